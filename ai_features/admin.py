@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AIChatHistory, DocumentVector, KnowledgeVector
+from .models import AIChatHistory, AIChatSummary, DocumentVector, EmbeddingCache, KnowledgeVector, VectorizationTask
 
 @admin.register(AIChatHistory)
 class AIChatHistoryAdmin(admin.ModelAdmin):
@@ -27,6 +27,22 @@ class AIChatHistoryAdmin(admin.ModelAdmin):
         )
 
 
+@admin.register(AIChatSummary)
+class AIChatSummaryAdmin(admin.ModelAdmin):
+    """チャット要約管理"""
+
+    list_display = ('user', 'summary_preview', 'summarized_until', 'updated_at')
+    search_fields = ('summary', 'user__user_id', 'user__email')
+    readonly_fields = ('updated_at',)
+    ordering = ('-updated_at',)
+
+    def summary_preview(self, obj):
+        """要約のプレビュー（最初の50文字）"""
+        return obj.summary[:50] + '...' if len(obj.summary) > 50 else obj.summary
+
+    summary_preview.short_description = '要約'
+
+
 @admin.register(DocumentVector)
 class DocumentVectorAdmin(admin.ModelAdmin):
     """ドキュメントベクトル管理"""
@@ -34,7 +50,7 @@ class DocumentVectorAdmin(admin.ModelAdmin):
     list_display = ('vector_id', 'source_type', 'source_id', 'content_preview', 'created_at')
     list_filter = ('source_type', 'created_at')
     search_fields = ('content', 'metadata')
-    readonly_fields = ('vector_id', 'created_at', 'updated_at')
+    readonly_fields = ('vector_id', 'content_hash', 'created_at', 'updated_at')
     ordering = ('-created_at',)
 
     def content_preview(self, obj):
@@ -48,7 +64,7 @@ class DocumentVectorAdmin(admin.ModelAdmin):
             'fields': ('vector_id', 'source_type', 'source_id', 'created_at', 'updated_at')
             }),
         ('コンテンツ', {
-            'fields': ('content', 'metadata')
+            'fields': ('content', 'content_hash', 'metadata')
             }),
         ('ベクトル', {
             'fields': ('embedding',),
@@ -64,7 +80,7 @@ class KnowledgeVectorAdmin(admin.ModelAdmin):
     list_display = ('vector_id', 'document_type', 'title', 'content_preview', 'created_at')
     list_filter = ('document_type', 'created_at')
     search_fields = ('title', 'content', 'metadata')
-    readonly_fields = ('vector_id', 'created_at', 'updated_at')
+    readonly_fields = ('vector_id', 'content_hash', 'created_at', 'updated_at')
     ordering = ('-created_at',)
 
     def content_preview(self, obj):
@@ -78,10 +94,32 @@ class KnowledgeVectorAdmin(admin.ModelAdmin):
             'fields': ('vector_id', 'document_type', 'title', 'created_at', 'updated_at')
             }),
         ('コンテンツ', {
-            'fields': ('content', 'metadata')
+            'fields': ('content', 'content_hash', 'metadata')
             }),
         ('ベクトル', {
             'fields': ('embedding',),
             'classes': ('collapse',)
             }),
-        )
\ No newline at end of file
+        )
+
+
+@admin.register(EmbeddingCache)
+class EmbeddingCacheAdmin(admin.ModelAdmin):
+    """埋め込みキャッシュ管理"""
+
+    list_display = ('cache_id', 'model_name', 'dimensions', 'text_hash', 'created_at', 'last_used_at')
+    list_filter = ('model_name', 'dimensions')
+    search_fields = ('text_hash',)
+    readonly_fields = ('cache_id', 'model_name', 'dimensions', 'text_hash', 'embedding', 'created_at', 'last_used_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(VectorizationTask)
+class VectorizationTaskAdmin(admin.ModelAdmin):
+    """ベクトル化タスク管理"""
+
+    list_display = ('task_id', 'source_type', 'source_id', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter = ('status', 'source_type')
+    search_fields = ('last_error',)
+    readonly_fields = ('task_id', 'locked_at', 'last_error', 'created_at', 'updated_at')
+    ordering = ('available_at', 'task_id')
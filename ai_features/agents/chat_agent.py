@@ -1,8 +1,10 @@
 import hashlib
 import json
 import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import List, Dict, Optional, Iterator, Tuple
-from datetime import datetime, timedelta
 from functools import lru_cache
 
 from langchain_core.tools import tool
@@ -12,17 +14,49 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-# ツール生成をキャッシュする（グローバル関数として定義）
-@lru_cache(maxsize=100)
-def _get_cached_tools_for_store(store_id: int) -> Tuple:
+# ツールを実行中のリクエストの店舗ID（ツールは店舗に依存せず、実行時にここから取得する）
+_current_store_id: ContextVar[Optional[int]] = ContextVar('ai_agent_store_id', default=None)
+
+
+@contextmanager
+def store_context(store_id: Optional[int]):
     """
-    store_idをバインドしたツールリストを作成（キャッシュ対応）
+    ブロック内で実行するツールの店舗IDを設定
 
     Args:
         store_id: 店舗ID
+    """
+    token = _current_store_id.set(store_id)
+    try:
+        yield
+    finally:
+        _current_store_id.reset(token)
+
+
+def get_current_store_id() -> int:
+    """
+    実行中のツールの店舗IDを取得
+
+    Raises:
+        RuntimeError: store_context の外で呼び出された場合
+    """
+    store_id = _current_store_id.get()
+    if store_id is None:
+        raise RuntimeError("店舗IDが設定されていません（store_context の中で実行してください）")
+    return store_id
+
+
+# ツールはプロセスで1回だけ生成し、全店舗で共有する（グローバル関数として定義）
+@lru_cache(maxsize=None)
+def _get_agent_tools() -> Tuple:
+    """
+    エージェントのツールリストを作成（プロセス内で1回だけ生成）
+
+    自店舗のツールは実行時に get_current_store_id() で店舗IDを取得するため、
+    店舗ごとにツールを生成する必要はない。
 
     Returns:
-        ツールのタプル（lru_cacheのためにタプルで返す）
+        ツールのタプル（共有するため変更不可のタプルで返す）
     """
     from ai_features.tools.search_tools import (
         search_daily_reports as _search_daily_reports,
@@ -31,6 +65,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         search_bbs_posts_my_store as _search_bbs_posts_my_store,
         search_bbs_by_keyword_my_store as _search_bbs_by_keyword_my_store,
         search_manual,
+        get_document_detail,
         search_by_genre as _search_by_genre,
         search_by_location as _search_by_location,
         search_daily_reports_all_stores,
@@ -53,7 +88,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         gather_topic_related_data_all_stores
     )
 
-    # Create tool functions with store_id bound via closure
+    # Create tool functions (store_id is resolved from the request context at call time)
     @tool
     def search_daily_reports(query: str = "", days: int = 30) -> str:
         """
@@ -68,12 +103,13 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
             query: Search keyword (e.g., "クレーム", "接客", "提供時間")
             days: Search period in days (default: 30)
         """
-        return _search_daily_reports.invoke({"query": query, "store_id": store_id, "days": days})
+        return _search_daily_reports.invoke({"query": query, "store_id": get_current_store_id(), "days": days})
 
     @tool
     def search_bbs_posts(query: str = "", days: int = 30) -> str:
         """
         Search bulletin board posts across ALL stores (includes HQ announcements).
+        Matches both exact keywords and similar meaning in one call (hybrid search).
         Returns full discussion threads with all comments.
 
         When to use this tool:
@@ -99,7 +135,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
 
         When to use this tool:
         - When looking for posts containing specific terms (営業時間, シフト, 休み, お知らせ)
-        - When vector search (search_bbs_posts) returns no results
+        - When the keyword must also be matched inside comments (search_bbs_posts already matches keywords in titles/contents)
         - When searching for announcements or official notices
         - Keywords: ○○について, ○○の投稿, ○○が書いてある
 
@@ -123,7 +159,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
             query: Search keyword
             days: Search period in days (default: 30)
         """
-        return _search_bbs_posts_my_store.invoke({"query": query, "store_id": store_id, "days": days})
+        return _search_bbs_posts_my_store.invoke({"query": query, "store_id": get_current_store_id(), "days": days})
 
     @tool
     def search_bbs_by_keyword_my_store(keyword: str, days: int = 60) -> str:
@@ -136,7 +172,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
             keyword: Keyword to search
             days: Search period in days (default: 60)
         """
-        return _search_bbs_by_keyword_my_store.invoke({"keyword": keyword, "store_id": store_id, "days": days})
+        return _search_bbs_by_keyword_my_store.invoke({"keyword": keyword, "store_id": get_current_store_id(), "days": days})
 
     @tool
     def get_claim_statistics(days: int = 30) -> str:
@@ -151,7 +187,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Args:
             days: Aggregation period in days (default: 30)
         """
-        return _get_claim_statistics.invoke({"store_id": store_id, "days": days})
+        return _get_claim_statistics.invoke({"store_id": get_current_store_id(), "days": days})
 
     @tool
     def get_sales_trend(days: int = 30) -> str:
@@ -166,7 +202,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Args:
             days: Aggregation period in days (default: 30)
         """
-        return _get_sales_trend.invoke({"store_id": store_id, "days": days})
+        return _get_sales_trend.invoke({"store_id": get_current_store_id(), "days": days})
 
     @tool
     def get_sales_by_date(date: str) -> str:
@@ -184,7 +220,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Returns:
             Sales amount, customer count, and average per customer for the date
         """
-        return _get_sales_by_date.invoke({"store_id": store_id, "date": date})
+        return _get_sales_by_date.invoke({"store_id": get_current_store_id(), "date": date})
 
     @tool
     def get_sales_by_date_range(start_date: str, end_date: str) -> str:
@@ -203,7 +239,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Returns:
             Aggregated summary and daily breakdown for the period
         """
-        return _get_sales_by_date_range.invoke({"store_id": store_id, "start_date": start_date, "end_date": end_date})
+        return _get_sales_by_date_range.invoke({"store_id": get_current_store_id(), "start_date": start_date, "end_date": end_date})
 
     @tool
     def get_cash_difference_analysis(days: int = 30) -> str:
@@ -217,7 +253,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Args:
             days: Aggregation period in days (default: 30)
         """
-        return _get_cash_difference_analysis.invoke({"store_id": store_id, "days": days})
+        return _get_cash_difference_analysis.invoke({"store_id": get_current_store_id(), "days": days})
 
     @tool
     def get_report_statistics(days: int = 30) -> str:
@@ -232,7 +268,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Args:
             days: Aggregation period in days (default: 30)
         """
-        return _get_report_statistics.invoke({"store_id": store_id, "days": days})
+        return _get_report_statistics.invoke({"store_id": get_current_store_id(), "days": days})
 
     @tool
     def get_monthly_goal_status() -> str:
@@ -246,7 +282,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Returns:
             JSON string with current goal status and past goals
         """
-        return _get_monthly_goal_status.invoke({"store_id": store_id})
+        return _get_monthly_goal_status.invoke({"store_id": get_current_store_id()})
 
     @tool
     def search_by_genre(query: str, genre: str, days: int = 60) -> str:
@@ -263,7 +299,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
             genre: Genre filter (claim/praise/accident/report/other)
             days: Search period in days (default: 60)
         """
-        return _search_by_genre.invoke({"query": query, "store_id": store_id, "genre": genre, "days": days})
+        return _search_by_genre.invoke({"query": query, "store_id": get_current_store_id(), "genre": genre, "days": days})
 
     @tool
     def search_by_location(query: str, location: str, days: int = 60) -> str:
@@ -280,7 +316,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
             location: Location filter (kitchen/hall/cashier/toilet/other)
             days: Search period in days (default: 60)
         """
-        return _search_by_location.invoke({"query": query, "store_id": store_id, "location": location, "days": days})
+        return _search_by_location.invoke({"query": query, "store_id": get_current_store_id(), "location": location, "days": days})
 
     @tool
     def gather_topic_related_data(topic: str, days: int = 30) -> str:
@@ -299,7 +335,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Returns:
             Comprehensive data from daily reports, BBS, and relevant statistics
         """
-        return _gather_topic_related_data.invoke({"topic": topic, "store_id": store_id, "days": days})
+        return _gather_topic_related_data.invoke({"topic": topic, "store_id": get_current_store_id(), "days": days})
 
     @tool
     def compare_periods(metric: str, period1_days: int = 7, period2_days: int = 14) -> str:
@@ -319,7 +355,7 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         Returns:
             Side-by-side comparison with calculated change rates
         """
-        return _compare_periods.invoke({"store_id": store_id, "metric": metric, "period1_days": period1_days, "period2_days": period2_days})
+        return _compare_periods.invoke({"store_id": get_current_store_id(), "metric": metric, "period1_days": period1_days, "period2_days": period2_days})
 
     # ============================================================
     # 全店舗ツール（All Stores）
@@ -477,6 +513,8 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         search_by_location,
         # マニュアル（全店舗共通）
         search_manual,
+        # 省略された本文の取得（全店舗共通）
+        get_document_detail,
         # 統計ツール（自店舗）
         get_claim_statistics,
         get_sales_trend,
@@ -497,95 +535,30 @@ def _get_cached_tools_for_store(store_id: int) -> Tuple:
         gather_topic_related_data_all_stores_tool,
     )
 
-    logger.info(f"Created and cached {len(tools)} tools for store_id={store_id}")
+    logger.info(f"Created {len(tools)} agent tools")
     return tools
 
 
-class ChatAgent:
-    """
-    LangChain ReAct Chat Agent
+def _invoke_tool(tool, tool_args, store_id: Optional[int] = None, budget=None):
     """
+    ワーカースレッドでツールを実行（非同期ストリーミング用）
 
-    def __init__(
-        self,
-        model_name: str = "gpt-4o-mini",
-        temperature: float = 0.0,
-        openai_api_key: Optional[str] = None,
-    ):
-        """
-        Args:
-            model_name: OpenAIモデル名（デフォルト: "gpt-4o-mini"）
-            temperature: 温度パラメータ（0.0-1.0、推奨: 0.0-0.2）
-            openai_api_key: OpenAI APIキー
-        """
-        self.model_name = model_name
-        self.temperature = temperature
-        self.openai_api_key = openai_api_key
-
-        # LLMの初期化
-        self.llm = self._initialize_llm()
-
-    def _initialize_llm(self):
-        """LLMを初期化"""
-
-        llm = ChatOpenAI(
-            model=self.model_name,
-            temperature=self.temperature,
-            api_key=self.openai_api_key
-        )
-        return llm
-
-
-    def _create_tools_for_store(self, store_id: int) -> List:
-        """
-        store_idをバインドしたツールリストを作成（キャッシュ使用）
-
-        Args:
-            store_id: 店舗ID
-
-        Returns:
-            ツールのリスト
-        """
-        # キャッシュされたグローバル関数を使用
-        return list(_get_cached_tools_for_store(store_id))
-
-
-    def chat(
-        self,
-        query: str,
-        user,
-        chat_history: Optional[List[Dict]] = None,
-        use_tools: bool = True
-    ) -> Dict:
-        """
-        チャット実行
-
-        Args:
-            query: ユーザーの質問
-            user: Djangoユーザーオブジェクト
-            chat_history: チャット履歴（オプション）
-            use_tools: ツールを使用するか（デフォルト: True）
+    ワーカースレッドには呼び出し元のコンテキストが引き継がれないため、店舗IDと
+    ツール結果のトークン予算をここで設定する。
+    スレッドごとに開いたDB接続は実行後に後始末する。
+    """
+    from django.db import close_old_connections
+    from ai_features.tools.formatting import tool_output_budget
 
-        Returns:
-            {
-                "message": "回答テキスト",
-                "sources": [],
-                "intermediate_steps": [],
-                "token_count": 推定値
-            }
-        """
-        try:
-            # ユーザー情報を収集
-            user_name = getattr(user, 'email', getattr(user, 'user_id', '不明'))
-            store_id = user.store.store_id if hasattr(user, 'store') and user.store else None
-            store_name = user.store.store_name if hasattr(user, 'store') and user.store else "不明"
+    try:
+        with store_context(store_id), tool_output_budget(budget):
+            return tool.invoke(tool_args)
+    finally:
+        close_old_connections()
 
-            # System prompt (English, ReAct-optimized)
-            system_info = f"""You are a restaurant operations support AI assistant. You help store managers and staff by retrieving accurate information from the database.
 
-## Current Context
-- Date/Time: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-- Store: {store_name} (ID: {store_id or "Unknown"})
+# システムプロンプトの固定部分（プロセスで1回だけ生成し、全リクエストで同一のバイト列を使う）
+SYSTEM_PROMPT_PREFIX = """You are a restaurant operations support AI assistant. You help store managers and staff by retrieving accurate information from the database.
 
 ## Your Mission: PDCA Cycle Support
 
@@ -605,15 +578,16 @@ You are NOT just a data retrieval assistant. You are a **strategic advisor** hel
 
 ## Available Tools (12 tools)
 
-### Search Tools (8 tools)
+### Search Tools (9 tools)
 - **search_daily_reports**: Search daily reports (自店舗)
 - **search_by_genre**: Search by genre - claim/praise/accident/report/other (自店舗)
 - **search_by_location**: Search by location - kitchen/hall/cashier/toilet/other (自店舗)
-- **search_bbs_posts**: Search bulletin board (全店舗, includes HQ announcements)
-- **search_bbs_by_keyword**: Search BBS by keyword (全店舗, use for 営業時間, お知らせ)
+- **search_bbs_posts**: Search bulletin board by keyword + meaning (全店舗, includes HQ announcements)
+- **search_bbs_by_keyword**: Search BBS by keyword including comments (全店舗)
 - **search_bbs_posts_my_store**: Search bulletin board (自店舗のみ, for うちの店の議論)
 - **search_bbs_by_keyword_my_store**: Search BBS by keyword (自店舗のみ)
 - **search_manual**: Search manuals and guidelines (全店舗共通)
+- **get_document_detail**: Full text of a daily report / BBS post by source_id (use when a result has `"truncated": true` and the details matter)
 
 ### Analytics Tools (7 tools)
 - **get_claim_statistics**: Claim counts, trends, category breakdown
@@ -648,9 +622,10 @@ Example (specific genre): "クレームの内容" → search_by_genre(query="",
 **DEFAULT: Always use ALL-STORES search (search_bbs_posts, search_bbs_by_keyword)**
 Only use my-store search when user EXPLICITLY mentions: "うちの店", "自店舗", "自分の店", "店内"
 
-→ DEFAULT (no store specification): Use **search_bbs_posts** or **search_bbs_by_keyword**
-Example: "年末年始の営業時間" → search_bbs_by_keyword(keyword="営業時間", days=60)
-Example: "お知らせについて" → search_bbs_by_keyword(keyword="お知らせ", days=60)
+→ DEFAULT (no store specification): Use **search_bbs_posts** (it matches keywords AND meaning, so one call is enough)
+→ Use **search_bbs_by_keyword** only when the keyword may appear only in comments
+Example: "年末年始の営業時間" → search_bbs_posts(query="年末年始 営業時間", days=60)
+Example: "お知らせについて" → search_bbs_posts(query="お知らせ", days=60)
 Example: "シフトの投稿" → search_bbs_posts(query="シフト", days=30)
 Example: "掲示板で何か話してる？" → search_bbs_posts(query="", days=30)
 
@@ -714,39 +689,290 @@ Example: "今月の目標" → get_monthly_goal_status()
 **📈 根拠となるデータ**
 - [使用したデータの要点]"""
 
+# 固定部分の変更を検知するための指紋（プロセス間・デプロイ間でキャッシュが共有できるかの確認用）
+SYSTEM_PROMPT_PREFIX_HASH = hashlib.sha256(SYSTEM_PROMPT_PREFIX.encode('utf-8')).hexdigest()[:16]
+
+
+class PromptCacheStats:
+    """
+    プロバイダ側のプロンプトキャッシュのヒット率を集計
+
+    LLMの応答（usage_metadata）の入力トークン数と、そのうちキャッシュから読み込まれた
+    トークン数（input_token_details.cache_read）をプロセス内で累計する。
+    """
+
+    _lock = threading.Lock()
+    _stats = {'calls': 0, 'input_tokens': 0, 'cached_tokens': 0}
+
+    @classmethod
+    def record(cls, message) -> None:
+        """
+        LLMの応答のトークン使用量を記録（使用量を含まない応答は無視）
+
+        Args:
+            message: AIMessage / AIMessageChunk
+        """
+        usage = getattr(message, 'usage_metadata', None)
+        if not isinstance(usage, dict):
+            return
+        details = usage.get('input_token_details') or {}
+        with cls._lock:
+            cls._stats['calls'] += 1
+            cls._stats['input_tokens'] += usage.get('input_tokens', 0)
+            cls._stats['cached_tokens'] += details.get('cache_read', 0) or 0
+
+    @classmethod
+    def stats(cls) -> Dict:
+        """
+        ヒット率などの統計を取得
+
+        Returns:
+            dict: calls / input_tokens / cached_tokens / hit_rate / prefix_hash
+        """
+        with cls._lock:
+            stats = dict(cls._stats)
+        input_tokens = stats['input_tokens']
+        stats['hit_rate'] = round(stats['cached_tokens'] / input_tokens, 4) if input_tokens else 0.0
+        stats['prefix_hash'] = SYSTEM_PROMPT_PREFIX_HASH
+        return stats
+
+    @classmethod
+    def reset(cls):
+        """統計を破棄（テスト用）"""
+        with cls._lock:
+            cls._stats = {'calls': 0, 'input_tokens': 0, 'cached_tokens': 0}
+
+
+class AgentPool:
+    """
+    プロセス内で共有するLLMクライアントとコンパイル済みエージェントのプール
+
+    ChatOpenAI は内部にHTTPクライアント（コネクションプール）を持つため、同じ設定の
+    インスタンスを使い回してモデルのエンドポイントへの接続を再利用する。
+    ツールをバインドしたLLM・コンパイル済みのReActエージェントは (LLM, ツールセット) ごとに保持する。
+    WSGIのビューとASGIのストリーミングサーバーのどちらも ChatAgent を経由して共有する。
+    """
+
+    _lock = threading.Lock()
+    _llms: Dict[Tuple, object] = {}
+    _bound_llms: Dict[Tuple, Tuple] = {}
+    _react_agents: Dict[Tuple, Tuple] = {}
+
+    @classmethod
+    def get_llm(cls, key: Tuple, factory):
+        """
+        設定に対応するLLMを取得（なければ factory で作成して保持）
+
+        Args:
+            key: (モデル名, 温度, APIキー)
+            factory: LLMを作成する関数
+        """
+        with cls._lock:
+            llm = cls._llms.get(key)
+            if llm is None:
+                llm = factory()
+                cls._llms[key] = llm
+                logger.info(f"Created shared LLM client for model={key[0]}")
+            return llm
+
+    @classmethod
+    def bind_tools(cls, llm, tools: List):
+        """ツールをバインドしたLLMを取得（ツールのスキーマ変換は初回のみ）"""
+        return cls._get_or_create(cls._bound_llms, llm, tools, lambda: llm.bind_tools(tools))
+
+    @classmethod
+    def get_react_agent(cls, llm, tools: List):
+        """コンパイル済みのReActエージェントを取得（グラフのコンパイルは初回のみ）"""
+        def compile_agent():
+            # 遅延インポート
+            from langgraph.prebuilt import create_react_agent
+            return create_react_agent(model=llm, tools=tools)
+
+        return cls._get_or_create(cls._react_agents, llm, tools, compile_agent)
+
+    @classmethod
+    def reset(cls):
+        """保持しているLLM・エージェントを破棄（設定変更時・テスト用）"""
+        with cls._lock:
+            cls._llms = {}
+            cls._bound_llms = {}
+            cls._react_agents = {}
+
+    @classmethod
+    def _get_or_create(cls, entries: Dict, llm, tools: List, factory):
+        # 値にLLMとツールの参照も保持し、キーのidが再利用されないようにする
+        key = (id(llm), tuple(id(t) for t in tools))
+        with cls._lock:
+            entry = entries.get(key)
+            if entry is None:
+                entry = (factory(), llm, tuple(tools))
+                entries[key] = entry
+            return entry[0]
+
+
+class ChatAgent:
+    """
+    LangChain ReAct Chat Agent
+
+    LLMクライアントとコンパイル済みエージェントは AgentPool で共有するため、
+    リクエストごとに作成してもセットアップのコストはかからない。
+    """
+
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        temperature: float = 0.0,
+        openai_api_key: Optional[str] = None,
+        max_iterations: Optional[int] = None,
+    ):
+        """
+        Args:
+            model_name: OpenAIモデル名（デフォルト: "gpt-4o-mini"）
+            temperature: 温度パラメータ（0.0-1.0、推奨: 0.0-0.2）
+            openai_api_key: OpenAI APIキー
+            max_iterations: ストリーミング時のReActループの最大ステップ数（Noneの場合は設定値）
+        """
+        from django.conf import settings
+
+        self.model_name = model_name
+        self.temperature = temperature
+        self.openai_api_key = openai_api_key
+        self.max_iterations = max_iterations or getattr(settings, 'AI_AGENT_MAX_ITERATIONS', 5)
+
+        # LLMの初期化
+        self.llm = self._initialize_llm()
+
+    def _initialize_llm(self):
+        """LLMを初期化（同じ設定のLLMはプロセス内で共有）"""
+
+        return AgentPool.get_llm(
+            (self.model_name, self.temperature, self.openai_api_key),
+            lambda: ChatOpenAI(
+                model=self.model_name,
+                temperature=self.temperature,
+                api_key=self.openai_api_key
+            )
+        )
+
+
+    def _get_tools(self) -> List:
+        """
+        全店舗で共有するツールリストを取得（店舗IDは実行時に store_context で設定する）
+
+        Returns:
+            ツールのリスト
+        """
+        return list(_get_agent_tools())
+
+
+    def _build_system_info(self, store_id: Optional[int], store_name: str) -> str:
+        """
+        システムプロンプトを生成（chat / chat_stream / achat_stream 共通）
+
+        固定部分（SYSTEM_PROMPT_PREFIX）はすべてのリクエストで同一のバイト列とし、
+        プロバイダ側のプロンプトキャッシュが効くよう、日付・店舗などの可変部分は末尾に置く。
+
+        Args:
+            store_id: 店舗ID
+            store_name: 店舗名
+
+        Returns:
+            システムプロンプト文字列
+        """
+        from django.utils import timezone
+
+        # 日時は日付単位にし、同じ日の会話では履歴までキャッシュが効くようにする
+        today = timezone.localdate()
+        return (
+            f"{SYSTEM_PROMPT_PREFIX}\n\n"
+            f"## Current Context\n"
+            f"- Date: {today.isoformat()} ({today.strftime('%A')})\n"
+            f"- Store: {store_name} (ID: {store_id or 'Unknown'})"
+        )
+
+    def _build_messages(self, system_info: str, query: str, chat_history: Optional[List[Dict]] = None) -> List:
+        """
+        LLMに渡すメッセージリストを作成（システム → 履歴の要約 → 直近の履歴 → 現在の質問）
+
+        Args:
+            system_info: システムプロンプト
+            query: ユーザーの質問
+            chat_history: チャット履歴（role='summary' は過去の会話の要約）
+
+        Returns:
+            メッセージのリスト
+        """
+        from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+        messages = [SystemMessage(content=system_info)]
+
+        # チャット履歴を追加
+        if chat_history:
+            for msg in chat_history:
+                if msg['role'] == 'summary':
+                    # システムプロンプトの後に置き、システムプロンプトのキャッシュを崩さない
+                    messages.append(SystemMessage(content=f"## Earlier Conversation Summary\n{msg['content']}"))
+                elif msg['role'] == 'user':
+                    messages.append(HumanMessage(content=msg['content']))
+                elif msg['role'] == 'assistant':
+                    messages.append(AIMessage(content=msg['content']))
+
+        # 現在のクエリを追加
+        messages.append(HumanMessage(content=query))
+        return messages
+
+    def chat(
+        self,
+        query: str,
+        user,
+        chat_history: Optional[List[Dict]] = None,
+        use_tools: bool = True
+    ) -> Dict:
+        """
+        チャット実行
+
+        Args:
+            query: ユーザーの質問
+            user: Djangoユーザーオブジェクト
+            chat_history: チャット履歴（オプション）
+            use_tools: ツールを使用するか（デフォルト: True）
+
+        Returns:
+            {
+                "message": "回答テキスト",
+                "sources": [],
+                "intermediate_steps": [],
+                "token_count": 推定値
+            }
+        """
+        try:
+            # ユーザー情報を収集
+            user_name = getattr(user, 'email', getattr(user, 'user_id', '不明'))
+            store_id = user.store.store_id if hasattr(user, 'store') and user.store else None
+            store_name = user.store.store_name if hasattr(user, 'store') and user.store else "不明"
+
+            # System prompt (English, ReAct-optimized)
+            system_info = self._build_system_info(store_id, store_name)
+
             # ツールを使用する場合（ReActエージェント）
             if use_tools and store_id:
                 # logger.info(f"Creating ReAct agent for store_id={store_id}")
 
-                # ツール作成（キャッシュから取得）
-                tools = self._create_tools_for_store(store_id)
-
-                # create_react_agentを使用
-                from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+                # ツール取得（全店舗共通）
+                tools = self._get_tools()
 
                 # メッセージリストの作成（システムメッセージを先頭に追加）
-                messages = [SystemMessage(content=system_info)]
-
-                # チャット履歴を追加
-                if chat_history:
-                    for msg in chat_history:
-                        if msg['role'] == 'user':
-                            messages.append(HumanMessage(content=msg['content']))
-                        elif msg['role'] == 'assistant':
-                            messages.append(AIMessage(content=msg['content']))
-
-                # 現在のクエリを追加
-                messages.append(HumanMessage(content=query))
-
-                # ReActエージェント作成（遅延インポート）
-                from langgraph.prebuilt import create_react_agent
-                agent = create_react_agent(
-                    model=self.llm,
-                    tools=tools
-                )
+                messages = self._build_messages(system_info, query, chat_history)
 
-                # エージェント実行
-                result = agent.invoke({"messages": messages})
+                # ReActエージェント取得（コンパイル済みのものを再利用）
+                agent = AgentPool.get_react_agent(self.llm, tools)
+
+                # エージェント実行（ToolNodeはコンテキストを引き継いでツールを実行する）
+                from ai_features.tools.formatting import tool_output_budget
+                with store_context(store_id), tool_output_budget(self._new_tool_output_budget()):
+                    result = agent.invoke({"messages": messages})
+                for msg in result["messages"]:
+                    PromptCacheStats.record(msg)
 
                 # 結果を取得
                 response_text = result["messages"][-1].content
@@ -777,23 +1003,11 @@ Example: "今月の目標" → get_monthly_goal_status()
 
             else:
                 # ツールなしで直接LLM呼び出し
-                logger.info(f"Invoking LLM without tools")
-                from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-
-                messages = [SystemMessage(content=system_info)]
-
-                # Add chat history if provided
-                if chat_history:
-                    for msg in chat_history:
-                        if msg['role'] == 'user':
-                            messages.append(HumanMessage(content=msg['content']))
-                        elif msg['role'] == 'assistant':
-                            messages.append(AIMessage(content=msg['content']))
-
-                # Add current query
-                messages.append(HumanMessage(content=query))
+                logger.info("Invoking LLM without tools")
+                messages = self._build_messages(system_info, query, chat_history)
 
                 llm_response = self.llm.invoke(messages)
+                PromptCacheStats.record(llm_response)
                 # AIMessageの場合、contentを取得
                 if hasattr(llm_response, 'content'):
                     response_text = llm_response.content
@@ -804,7 +1018,7 @@ Example: "今月の目標" → get_monthly_goal_status()
             # 空の応答をチェック
             if not response_text or response_text.strip() in ['-', '', 'None']:
                 response_text = "申し訳ございません。回答を生成できませんでした。別の質問をお試しください。"
-                logger.warning(f"Empty or invalid response generated")
+                logger.warning("Empty or invalid response generated")
 
             # 結果を整形
             response = {
@@ -825,96 +1039,233 @@ Example: "今月の目標" → get_monthly_goal_status()
                 "token_count": 0,
             }
 
+    def _tool_settings(self) -> Tuple[float, int]:
+        """ツール実行のタイムアウト（秒）と並列数の上限を取得"""
+        from django.conf import settings
+
+        return (
+            getattr(settings, 'AI_AGENT_TOOL_TIMEOUT', 30),
+            getattr(settings, 'AI_AGENT_MAX_TOOL_WORKERS', 8),
+        )
+
+    def _new_tool_output_budget(self):
+        """1回の応答のツール結果のトークン予算を作成（予算が0以下の場合はNone）"""
+        from django.conf import settings
+        from ai_features.tools.formatting import ToolOutputBudget
+
+        total_tokens = getattr(settings, 'AI_TOOL_OUTPUT_TOKEN_BUDGET', 12000)
+        if total_tokens <= 0:
+            return None
+        return ToolOutputBudget(
+            total_tokens,
+            max_call_tokens=getattr(settings, 'AI_TOOL_OUTPUT_MAX_CALL_TOKENS', 4000) or None
+        )
+
+    # 履歴の要約で、1発言あたりにLLMへ渡す文字数
+    SUMMARY_INPUT_CHARS = 1000
+
+    def summarize_history(self, summary: str, messages: List[Dict]) -> str:
+        """
+        前回の要約に新しい発言を反映した要約を作成（ChatHistoryService の summarizer）
+
+        Args:
+            summary: 前回の要約（初回は空文字）
+            messages: 要約に反映する発言のリスト（古い順）
+
+        Returns:
+            新しい要約
+        """
+        response = self.llm.invoke(self._build_summary_messages(summary, messages))
+        PromptCacheStats.record(response)
+        content = response.content
+        return content if isinstance(content, str) else str(content)
+
+    async def asummarize_history(self, summary: str, messages: List[Dict]) -> str:
+        """
+        summarize_history の非同期版（ChatHistoryService.aupdate_summary の summarizer）
+
+        Args:
+            summary: 前回の要約（初回は空文字）
+            messages: 要約に反映する発言のリスト（古い順）
+
+        Returns:
+            新しい要約
+        """
+        response = await self.llm.ainvoke(self._build_summary_messages(summary, messages))
+        PromptCacheStats.record(response)
+        content = response.content
+        return content if isinstance(content, str) else str(content)
+
+    def _build_summary_messages(self, summary: str, messages: List[Dict]) -> List:
+        """履歴の要約に使うメッセージリストを作成"""
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        lines = []
+        for msg in messages:
+            label = 'ユーザー' if msg['role'] == 'user' else 'AI'
+            lines.append(f"{label}: {msg['content'][:self.SUMMARY_INPUT_CHARS]}")
+
+        return [
+            SystemMessage(content=(
+                "あなたは飲食店向けアシスタントとユーザーの会話を要約します。"
+                "これまでの要約に新しい会話を反映し、以降の質問に必要な事実（話題、店舗、期間、数値、結論、ユーザーの要望）"
+                "だけを日本語の箇条書きで簡潔にまとめてください。表や長い引用は含めないでください。"
+            )),
+            HumanMessage(content=(
+                f"## これまでの要約\n{summary or '（なし）'}\n\n"
+                f"## 新しい会話\n" + "\n".join(lines)
+            )),
+        ]
+
+    def _run_tools_stream(
+        self,
+        tool_calls: List,
+        tools_by_name: Dict,
+        step: int,
+        store_id: Optional[int] = None,
+        budget=None
+    ):
+        """
+        1ステップ分のツール呼び出しをスレッドプールで並列実行
+
+        完了したツールから順に進捗イベントを返し、全ツールの結果（ToolMessage）を
+        ジェネレータの戻り値として返す（`yield from` で受け取る）。
+
+        Args:
+            tool_calls: LLMが返したツール呼び出しのリスト
+            tools_by_name: ツール名 → ツールの辞書
+            step: ReActループのステップ番号
+            store_id: ツールを実行する店舗ID
+            budget: ツール結果のトークン予算（ToolOutputBudget）
+
+        Yields:
+            dict: 進捗イベント（type='tool_end'）
+
+        Returns:
+            ツール呼び出し順に並べたToolMessageのリスト
+        """
+        import concurrent.futures
+        import time
+        from langchain_core.messages import ToolMessage
+
+        timeout, max_workers = self._tool_settings()
+        contents = {}
+        futures = {}
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(tool_calls)))
+        )
+        try:
+            for tool_call in tool_calls:
+                target_tool = tools_by_name.get(tool_call['name'])
+                if target_tool is None:
+                    # LLMにはすべての呼び出しへの応答を返す必要がある
+                    contents[tool_call['id']] = f"Error: 不明なツールです: {tool_call['name']}"
+                    continue
+                logger.info(f"[Stream] Executing tool: {tool_call['name']}")
+                futures[executor.submit(_invoke_tool, target_tool, tool_call['args'], store_id, budget)] = tool_call
+
+            deadline = time.monotonic() + timeout
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending,
+                    timeout=max(0, deadline - time.monotonic()),
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for future in done:
+                    tool_call = futures[future]
+                    try:
+                        contents[tool_call['id']] = str(future.result())
+                        status = 'success'
+                    except Exception as e:
+                        logger.error(f"[Stream] Error executing tool {tool_call['name']}: {e}")
+                        contents[tool_call['id']] = f"Error: {str(e)}"
+                        status = 'error'
+                    yield {'type': 'tool_end', 'tool': tool_call['name'], 'status': status, 'step': step}
+
+            # タイムアウトしたツールは結果を待たずにエラーとして扱う
+            for future in pending:
+                tool_call = futures[future]
+                logger.warning(f"[Stream] Tool timed out after {timeout}s: {tool_call['name']}")
+                contents[tool_call['id']] = f"Error: {timeout}秒以内に完了しませんでした"
+                yield {'type': 'tool_end', 'tool': tool_call['name'], 'status': 'timeout', 'step': step}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return [
+            ToolMessage(content=contents[tool_call['id']], tool_call_id=tool_call['id'])
+            for tool_call in tool_calls
+        ]
+
     def _react_loop_stream(
         self,
         query: str,
         tools: List,
         system_info: str,
-        chat_history: Optional[List[Dict]] = None
+        chat_history: Optional[List[Dict]] = None,
+        store_id: Optional[int] = None
     ):
         """
-        ReActループのストリーミング版（最終回答のみトークン単位でストリーム）
+        ReActループのストリーミング版（複数ステップ・ツール並列実行）
+
+        各ステップでツールをバインドしたLLMをストリーミングし、ツール呼び出しの差分
+        （tool_call_chunks）が現れなければそのまま回答トークンを返す。ツール呼び出しが
+        あれば同じステップの呼び出しを並列実行し、結果を加えて次のステップへ進む。
+        最大ステップ数に達した場合はツールなしのLLMで最終回答を生成する。
 
         Args:
             query: ユーザーの質問
             tools: 利用可能なツールリスト
             system_info: システムプロンプト
             chat_history: チャット履歴
+            store_id: ツールを実行する店舗ID
 
         Yields:
             str: レスポンスのトークンチャンク
+            dict: ツール実行の進捗イベント（type='tool_start' / 'tool_end'）
         """
         try:
-            from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
-
-            # System message
-            system_message = SystemMessage(content=system_info)
-
-            # Bind tools to the LLM
-            llm_with_tools = self.llm.bind_tools(tools)
-
-            # Create messages with chat history
-            messages = [system_message]
-
-            # Add chat history if provided
-            if chat_history:
-                for msg in chat_history:
-                    if msg['role'] == 'user':
-                        messages.append(HumanMessage(content=msg['content']))
-                    elif msg['role'] == 'assistant':
-                        messages.append(AIMessage(content=msg['content']))
-
-            # Add current query
-            messages.append(HumanMessage(content=query))
-
-            # Invoke LLM with tools
-            logger.info(f"[Stream] Invoking LLM with tools for query: {query}")
-            response = llm_with_tools.invoke(messages)
-
-            # Check if tools were called
-            if hasattr(response, 'tool_calls') and response.tool_calls:
-                logger.info(f"[Stream] Tools called: {len(response.tool_calls)}")
-
-                # Execute tool calls (non-streaming)
-                tool_results = []
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call['name']
-                    tool_args = tool_call['args']
-                    logger.info(f"[Stream] Executing tool: {tool_name}")
-
-                    # Find and execute the tool
-                    for tool in tools:
-                        if tool.name == tool_name:
-                            result_text = tool.invoke(tool_args)
-                            tool_results.append(ToolMessage(
-                                content=str(result_text),
-                                tool_call_id=tool_call['id']
-                            ))
-                            break
-
-                # Get final response with tool results - STREAMING
+            llm_with_tools = AgentPool.bind_tools(self.llm, tools)
+            tools_by_name = {t.name: t for t in tools}
+            messages = self._build_messages(system_info, query, chat_history)
+            budget = self._new_tool_output_budget()
+
+            for step in range(1, self.max_iterations + 1):
+                logger.info(f"[Stream] Step {step}: streaming LLM with tools for query: {query}")
+                response = None
+                has_tool_calls = False
+                for chunk in llm_with_tools.stream(messages):
+                    response = chunk if response is None else response + chunk
+                    if getattr(chunk, 'tool_call_chunks', None):
+                        has_tool_calls = True
+                    if not has_tool_calls and chunk.content:
+                        yield chunk.content
+                PromptCacheStats.record(response)
+
+                if not (has_tool_calls and response.tool_calls):
+                    if response is None or not response.content:
+                        logger.error(f"[Stream] No content in response! Response type: {type(response)}")
+                        yield "エラー: 応答が空です"
+                    return
+
+                logger.info(f"[Stream] Step {step}: tools called: {len(response.tool_calls)}")
+                yield {
+                    'type': 'tool_start',
+                    'tools': [tool_call['name'] for tool_call in response.tool_calls],
+                    'step': step,
+                }
+                tool_results = yield from self._run_tools_stream(response.tool_calls, tools_by_name, step, store_id, budget)
                 messages.append(response)
                 messages.extend(tool_results)
 
-                logger.info(f"[Stream] Generating final response with streaming...")
-                # 重要: 最終回答生成時はツールなしのLLMを使用
-                # llm_with_tools を使うとLLMがまたツールを呼ぼうとしてしまう
-                for chunk in self.llm.stream(messages):
-                    if hasattr(chunk, 'content') and chunk.content:
-                        yield chunk.content
-                logger.info(f"[Stream] Final response streaming completed")
-            else:
-                logger.info("[Stream] No tools called, streaming direct response")
-                # ツールが呼ばれなかった場合もストリーミング
-                if hasattr(response, 'content') and response.content:
-                    logger.info(f"[Stream] Direct response length: {len(response.content)}")
-                    # トークン単位でストリーミング
-                    for chunk in self.llm.stream(messages):
-                        if hasattr(chunk, 'content') and chunk.content:
-                            yield chunk.content
-                else:
-                    logger.error(f"[Stream] No content in response! Response type: {type(response)}, has content: {hasattr(response, 'content')}")
-                    yield "エラー: 応答が空です"
+            # 最大ステップ数に達した場合はツールなしのLLMで最終回答を生成
+            logger.info(f"[Stream] Reached max iterations ({self.max_iterations}), generating final response")
+            for chunk in self.llm.stream(messages):
+                PromptCacheStats.record(chunk)
+                if hasattr(chunk, 'content') and chunk.content:
+                    yield chunk.content
 
         except Exception as e:
             logger.error(f"[Stream] Error in _react_loop_stream: {e}", exc_info=True)
@@ -925,7 +1276,8 @@ Example: "今月の目標" → get_monthly_goal_status()
         query: str,
         user,
         chat_history: Optional[List[Dict]] = None,
-        use_tools: bool = True
+        use_tools: bool = True,
+        include_progress: bool = False
     ):
         """
         ストリーミングチャット実行（Generator）
@@ -935,9 +1287,11 @@ Example: "今月の目標" → get_monthly_goal_status()
             user: Djangoユーザーオブジェクト
             chat_history: チャット履歴（オプション）
             use_tools: ツールを使用するか（デフォルト: True）
+            include_progress: ツール実行の進捗イベント（dict）も返すか（デフォルト: False）
 
         Yields:
             str: レスポンスのチャンク（トークンごと）
+            dict: 進捗イベント（include_progress=True の場合のみ）
         """
         try:
             # ユーザー情報を収集
@@ -945,181 +1299,219 @@ Example: "今月の目標" → get_monthly_goal_status()
             store_name = user.store.store_name if hasattr(user, 'store') and user.store else "不明"
 
             # System prompt (same as chat method)
-            system_info = f"""You are a restaurant operations support AI assistant. You help store managers and staff by retrieving accurate information from the database.
-
-## Current Context
-- Date/Time: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-- Store: {store_name} (ID: {store_id or "Unknown"})
-
-## Your Mission: PDCA Cycle Support
+            system_info = self._build_system_info(store_id, store_name)
 
-You are NOT just a data retrieval assistant. You are a **strategic advisor** helping managers improve operations through the PDCA cycle:
-- **Plan**: Help set realistic goals and create action plans
-- **Do**: Monitor execution and provide real-time guidance
-- **Check**: Analyze results and identify issues
-- **Act**: Recommend specific improvements based on data
-
-## Critical Rules
-1. **ALWAYS use tools**: You have NO knowledge about this restaurant's data. You MUST use tools to retrieve ALL information.
-2. **NEVER guess or assume**: Base your answers ONLY on actual data retrieved from tools.
-3. **Check tool results carefully**:
-   - If tool returns `"status": "success"` AND `"results"` has items → Data EXISTS, provide the information
-   - If tool returns `"status": "no_data"` OR `"results": []` → Data does NOT exist, say "データがありません"
-   - NEVER say "データがありません" when results actually contain data
-
-## Available Tools (12 tools)
-
-### Search Tools (8 tools)
-- **search_daily_reports**: Search daily reports (自店舗)
-- **search_by_genre**: Search by genre - claim/praise/accident/report/other (自店舗)
-- **search_by_location**: Search by location - kitchen/hall/cashier/toilet/other (自店舗)
-- **search_bbs_posts**: Search bulletin board (全店舗, includes HQ announcements)
-- **search_bbs_by_keyword**: Search BBS by keyword (全店舗, use for 営業時間, お知らせ)
-- **search_bbs_posts_my_store**: Search bulletin board (自店舗のみ, for うちの店の議論)
-- **search_bbs_by_keyword_my_store**: Search BBS by keyword (自店舗のみ)
-- **search_manual**: Search manuals and guidelines (全店舗共通)
-
-### Analytics Tools (7 tools)
-- **get_claim_statistics**: Claim counts, trends, category breakdown
-- **get_sales_trend**: Sales data over a period (use for "今月の売上", "最近の売上推移")
-- **get_sales_by_date**: Sales for a SPECIFIC DATE (use for "1/24の売上", "昨日の客数")
-- **get_sales_by_date_range**: Sales for a DATE RANGE (use for "1/20〜1/24の売上")
-- **get_cash_difference_analysis**: Register discrepancies, plus/minus breakdown
-- **get_report_statistics**: Overall daily report statistics by genre/location
-- **get_monthly_goal_status**: Current month's goal and achievement rate
-
-### PDCA Support Tools (2 tools)
-- **gather_topic_related_data**: Comprehensive data collection from multiple sources (for advice/analysis)
-- **compare_periods**: Period-to-period comparison with change rates (for trend analysis)
-
-## Tool Selection Guidelines
+            # ツールを使用する場合（ReActエージェント）
+            if use_tools and store_id:
+                logger.debug(f"[Stream] Using manual ReAct loop with token streaming for store_id={store_id}")
 
-### When user asks for ADVICE or RECOMMENDATIONS (アドバイス, 改善策, 提案):
-→ Use **gather_topic_related_data** + multiple analytics tools (see detailed steps below)
+                # ツール取得（全店舗共通）
+                tools = self._get_tools()
 
-### When user asks about CHANGES or TRENDS (変化, 推移, 比較):
-→ Use **compare_periods** for quantitative comparison
-Example: "先週と比べてクレームは増えた?" → compare_periods(metric="claims", period1_days=7, period2_days=14)
+                # 自作のReActループ（ストリーミング版）を使用
+                for token in self._react_loop_stream(
+                    query=query,
+                    tools=tools,
+                    system_info=system_info,
+                    chat_history=chat_history,
+                    store_id=store_id
+                ):
+                    if isinstance(token, dict) and not include_progress:
+                        continue
+                    yield token
 
-### When user asks about SPECIFIC CONTENT or DETAILS:
-→ Use **search_daily_reports** or **search_bbs_posts** for general queries
-→ Use **search_by_genre** when user asks specifically about a genre (クレーム/賞賛/事故/報告)
-Example (general): "先週の問題" → search_daily_reports(query="問題", days=7)
-Example (specific genre): "先週の事故" → search_by_genre(query="事故", genre="accident", days=7)
-Example (specific genre): "クレームの内容" → search_by_genre(query="", genre="claim", days=30)
+                logger.debug("[Stream] Token streaming completed")
 
-### BBS Search - IMPORTANT DEFAULT BEHAVIOR:
-**DEFAULT: Always use ALL-STORES search (search_bbs_posts, search_bbs_by_keyword)**
-Only use my-store search when user EXPLICITLY mentions: "うちの店", "自店舗", "自分の店", "店内"
-
-→ DEFAULT (no store specification): Use **search_bbs_posts** or **search_bbs_by_keyword**
-Example: "年末年始の営業時間" → search_bbs_by_keyword(keyword="営業時間", days=60)
-Example: "お知らせについて" → search_bbs_by_keyword(keyword="お知らせ", days=60)
-Example: "シフトの投稿" → search_bbs_posts(query="シフト", days=30)
-Example: "掲示板で何か話してる？" → search_bbs_posts(query="", days=30)
+            else:
+                # ツールなしで直接LLM呼び出し（ストリーミング）
+                logger.debug("Streaming LLM without tools")
+                messages = self._build_messages(system_info, query, chat_history)
 
-→ ONLY when user EXPLICITLY says "うちの店/自店舗/自分の店": Use **search_bbs_posts_my_store** or **search_bbs_by_keyword_my_store**
-Example: "うちの店の掲示板" → search_bbs_posts_my_store(query="", days=30)
-Example: "自店舗でシフトについて" → search_bbs_by_keyword_my_store(keyword="シフト", days=60)
+                # ストリーミング実行
+                for chunk in self.llm.stream(messages):
+                    PromptCacheStats.record(chunk)
+                    if hasattr(chunk, 'content') and chunk.content:
+                        yield chunk.content
 
-### When user asks about STATISTICS or COUNTS:
-→ Use **analytics tools** (get_claim_statistics, get_sales_trend, etc.)
-Example: "先週のクレーム件数" → get_claim_statistics(days=7)
+        except Exception as e:
+            logger.error(f"Error in chat_stream: {e}", exc_info=True)
+            yield f"エラーが発生しました: {str(e)}"
 
-### When user asks about SPECIFIC DATE sales/customers:
-→ Use **get_sales_by_date** for single date
-→ Use **get_sales_by_date_range** for date range
-Example: "1/24の売上" → get_sales_by_date(date="2026-01-24")
-Example: "1/20から1/24の客数" → get_sales_by_date_range(start_date="2026-01-20", end_date="2026-01-24")
-Example: "昨日の売上" → get_sales_by_date(date="YYYY-MM-DD of yesterday")
+    async def _arun_tool(
+        self,
+        tool_call: Dict,
+        target_tool,
+        timeout: float,
+        semaphore,
+        store_id: Optional[int] = None,
+        budget=None
+    ) -> Tuple[Dict, str, str]:
+        """
+        ツールを1つワーカースレッドで実行（タイムアウト付き）
 
-### When user specifies GENRE or LOCATION filter:
-→ Use **search_by_genre** or **search_by_location**
-Example: "キッチンのクレーム" → search_by_location(query="クレーム", location="kitchen")
+        Returns:
+            (tool_call, status, 結果テキスト)
+        """
+        from asgiref.sync import sync_to_async
+
+        if target_tool is None:
+            return tool_call, 'error', f"Error: 不明なツールです: {tool_call['name']}"
+
+        async with semaphore:
+            logger.info(f"[AStream] Executing tool: {tool_call['name']}")
+            try:
+                # 他のチャットのストリーミングを止めないよう、スレッドプールで実行
+                result_text = await asyncio.wait_for(
+                    sync_to_async(_invoke_tool, thread_sensitive=False)(target_tool, tool_call['args'], store_id, budget),
+                    timeout=timeout,
+                )
+                return tool_call, 'success', str(result_text)
+            except TimeoutError:
+                logger.warning(f"[AStream] Tool timed out after {timeout}s: {tool_call['name']}")
+                return tool_call, 'timeout', f"Error: {timeout}秒以内に完了しませんでした"
+            except Exception as e:
+                logger.error(f"[AStream] Error executing tool {tool_call['name']}: {e}")
+                return tool_call, 'error', f"Error: {str(e)}"
+
+    async def _areact_loop_stream(
+        self,
+        query: str,
+        tools: List,
+        system_info: str,
+        chat_history: Optional[List[Dict]] = None,
+        store_id: Optional[int] = None
+    ):
+        """
+        ReActループの非同期ストリーミング版（_react_loop_stream と同じ流れ）
 
-### When user asks about GOALS or TARGETS:
-→ Use **get_monthly_goal_status**
-Example: "今月の目標" → get_monthly_goal_status()
+        LLM呼び出しは astream、ツール（ORM・埋め込みAPIを使う同期処理）は
+        ワーカースレッドで並列実行し、イベントループをブロックしない。
 
-## Response Style
-- Respond in Japanese (日本語で回答)
-- Be concise and use bullet points
-- Include specific numbers from tool results
-- State conclusions first, then supporting details
+        Args:
+            query: ユーザーの質問
+            tools: 利用可能なツールリスト
+            system_info: システムプロンプト
+            chat_history: チャット履歴
+            store_id: ツールを実行する店舗ID
 
-## When Providing ADVICE (アドバイス・提案モード):
+        Yields:
+            str: レスポンスのトークンチャンク
+            dict: ツール実行の進捗イベント（type='tool_start' / 'tool_end'）
+        """
+        try:
+            from langchain_core.messages import ToolMessage
+
+            llm_with_tools = AgentPool.bind_tools(self.llm, tools)
+            tools_by_name = {t.name: t for t in tools}
+            messages = self._build_messages(system_info, query, chat_history)
+            budget = self._new_tool_output_budget()
+            timeout, max_workers = self._tool_settings()
+            semaphore = asyncio.Semaphore(max(1, max_workers))
+
+            for step in range(1, self.max_iterations + 1):
+                logger.info(f"[AStream] Step {step}: streaming LLM with tools for query: {query}")
+                response = None
+                has_tool_calls = False
+                async for chunk in llm_with_tools.astream(messages):
+                    response = chunk if response is None else response + chunk
+                    if getattr(chunk, 'tool_call_chunks', None):
+                        has_tool_calls = True
+                    if not has_tool_calls and chunk.content:
+                        yield chunk.content
+                PromptCacheStats.record(response)
+
+                if not (has_tool_calls and response.tool_calls):
+                    if response is None or not response.content:
+                        logger.error(f"[AStream] No content in response! Response type: {type(response)}")
+                        yield "エラー: 応答が空です"
+                    return
+
+                logger.info(f"[AStream] Step {step}: tools called: {len(response.tool_calls)}")
+                yield {
+                    'type': 'tool_start',
+                    'tools': [tool_call['name'] for tool_call in response.tool_calls],
+                    'step': step,
+                }
+
+                # 同じステップのツールは並列実行し、完了したものから進捗を返す
+                contents = {}
+                for finished in asyncio.as_completed([
+                    self._arun_tool(tool_call, tools_by_name.get(tool_call['name']), timeout, semaphore, store_id, budget)
+                    for tool_call in response.tool_calls
+                ]):
+                    tool_call, status, content = await finished
+                    contents[tool_call['id']] = content
+                    yield {'type': 'tool_end', 'tool': tool_call['name'], 'status': status, 'step': step}
 
-**Step 1: GATHER DATA** - Use multiple tools for comprehensive context
-- gather_topic_related_data() for cross-source information
-- Relevant analytics tools (get_sales_trend, get_claim_statistics, etc.)
-- compare_periods() if trend analysis is needed
+                messages.append(response)
+                messages.extend(
+                    ToolMessage(content=contents[tool_call['id']], tool_call_id=tool_call['id'])
+                    for tool_call in response.tool_calls
+                )
 
-**Step 2: ANALYZE** - Identify patterns, gaps, root causes
-- Calculate gaps: 目標 - 現状 = ギャップ
-- Find correlations: クレーム↑ → 売上↓?
-- Spot trends: 増加傾向 or 減少傾向?
-- Check BBS for staff perspectives
+            # 最大ステップ数に達した場合はツールなしのLLMで最終回答を生成
+            logger.info(f"[AStream] Reached max iterations ({self.max_iterations}), generating final response")
+            async for chunk in self.llm.astream(messages):
+                PromptCacheStats.record(chunk)
+                if hasattr(chunk, 'content') and chunk.content:
+                    yield chunk.content
 
-**Step 3: RECOMMEND** - Provide specific, actionable advice
+        except Exception as e:
+            logger.error(f"[AStream] Error in _areact_loop_stream: {e}", exc_info=True)
+            yield f"エラーが発生しました: {str(e)}"
 
-**Japanese Response Format:**
+    async def achat_stream(
+        self,
+        query: str,
+        user,
+        chat_history: Optional[List[Dict]] = None,
+        use_tools: bool = True,
+        include_progress: bool = False
+    ):
+        """
+        非同期ストリーミングチャット実行（AsyncGenerator）
 
-**📊 現状分析**
-- [データから分かった現状を簡潔に]
+        ASGIサーバー（asgi_stream.py）から使用する。userは店舗をselect_related済みで渡すこと
+        （イベントループ上で遅延ロードのクエリが発生しないようにするため）。
 
-**⚠️ 課題・ギャップ**
-- [目標とのギャップ、問題点]
+        Args:
+            query: ユーザーの質問
+            user: Djangoユーザーオブジェクト
+            chat_history: チャット履歴（オプション）
+            use_tools: ツールを使用するか（デフォルト: True）
+            include_progress: ツール実行の進捗イベント（dict）も返すか（デフォルト: False）
 
-**💡 推奨アクション（優先度順）**
-1. **[最優先]** [具体的な行動] → [期待される効果]
-2. **[重要]** [具体的な行動] → [期待される効果]
-3. [その他の施策]
+        Yields:
+            str: レスポンスのチャンク（トークンごと）
+            dict: 進捗イベント（include_progress=True の場合のみ）
+        """
+        try:
+            store_id = user.store.store_id if hasattr(user, 'store') and user.store else None
+            store_name = user.store.store_name if hasattr(user, 'store') and user.store else "不明"
 
-**📈 根拠となるデータ**
-- [使用したデータの要点]"""
+            system_info = self._build_system_info(store_id, store_name)
 
-            # ツールを使用する場合（ReActエージェント）
             if use_tools and store_id:
-                logger.debug(f"[Stream] Using manual ReAct loop with token streaming for store_id={store_id}")
-
-                # ツール作成（キャッシュから取得）
-                tools = self._create_tools_for_store(store_id)
-
-                # 自作のReActループ（ストリーミング版）を使用
-                # ツール実行後の最終回答生成時にトークン単位でストリーミング
-                for token in self._react_loop_stream(
+                tools = self._get_tools()
+                async for token in self._areact_loop_stream(
                     query=query,
                     tools=tools,
                     system_info=system_info,
-                    chat_history=chat_history
+                    chat_history=chat_history,
+                    store_id=store_id
                 ):
+                    if isinstance(token, dict) and not include_progress:
+                        continue
                     yield token
-
-                logger.debug(f"[Stream] Token streaming completed")
-
             else:
-                # ツールなしで直接LLM呼び出し（ストリーミング）
-                logger.debug(f"Streaming LLM without tools")
-                from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-
-                messages = [SystemMessage(content=system_info)]
-
-                if chat_history:
-                    for msg in chat_history:
-                        if msg['role'] == 'user':
-                            messages.append(HumanMessage(content=msg['content']))
-                        elif msg['role'] == 'assistant':
-                            messages.append(AIMessage(content=msg['content']))
-
-                messages.append(HumanMessage(content=query))
-
-                # ストリーミング実行
-                for chunk in self.llm.stream(messages):
+                messages = self._build_messages(system_info, query, chat_history)
+                async for chunk in self.llm.astream(messages):
+                    PromptCacheStats.record(chunk)
                     if hasattr(chunk, 'content') and chunk.content:
                         yield chunk.content
 
         except Exception as e:
-            logger.error(f"Error in chat_stream: {e}", exc_info=True)
+            logger.error(f"Error in achat_stream: {e}", exc_info=True)
             yield f"エラーが発生しました: {str(e)}"
 
     # DEPRECATED: Replaced by create_react_agent
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:09
+
+import hashlib
+
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    """既存ベクトルのコンテンツハッシュを埋める（埋め込みは既存のコンテンツから生成済み）"""
+    for model_name in ('DocumentVector', 'KnowledgeVector'):
+        model = apps.get_model('ai_features', model_name)
+        batch = []
+        for vector in model.objects.only('vector_id', 'content').iterator(chunk_size=1000):
+            vector.content_hash = hashlib.sha256(vector.content.encode('utf-8')).hexdigest()
+            batch.append(vector)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, ['content_hash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_features', '0003_knowledgevector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentvector',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='埋め込み生成時のコンテンツのSHA-256（変更がなければ再ベクトル化をスキップ）', max_length=64, verbose_name='コンテンツハッシュ'),
+        ),
+        migrations.AddField(
+            model_name='knowledgevector',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='埋め込み生成時のコンテンツのSHA-256', max_length=64, verbose_name='コンテンツハッシュ'),
+        ),
+        migrations.CreateModel(
+            name='EmbeddingCache',
+            fields=[
+                ('cache_id', models.AutoField(primary_key=True, serialize=False, verbose_name='キャッシュID')),
+                ('model_name', models.CharField(max_length=100, verbose_name='埋め込みモデル')),
+                ('dimensions', models.IntegerField(verbose_name='次元数')),
+                ('text_hash', models.CharField(max_length=64, verbose_name='テキストハッシュ')),
+                ('embedding', pgvector.django.vector.VectorField(dimensions=384, verbose_name='埋め込みベクトル')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+            ],
+            options={
+                'verbose_name': '埋め込みキャッシュ',
+                'verbose_name_plural': '埋め込みキャッシュ',
+                'db_table': 'embedding_cache',
+                'unique_together': {('model_name', 'dimensions', 'text_hash')},
+            },
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_features', '0004_content_hash_embedding_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorizationTask',
+            fields=[
+                ('task_id', models.AutoField(primary_key=True, serialize=False, verbose_name='タスクID')),
+                ('source_type', models.CharField(choices=[('daily_report', '日報'), ('bbs_post', '掲示板投稿'), ('bbs_comment', '掲示板コメント'), ('performance', '店舗実績')], max_length=20, verbose_name='ソース種別')),
+                ('source_id', models.IntegerField(verbose_name='ソースID')),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('processing', '処理中'), ('failed', '失敗')], default='pending', max_length=20, verbose_name='ステータス')),
+                ('attempts', models.IntegerField(default=0, verbose_name='試行回数')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='実行可能日時')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='取得日時')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='最終エラー')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'ベクトル化タスク',
+                'verbose_name_plural': 'ベクトル化タスク',
+                'db_table': 'vectorization_outbox',
+                'ordering': ['available_at', 'task_id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='vec_outbox_status_avail_idx'), models.Index(fields=['source_type', 'source_id'], name='vec_outbox_source_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:18
+
+import pgvector.django.indexes
+from django.db import migrations, models
+from django.utils.dateparse import parse_date
+
+from common.migration_operations import AddPostgresIndex
+
+
+def backfill_filter_columns(apps, schema_editor):
+    """既存ベクトルの store_id / date を metadata から埋める"""
+    DocumentVector = apps.get_model('ai_features', 'DocumentVector')
+    batch = []
+    for vector in DocumentVector.objects.only('vector_id', 'metadata').iterator(chunk_size=1000):
+        date = vector.metadata.get('date')
+        vector.store_id = vector.metadata.get('store_id')
+        vector.date = parse_date(date) if date else None
+        batch.append(vector)
+        if len(batch) >= 1000:
+            DocumentVector.objects.bulk_update(batch, ['store_id', 'date'])
+            batch = []
+    if batch:
+        DocumentVector.objects.bulk_update(batch, ['store_id', 'date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_features', '0005_vectorizationtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentvector',
+            name='date',
+            field=models.DateField(blank=True, null=True, verbose_name='日付'),
+        ),
+        migrations.AddField(
+            model_name='documentvector',
+            name='store_id',
+            field=models.IntegerField(blank=True, null=True, verbose_name='店舗ID'),
+        ),
+        migrations.RunPython(backfill_filter_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='documentvector',
+            index=models.Index(fields=['source_type', 'store_id', 'date'], name='docvec_type_store_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentvector',
+            index=models.Index(fields=['source_type', 'date'], name='docvec_type_date_idx'),
+        ),
+        AddPostgresIndex(
+            model_name='documentvector',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='docvec_embedding_hnsw_idx', opclasses=['vector_cosine_ops']),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ai_features', '0007_documentvector_content_trgm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIChatSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ai_chat_summary', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='ユーザーID')),
+                ('summary', models.TextField(blank=True, default='', verbose_name='要約')),
+                ('summarized_until', models.IntegerField(default=0, help_text='このチャットID以下の履歴は要約に反映済み', verbose_name='要約済みのチャットID')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'AIチャット要約',
+                'verbose_name_plural': 'AIチャット要約',
+                'db_table': 'ai_chat_summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+import common.indexes
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+from common.migration_operations import replace_index_state
+
+
+class Migration(migrations.Migration):
+    """HNSW / pg_trgm のインデックスを PostgreSQL専用インデックスとして扱う（モデルの状態のみ、DDLなし）"""
+
+    dependencies = [
+        ('ai_features', '0008_chat_summary'),
+    ]
+
+    operations = [
+        replace_index_state(
+            model_name='documentvector',
+            index=common.indexes.PostgresHnswIndex(ef_construction=64, fields=['embedding'], m=16, name='docvec_embedding_hnsw_idx', opclasses=['vector_cosine_ops']),
+        ),
+        replace_index_state(
+            model_name='documentvector',
+            index=common.indexes.PostgresGinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('content'), name='gin_trgm_ops'), name='docvec_content_upper_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_features', '0009_postgres_only_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embeddingcache',
+            name='last_used_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='最終使用日時'),
+        ),
+    ]
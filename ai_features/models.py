@@ -1,7 +1,21 @@
+import hashlib
+
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from pgvector.django import VectorField
 
+from common.indexes import PostgresGinIndex, PostgresHnswIndex
+
+
+def compute_content_hash(text: str) -> str:
+    """ベクトル化対象テキストのハッシュ（SHA-256の16進文字列）を計算"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
 class AIChatHistory(models.Model):
     """AIチャット履歴モデル"""
 
@@ -35,6 +49,33 @@ class AIChatHistory(models.Model):
         return f"{self.user} - {self.get_role_display()} - {self.created_at}"
 
 
+class AIChatSummary(models.Model):
+    """AIチャットの要約（直近のやり取りより前の会話をユーザーごとに要約したもの）"""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ai_chat_summary',
+        verbose_name='ユーザーID'
+    )
+    summary = models.TextField(blank=True, default='', verbose_name='要約')
+    summarized_until = models.IntegerField(
+        default=0,
+        verbose_name='要約済みのチャットID',
+        help_text='このチャットID以下の履歴は要約に反映済み'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    class Meta:
+        db_table = 'ai_chat_summaries'
+        verbose_name = 'AIチャット要約'
+        verbose_name_plural = 'AIチャット要約'
+
+    def __str__(self):
+        return f"{self.user} - {self.updated_at}"
+
+
 class DocumentVector(models.Model):
     """ドキュメントベクトルモデル（実績RAG用）"""
 
@@ -54,11 +95,21 @@ class DocumentVector(models.Model):
     )
     source_id = models.IntegerField(verbose_name='ソースID', db_index=True)
     content = models.TextField(verbose_name='コンテンツ')
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name='コンテンツハッシュ',
+        help_text='埋め込み生成時のコンテンツのSHA-256（変更がなければ再ベクトル化をスキップ）'
+    )
     metadata = models.JSONField(
         default=dict,
         verbose_name='メタデータ',
         help_text='store_id, date, title などの追加情報'
     )
+    # 検索フィルタ用カラム（metadata の store_id / date を保存時に反映）
+    store_id = models.IntegerField(null=True, blank=True, verbose_name='店舗ID')
+    date = models.DateField(null=True, blank=True, verbose_name='日付')
     embedding = VectorField(
         dimensions=384,
         verbose_name='埋め込みベクトル'
@@ -74,12 +125,40 @@ class DocumentVector(models.Model):
         indexes = [
             models.Index(fields=['source_type', 'source_id']),
             models.Index(fields=['created_at']),
+            # 自店舗・直近N日の絞り込み用
+            models.Index(fields=['source_type', 'store_id', 'date'], name='docvec_type_store_date_idx'),
+            models.Index(fields=['source_type', 'date'], name='docvec_type_date_idx'),
+            # コサイン距離の近似最近傍検索用（PostgreSQLのみ）
+            PostgresHnswIndex(
+                name='docvec_embedding_hnsw_idx',
+                fields=['embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_cosine_ops'],
+            ),
+            # ハイブリッド検索のキーワード側（部分一致）用のトライグラムインデックス（icontains は UPPER(col) LIKE になるため UPPER 式に張る、PostgreSQLのみ）
+            PostgresGinIndex(OpClass(Upper('content'), name='gin_trgm_ops'), name='docvec_content_upper_trgm_idx'),
         ]
         unique_together = [['source_type', 'source_id']]
 
     def __str__(self):
         return f"{self.get_source_type_display()} - ID:{self.source_id}"
 
+    def save(self, *args, **kwargs):
+        self.content_hash = compute_content_hash(self.content)
+        for field, value in self.filter_columns(self.metadata).items():
+            setattr(self, field, value)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def filter_columns(metadata: dict) -> dict:
+        """メタデータから検索フィルタ用カラム（store_id, date）の値を取得"""
+        date = metadata.get('date')
+        return {
+            'store_id': metadata.get('store_id'),
+            'date': parse_date(date) if date else None,
+        }
+
 
 class KnowledgeVector(models.Model):
     """ナレッジベースベクトルモデル"""
@@ -101,6 +180,13 @@ class KnowledgeVector(models.Model):
     )
     title = models.CharField(max_length=200, verbose_name='タイトル')
     content = models.TextField(verbose_name='コンテンツ')
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name='コンテンツハッシュ',
+        help_text='埋め込み生成時のコンテンツのSHA-256'
+    )
     metadata = models.JSONField(
         default=dict,
         verbose_name='メタデータ',
@@ -124,4 +210,88 @@ class KnowledgeVector(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.get_document_type_display()} - {self.title}"
\ No newline at end of file
+        return f"{self.get_document_type_display()} - {self.title}"
+
+    def save(self, *args, **kwargs):
+        self.content_hash = compute_content_hash(self.content)
+        super().save(*args, **kwargs)
+
+
+class EmbeddingCache(models.Model):
+    """埋め込みキャッシュモデル
+
+    (埋め込みモデル, 次元数, テキストハッシュ) 単位で生成済みの埋め込みを保持し、
+    同一テキストの再ベクトル化時に埋め込みAPIの呼び出しを省略する。
+    EMBEDDING_CACHE_TTL_DAYS 日以上使われていないものは vectorization_worker / prune_embedding_cache で削除する。
+    """
+
+    cache_id = models.AutoField(primary_key=True, verbose_name='キャッシュID')
+    model_name = models.CharField(max_length=100, verbose_name='埋め込みモデル')
+    dimensions = models.IntegerField(verbose_name='次元数')
+    text_hash = models.CharField(max_length=64, verbose_name='テキストハッシュ')
+    embedding = VectorField(
+        dimensions=384,
+        verbose_name='埋め込みベクトル'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='最終使用日時')
+
+    class Meta:
+        db_table = 'embedding_cache'
+        verbose_name = '埋め込みキャッシュ'
+        verbose_name_plural = '埋め込みキャッシュ'
+        unique_together = [['model_name', 'dimensions', 'text_hash']]
+
+    def __str__(self):
+        return f"{self.model_name}({self.dimensions}) - {self.text_hash[:12]}"
+
+
+class VectorizationTask(models.Model):
+    """ベクトル化タスクモデル（トランザクショナルアウトボックス）
+
+    日報・掲示板の作成/更新と同じトランザクションで登録し、
+    vectorization_worker コマンドが非同期に取り出してベクトル化する。
+    成功したタスクは削除され、リトライ上限に達したタスクは failed として残る。
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '待機中'),
+        (STATUS_PROCESSING, '処理中'),
+        (STATUS_FAILED, '失敗'),
+    ]
+
+    task_id = models.AutoField(primary_key=True, verbose_name='タスクID')
+    source_type = models.CharField(
+        max_length=20,
+        choices=DocumentVector.SOURCE_TYPE_CHOICES,
+        verbose_name='ソース種別'
+    )
+    source_id = models.IntegerField(verbose_name='ソースID')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='ステータス'
+    )
+    attempts = models.IntegerField(default=0, verbose_name='試行回数')
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='実行可能日時')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='取得日時')
+    last_error = models.TextField(blank=True, default='', verbose_name='最終エラー')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    class Meta:
+        db_table = 'vectorization_outbox'
+        verbose_name = 'ベクトル化タスク'
+        verbose_name_plural = 'ベクトル化タスク'
+        ordering = ['available_at', 'task_id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='vec_outbox_status_avail_idx'),
+            models.Index(fields=['source_type', 'source_id'], name='vec_outbox_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_type_display()} - ID:{self.source_id} ({self.get_status_display()})"
@@ -0,0 +1,242 @@
+"""
+チャット履歴の圧縮（要約＋直近のやり取り）
+
+プロンプトに渡す履歴は、ユーザーごとの要約（AIChatSummary）と直近のやり取りだけにし、
+会話が長くなってもプロンプトのサイズが一定の範囲に収まるようにする。
+直近の範囲から外れたやり取りは、ターンごとに前回の要約へ反映して要約し直す。
+"""
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ai_features.models import AIChatHistory, AIChatSummary
+from ai_features.tools.formatting import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ChatHistoryService:
+    """チャット履歴の保存と、プロンプトに渡す履歴（要約＋直近のやり取り）の作成"""
+
+    # 要約に失敗した場合の簡易要約で、1発言あたりに残す文字数
+    FALLBACK_LINE_CHARS = 100
+
+    @staticmethod
+    def _settings():
+        """直近のやり取りの件数、直近のやり取りのトークン上限、要約のトークン上限を取得"""
+        return (
+            getattr(settings, 'AI_CHAT_HISTORY_RECENT_EXCHANGES', 2),
+            getattr(settings, 'AI_CHAT_HISTORY_MAX_TOKENS', 2000),
+            getattr(settings, 'AI_CHAT_SUMMARY_MAX_TOKENS', 600),
+        )
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int) -> str:
+        """テキストを max_tokens 以内に切り詰める（1文字は1トークン以下のため文字数で切る）"""
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        return text[:max(max_tokens, 0)] + '…'
+
+    @staticmethod
+    def _recent_ids(user, recent_exchanges: int) -> List[int]:
+        return list(
+            AIChatHistory.objects.filter(user=user)
+            .order_by('-created_at', '-chat_id')
+            .values_list('chat_id', flat=True)[:recent_exchanges * 2]
+        )
+
+    @classmethod
+    def load_for_prompt(cls, user) -> List[Dict]:
+        """
+        プロンプトに渡す履歴を取得
+
+        直近のやり取りは新しいものから上限トークン数まで含め、1件の発言は上限の半分までに切り詰める。
+
+        Args:
+            user: ユーザーオブジェクト
+
+        Returns:
+            履歴のリスト（要約がある場合は先頭に role='summary'、続いて直近の発言を古い順）
+        """
+        recent_exchanges, max_tokens, _ = cls._settings()
+
+        history = []
+        summary = AIChatSummary.objects.filter(user=user).values_list('summary', flat=True).first()
+        if summary:
+            history.append({"role": "summary", "content": summary})
+
+        recent = AIChatHistory.objects.filter(user=user).order_by('-created_at', '-chat_id')[:recent_exchanges * 2]
+        messages = []
+        remaining = max_tokens
+        for chat in recent:
+            content = cls._truncate(chat.message, max_tokens // 2)
+            tokens = estimate_tokens(content)
+            if tokens > remaining:
+                break
+            messages.append({"role": chat.role, "content": content})
+            remaining -= tokens
+
+        # 先頭がAIの応答だけにならないようにする
+        while messages and messages[-1]['role'] != 'user':
+            messages.pop()
+        return history + messages[::-1]
+
+    @classmethod
+    def save_turn(cls, user, message: str, response: str) -> None:
+        """
+        1ターン分のやり取りを保存
+
+        要約の更新（LLMの呼び出し）は含まないため、応答を返した後に schedule_summary_update、
+        非同期の場合は aupdate_summary で行う。件数超過分は要約の更新後に削除する。
+
+        Args:
+            user: ユーザーオブジェクト
+            message: ユーザーのメッセージ
+            response: AIの応答
+        """
+        with transaction.atomic():
+            AIChatHistory.objects.create(user=user, role='user', message=message)
+            AIChatHistory.objects.create(user=user, role='assistant', message=response)
+
+    @classmethod
+    def schedule_summary_update(cls, user, summarizer: Optional[Callable[[str, List[Dict]], str]] = None) -> None:
+        """
+        コミット後に別スレッドで要約を更新（リクエストの処理時間にLLMの呼び出しを含めない）
+
+        Args:
+            user: ユーザーオブジェクト
+            summarizer: (前回の要約, 要約する発言のリスト) から新しい要約を返す関数
+        """
+        def run():
+            from django.db import close_old_connections
+
+            try:
+                cls.update_summary(user, summarizer)
+            except Exception as e:
+                logger.error(f"Failed to update chat summary for user={user.pk}: {e}", exc_info=True)
+            finally:
+                # ワーカースレッドで開いた接続を閉じる
+                close_old_connections()
+
+        transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
+
+    @classmethod
+    def update_summary(cls, user, summarizer: Optional[Callable[[str, List[Dict]], str]] = None) -> bool:
+        """
+        直近の範囲から外れた未要約の発言を要約に反映し、件数超過分を削除
+
+        LLMの呼び出し中はトランザクションを保持せず、要約済みのチャットIDが変わっていない場合のみ
+        保存する（同じユーザーの同時リクエストで二重に反映しないため）。
+
+        Args:
+            user: ユーザーオブジェクト
+            summarizer: (前回の要約, 要約する発言のリスト) から新しい要約を返す関数
+
+        Returns:
+            bool: 要約を更新したか
+        """
+        state, messages, last_id = cls._pending(user)
+        summary = None
+        if messages and summarizer is not None:
+            try:
+                summary = summarizer(state.summary, messages)
+            except Exception as e:
+                logger.warning(f"Failed to summarize chat history for user={user.pk}: {e}")
+        return cls._store_summary(user, state, messages, last_id, summary)
+
+    @classmethod
+    async def aupdate_summary(cls, user, asummarizer=None) -> bool:
+        """
+        update_summary の非同期版（要約のLLM呼び出しを await し、同期処理のスレッドを占有しない）
+
+        Args:
+            user: ユーザーオブジェクト
+            asummarizer: (前回の要約, 要約する発言のリスト) から新しい要約を返すコルーチン関数
+
+        Returns:
+            bool: 要約を更新したか
+        """
+        from asgiref.sync import sync_to_async
+
+        state, messages, last_id = await sync_to_async(cls._pending)(user)
+        summary = None
+        if messages and asummarizer is not None:
+            try:
+                summary = await asummarizer(state.summary, messages)
+            except Exception as e:
+                logger.warning(f"Failed to summarize chat history for user={user.pk}: {e}")
+        return await sync_to_async(cls._store_summary)(user, state, messages, last_id, summary)
+
+    @classmethod
+    def _pending(cls, user):
+        """要約の状態と、直近の範囲から外れた未要約の発言（古い順）、その最後のチャットIDを取得"""
+        recent_exchanges, _, _ = cls._settings()
+        state, _ = AIChatSummary.objects.get_or_create(user=user)
+        pending = list(
+            AIChatHistory.objects.filter(user=user, chat_id__gt=state.summarized_until)
+            .exclude(chat_id__in=cls._recent_ids(user, recent_exchanges))
+            .order_by('created_at', 'chat_id')
+        )
+        messages = [{"role": chat.role, "content": chat.message} for chat in pending]
+        return state, messages, (pending[-1].chat_id if pending else None)
+
+    @classmethod
+    def _store_summary(cls, user, state, messages: List[Dict], last_id: Optional[int], summary) -> bool:
+        """要約を保存し（要約できなかった場合は簡易要約）、件数超過分を削除"""
+        updated = 0
+        if messages:
+            _, _, summary_max_tokens = cls._settings()
+            if isinstance(summary, str) and summary.strip():
+                summary = cls._truncate(summary.strip(), summary_max_tokens)
+            else:
+                summary = cls._fallback_summary(state.summary, messages, summary_max_tokens)
+
+            updated = AIChatSummary.objects.filter(
+                user=user, summarized_until=state.summarized_until
+            ).update(
+                summary=summary,
+                summarized_until=last_id,
+                updated_at=timezone.now()
+            )
+        cls._trim(user)
+        return bool(updated)
+
+    @classmethod
+    def clear(cls, user) -> int:
+        """
+        チャット履歴と要約を削除
+
+        Returns:
+            int: 削除した履歴の件数
+        """
+        with transaction.atomic():
+            AIChatSummary.objects.filter(user=user).delete()
+            return AIChatHistory.objects.filter(user=user).delete()[0]
+
+    @classmethod
+    def _fallback_summary(cls, summary: str, messages: List[Dict], max_tokens: int) -> str:
+        """発言の冒頭を箇条書きで追記した簡易要約（上限を超える場合は古い行から削除）"""
+        lines = summary.splitlines() if summary else []
+        for msg in messages:
+            label = 'ユーザー' if msg['role'] == 'user' else 'AI'
+            text = ' '.join(msg['content'].split())[:cls.FALLBACK_LINE_CHARS]
+            lines.append(f"- {label}: {text}")
+        while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+            lines.pop(0)
+        return cls._truncate('\n'.join(lines), max_tokens)
+
+    @staticmethod
+    def _trim(user) -> None:
+        """件数超過分（MAX_CHAT_HISTORY件を超えた古い履歴）を削除"""
+        max_chat_history = int(os.environ.get('MAX_CHAT_HISTORY', '14'))
+        qs = AIChatHistory.objects.filter(user=user).order_by('-created_at')
+        excess_count = qs.count() - max_chat_history
+        if excess_count > 0:
+            # スライスしたクエリセットは直接削除できないので、IDを取得してから削除
+            ids_to_delete = list(qs.reverse()[:excess_count].values_list('chat_id', flat=True))
+            AIChatHistory.objects.filter(chat_id__in=ids_to_delete).delete()
@@ -4,8 +4,14 @@ AI Features Core Services
 """
 import logging
 import os
-from typing import List, Optional, Dict
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Optional, Dict, Tuple
 from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
 
 # from sentence_transformers import SentenceTransformer  # メモリ削減のためコメントアウト
 from pgvector.django import CosineDistance
@@ -19,6 +25,12 @@ class EmbeddingService:
     _openai_client = None
     _local_model = None
 
+    LOCAL_EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+    OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS = 384  # local と合わせる
+    # OpenAI Embeddings API の1リクエストあたりの入力数上限
+    OPENAI_MAX_BATCH_SIZE = 2048
+
     # ===== OpenAI client =====
     @classmethod
     def get_openai_client(cls):
@@ -61,16 +73,47 @@ class EmbeddingService:
                 from sentence_transformers import SentenceTransformer
 
             cls._local_model = SentenceTransformer(
-                "paraphrase-multilingual-MiniLM-L12-v2"
+                cls.LOCAL_EMBEDDING_MODEL
             )
         return cls._local_model
 
+    @classmethod
+    def get_model_name(cls) -> str:
+        """現在の埋め込みモデル名（settings.DEBUG に応じて切り替わる）"""
+        return cls.LOCAL_EMBEDDING_MODEL if settings.DEBUG else cls.OPENAI_EMBEDDING_MODEL
+
+    @classmethod
+    def get_provider(cls) -> str:
+        """現在の埋め込みプロバイダ（settings.DEBUG に応じて切り替わる）"""
+        return "local" if settings.DEBUG else "openai"
+
     # ===== Public API =====
     @classmethod
-    def generate_embedding(cls, text: str) -> Optional[List[float]]:
+    def generate_query_embedding(cls, query: str) -> Optional[List[float]]:
+        """
+        検索クエリの埋め込みを生成（クエリ埋め込みキャッシュを参照）
+
+        (プロバイダ, モデル, 次元数, 正規化したクエリ) 単位でキャッシュし、
+        同じクエリでの複数ツールからの検索では埋め込みを1回だけ生成する
+        """
+        from ai_features.services.query_embedding_cache import QueryEmbeddingCache
+
+        return QueryEmbeddingCache.get_or_compute(
+            (cls.get_provider(), cls.get_model_name(), cls.EMBEDDING_DIMENSIONS),
+            query,
+            cls.generate_embedding,
+        )
+
+    @classmethod
+    def generate_embedding(cls, text: str, use_cache: bool = False) -> Optional[List[float]]:
         """
         settings.DEBUG に応じて埋め込み方式を切り替える
+
+        use_cache=True の場合は埋め込みキャッシュを参照し、同一テキストの埋め込みがあれば再利用する
         """
+        if use_cache:
+            return cls.generate_embeddings([text], use_cache=True)[0]
+
         try:
             if settings.DEBUG:
                 return cls._generate_local_embedding(text)
@@ -84,6 +127,132 @@ class EmbeddingService:
             )
             return None
 
+    @classmethod
+    def generate_embeddings(
+        cls,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        use_cache: bool = False
+    ) -> List[Optional[List[float]]]:
+        """
+        複数テキストの埋め込みをまとめて生成（プロバイダの上限に合わせてバッチ分割）
+
+        Args:
+            texts: テキストのリスト
+            batch_size: 1リクエストあたりのテキスト数（Noneの場合は settings.EMBEDDING_BATCH_SIZE）
+            use_cache: 埋め込みキャッシュを参照・保存するか（キャッシュにないテキストのみAPIを呼び出す）
+
+        Returns:
+            texts と同じ順序の埋め込みリスト（生成に失敗したバッチの要素は None）
+        """
+        if use_cache:
+            return cls._generate_cached_embeddings(texts, batch_size)
+        return cls._generate_uncached_embeddings(texts, batch_size)
+
+    # ===== Embedding cache =====
+    @classmethod
+    def _generate_cached_embeddings(cls, texts: List[str], batch_size: Optional[int]) -> List[Optional[List[float]]]:
+        """埋め込みキャッシュ（モデル, 次元数, テキストハッシュ）を参照し、未生成のテキストのみ埋め込みを生成"""
+        from ai_features.models import EmbeddingCache, compute_content_hash
+
+        model_name = cls.get_model_name()
+        hashes = [compute_content_hash(text) for text in texts]
+
+        embeddings = {
+            text_hash: [float(value) for value in embedding]
+            for text_hash, embedding in EmbeddingCache.objects.filter(
+                model_name=model_name,
+                dimensions=cls.EMBEDDING_DIMENSIONS,
+                text_hash__in=set(hashes),
+            ).values_list('text_hash', 'embedding')
+        }
+
+        # 使用したキャッシュの最終使用日時を更新（書き込みを抑えるため1日に1回まで）
+        if embeddings:
+            now = timezone.now()
+            EmbeddingCache.objects.filter(
+                model_name=model_name,
+                dimensions=cls.EMBEDDING_DIMENSIONS,
+                text_hash__in=embeddings.keys(),
+                last_used_at__lt=now - timedelta(days=1),
+            ).update(last_used_at=now)
+
+        # キャッシュにないテキスト（重複は1回のみ）の埋め込みを生成して保存
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in embeddings:
+                missing.setdefault(text_hash, text)
+        if missing:
+            generated = {
+                text_hash: embedding
+                for text_hash, embedding in zip(
+                    missing, cls._generate_uncached_embeddings(list(missing.values()), batch_size)
+                )
+                if embedding is not None
+            }
+            EmbeddingCache.objects.bulk_create(
+                [
+                    EmbeddingCache(
+                        model_name=model_name,
+                        dimensions=cls.EMBEDDING_DIMENSIONS,
+                        text_hash=text_hash,
+                        embedding=embedding,
+                    )
+                    for text_hash, embedding in generated.items()
+                ],
+                ignore_conflicts=True,
+            )
+            embeddings.update(generated)
+
+        logger.debug(f"Embedding cache: hit={len(texts) - len(missing)}, miss={len(missing)}")
+        return [embeddings.get(text_hash) for text_hash in hashes]
+
+    @classmethod
+    def prune_embedding_cache(cls, max_age_days: Optional[int] = None) -> int:
+        """
+        一定期間使われていない埋め込みキャッシュを削除
+
+        Args:
+            max_age_days: 最終使用からの日数（Noneの場合は settings.EMBEDDING_CACHE_TTL_DAYS、0以下の場合は削除しない）
+
+        Returns:
+            削除した件数
+        """
+        from ai_features.models import EmbeddingCache
+
+        if max_age_days is None:
+            max_age_days = getattr(settings, 'EMBEDDING_CACHE_TTL_DAYS', 90)
+        if max_age_days <= 0:
+            return 0
+
+        deleted, _ = EmbeddingCache.objects.filter(
+            last_used_at__lt=timezone.now() - timedelta(days=max_age_days)
+        ).delete()
+        if deleted:
+            logger.info(f"Pruned {deleted} embedding cache entries unused for {max_age_days} days")
+        return deleted
+
+    @classmethod
+    def _generate_uncached_embeddings(cls, texts: List[str], batch_size: Optional[int]) -> List[Optional[List[float]]]:
+        batch_size = batch_size or getattr(settings, 'EMBEDDING_BATCH_SIZE', 100)
+        batch_size = max(1, min(batch_size, cls.OPENAI_MAX_BATCH_SIZE))
+
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            try:
+                if settings.DEBUG:
+                    embeddings.extend(cls._generate_local_embeddings(batch))
+                else:
+                    embeddings.extend(cls._generate_openai_embeddings(batch))
+            except Exception as e:
+                logger.error(
+                    f"Error generating embeddings for batch of {len(batch)} (DEBUG={settings.DEBUG}): {e}",
+                    exc_info=True
+                )
+                embeddings.extend([None] * len(batch))
+        return embeddings
+
     # ===== Implementations =====
     @classmethod
     def _generate_local_embedding(cls, text: str) -> List[float]:
@@ -91,16 +260,33 @@ class EmbeddingService:
         embedding = model.encode(text)
         return embedding.tolist()
 
+    @classmethod
+    def _generate_local_embeddings(cls, texts: List[str]) -> List[List[float]]:
+        model = cls.get_local_model()
+        embeddings = model.encode(texts, batch_size=len(texts))
+        return [embedding.tolist() for embedding in embeddings]
+
     @classmethod
     def _generate_openai_embedding(cls, text: str) -> List[float]:
         client = cls.get_openai_client()
         response = client.embeddings.create(
-            model="text-embedding-3-small",
+            model=cls.OPENAI_EMBEDDING_MODEL,
             input=text,
-            dimensions=384,  # local と合わせる
+            dimensions=cls.EMBEDDING_DIMENSIONS,
         )
         return response.data[0].embedding
 
+    @classmethod
+    def _generate_openai_embeddings(cls, texts: List[str]) -> List[List[float]]:
+        client = cls.get_openai_client()
+        response = client.embeddings.create(
+            model=cls.OPENAI_EMBEDDING_MODEL,
+            input=texts,
+            dimensions=cls.EMBEDDING_DIMENSIONS,
+        )
+        # 入力順に並べ直す（レスポンスは index を持つ）
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
     # ========== 旧実装（sentence-transformers）==========
     # メモリ削減のためコメントアウト（torch依存削除）
     '''
@@ -166,7 +352,8 @@ class VectorSearchService:
         store_id: Optional[int] = None,
         source_types: List[str] = None,
         filters: Optional[Dict] = None,
-        top_k: int = 5
+        top_k: int = 5,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         ドキュメントをベクトル検索
@@ -177,35 +364,19 @@ class VectorSearchService:
             source_types: 検索対象タイプのリスト ['daily_report', 'bbs_post', 'bbs_comment']
             filters: フィルタ条件（date_from等）
             top_k: 取得件数
+            query_embedding: 生成済みのクエリの埋め込み（省略時は生成）
 
         Returns:
             検索結果のリスト
         """
         try:
-            from ai_features.models import DocumentVector
-            from django.db.models import Q
-
             # クエリの埋め込みベクトルを生成
-            query_embedding = EmbeddingService.generate_embedding(query)
+            if query_embedding is None:
+                query_embedding = EmbeddingService.generate_query_embedding(query)
             if query_embedding is None:
                 return []
 
-            # 基本フィルタ
-            queryset = DocumentVector.objects.filter(
-                source_type__in=source_types
-            )
-
-            # 店舗フィルタ（指定がある場合のみ）
-            if store_id is not None:
-                queryset = queryset.filter(
-                    metadata__store_id=store_id
-                )
-
-            # 日付フィルタ
-            if filters and 'date_from' in filters:
-                queryset = queryset.filter(
-                    metadata__date__gte=filters['date_from']
-                )
+            queryset = VectorSearchService._filter_documents(store_id, source_types, filters)
 
             # pgvectorでベクトル検索（DBレベルでコサイン類似度計算）
             queryset = queryset.annotate(
@@ -214,7 +385,12 @@ class VectorSearchService:
 
             # 結果を整形
             results = []
-            for doc in queryset:
+            with transaction.atomic():
+                VectorSearchService._configure_hnsw_search(top_k)
+                docs = list(queryset)
+            # iterative_scan の relaxed_order では距離の順序が前後することがあるため並べ直す
+            docs.sort(key=lambda doc: doc.distance)
+            for doc in docs:
                 # 類似度 = 1 - コサイン距離
                 similarity = 1 - doc.distance
 
@@ -233,6 +409,204 @@ class VectorSearchService:
             logger.error(f"Error in vector search: {e}", exc_info=True)
             return []
 
+    @staticmethod
+    def keyword_search_documents(
+        query: str,
+        store_id: Optional[int] = None,
+        source_types: List[str] = None,
+        filters: Optional[Dict] = None,
+        top_k: int = 20
+    ) -> List[Dict]:
+        """
+        ドキュメントをキーワード（部分一致）で検索
+
+        クエリを空白・句読点で分割した語のいずれかを含むドキュメントを、
+        含む語の数が多い順・日付の新しい順に返す（PostgreSQLではトライグラムインデックスを使用）
+
+        Args:
+            query: 検索クエリ
+            store_id: 店舗ID（Noneの場合は全店舗検索）
+            source_types: 検索対象タイプのリスト
+            filters: フィルタ条件（date_from等）
+            top_k: 取得件数
+
+        Returns:
+            検索結果のリスト（keyword_score: 含む語の数）
+        """
+        try:
+            terms = VectorSearchService._split_keywords(query)
+            if not terms:
+                return []
+
+            match = Q()
+            score = Value(0)
+            for term in terms:
+                match |= Q(content__icontains=term)
+                score = score + Case(When(content__icontains=term, then=Value(1)), default=Value(0))
+
+            queryset = VectorSearchService._filter_documents(store_id, source_types, filters).filter(
+                match
+            ).annotate(
+                keyword_score=score
+            ).order_by('-keyword_score', '-date', '-vector_id')[:top_k]
+
+            return [
+                {
+                    'vector_id': doc.vector_id,
+                    'source_type': doc.source_type,
+                    'source_id': doc.source_id,
+                    'content': doc.content,
+                    'metadata': doc.metadata,
+                    'keyword_score': doc.keyword_score,
+                }
+                for doc in queryset.defer('embedding')
+            ]
+
+        except Exception as e:
+            logger.error(f"Error in keyword search: {e}", exc_info=True)
+            return []
+
+    @staticmethod
+    def hybrid_search_documents(
+        query: str,
+        store_id: Optional[int] = None,
+        source_types: List[str] = None,
+        filters: Optional[Dict] = None,
+        top_k: int = 5
+    ) -> List[Dict]:
+        """
+        キーワード検索とベクトル検索を組み合わせて検索（Reciprocal Rank Fusion で統合）
+
+        各検索で top_k より多めの候補を取得し、順位の逆数の和（1 / (k + 順位)）でスコアリングする。
+        両方で上位に出たドキュメントが優先され、一方にしか出ないドキュメントも拾える。
+        ベクトル検索の待ち時間の大半を占めるクエリの埋め込み生成を別スレッドで行い、
+        その間にキーワード検索を実行する（DBへの問い合わせは呼び出し元の接続で行う）。
+
+        Args:
+            query: 検索クエリ
+            store_id: 店舗ID（Noneの場合は全店舗検索）
+            source_types: 検索対象タイプのリスト
+            filters: フィルタ条件（date_from等）
+            top_k: 取得件数
+
+        Returns:
+            検索結果のリスト（score: RRFスコア、similarity: ベクトル類似度（キーワードのみの場合0）、
+            matched_by: ヒットした検索 ['vector', 'keyword']）
+        """
+        candidate_k = max(top_k * getattr(settings, 'AI_HYBRID_SEARCH_CANDIDATE_FACTOR', 4), top_k)
+        rrf_k = getattr(settings, 'AI_HYBRID_SEARCH_RRF_K', 60)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            embedding_future = executor.submit(VectorSearchService._generate_query_embedding_in_thread, query)
+            keyword_results = VectorSearchService.keyword_search_documents(
+                query, store_id=store_id, source_types=source_types, filters=filters, top_k=candidate_k
+            )
+            query_embedding = embedding_future.result()
+
+        vector_results = []
+        if query_embedding is not None:
+            vector_results = VectorSearchService.search_documents(
+                query, store_id=store_id, source_types=source_types, filters=filters, top_k=candidate_k,
+                query_embedding=query_embedding
+            )
+        rankings = {'keyword': keyword_results, 'vector': vector_results}
+
+        fused = {}
+        for name, results in rankings.items():
+            for rank, item in enumerate(results, start=1):
+                entry = fused.setdefault(item['vector_id'], {
+                    'vector_id': item['vector_id'],
+                    'source_type': item['source_type'],
+                    'source_id': item['source_id'],
+                    'content': item['content'],
+                    'metadata': item['metadata'],
+                    'similarity': 0.0,
+                    'score': 0.0,
+                    'matched_by': [],
+                })
+                entry['score'] += 1.0 / (rrf_k + rank)
+                entry['matched_by'].append(name)
+                if name == 'vector':
+                    entry['similarity'] = item['similarity']
+
+        return sorted(fused.values(), key=lambda entry: entry['score'], reverse=True)[:top_k]
+
+    @staticmethod
+    def _generate_query_embedding_in_thread(query: str) -> Optional[List[float]]:
+        """ワーカースレッドでクエリの埋め込みを生成（共有キャッシュ等で開いたDB接続を後始末する）"""
+        from django.db import close_old_connections
+
+        try:
+            return EmbeddingService.generate_query_embedding(query)
+        except Exception as e:
+            logger.error(f"Error generating query embedding: {e}", exc_info=True)
+            return None
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _filter_documents(
+        store_id: Optional[int],
+        source_types: Optional[List[str]],
+        filters: Optional[Dict]
+    ):
+        """検索対象のドキュメントを絞り込むクエリセットを作成"""
+        from ai_features.models import DocumentVector
+
+        # 基本フィルタ
+        queryset = DocumentVector.objects.filter(
+            source_type__in=source_types
+        )
+
+        # 店舗フィルタ（指定がある場合のみ）
+        if store_id is not None:
+            queryset = queryset.filter(
+                store_id=store_id
+            )
+
+        # 日付フィルタ
+        if filters and 'date_from' in filters:
+            queryset = queryset.filter(
+                date__gte=filters['date_from']
+            )
+
+        return queryset
+
+    @staticmethod
+    def _split_keywords(query: str, max_terms: int = 5) -> List[str]:
+        """クエリを空白・句読点で分割してキーワードを取得（1文字の語は除外）"""
+        terms = []
+        for term in re.split(r'[\s、。，．,.!?！？「」]+', query or ''):
+            if len(term) >= 2 and term not in terms:
+                terms.append(term)
+        return terms[:max_terms]
+
+    @staticmethod
+    def _configure_hnsw_search(limit: int = 0) -> None:
+        """
+        HNSWインデックス検索のパラメータを現在のトランザクションに設定（PostgreSQLのみ）
+
+        HNSWは ef_search 件の候補を探索してから WHERE で絞り込むため、ef_search は LIMIT 以上にする。
+        iterative_scan（pgvector 0.8以降）を有効にすると、店舗・日付の絞り込みで件数が不足する場合に探索を続ける。
+        未対応のバージョンでは設定できないため、ef_search だけで検索する。
+
+        Args:
+            limit: クエリの取得件数（LIMIT）
+        """
+        if connection.vendor != 'postgresql':
+            return
+
+        ef_search = max(getattr(settings, 'AI_VECTOR_SEARCH_EF_SEARCH', 40), limit)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT set_config(%s, %s, true)', ['hnsw.ef_search', str(ef_search)])
+            iterative_scan = getattr(settings, 'AI_VECTOR_SEARCH_ITERATIVE_SCAN', 'relaxed_order')
+            if iterative_scan:
+                try:
+                    with transaction.atomic():
+                        cursor.execute('SELECT set_config(%s, %s, true)', ['hnsw.iterative_scan', iterative_scan])
+                except DatabaseError as e:
+                    logger.warning(f"hnsw.iterative_scan is not available: {e}")
+
     @staticmethod
     def search_knowledge(
         query: str,
@@ -254,7 +628,7 @@ class VectorSearchService:
             from ai_features.models import KnowledgeVector
 
             # クエリの埋め込みベクトルを生成
-            query_embedding = EmbeddingService.generate_embedding(query)
+            query_embedding = EmbeddingService.generate_query_embedding(query)
             if query_embedding is None:
                 return []
 
@@ -294,58 +668,154 @@ class VectorSearchService:
 class VectorizationService:
     """ドキュメントのベクトル化サービス"""
 
+    # 一括ベクトル化の対象となるソース種別
+    SOURCE_TYPES = ('daily_report', 'bbs_post', 'bbs_comment')
+
+    # ===== ドキュメント生成 =====
     @staticmethod
-    def vectorize_daily_report(report_id: int) -> bool:
-        """日報をベクトル化"""
+    def _build_daily_report_document(report) -> Tuple[str, Dict]:
+        """日報からベクトル化用のコンテンツとメタデータを生成"""
+        content_parts = [
+            f"日付: {report.date}",
+            f"店舗: {report.store.store_name}",
+            f"報告者: {report.user.email}",
+            f"ジャンル: {report.genre}",
+            f"場所: {report.location}",
+            f"タイトル: {report.title}",
+            f"内容: {report.content}"
+        ]
+
+        metadata = {
+            'store_id': report.store.store_id,
+            'store_name': report.store.store_name,
+            'user_id': report.user.user_id,
+            'user_name': report.user.email,
+            'date': str(report.date),
+            'genre': report.genre,
+            'location': report.location,
+            'has_claim': report.genre == 'claim',
+            'has_praise': report.genre == 'praise',
+            'has_accident': report.genre == 'accident',
+        }
+        return "\n".join(content_parts), metadata
+
+    @staticmethod
+    def _build_bbs_post_document(post) -> Tuple[str, Dict]:
+        """掲示板投稿からベクトル化用のコンテンツとメタデータを生成"""
+        content_parts = [
+            f"投稿日: {post.created_at.date()}",
+            f"店舗: {post.store.store_name}",
+            f"投稿者: {post.user.email}",
+            f"タイトル: {post.title}",
+            f"内容: {post.content}"
+        ]
+
+        metadata = {
+            'store_id': post.store.store_id,
+            'store_name': post.store.store_name,
+            'author_id': post.user.user_id,
+            'author_name': post.user.email,
+            'date': str(post.created_at.date()),
+            'title': post.title,
+        }
+        return "\n".join(content_parts), metadata
+
+    @staticmethod
+    def _build_bbs_comment_document(comment) -> Tuple[str, Dict]:
+        """掲示板コメントからベクトル化用のコンテンツとメタデータを生成"""
+        content_parts = [
+            f"投稿日: {comment.created_at.date()}",
+            f"投稿タイトル: {comment.post.title}",
+            f"コメント者: {comment.user.email}",
+            f"内容: {comment.content}"
+        ]
+
+        metadata = {
+            'post_id': comment.post.post_id,
+            'post_title': comment.post.title,
+            'author_id': comment.user.user_id,
+            'author_name': comment.user.email,
+            'date': str(comment.created_at.date()),
+        }
+        return "\n".join(content_parts), metadata
+
+    @staticmethod
+    def _get_source(source_type: str):
+        """ソース種別ごとの取得クエリ（関連をselect_related済み）とドキュメント生成関数を取得"""
         from reports.models import DailyReport
-        from ai_features.models import DocumentVector
+        from bbs.models import BBSPost, BBSComment
 
-        try:
-            report = DailyReport.objects.get(report_id=report_id)
-
-            # コンテンツ生成
-            content_parts = [
-                f"日付: {report.date}",
-                f"店舗: {report.store.store_name}",
-                f"報告者: {report.user.email}",
-                f"ジャンル: {report.genre}",
-                f"場所: {report.location}",
-                f"タイトル: {report.title}",
-                f"内容: {report.content}"
-            ]
+        if source_type == 'daily_report':
+            return (
+                DailyReport.objects.select_related('store', 'user'),
+                VectorizationService._build_daily_report_document,
+            )
+        if source_type == 'bbs_post':
+            return (
+                BBSPost.objects.select_related('store', 'user'),
+                VectorizationService._build_bbs_post_document,
+            )
+        if source_type == 'bbs_comment':
+            return (
+                BBSComment.objects.select_related('post', 'user'),
+                VectorizationService._build_bbs_comment_document,
+            )
+        raise ValueError(f'不正なソース種別です: {source_type}')
 
-            content = "\n".join(content_parts)
+    # ===== 1件ずつのベクトル化 =====
+    @staticmethod
+    def vectorize_source(source_type: str, source_id: int) -> bool:
+        """
+        指定したソースを1件ベクトル化して保存/更新（コンテンツに変更がなければ埋め込みを再生成しない）
 
-            # ベクトル化
-            embedding = EmbeddingService.generate_embedding(content)
-            if embedding is None:
-                return False
+        ソースが存在しない場合などの例外はそのまま送出する（呼び出し側でリトライ等を判断する）
 
-            # メタデータ生成
-            metadata = {
-                'store_id': report.store.store_id,
-                'store_name': report.store.store_name,
-                'user_id': report.user.user_id,
-                'user_name': report.user.email,
-                'date': str(report.date),
-                'genre': report.genre,
-                'location': report.location,
-                'has_claim': report.genre == 'claim',
-                'has_praise': report.genre == 'praise',
-                'has_accident': report.genre == 'accident',
-            }
+        Returns:
+            保存/更新できた場合True、埋め込みの生成に失敗した場合False
+        """
+        from ai_features.models import DocumentVector, compute_content_hash
+
+        queryset, build_document = VectorizationService._get_source(source_type)
+        source = queryset.get(pk=source_id)
+        content, metadata = build_document(source)
+
+        existing = DocumentVector.objects.filter(
+            source_type=source_type,
+            source_id=source_id,
+        ).only('vector_id', 'content_hash', 'metadata').first()
+        if existing and existing.content_hash == compute_content_hash(content):
+            if existing.metadata != metadata:
+                DocumentVector.objects.filter(pk=existing.pk).update(
+                    metadata=metadata,
+                    updated_at=timezone.now(),
+                    **DocumentVector.filter_columns(metadata)
+                )
+            logger.debug(f"Skipped unchanged {source_type} {source_id}")
+            return True
 
-            # ベクトルを保存/更新
-            DocumentVector.objects.update_or_create(
-                source_type='daily_report',
-                source_id=report_id,
-                defaults={
-                    'content': content,
-                    'metadata': metadata,
-                    'embedding': embedding,
-                }
-            )
+        # ベクトル化
+        embedding = EmbeddingService.generate_embedding(content, use_cache=True)
+        if embedding is None:
+            return False
+
+        # ベクトルを保存/更新
+        DocumentVector.objects.update_or_create(
+            source_type=source_type,
+            source_id=source_id,
+            defaults={
+                'content': content,
+                'metadata': metadata,
+                'embedding': embedding,
+            }
+        )
+        return True
 
+    @staticmethod
+    def vectorize_daily_report(report_id: int) -> bool:
+        """日報をベクトル化"""
+        try:
+            if not VectorizationService.vectorize_source('daily_report', report_id):
+                return False
             logger.info(f"Vectorized daily report {report_id}")
             return True
 
@@ -356,49 +826,9 @@ class VectorizationService:
     @staticmethod
     def vectorize_bbs_post(post_id: int) -> bool:
         """掲示板投稿をベクトル化"""
-        from bbs.models import BBSPost
-        from ai_features.models import DocumentVector
-
         try:
-            post = BBSPost.objects.get(post_id=post_id)
-
-            # コンテンツ生成
-            content_parts = [
-                f"投稿日: {post.created_at.date()}",
-                f"店舗: {post.store.store_name}",
-                f"投稿者: {post.user.email}",
-                f"タイトル: {post.title}",
-                f"内容: {post.content}"
-            ]
-
-            content = "\n".join(content_parts)
-
-            # ベクトル化
-            embedding = EmbeddingService.generate_embedding(content)
-            if embedding is None:
+            if not VectorizationService.vectorize_source('bbs_post', post_id):
                 return False
-
-            # メタデータ生成
-            metadata = {
-                'store_id': post.store.store_id,
-                'store_name': post.store.store_name,
-                'author_id': post.user.user_id,
-                'author_name': post.user.email,
-                'date': str(post.created_at.date()),
-                'title': post.title,
-            }
-
-            # ベクトルを保存/更新
-            DocumentVector.objects.update_or_create(
-                source_type='bbs_post',
-                source_id=post_id,
-                defaults={
-                    'content': content,
-                    'metadata': metadata,
-                    'embedding': embedding,
-                }
-            )
-
             logger.info(f"Vectorized BBS post {post_id}")
             return True
 
@@ -409,50 +839,277 @@ class VectorizationService:
     @staticmethod
     def vectorize_bbs_comment(comment_id: int) -> bool:
         """掲示板コメントをベクトル化"""
-        from bbs.models import BBSComment
-        from ai_features.models import DocumentVector
+        try:
+            if not VectorizationService.vectorize_source('bbs_comment', comment_id):
+                return False
+            logger.info(f"Vectorized BBS comment {comment_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error vectorizing BBS comment {comment_id}: {e}", exc_info=True)
+            return False
+
+    # ===== 一括ベクトル化 =====
+    @staticmethod
+    def bulk_vectorize(
+        source_type: str,
+        source_ids: Optional[List[int]] = None,
+        batch_size: Optional[int] = None,
+        progress=None,
+        force: bool = False
+    ) -> Tuple[int, int]:
+        """
+        指定したソース種別をまとめてベクトル化
+
+        ソースを関連込みでバッチ単位に取得し、埋め込みをバッチで生成して
+        DocumentVector を bulk_create（既存行は更新）で書き込む。
+        コンテンツに変更がないソースは埋め込みを再生成しない（force=True で再生成）。
+
+        Args:
+            source_type: 'daily_report', 'bbs_post', 'bbs_comment'
+            source_ids: 対象のソースID（Noneの場合は全件）
+            batch_size: 1バッチあたりの件数（Noneの場合は settings.EMBEDDING_BATCH_SIZE）
+            progress: バッチ処理ごとに処理件数を受け取るコールバック（任意）
+            force: コンテンツに変更がなくても埋め込みを再生成するか
+
+        Returns:
+            (成功件数, 失敗件数)
+        """
+        queryset, build_document = VectorizationService._get_source(source_type)
+        if source_ids is not None:
+            queryset = queryset.filter(pk__in=source_ids)
+        batch_size = batch_size or getattr(settings, 'EMBEDDING_BATCH_SIZE', 100)
+
+        success, fail = 0, 0
+        batch = []
+        for source in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(source)
+            if len(batch) >= batch_size:
+                batch_success, batch_fail = VectorizationService._vectorize_batch(source_type, batch, build_document, force)
+                success, fail = success + batch_success, fail + batch_fail
+                if progress:
+                    progress(len(batch))
+                batch = []
+        if batch:
+            batch_success, batch_fail = VectorizationService._vectorize_batch(source_type, batch, build_document, force)
+            success, fail = success + batch_success, fail + batch_fail
+            if progress:
+                progress(len(batch))
+
+        logger.info(f"Bulk vectorized {source_type}: success={success}, fail={fail}")
+        return success, fail
+
+    @staticmethod
+    def _vectorize_batch(source_type: str, sources: List, build_document, force: bool = False) -> Tuple[int, int]:
+        """1バッチ分のソースをベクトル化して書き込み"""
+        from ai_features.models import DocumentVector, compute_content_hash
+
+        existing = {} if force else {
+            row['source_id']: row
+            for row in DocumentVector.objects.filter(
+                source_type=source_type,
+                source_id__in=[source.pk for source in sources],
+            ).values('vector_id', 'source_id', 'content_hash', 'metadata')
+        }
+
+        documents = []
+        unchanged = []
+        skipped = 0
+        for source in sources:
+            try:
+                content, metadata = build_document(source)
+            except Exception as e:
+                logger.error(f"Error building {source_type} {source.pk}: {e}", exc_info=True)
+                continue
+
+            content_hash = compute_content_hash(content)
+            row = existing.get(source.pk)
+            if row and row['content_hash'] == content_hash:
+                # コンテンツに変更がなければメタデータのみ更新する
+                if row['metadata'] != metadata:
+                    unchanged.append(DocumentVector(
+                        vector_id=row['vector_id'],
+                        metadata=metadata,
+                        updated_at=timezone.now(),
+                        **DocumentVector.filter_columns(metadata)
+                    ))
+                skipped += 1
+                continue
+            documents.append((source.pk, content, content_hash, metadata))
+
+        embeddings = EmbeddingService.generate_embeddings(
+            [content for _, content, _, _ in documents],
+            use_cache=True,
+        )
+        vectors = [
+            DocumentVector(
+                source_type=source_type,
+                source_id=source_id,
+                content=content,
+                content_hash=content_hash,
+                metadata=metadata,
+                embedding=embedding,
+                **DocumentVector.filter_columns(metadata)
+            )
+            for (source_id, content, content_hash, metadata), embedding in zip(documents, embeddings)
+            if embedding is not None
+        ]
 
         try:
-            comment = BBSComment.objects.get(comment_id=comment_id)
-
-            # コンテンツ生成
-            content_parts = [
-                f"投稿日: {comment.created_at.date()}",
-                f"投稿タイトル: {comment.post.title}",
-                f"コメント者: {comment.user.email}",
-                f"内容: {comment.content}"
-            ]
+            DocumentVector.objects.bulk_create(
+                vectors,
+                update_conflicts=True,
+                unique_fields=['source_type', 'source_id'],
+                update_fields=['content', 'content_hash', 'metadata', 'store_id', 'date', 'embedding', 'updated_at'],
+            )
+            DocumentVector.objects.bulk_update(unchanged, ['metadata', 'store_id', 'date', 'updated_at'])
+        except Exception as e:
+            logger.error(f"Error writing {source_type} vectors: {e}", exc_info=True)
+            return 0, len(sources)
 
-            content = "\n".join(content_parts)
+        success = skipped + len(vectors)
+        return success, len(sources) - success
 
-            # ベクトル化
-            embedding = EmbeddingService.generate_embedding(content)
-            if embedding is None:
-                return False
 
-            # メタデータ生成
-            metadata = {
-                'post_id': comment.post.post_id,
-                'post_title': comment.post.title,
-                'author_id': comment.user.user_id,
-                'author_name': comment.user.email,
-                'date': str(comment.created_at.date()),
-            }
+class VectorizationOutboxService:
+    """ベクトル化のアウトボックス（VectorizationTask）を管理するサービス"""
 
-            # ベクトルを保存/更新
-            DocumentVector.objects.update_or_create(
-                source_type='bbs_comment',
-                source_id=comment_id,
-                defaults={
-                    'content': content,
-                    'metadata': metadata,
-                    'embedding': embedding,
-                }
+    @staticmethod
+    def is_enabled() -> bool:
+        """アウトボックス経由の非同期ベクトル化が有効か（settings.AI_VECTORIZATION_MODE）"""
+        return getattr(settings, 'AI_VECTORIZATION_MODE', 'outbox') == 'outbox'
+
+    @staticmethod
+    def enqueue(source_type: str, source_id: int) -> None:
+        """
+        ベクトル化タスクを登録（呼び出し元のトランザクション内で実行する）
+
+        同じソースの待機中タスクがあれば追加しない（ワーカーは処理時点の内容でベクトル化するため）
+        """
+        from ai_features.models import VectorizationTask
+
+        exists = VectorizationTask.objects.filter(
+            source_type=source_type,
+            source_id=source_id,
+            status=VectorizationTask.STATUS_PENDING,
+        ).exists()
+        if not exists:
+            VectorizationTask.objects.create(source_type=source_type, source_id=source_id)
+
+    @staticmethod
+    def claim(limit: int) -> List:
+        """
+        実行可能なタスクを取得して処理中にする
+
+        ステータスを条件にした UPDATE で取得するため、複数ワーカーが同時に動いても
+        同じタスクを二重に処理しない（SQLite/PostgreSQL共通）。
+        ロックから一定時間経過した処理中タスク（停止したワーカーのもの）も再取得する。
+        """
+        from django.db.models import Q
+        from ai_features.models import VectorizationTask
+
+        now = timezone.now()
+        lock_timeout = getattr(settings, 'VECTORIZATION_OUTBOX_LOCK_TIMEOUT', 300)
+        claimable = (
+            Q(status=VectorizationTask.STATUS_PENDING, available_at__lte=now)
+            | Q(status=VectorizationTask.STATUS_PROCESSING, locked_at__lt=now - timedelta(seconds=lock_timeout))
+        )
+
+        candidate_ids = list(
+            VectorizationTask.objects.filter(claimable)
+            .order_by('available_at', 'task_id')
+            .values_list('task_id', flat=True)[:limit]
+        )
+        claimed_ids = [
+            task_id for task_id in candidate_ids
+            if VectorizationTask.objects.filter(claimable, pk=task_id).update(
+                status=VectorizationTask.STATUS_PROCESSING,
+                locked_at=now,
             )
+        ]
+        return list(VectorizationTask.objects.filter(pk__in=claimed_ids).order_by('available_at', 'task_id'))
 
-            logger.info(f"Vectorized BBS comment {comment_id}")
-            return True
+    @staticmethod
+    def process(task) -> bool:
+        """
+        タスクを1件処理（成功したら削除し、失敗したらバックオフしてリトライ待ちに戻す）
+
+        Returns:
+            成功した場合True
+        """
+        from django.core.exceptions import ObjectDoesNotExist
 
+        try:
+            if VectorizationService.vectorize_source(task.source_type, task.source_id):
+                task.delete()
+                return True
+            error = 'embedding generation failed'
+        except ObjectDoesNotExist:
+            # ソースが削除済みの場合はベクトル化不要
+            logger.info(f"Skipped vectorization of deleted {task.source_type} {task.source_id}")
+            task.delete()
+            return True
         except Exception as e:
-            logger.error(f"Error vectorizing BBS comment {comment_id}: {e}", exc_info=True)
-            return False
+            logger.error(f"Error vectorizing {task.source_type} {task.source_id}: {e}", exc_info=True)
+            error = str(e)
+
+        VectorizationOutboxService._schedule_retry(task, error)
+        return False
+
+    @staticmethod
+    def _schedule_retry(task, error: str) -> None:
+        """指数バックオフで次回の実行日時を設定（上限に達したら failed にする）"""
+        from ai_features.models import VectorizationTask
+
+        max_attempts = getattr(settings, 'VECTORIZATION_OUTBOX_MAX_ATTEMPTS', 5)
+        base_delay = getattr(settings, 'VECTORIZATION_OUTBOX_RETRY_DELAY', 2.0)
+        max_delay = getattr(settings, 'VECTORIZATION_OUTBOX_MAX_RETRY_DELAY', 300.0)
+
+        task.attempts += 1
+        task.last_error = error
+        task.locked_at = None
+        if task.attempts >= max_attempts:
+            task.status = VectorizationTask.STATUS_FAILED
+            logger.warning(
+                f"Gave up vectorizing {task.source_type} {task.source_id} after {task.attempts} attempts"
+            )
+        else:
+            task.status = VectorizationTask.STATUS_PENDING
+            delay = min(base_delay * (2 ** (task.attempts - 1)), max_delay)
+            task.available_at = timezone.now() + timedelta(seconds=delay)
+        task.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'available_at', 'updated_at'])
+
+    @staticmethod
+    def drain(batch_size: int = 20, max_workers: int = 1) -> Tuple[int, int]:
+        """
+        実行可能なタスクを1バッチ分取得して処理
+
+        Args:
+            batch_size: 1回に取得するタスク数
+            max_workers: 並列に処理するスレッド数（埋め込みAPIの待ち時間を重ねる）
+
+        Returns:
+            (成功件数, 失敗件数)
+        """
+        tasks = VectorizationOutboxService.claim(batch_size)
+        if not tasks:
+            return 0, 0
+
+        if max_workers <= 1:
+            results = [VectorizationOutboxService.process(task) for task in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+                results = list(executor.map(VectorizationOutboxService._process_in_thread, tasks))
+
+        success = sum(1 for result in results if result)
+        return success, len(results) - success
+
+    @staticmethod
+    def _process_in_thread(task) -> bool:
+        """ワーカースレッドでタスクを処理（スレッドごとのDB接続を後始末する）"""
+        from django.db import close_old_connections
+
+        try:
+            return VectorizationOutboxService.process(task)
+        finally:
+            close_old_connections()
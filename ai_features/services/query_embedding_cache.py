@@ -0,0 +1,172 @@
+"""
+検索クエリの埋め込みキャッシュ
+
+検索ツールは1回のエージェント応答の中で同じクエリ（既定値の空文字を含む）を複数回埋め込むため、
+(プロバイダ, モデル, 次元数, 正規化したクエリ) をキーに埋め込みを保持する。
+プロセス内LRU（TTL付き）を1段目とし、設定された場合は Django のキャッシュ（Redis等）を2段目として共有する。
+同じキーの同時ミスは1回だけ埋め込みを生成し、他のスレッドはその結果を待つ
+（待ち時間が AI_QUERY_EMBEDDING_CACHE_WAIT_TIMEOUT を超えた場合は自分で生成する）。
+"""
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from analytics.cache import DjangoCacheBackend, LocalLRUCacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """検索クエリの埋め込みキャッシュ（プロセス内LRU＋任意の共有キャッシュ）"""
+
+    KEY_PREFIX = 'ai:query_embedding'
+
+    _local = None
+    _shared = None
+    _lock = threading.Lock()
+    _inflight: Dict[str, threading.Event] = {}
+    _stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def normalize(text: Optional[str]) -> str:
+        """クエリを正規化（NFKC、前後の空白除去、連続する空白を1つに）"""
+        text = unicodedata.normalize('NFKC', text or '')
+        return re.sub(r'\s+', ' ', text).strip()
+
+    @classmethod
+    def get_local_backend(cls):
+        """プロセス内LRUを取得（最大件数が0の場合はNone）"""
+        max_entries = getattr(settings, 'AI_QUERY_EMBEDDING_CACHE_MAX_ENTRIES', 1024)
+        if max_entries <= 0:
+            return None
+        if cls._local is None:
+            with cls._lock:
+                if cls._local is None:
+                    cls._local = LocalLRUCacheBackend(max_entries)
+        return cls._local
+
+    @classmethod
+    def get_shared_backend(cls):
+        """共有キャッシュを取得（エイリアス未設定の場合はNone）"""
+        alias = getattr(settings, 'AI_QUERY_EMBEDDING_CACHE_SHARED_ALIAS', '')
+        if not alias:
+            return None
+        if cls._shared is None:
+            with cls._lock:
+                if cls._shared is None:
+                    cls._shared = DjangoCacheBackend(alias)
+        return cls._shared
+
+    @classmethod
+    def reset(cls):
+        """バックエンドと統計を破棄（設定変更時・テスト用）"""
+        with cls._lock:
+            cls._local = None
+            cls._shared = None
+            cls._inflight = {}
+            cls._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @classmethod
+    def get_or_compute(
+        cls,
+        namespace: Tuple,
+        text: str,
+        compute: Callable[[str], Optional[List[float]]]
+    ) -> Optional[List[float]]:
+        """キャッシュからクエリの埋め込みを取得し、なければ生成して保存
+
+        Args:
+            namespace: キーに含める (プロバイダ, モデル, 次元数)
+            text: 検索クエリ
+            compute: 正規化したクエリから埋め込みを生成する関数（失敗時はNone）
+
+        Returns:
+            埋め込みベクトル（生成に失敗した場合はNone、失敗はキャッシュしない）
+        """
+        normalized = cls.normalize(text)
+        local = cls.get_local_backend()
+        shared = cls.get_shared_backend()
+        if local is None and shared is None:
+            return compute(normalized)
+
+        key = cls._make_key(namespace, normalized)
+        while True:
+            embedding = cls._lookup(key, local, shared)
+            if embedding is not None:
+                return embedding
+
+            # 同じキーを生成中のスレッドがあれば完了を待ってから再参照する
+            with cls._lock:
+                event = cls._inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    cls._inflight[key] = event
+                    break
+            # 生成中のスレッドが応答しない場合に巻き込まれないよう、待ち時間に上限を設ける
+            wait_timeout = getattr(settings, 'AI_QUERY_EMBEDDING_CACHE_WAIT_TIMEOUT', 10)
+            if not event.wait(timeout=wait_timeout):
+                logger.warning(f"Timed out waiting for query embedding after {wait_timeout}s; computing directly")
+                cls._count('misses')
+                return compute(normalized)
+
+        try:
+            cls._count('misses')
+            embedding = compute(normalized)
+            if embedding is not None:
+                timeout = getattr(settings, 'AI_QUERY_EMBEDDING_CACHE_TTL', 3600)
+                if local is not None:
+                    local.set(key, embedding, timeout)
+                if shared is not None:
+                    shared.set(key, embedding, timeout)
+            return embedding
+        finally:
+            with cls._lock:
+                cls._inflight.pop(key, None)
+            event.set()
+
+    @classmethod
+    def stats(cls) -> Dict:
+        """ヒット率などの統計を取得
+
+        Returns:
+            dict: local_hits / shared_hits / misses / hit_rate / size
+        """
+        with cls._lock:
+            stats = dict(cls._stats)
+            local = cls._local
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        hits = stats['local_hits'] + stats['shared_hits']
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        stats['size'] = len(local._entries) if local is not None else 0
+        return stats
+
+    @classmethod
+    def _lookup(cls, key, local, shared):
+        if local is not None:
+            embedding = local.get(key)
+            if embedding is not None:
+                cls._count('local_hits')
+                return embedding
+        if shared is not None:
+            embedding = shared.get(key)
+            if embedding is not None:
+                cls._count('shared_hits')
+                if local is not None:
+                    local.set(key, embedding, getattr(settings, 'AI_QUERY_EMBEDDING_CACHE_TTL', 3600))
+                return embedding
+        return None
+
+    @classmethod
+    def _count(cls, name):
+        with cls._lock:
+            cls._stats[name] += 1
+
+    @classmethod
+    def _make_key(cls, namespace, normalized):
+        digest = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return ':'.join([cls.KEY_PREFIX, *(str(part) for part in namespace), digest])
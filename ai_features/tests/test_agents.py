@@ -1,7 +1,10 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from unittest.mock import patch, MagicMock, call
-from ai_features.agents.chat_agent import ChatAgent, _get_cached_tools_for_store
+from ai_features.agents.chat_agent import (
+    SYSTEM_PROMPT_PREFIX, AgentPool, ChatAgent, PromptCacheStats,
+    _get_agent_tools, get_current_store_id, store_context
+)
 from stores.models import Store
 
 User = get_user_model()
@@ -10,6 +13,10 @@ User = get_user_model()
 class ChatAgentInitTest(TestCase):
     """ChatAgentの初期化テスト"""
 
+    def setUp(self):
+        # テストごとにモックのLLMを使うため、共有プールを破棄
+        AgentPool.reset()
+
     @patch('ai_features.agents.chat_agent.ChatOpenAI')
     def test_init_default_parameters(self, mock_chat_openai):
         """デフォルトパラメータで初期化できることを確認"""
@@ -40,24 +47,197 @@ class ChatAgentInitTest(TestCase):
         )
 
 
+class AgentPoolTest(TestCase):
+    """LLMクライアント・コンパイル済みエージェントの共有プールのテスト"""
+
+    def setUp(self):
+        """テスト用データを作成"""
+        AgentPool.reset()
+        self.addCleanup(AgentPool.reset)
+        self.store = Store.objects.create(
+            store_name='テスト店舗',
+            address='テスト住所'
+        )
+        self.user = User.objects.create_user(
+            user_id='testuser',
+            password='testpass123',
+            store=self.store
+        )
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_llm_shared_by_settings(self, mock_chat_openai):
+        """同じ設定のエージェントはLLMクライアントを共有することを確認"""
+        mock_chat_openai.side_effect = lambda **kwargs: MagicMock()
+
+        agent1 = ChatAgent(model_name="gpt-4o-mini", openai_api_key="key")
+        agent2 = ChatAgent(model_name="gpt-4o-mini", openai_api_key="key")
+        agent3 = ChatAgent(model_name="gpt-4o", openai_api_key="key")
+
+        self.assertIs(agent1.llm, agent2.llm)
+        self.assertIsNot(agent1.llm, agent3.llm)
+        self.assertEqual(mock_chat_openai.call_count, 2)
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    @patch('langgraph.prebuilt.create_react_agent')
+    def test_react_agent_compiled_once(self, mock_create_react_agent, mock_chat_openai):
+        """ReActエージェントはリクエストをまたいで1回だけコンパイルされることを確認"""
+        mock_message = MagicMock()
+        mock_message.content = "回答"
+        mock_create_react_agent.return_value.invoke.return_value = {"messages": [mock_message]}
+
+        for _ in range(2):
+            result = ChatAgent().chat(query="テスト質問", user=self.user)
+            self.assertEqual(result['message'], "回答")
+
+        mock_create_react_agent.assert_called_once()
+        self.assertEqual(mock_create_react_agent.return_value.invoke.call_count, 2)
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_bind_tools_once(self, mock_chat_openai):
+        """ストリーミングでもツールのバインドは1回だけ行われることを確認"""
+        from langchain_core.messages import AIMessageChunk
+
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value.stream.side_effect = lambda messages: [AIMessageChunk(content="回答")]
+        mock_chat_openai.return_value = mock_llm
+
+        for _ in range(2):
+            chunks = list(ChatAgent().chat_stream(query="テスト質問", user=self.user))
+            self.assertEqual(chunks, ["回答"])
+
+        mock_llm.bind_tools.assert_called_once()
+
+
+class SystemPromptTest(TestCase):
+    """プロンプトキャッシュを考慮したシステムプロンプトのテスト"""
+
+    def setUp(self):
+        AgentPool.reset()
+        PromptCacheStats.reset()
+        self.addCleanup(PromptCacheStats.reset)
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_static_prefix(self, mock_chat_openai):
+        """店舗・日付が違っても先頭は同一の固定部分で、可変部分は末尾に置かれることを確認"""
+        from datetime import date
+
+        agent = ChatAgent()
+        with patch('django.utils.timezone.localdate', return_value=date(2026, 1, 24)):
+            prompt1 = agent._build_system_info(1, '渋谷店')
+        with patch('django.utils.timezone.localdate', return_value=date(2026, 1, 25)):
+            prompt2 = agent._build_system_info(2, '新宿店')
+
+        for prompt in (prompt1, prompt2):
+            self.assertTrue(prompt.startswith(SYSTEM_PROMPT_PREFIX))
+        self.assertNotIn('渋谷店', SYSTEM_PROMPT_PREFIX)
+        self.assertTrue(prompt1.endswith('- Date: 2026-01-24 (Saturday)\n- Store: 渋谷店 (ID: 1)'))
+        self.assertTrue(prompt2.endswith('- Store: 新宿店 (ID: 2)'))
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_same_prompt_within_day(self, mock_chat_openai):
+        """同じ日・同じ店舗ではバイト単位で同一のプロンプトになることを確認"""
+        agent = ChatAgent()
+
+        self.assertEqual(agent._build_system_info(1, '渋谷店'), agent._build_system_info(1, '渋谷店'))
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_history_summary_after_system_prompt(self, mock_chat_openai):
+        """履歴の要約はシステムプロンプトの後のシステムメッセージになることを確認"""
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        agent = ChatAgent()
+        messages = agent._build_messages('system', '質問2', [
+            {'role': 'summary', 'content': '- 先週の売上を確認した'},
+            {'role': 'user', 'content': '質問1'},
+            {'role': 'assistant', 'content': '回答1'},
+        ])
+
+        self.assertEqual([type(msg) for msg in messages], [SystemMessage, SystemMessage, HumanMessage, AIMessage, HumanMessage])
+        self.assertEqual(messages[0].content, 'system')
+        self.assertIn('- 先週の売上を確認した', messages[1].content)
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_summarize_history(self, mock_chat_openai):
+        """前回の要約と新しい発言をLLMに渡して要約を作成することを確認"""
+        from langchain_core.messages import AIMessage
+
+        llm = mock_chat_openai.return_value
+        llm.invoke.return_value = AIMessage(content='- 新しい要約')
+        agent = ChatAgent()
+
+        summary = agent.summarize_history('- 前回の要約', [
+            {'role': 'user', 'content': '質問'},
+            {'role': 'assistant', 'content': '表' * 5000},
+        ])
+
+        self.assertEqual(summary, '- 新しい要約')
+        prompt = llm.invoke.call_args[0][0][1].content
+        self.assertIn('- 前回の要約', prompt)
+        self.assertIn('ユーザー: 質問', prompt)
+        self.assertNotIn('表' * (ChatAgent.SUMMARY_INPUT_CHARS + 1), prompt)
+
+    def test_record_usage(self):
+        """キャッシュから読み込まれた入力トークンの割合を集計することを確認"""
+        from langchain_core.messages import AIMessage
+
+        PromptCacheStats.record(AIMessage(content='回答', usage_metadata={
+            'input_tokens': 2000, 'output_tokens': 10, 'total_tokens': 2010,
+            'input_token_details': {'cache_read': 1536},
+        }))
+        PromptCacheStats.record(AIMessage(content='回答', usage_metadata={
+            'input_tokens': 2000, 'output_tokens': 10, 'total_tokens': 2010,
+        }))
+        # 使用量を含まない応答は無視
+        PromptCacheStats.record(AIMessage(content='回答'))
+        PromptCacheStats.record(MagicMock())
+
+        stats = PromptCacheStats.stats()
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['input_tokens'], 4000)
+        self.assertEqual(stats['cached_tokens'], 1536)
+        self.assertEqual(stats['hit_rate'], 0.384)
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_stream_records_usage(self, mock_chat_openai):
+        """ストリーミングの応答の使用量も集計されることを確認"""
+        from langchain_core.messages import AIMessageChunk
+
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.stream.return_value = [
+            AIMessageChunk(content="回答"),
+            AIMessageChunk(content="", usage_metadata={
+                'input_tokens': 1500, 'output_tokens': 5, 'total_tokens': 1505,
+                'input_token_details': {'cache_read': 1024},
+            }),
+        ]
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
+        mock_chat_openai.return_value = mock_llm
+
+        chunks = list(ChatAgent()._react_loop_stream(query="テスト質問", tools=[], system_info="System prompt"))
+
+        self.assertEqual(chunks, ["回答"])
+        stats = PromptCacheStats.stats()
+        self.assertEqual((stats['calls'], stats['cached_tokens']), (1, 1024))
+
+
 class ChatAgentToolsTest(TestCase):
     """ChatAgentのツール関連テスト"""
 
     def setUp(self):
         """テスト用データを作成"""
+        # テストごとにモックのLLMを使うため、共有プールを破棄
+        AgentPool.reset()
         self.store = Store.objects.create(
             store_name='テスト店舗',
             address='テスト住所'
         )
 
     @patch('ai_features.agents.chat_agent.ChatOpenAI')
-    def test_create_tools_for_store(self, mock_chat_openai):
-        """店舗IDに紐づいたツールが作成されることを確認"""
-        # キャッシュをクリア
-        _get_cached_tools_for_store.cache_clear()
-
+    def test_get_tools(self, mock_chat_openai):
+        """ツールリストが取得できることを確認"""
         agent = ChatAgent()
-        tools = agent._create_tools_for_store(self.store.store_id)
+        tools = agent._get_tools()
 
         # ツールがリストで返されることを確認
         self.assertIsInstance(tools, list)
@@ -65,20 +245,48 @@ class ChatAgentToolsTest(TestCase):
         self.assertGreater(len(tools), 0)
 
     @patch('ai_features.agents.chat_agent.ChatOpenAI')
-    def test_cached_tools_reused(self, mock_chat_openai):
-        """ツールがキャッシュされることを確認"""
-        # キャッシュをクリア
-        _get_cached_tools_for_store.cache_clear()
+    def test_tools_shared_across_stores(self, mock_chat_openai):
+        """ツールはプロセスで1回だけ生成され、全店舗で共有されることを確認"""
+        _get_agent_tools.cache_clear()
 
         agent = ChatAgent()
+        tools1 = agent._get_tools()
+        tools2 = ChatAgent()._get_tools()
 
-        # 1回目
-        tools1 = agent._create_tools_for_store(self.store.store_id)
-        # 2回目（キャッシュから取得）
-        tools2 = agent._create_tools_for_store(self.store.store_id)
-
-        # 同じツールセットが返されることを確認
+        # 同じツールのインスタンスが返されることを確認
         self.assertEqual(len(tools1), len(tools2))
+        for tool1, tool2 in zip(tools1, tools2):
+            self.assertIs(tool1, tool2)
+        self.assertEqual(_get_agent_tools.cache_info().misses, 1)
+
+    def test_store_id_from_context(self):
+        """自店舗のツールは実行時のコンテキストから店舗IDを取得することを確認"""
+        _get_agent_tools.cache_clear()
+        self.addCleanup(_get_agent_tools.cache_clear)
+
+        with patch('ai_features.tools.analytics_tools.get_sales_trend') as mock_get_sales_trend:
+            mock_get_sales_trend.invoke.return_value = 'ok'
+            tools = {t.name: t for t in _get_agent_tools()}
+
+            with store_context(self.store.store_id):
+                tools['get_sales_trend'].invoke({'days': 7})
+            with store_context(999):
+                tools['get_sales_trend'].invoke({'days': 7})
+
+        self.assertEqual(mock_get_sales_trend.invoke.call_args_list, [
+            call({'store_id': self.store.store_id, 'days': 7}),
+            call({'store_id': 999, 'days': 7}),
+        ])
+
+    def test_store_id_required(self):
+        """store_context の外では店舗IDを取得できないことを確認"""
+        with self.assertRaises(RuntimeError):
+            get_current_store_id()
+
+        with store_context(self.store.store_id):
+            self.assertEqual(get_current_store_id(), self.store.store_id)
+        with self.assertRaises(RuntimeError):
+            get_current_store_id()
 
 
 class ChatAgentChatTest(TestCase):
@@ -86,6 +294,8 @@ class ChatAgentChatTest(TestCase):
 
     def setUp(self):
         """テスト用データを作成"""
+        # テストごとにモックのLLMを使うため、共有プールを破棄
+        AgentPool.reset()
         self.store = Store.objects.create(
             store_name='テスト店舗',
             address='テスト住所'
@@ -100,9 +310,6 @@ class ChatAgentChatTest(TestCase):
     @patch('langgraph.prebuilt.create_react_agent')
     def test_chat_with_tools(self, mock_create_react_agent, mock_chat_openai):
         """ツールありでチャットが実行できることを確認"""
-        # キャッシュをクリア
-        _get_cached_tools_for_store.cache_clear()
-
         # モックの設定
         mock_agent = MagicMock()
         mock_message = MagicMock()
@@ -219,6 +426,8 @@ class ChatAgentStreamTest(TestCase):
 
     def setUp(self):
         """テスト用データを作成"""
+        # テストごとにモックのLLMを使うため、共有プールを破棄
+        AgentPool.reset()
         self.store = Store.objects.create(
             store_name='テスト店舗',
             address='テスト住所'
@@ -278,6 +487,10 @@ class ChatAgentStreamTest(TestCase):
 class ChatAgentUtilityTest(TestCase):
     """ChatAgentのユーティリティメソッドテスト"""
 
+    def setUp(self):
+        # テストごとにモックのLLMを使うため、共有プールを破棄
+        AgentPool.reset()
+
     @patch('ai_features.agents.chat_agent.ChatOpenAI')
     def test_estimate_tokens(self, mock_chat_openai):
         """トークン数推定が正しく動作することを確認"""
@@ -313,6 +526,8 @@ class ChatAgentReactLoopStreamTest(TestCase):
 
     def setUp(self):
         """テスト用データを作成"""
+        # テストごとにモックのLLMを使うため、共有プールを破棄
+        AgentPool.reset()
         self.store = Store.objects.create(
             store_name='テスト店舗',
             address='テスト住所'
@@ -326,30 +541,22 @@ class ChatAgentReactLoopStreamTest(TestCase):
     @patch('ai_features.agents.chat_agent.ChatOpenAI')
     def test_react_loop_stream_no_tool_calls(self, mock_chat_openai):
         """ツール呼び出しなしのReActループストリーミングテスト"""
-        # キャッシュをクリア
-        _get_cached_tools_for_store.cache_clear()
+        from langchain_core.messages import AIMessageChunk
 
         mock_llm = MagicMock()
 
-        # bind_toolsのモック
+        # ツールをバインドしたLLMのストリーム（ツール呼び出しなし）
         mock_llm_with_tools = MagicMock()
-        mock_response = MagicMock()
-        mock_response.tool_calls = []  # ツール呼び出しなし
-        mock_response.content = "直接回答"
-        mock_llm_with_tools.invoke.return_value = mock_response
+        mock_llm_with_tools.stream.return_value = [
+            AIMessageChunk(content="直接"),
+            AIMessageChunk(content="回答"),
+        ]
         mock_llm.bind_tools.return_value = mock_llm_with_tools
 
-        # streamのモック
-        mock_chunk1 = MagicMock()
-        mock_chunk1.content = "直接"
-        mock_chunk2 = MagicMock()
-        mock_chunk2.content = "回答"
-        mock_llm.stream.return_value = [mock_chunk1, mock_chunk2]
-
         mock_chat_openai.return_value = mock_llm
 
         agent = ChatAgent()
-        tools = agent._create_tools_for_store(self.store.store_id)
+        tools = agent._get_tools()
 
         chunks = list(agent._react_loop_stream(
             query="テスト質問",
@@ -357,54 +564,386 @@ class ChatAgentReactLoopStreamTest(TestCase):
             system_info="System prompt"
         ))
 
-        # チャンクが返されることを確認
-        self.assertGreater(len(chunks), 0)
+        # 1回目のストリームのトークンがそのまま返され、LLMの再呼び出しは行われない
+        self.assertEqual(chunks, ["直接", "回答"])
+        mock_llm_with_tools.invoke.assert_not_called()
+        mock_llm.stream.assert_not_called()
 
     @patch('ai_features.agents.chat_agent.ChatOpenAI')
     def test_react_loop_stream_with_tool_calls(self, mock_chat_openai):
         """ツール呼び出しありのReActループストリーミングテスト"""
-        # キャッシュをクリア
-        _get_cached_tools_for_store.cache_clear()
+        from langchain_core.messages import AIMessageChunk
 
         mock_llm = MagicMock()
 
-        # ツール付きLLMのモック
+        # ツール付きLLMのストリーム
+        # 1ステップ目: ツール呼び出しの差分が分割されて届く / 2ステップ目: 最終回答
         mock_llm_with_tools = MagicMock()
-        mock_response = MagicMock()
+        mock_llm_with_tools.stream.side_effect = [
+            [
+                AIMessageChunk(content="", tool_call_chunks=[
+                    {'name': 'get_sales_trend', 'args': '{"days"', 'id': 'tool_call_1', 'index': 0}
+                ]),
+                AIMessageChunk(content="", tool_call_chunks=[
+                    {'name': None, 'args': ': 30}', 'id': None, 'index': 0}
+                ]),
+            ],
+            [AIMessageChunk(content="ツール使用後"), AIMessageChunk(content="の回答")],
+        ]
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
 
-        # ツール呼び出しのモック
-        mock_tool_call = {
-            'name': 'search_daily_reports',
-            'args': {'query': 'テスト', 'days': 30},
-            'id': 'tool_call_1'
-        }
-        mock_response.tool_calls = [mock_tool_call]
-        mock_response.content = ""
-        mock_llm_with_tools.invoke.return_value = mock_response
+        mock_chat_openai.return_value = mock_llm
+
+        mock_tool = MagicMock()
+        mock_tool.name = 'get_sales_trend'
+        mock_tool.invoke.return_value = '{"status": "success"}'
+
+        agent = ChatAgent()
+        chunks = list(agent._react_loop_stream(
+            query="テスト質問",
+            tools=[mock_tool],
+            system_info="System prompt"
+        ))
+
+        # 進捗イベントの後、ツール結果を踏まえた最終回答がストリームされることを確認
+        self.assertEqual(chunks, [
+            {'type': 'tool_start', 'tools': ['get_sales_trend'], 'step': 1},
+            {'type': 'tool_end', 'tool': 'get_sales_trend', 'status': 'success', 'step': 1},
+            "ツール使用後",
+            "の回答",
+        ])
+        mock_tool.invoke.assert_called_once_with({'days': 30})
+        second_messages = mock_llm_with_tools.stream.call_args_list[1].args[0]
+        self.assertEqual(second_messages[-1].content, '{"status": "success"}')
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_react_loop_stream_sets_store_in_worker(self, mock_chat_openai):
+        """ワーカースレッドで実行するツールに店舗IDが渡されることを確認"""
+        from langchain_core.messages import AIMessageChunk
+
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.stream.side_effect = [
+            [self._tool_call_chunk('get_sales_trend')],
+            [AIMessageChunk(content="回答")],
+        ]
+        mock_llm = MagicMock()
         mock_llm.bind_tools.return_value = mock_llm_with_tools
+        mock_chat_openai.return_value = mock_llm
 
-        # 最終回答のストリーミングモック
-        mock_chunk1 = MagicMock()
-        mock_chunk1.content = "ツール使用後"
-        mock_chunk2 = MagicMock()
-        mock_chunk2.content = "の回答"
-        mock_llm.stream.return_value = [mock_chunk1, mock_chunk2]
+        mock_tool = MagicMock()
+        mock_tool.name = 'get_sales_trend'
+        mock_tool.invoke.side_effect = lambda args: str(get_current_store_id())
+
+        agent = ChatAgent()
+        list(agent._react_loop_stream(
+            query="テスト質問",
+            tools=[mock_tool],
+            system_info="System prompt",
+            store_id=self.store.store_id
+        ))
+
+        second_messages = mock_llm_with_tools.stream.call_args_list[1].args[0]
+        self.assertEqual(second_messages[-1].content, str(self.store.store_id))
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_react_loop_stream_applies_tool_output_budget(self, mock_chat_openai):
+        """ワーカースレッドで実行するツールの結果にターンのトークン予算が適用されることを確認"""
+        from django.test import override_settings
+        from langchain_core.messages import AIMessageChunk
+        from ai_features.tools.formatting import estimate_tokens, format_tool_result
 
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.stream.side_effect = [
+            [self._tool_call_chunk('search_daily_reports')],
+            [AIMessageChunk(content="回答")],
+        ]
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
+        mock_chat_openai.return_value = mock_llm
+
+        mock_tool = MagicMock()
+        mock_tool.name = 'search_daily_reports'
+        mock_tool.invoke.side_effect = lambda args: format_tool_result({
+            "status": "success",
+            "results": [{"source_id": i, "content": "あ" * 1000} for i in range(10)],
+        })
+
+        agent = ChatAgent()
+        with override_settings(AI_TOOL_OUTPUT_TOKEN_BUDGET=1000, AI_TOOL_OUTPUT_MAX_CALL_TOKENS=0):
+            list(agent._react_loop_stream(query="テスト質問", tools=[mock_tool], system_info="System prompt"))
+
+        tool_output = mock_llm_with_tools.stream.call_args_list[1].args[0][-1].content
+        self.assertLessEqual(estimate_tokens(tool_output), 1000)
+        self.assertIn('"truncated":true', tool_output)
+
+    @staticmethod
+    def _tool_call_chunk(*calls):
+        """ツール呼び出しを含むチャンクを作成"""
+        from langchain_core.messages import AIMessageChunk
+        return AIMessageChunk(content="", tool_call_chunks=[
+            {'name': name, 'args': '{}', 'id': f'call_{index}', 'index': index}
+            for index, name in enumerate(calls)
+        ])
+
+    @staticmethod
+    def _slow_tool(name, delay, result='ok'):
+        """指定秒数かかるツールのモックを作成"""
+        import time
+
+        mock_tool = MagicMock()
+        mock_tool.name = name
+
+        def invoke(args):
+            time.sleep(delay)
+            return result
+        mock_tool.invoke.side_effect = invoke
+        return mock_tool
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_react_loop_stream_runs_tools_in_parallel(self, mock_chat_openai):
+        """同じステップのツールが並列実行されることを確認"""
+        import time
+        from langchain_core.messages import AIMessageChunk
+
+        names = ['gather_topic_related_data', 'get_sales_trend', 'get_claim_statistics', 'get_monthly_goal_status']
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.stream.side_effect = [
+            [self._tool_call_chunk(*names)],
+            [AIMessageChunk(content="回答")],
+        ]
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
         mock_chat_openai.return_value = mock_llm
 
         agent = ChatAgent()
-        tools = agent._create_tools_for_store(self.store.store_id)
+        started = time.monotonic()
+        chunks = list(agent._react_loop_stream(
+            query="アドバイスして",
+            tools=[self._slow_tool(name, 0.3) for name in names],
+            system_info="System prompt"
+        ))
+        elapsed = time.monotonic() - started
+
+        # 直列なら 4 × 0.3秒 = 1.2秒かかる
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(chunks[-1], "回答")
+        finished = [c['tool'] for c in chunks if isinstance(c, dict) and c['type'] == 'tool_end']
+        self.assertCountEqual(finished, names)
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_react_loop_stream_tool_timeout(self, mock_chat_openai):
+        """タイムアウトしたツールはエラー結果としてLLMに渡されることを確認"""
+        from django.test import override_settings
+        from langchain_core.messages import AIMessageChunk
 
-        # ツールのinvokeは実際に実行されるが、エラーが出ても問題ない
-        # （テストの目的はストリーミングの動作確認）
-        try:
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.stream.side_effect = [
+            [self._tool_call_chunk('get_sales_trend', 'get_claim_statistics')],
+            [AIMessageChunk(content="回答")],
+        ]
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
+        mock_chat_openai.return_value = mock_llm
+
+        agent = ChatAgent()
+        with override_settings(AI_AGENT_TOOL_TIMEOUT=0.2):
             chunks = list(agent._react_loop_stream(
                 query="テスト質問",
-                tools=tools,
+                tools=[
+                    self._slow_tool('get_sales_trend', 0),
+                    self._slow_tool('get_claim_statistics', 1.0),
+                ],
                 system_info="System prompt"
             ))
-            # チャンクが返されることを確認
-            self.assertGreater(len(chunks), 0)
-        except Exception:
-            # ツール実行でエラーが出る場合もあるが、それはこのテストの範囲外
-            pass
+
+        statuses = {c['tool']: c['status'] for c in chunks if isinstance(c, dict) and c['type'] == 'tool_end'}
+        self.assertEqual(statuses, {'get_sales_trend': 'success', 'get_claim_statistics': 'timeout'})
+        tool_messages = mock_llm_with_tools.stream.call_args_list[1].args[0][-2:]
+        self.assertEqual(tool_messages[0].content, 'ok')
+        self.assertIn('Error', tool_messages[1].content)
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_react_loop_stream_stops_at_max_iterations(self, mock_chat_openai):
+        """最大ステップ数に達したらツールなしのLLMで最終回答を生成することを確認"""
+        from langchain_core.messages import AIMessageChunk
+
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.stream.side_effect = lambda messages: [self._tool_call_chunk('get_sales_trend')]
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
+        mock_llm.stream.return_value = [AIMessageChunk(content="最終回答")]
+        mock_chat_openai.return_value = mock_llm
+
+        agent = ChatAgent(max_iterations=2)
+        chunks = list(agent._react_loop_stream(
+            query="テスト質問",
+            tools=[self._slow_tool('get_sales_trend', 0)],
+            system_info="System prompt"
+        ))
+
+        self.assertEqual(mock_llm_with_tools.stream.call_count, 2)
+        self.assertEqual(chunks[-1], "最終回答")
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_chat_stream_hides_progress_by_default(self, mock_chat_openai):
+        """chat_streamは指定がなければ進捗イベントを返さないことを確認"""
+        agent = ChatAgent()
+        with patch.object(agent, '_react_loop_stream', return_value=iter([
+            {'type': 'tool_start', 'tools': ['get_sales_trend'], 'step': 1},
+            "回答",
+        ])):
+            self.assertEqual(list(agent.chat_stream(query="q", user=self.user)), ["回答"])
+        with patch.object(agent, '_react_loop_stream', return_value=iter([
+            {'type': 'tool_start', 'tools': ['get_sales_trend'], 'step': 1},
+            "回答",
+        ])):
+            chunks = list(agent.chat_stream(query="q", user=self.user, include_progress=True))
+        self.assertEqual(len(chunks), 2)
+
+
+class ChatAgentAsyncStreamTest(TestCase):
+    """ChatAgentのachat_streamメソッドテスト（ASGIストリーミング用）"""
+
+    def setUp(self):
+        """テスト用データを作成"""
+        # テストごとにモックのLLMを使うため、共有プールを破棄
+        AgentPool.reset()
+        self.store = Store.objects.create(
+            store_name='テスト店舗',
+            address='テスト住所'
+        )
+        self.user = User.objects.create_user(
+            user_id='testuser',
+            password='testpass123',
+            store=self.store
+        )
+
+    @staticmethod
+    def _make_astream(contents, delay=0):
+        """指定したチャンクを返すastreamのモックを作成"""
+        import asyncio
+        from langchain_core.messages import AIMessageChunk
+
+        async def astream(messages):
+            for content in contents:
+                if delay:
+                    await asyncio.sleep(delay)
+                yield AIMessageChunk(content=content)
+        return astream
+
+    @staticmethod
+    def _collect(agen):
+        """非同期ジェネレータの出力をリストで取得"""
+        import asyncio
+
+        async def collect():
+            return [chunk async for chunk in agen]
+        return asyncio.run(collect())
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_achat_stream_without_tools(self, mock_chat_openai):
+        """ツールなしで非同期ストリーミングが実行できることを確認"""
+        mock_llm = MagicMock()
+        mock_llm.astream = self._make_astream(["これは", "テスト", "です"])
+        mock_chat_openai.return_value = mock_llm
+
+        agent = ChatAgent()
+        chunks = self._collect(agent.achat_stream(
+            query="テスト質問",
+            user=self.user,
+            use_tools=False
+        ))
+
+        self.assertEqual(chunks, ["これは", "テスト", "です"])
+        mock_llm.stream.assert_not_called()
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_areact_loop_stream_executes_tools(self, mock_chat_openai):
+        """ツール呼び出し時はツールを実行してから最終回答をストリームすることを確認"""
+        from langchain_core.messages import AIMessageChunk
+
+        steps = iter([
+            [AIMessageChunk(content="", tool_call_chunks=[
+                {'name': 'get_sales_trend', 'args': '{"days": 7}', 'id': 'call_1', 'index': 0}
+            ])],
+            [AIMessageChunk(content="ツール使用後"), AIMessageChunk(content="の回答")],
+        ])
+
+        async def astream(messages):
+            for chunk in next(steps):
+                yield chunk
+
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.astream = astream
+
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
+        mock_chat_openai.return_value = mock_llm
+
+        mock_tool = MagicMock()
+        mock_tool.name = 'get_sales_trend'
+        mock_tool.invoke.return_value = '{"status": "success"}'
+
+        agent = ChatAgent()
+        chunks = self._collect(agent._areact_loop_stream(
+            query="テスト質問",
+            tools=[mock_tool],
+            system_info="System prompt"
+        ))
+
+        self.assertEqual(chunks, [
+            {'type': 'tool_start', 'tools': ['get_sales_trend'], 'step': 1},
+            {'type': 'tool_end', 'tool': 'get_sales_trend', 'status': 'success', 'step': 1},
+            "ツール使用後",
+            "の回答",
+        ])
+        mock_tool.invoke.assert_called_once_with({'days': 7})
+        mock_llm_with_tools.invoke.assert_not_called()
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_areact_loop_stream_without_tool_calls_uses_single_pass(self, mock_chat_openai):
+        """ツール呼び出しがない場合は1回目のストリームをそのまま返すことを確認"""
+        mock_llm_with_tools = MagicMock()
+        mock_llm_with_tools.astream = self._make_astream(["直接", "回答"])
+
+        mock_llm = MagicMock()
+        mock_llm.bind_tools.return_value = mock_llm_with_tools
+        mock_chat_openai.return_value = mock_llm
+
+        agent = ChatAgent()
+        chunks = self._collect(agent._areact_loop_stream(
+            query="テスト質問",
+            tools=[],
+            system_info="System prompt"
+        ))
+
+        self.assertEqual(chunks, ["直接", "回答"])
+        mock_llm.astream.assert_not_called()
+
+    @patch('ai_features.agents.chat_agent.ChatOpenAI')
+    def test_concurrent_streams_do_not_block_each_other(self, mock_chat_openai):
+        """複数チャットのストリーミングが並行して進むことを確認"""
+        import asyncio
+        import time
+
+        mock_llm = MagicMock()
+        mock_llm.astream = self._make_astream(["a", "b", "c"], delay=0.1)
+        mock_chat_openai.return_value = mock_llm
+
+        agent = ChatAgent()
+
+        async def run_all():
+            async def one():
+                return [chunk async for chunk in agent.achat_stream(
+                    query="テスト質問", user=self.user, use_tools=False
+                )]
+            return await asyncio.gather(*(one() for _ in range(20)))
+
+        started = time.monotonic()
+        results = asyncio.run(run_all())
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(chunks == ["a", "b", "c"] for chunks in results))
+        # 直列なら 20 × 0.3秒 = 6秒かかる
+        self.assertLess(elapsed, 2.0)
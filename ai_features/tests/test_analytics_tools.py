@@ -43,7 +43,8 @@ class AnalyticsToolsTest(TestCase):
         )
 
         self.today = datetime.now().date()
-        self._create_test_data()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_test_data()
 
     def _create_test_data(self):
         """テストデータ作成"""
@@ -0,0 +1,98 @@
+import json
+
+from django.test import SimpleTestCase
+
+from ai_features.tools.formatting import (
+    ToolOutputBudget,
+    estimate_tokens,
+    format_tool_result,
+    tool_output_budget,
+)
+
+
+class FormatToolResultTest(SimpleTestCase):
+    """ツール結果の整形（トークン予算）のテスト"""
+
+    def _search_result(self, count=5, length=1000):
+        return {
+            "status": "success",
+            "query": "シフト",
+            "results": [
+                {"source_id": i, "title": f"投稿{i}", "content": "あ" * length}
+                for i in range(count)
+            ],
+            "total": count
+        }
+
+    def test_compact_json(self):
+        """インデント・区切りの空白を含まないJSONを返すことを確認"""
+        text = format_tool_result({"status": "success", "summary": {"total": 1}})
+
+        self.assertEqual(text, '{"status":"success","summary":{"total":1}}')
+
+    def test_daily_series_as_table(self):
+        """日別の系列は列名と行の表形式にまとめることを確認"""
+        result = json.loads(format_tool_result({
+            "status": "success",
+            "daily_trend": [
+                {"date": "2026-01-24", "count": 2},
+                {"date": "2026-01-23", "count": 0},
+            ],
+            "top_categories": [{"category": "hall", "count": 2}],
+        }))
+
+        self.assertEqual(result["daily_trend"], {
+            "columns": ["date", "count"],
+            "rows": [["2026-01-24", 2], ["2026-01-23", 0]],
+        })
+        # 日別の系列以外はそのまま
+        self.assertEqual(result["top_categories"], [{"category": "hall", "count": 2}])
+
+    def test_no_budget_keeps_contents(self):
+        """予算が設定されていない場合は本文を省略しないことを確認"""
+        result = json.loads(format_tool_result(self._search_result()))
+
+        self.assertEqual(len(result["results"][0]["content"]), 1000)
+        self.assertNotIn("truncated", result["results"][0])
+
+    def test_budget_truncates_contents(self):
+        """予算を超える場合は本文を短くし、source_id を残すことを確認"""
+        budget = ToolOutputBudget(2000)
+        with tool_output_budget(budget):
+            text = format_tool_result(self._search_result())
+        result = json.loads(text)
+
+        self.assertLessEqual(estimate_tokens(text), 2000)
+        self.assertEqual(len(result["results"]), 5)
+        first = result["results"][0]
+        self.assertEqual(first["source_id"], 0)
+        self.assertTrue(first["truncated"])
+        self.assertTrue(first["content"].endswith("…"))
+        self.assertEqual(budget.used_tokens, estimate_tokens(text))
+
+    def test_budget_omits_trailing_items(self):
+        """本文を短くしても超える場合は末尾の項目を省略することを確認"""
+        with tool_output_budget(ToolOutputBudget(500)):
+            text = format_tool_result(self._search_result(count=20))
+        result = json.loads(text)
+
+        self.assertLessEqual(estimate_tokens(text), 500)
+        self.assertLess(len(result["results"]), 20)
+        self.assertEqual(len(result["results"]) + result["results_omitted"], 20)
+        self.assertEqual(result["total"], 20)
+
+    def test_budget_shared_within_turn(self):
+        """同じターンのツール結果は予算を合計で消費することを確認"""
+        budget = ToolOutputBudget(3000, max_call_tokens=2500)
+        with tool_output_budget(budget):
+            first = format_tool_result(self._search_result())
+            second = format_tool_result(self._search_result())
+
+        self.assertLessEqual(estimate_tokens(first), 2500)
+        # 2回目は残りの予算（最小値あり）に収める
+        self.assertLessEqual(estimate_tokens(second), max(3000 - estimate_tokens(first), 300))
+
+    def test_estimate_tokens(self):
+        """ASCIIは4文字で1トークン、日本語は1文字で1トークンと推定することを確認"""
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+        self.assertEqual(estimate_tokens("日報"), 2)
@@ -1,3 +1,5 @@
+from datetime import date
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -176,6 +178,33 @@ class DocumentVectorModelTest(TestCase):
         )
         self.assertEqual(str(doc), '日報 - ID:123')
 
+    def test_filter_columns_from_metadata(self):
+        """保存時にmetadataのstore_id/dateが検索フィルタ用カラムに反映されることを確認"""
+        doc = DocumentVector.objects.create(
+            source_type='daily_report',
+            source_id=1,
+            content='テスト',
+            metadata={'store_id': 3, 'date': '2024-01-15'},
+            embedding=self.dummy_embedding
+        )
+        doc.refresh_from_db()
+        self.assertEqual(doc.store_id, 3)
+        self.assertEqual(doc.date, date(2024, 1, 15))
+
+        # store_id を持たないソース（コメント等）はNULL
+        comment = DocumentVector.objects.create(
+            source_type='bbs_comment',
+            source_id=1,
+            content='コメント',
+            metadata={'post_id': 1, 'date': '2024-01-16'},
+            embedding=self.dummy_embedding
+        )
+        self.assertIsNone(comment.store_id)
+        self.assertEqual(
+            list(DocumentVector.objects.filter(store_id=3, date__gte='2024-01-01').values_list('vector_id', flat=True)),
+            [doc.vector_id]
+        )
+
 
 class KnowledgeVectorModelTest(TestCase):
     """KnowledgeVectorモデルのテスト"""
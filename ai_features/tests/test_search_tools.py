@@ -0,0 +1,134 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from unittest.mock import patch
+import json
+from stores.models import Store
+from bbs.models import BBSPost, BBSComment
+from reports.models import DailyReport
+from ai_features.tools.search_tools import (
+    search_bbs_posts,
+    search_bbs_posts_my_store,
+    search_bbs_posts_all_stores,
+    search_bbs_by_keyword,
+    get_document_detail,
+)
+
+User = get_user_model()
+
+
+class BBSSearchToolsTest(TestCase):
+    """掲示板検索ツールのテスト（スレッドの一括取得）"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_id=1, store_name='店舗1', address='住所1')
+        self.user = User.objects.create_user(user_id='testuser', password='testpass123', store=self.store)
+
+        self.posts = []
+        for i in range(5):
+            post = BBSPost.objects.create(
+                store=self.store, user=self.user, title=f'シフト調整{i}', content='来週のシフトについて'
+            )
+            for j in range(2):
+                BBSComment.objects.create(
+                    post=post, user=self.user, content=f'了解です{j}', is_best_answer=(j == 1)
+                )
+            self.posts.append(post)
+
+        self.search_results = [
+            {
+                'source_id': post.post_id,
+                'content': post.content,
+                'metadata': {'title': post.title, 'store_name': '店舗1'},
+                'similarity': 0.9,
+                'matched_by': ['vector'],
+            }
+            for post in self.posts
+        ]
+
+    @patch('ai_features.services.core_services.VectorSearchService.hybrid_search_documents')
+    def test_vector_tools_hydrate_threads_in_constant_queries(self, mock_search):
+        """ヒット件数によらず投稿・コメントを2クエリで取得することを確認"""
+        mock_search.return_value = self.search_results
+
+        cases = [
+            (search_bbs_posts, {'query': 'シフト'}),
+            (search_bbs_posts_my_store, {'query': 'シフト', 'store_id': 1}),
+            (search_bbs_posts_all_stores, {'query': 'シフト'}),
+        ]
+        for tool, args in cases:
+            with self.subTest(tool=tool.name):
+                with self.assertNumQueries(2):
+                    result = json.loads(tool.invoke(args))
+
+                self.assertEqual(result['status'], 'success')
+                self.assertEqual(len(result['results']), 5)
+                first = result['results'][0]
+                self.assertEqual(first['comment_count'], 2)
+                self.assertEqual([c['content'] for c in first['comments']], ['了解です0', '了解です1'])
+                self.assertEqual(first['best_answer'], '了解です1')
+
+    @patch('ai_features.services.core_services.VectorSearchService.hybrid_search_documents')
+    def test_vector_tools_skip_missing_posts(self, mock_search):
+        """削除済みの投稿はコメントなしで返すことを確認"""
+        mock_search.return_value = [dict(self.search_results[0], source_id=99999)]
+
+        result = json.loads(search_bbs_posts.invoke({'query': 'シフト'}))
+
+        self.assertEqual(result['results'][0]['comment_count'], 0)
+        self.assertIsNone(result['results'][0]['best_answer'])
+
+    def test_keyword_tool_loads_comments_once(self):
+        """キーワード検索のコメント取得がヒット件数によらず1クエリであることを確認"""
+        BBSComment.objects.create(post=self.posts[0], user=self.user, content='休憩の取り方')
+        post = BBSPost.objects.create(store=self.store, user=self.user, title='休憩', content='休憩時間')
+
+        result = json.loads(search_bbs_by_keyword.invoke({'keyword': '休憩'}))
+
+        self.assertEqual(result['status'], 'success')
+        match_types = {item['title']: item['match_type'] for item in result['results']}
+        self.assertEqual(match_types, {post.title: 'タイトル/本文', self.posts[0].title: 'コメント'})
+        comment_hit = next(item for item in result['results'] if item['match_type'] == 'コメント')
+        self.assertTrue(comment_hit['comments'][-1]['contains_keyword'])
+        self.assertFalse(comment_hit['comments'][0]['contains_keyword'])
+
+
+class DocumentDetailToolTest(TestCase):
+    """省略された本文を取得するツールのテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_id=1, store_name='店舗1', address='住所1')
+        self.user = User.objects.create_user(user_id='testuser', password='testpass123', store=self.store)
+
+    def test_daily_report(self):
+        """日報の全文を取得できることを確認"""
+        from datetime import date
+
+        report = DailyReport.objects.create(
+            store=self.store, user=self.user, date=date(2026, 1, 24),
+            genre='claim', location='hall', title='提供遅延', content='あ' * 1000
+        )
+
+        result = json.loads(get_document_detail.invoke({'source_type': 'daily_report', 'source_id': report.report_id}))
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['content'], 'あ' * 1000)
+        self.assertEqual(result['store_name'], '店舗1')
+
+    def test_bbs_post(self):
+        """掲示板投稿の全文とコメントを取得できることを確認"""
+        post = BBSPost.objects.create(store=self.store, user=self.user, title='シフト調整', content='来週のシフト')
+        BBSComment.objects.create(post=post, user=self.user, content='了解です', is_best_answer=True)
+
+        result = json.loads(get_document_detail.invoke({'source_type': 'bbs_post', 'source_id': post.post_id}))
+
+        self.assertEqual(result['content'], '来週のシフト')
+        self.assertEqual([c['content'] for c in result['comments']], ['了解です'])
+        self.assertEqual(result['best_answer'], '了解です')
+
+    def test_not_found_and_invalid_type(self):
+        """存在しないID・不正な種別の場合を確認"""
+        result = json.loads(get_document_detail.invoke({'source_type': 'bbs_post', 'source_id': 999}))
+        self.assertEqual(result['status'], 'no_data')
+
+        result = json.loads(get_document_detail.invoke({'source_type': 'manual', 'source_id': 1}))
+        self.assertEqual(result['status'], 'error')
@@ -1,4 +1,13 @@
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from unittest.mock import patch, MagicMock
 import numpy as np
@@ -7,9 +16,15 @@ from ai_features.services.core_services import (
     EmbeddingService,
     QueryClassifier,
     VectorSearchService,
-    VectorizationService
+    VectorizationService,
+    VectorizationOutboxService
+)
+from ai_features.services.query_embedding_cache import QueryEmbeddingCache
+from ai_features.services.chat_history import ChatHistoryService
+from ai_features.models import (
+    AIChatHistory, AIChatSummary, DocumentVector, EmbeddingCache, KnowledgeVector, VectorizationTask,
+    compute_content_hash
 )
-from ai_features.models import DocumentVector, KnowledgeVector
 from stores.models import Store
 from reports.models import DailyReport
 from bbs.models import BBSPost, BBSComment
@@ -70,6 +85,240 @@ class EmbeddingServiceTest(TestCase):
         self.assertIsNone(result)
         mock_logger.error.assert_called_once()
 
+    @patch('ai_features.services.core_services.EmbeddingService.get_openai_client')
+    @override_settings(DEBUG=False)
+    def test_generate_embeddings_openai_batches(self, mock_get_client):
+        """複数テキストがバッチ分割され、入力順に埋め込みが返ることを確認"""
+        def create(model, input, dimensions):
+            response = MagicMock()
+            # レスポンスの並びが入力順と異なっても index で並べ直されること
+            response.data = [
+                MagicMock(index=i, embedding=[float(len(text))] * dimensions)
+                for i, text in reversed(list(enumerate(input)))
+            ]
+            return response
+
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = create
+        mock_get_client.return_value = mock_client
+
+        texts = ['a', 'bb', 'ccc', 'dddd', 'eeeee']
+        result = EmbeddingService.generate_embeddings(texts, batch_size=2)
+
+        self.assertEqual(mock_client.embeddings.create.call_count, 3)
+        self.assertEqual([embedding[0] for embedding in result], [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(len(result[0]), 384)
+
+    @patch('ai_features.services.core_services.logger')
+    @patch('ai_features.services.core_services.EmbeddingService.get_local_model')
+    @override_settings(DEBUG=True)
+    def test_generate_embeddings_failed_batch(self, mock_get_model, mock_logger):
+        """失敗したバッチの要素のみNoneになることを確認"""
+        mock_model = MagicMock()
+        mock_model.encode.side_effect = [
+            np.random.rand(2, 384),
+            Exception("モデルエラー"),
+        ]
+        mock_get_model.return_value = mock_model
+
+        result = EmbeddingService.generate_embeddings(['a', 'b', 'c'], batch_size=2)
+
+        self.assertEqual(len(result), 3)
+        self.assertEqual(len(result[0]), 384)
+        self.assertEqual(len(result[1]), 384)
+        self.assertIsNone(result[2])
+        mock_logger.error.assert_called_once()
+
+    @patch('ai_features.services.core_services.EmbeddingService.get_local_model')
+    @override_settings(DEBUG=True)
+    def test_generate_embeddings_uses_cache(self, mock_get_model):
+        """キャッシュ済みのテキストは埋め込みを再生成しないことを確認"""
+        mock_model = MagicMock()
+        mock_model.encode.side_effect = lambda texts, batch_size: np.random.rand(len(texts), 384)
+        mock_get_model.return_value = mock_model
+
+        first = EmbeddingService.generate_embeddings(['a', 'b', 'a'], use_cache=True)
+
+        # 重複テキストは1回のみ生成される
+        mock_model.encode.assert_called_once()
+        self.assertEqual(mock_model.encode.call_args.args[0], ['a', 'b'])
+        self.assertEqual(first[0], first[2])
+        self.assertEqual(EmbeddingCache.objects.filter(
+            model_name=EmbeddingService.LOCAL_EMBEDDING_MODEL
+        ).count(), 2)
+
+        second = EmbeddingService.generate_embeddings(['b', 'a'], use_cache=True)
+        single = EmbeddingService.generate_embedding('a', use_cache=True)
+
+        mock_model.encode.assert_called_once()
+        np.testing.assert_allclose(second[0], first[1], rtol=1e-6)
+        np.testing.assert_allclose(second[1], first[0], rtol=1e-6)
+        np.testing.assert_allclose(single, first[0], rtol=1e-6)
+
+    @patch('ai_features.services.core_services.EmbeddingService.get_local_model')
+    @override_settings(DEBUG=True, EMBEDDING_CACHE_TTL_DAYS=30)
+    def test_prune_embedding_cache(self, mock_get_model):
+        """使われていないキャッシュのみ削除され、再利用したキャッシュは残ることを確認"""
+        mock_model = MagicMock()
+        mock_model.encode.side_effect = lambda texts, batch_size: np.random.rand(len(texts), 384)
+        mock_get_model.return_value = mock_model
+
+        EmbeddingService.generate_embeddings(['a', 'b'], use_cache=True)
+        EmbeddingCache.objects.update(last_used_at=timezone.now() - timedelta(days=60))
+
+        # 再利用したキャッシュは最終使用日時が更新される
+        EmbeddingService.generate_embeddings(['a'], use_cache=True)
+
+        self.assertEqual(EmbeddingService.prune_embedding_cache(), 1)
+        self.assertEqual(
+            list(EmbeddingCache.objects.values_list('text_hash', flat=True)),
+            [compute_content_hash('a')]
+        )
+        self.assertEqual(EmbeddingService.prune_embedding_cache(max_age_days=0), 0)
+
+        out = StringIO()
+        EmbeddingCache.objects.update(last_used_at=timezone.now() - timedelta(days=60))
+        call_command('prune_embedding_cache', stdout=out)
+        self.assertFalse(EmbeddingCache.objects.exists())
+        self.assertIn('1件', out.getvalue())
+
+
+class QueryEmbeddingCacheTest(TestCase):
+    """検索クエリの埋め込みキャッシュのテスト"""
+
+    def setUp(self):
+        QueryEmbeddingCache.reset()
+        self.addCleanup(QueryEmbeddingCache.reset)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    @override_settings(DEBUG=True)
+    def test_repeated_query_embedded_once(self, mock_generate_embedding):
+        """正規化して同じクエリは埋め込みを1回だけ生成することを確認"""
+        mock_generate_embedding.return_value = [0.1] * 384
+
+        first = EmbeddingService.generate_query_embedding('提供 遅延')
+        second = EmbeddingService.generate_query_embedding('  提供　遅延 ')
+        EmbeddingService.generate_query_embedding('')
+        EmbeddingService.generate_query_embedding('')
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_generate_embedding.call_count, 2)
+        mock_generate_embedding.assert_any_call('提供 遅延')
+        stats = QueryEmbeddingCache.stats()
+        self.assertEqual(stats['local_hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertEqual(stats['size'], 2)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    def test_failure_not_cached(self, mock_generate_embedding):
+        """埋め込み生成の失敗はキャッシュしないことを確認"""
+        mock_generate_embedding.side_effect = [None, [0.2] * 384]
+
+        self.assertIsNone(EmbeddingService.generate_query_embedding('クレーム'))
+        self.assertEqual(EmbeddingService.generate_query_embedding('クレーム'), [0.2] * 384)
+        self.assertEqual(mock_generate_embedding.call_count, 2)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    def test_provider_in_key(self, mock_generate_embedding):
+        """プロバイダ・モデルが異なる場合は別のキーになることを確認"""
+        mock_generate_embedding.return_value = [0.1] * 384
+
+        with override_settings(DEBUG=True):
+            EmbeddingService.generate_query_embedding('クレーム')
+        with override_settings(DEBUG=False):
+            EmbeddingService.generate_query_embedding('クレーム')
+
+        self.assertEqual(mock_generate_embedding.call_count, 2)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    @override_settings(AI_QUERY_EMBEDDING_CACHE_TTL=60)
+    def test_ttl_expiry(self, mock_generate_embedding):
+        """有効期間を過ぎたエントリは再生成することを確認"""
+        mock_generate_embedding.return_value = [0.1] * 384
+
+        with patch('analytics.cache.time.monotonic', return_value=1000.0):
+            EmbeddingService.generate_query_embedding('クレーム')
+            EmbeddingService.generate_query_embedding('クレーム')
+        with patch('analytics.cache.time.monotonic', return_value=1061.0):
+            EmbeddingService.generate_query_embedding('クレーム')
+
+        self.assertEqual(mock_generate_embedding.call_count, 2)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    @override_settings(AI_QUERY_EMBEDDING_CACHE_SHARED_ALIAS='default')
+    def test_shared_tier(self, mock_generate_embedding):
+        """プロセス内キャッシュにない場合は共有キャッシュを参照することを確認"""
+        mock_generate_embedding.return_value = [0.1] * 384
+
+        EmbeddingService.generate_query_embedding('クレーム')
+        # 別プロセス相当（プロセス内LRUのみ破棄）
+        QueryEmbeddingCache._local = None
+        result = EmbeddingService.generate_query_embedding('クレーム')
+
+        self.assertEqual(result, [0.1] * 384)
+        mock_generate_embedding.assert_called_once()
+        self.assertEqual(QueryEmbeddingCache.stats()['shared_hits'], 1)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    @override_settings(AI_QUERY_EMBEDDING_CACHE_MAX_ENTRIES=0)
+    def test_disabled(self, mock_generate_embedding):
+        """最大件数0の場合はキャッシュしないことを確認"""
+        mock_generate_embedding.return_value = [0.1] * 384
+
+        EmbeddingService.generate_query_embedding('クレーム')
+        EmbeddingService.generate_query_embedding('クレーム')
+
+        self.assertEqual(mock_generate_embedding.call_count, 2)
+
+    def test_concurrent_misses_compute_once(self):
+        """同じクエリの同時ミスは1回だけ生成することを確認"""
+        calls = []
+
+        def compute(text):
+            calls.append(text)
+            time.sleep(0.05)
+            return [0.1] * 384
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(QueryEmbeddingCache.get_or_compute(('local', 'm', 384), 'クレーム', compute))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[0.1] * 384] * 5)
+
+    @override_settings(AI_QUERY_EMBEDDING_CACHE_WAIT_TIMEOUT=0.05)
+    def test_wait_timeout_computes_directly(self):
+        """生成中のスレッドが応答しない場合は待たずに自分で生成することを確認"""
+        release = threading.Event()
+
+        def hanging_compute(text):
+            release.wait(timeout=5)
+            return None
+
+        thread = threading.Thread(
+            target=QueryEmbeddingCache.get_or_compute, args=(('local', 'm', 384), 'クレーム', hanging_compute)
+        )
+        thread.start()
+        # 後始末は登録の逆順（生成中のスレッドを解放してから終了を待つ）
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        while not QueryEmbeddingCache._inflight:
+            time.sleep(0.001)
+
+        result = QueryEmbeddingCache.get_or_compute(('local', 'm', 384), 'クレーム', lambda text: [0.2] * 384)
+
+        self.assertEqual(result, [0.2] * 384)
+        self.assertTrue(thread.is_alive())
+
 
 class QueryClassifierTest(TestCase):
     """QueryClassifierのテスト"""
@@ -112,6 +361,9 @@ class VectorSearchServiceTest(TestCase):
 
     def setUp(self):
         """テスト用データを作成"""
+        # クエリ埋め込みキャッシュにテスト間でモックの値が残らないようにする
+        QueryEmbeddingCache.reset()
+        self.addCleanup(QueryEmbeddingCache.reset)
         self.dummy_embedding = np.random.rand(384).tolist()
         self.store = Store.objects.create(
             store_name='テスト店舗',
@@ -233,6 +485,175 @@ class VectorSearchServiceTest(TestCase):
         for result in results:
             self.assertEqual(result['metadata']['category'], 'operations')
 
+    def test_keyword_search_documents(self):
+        """キーワード検索が含む語の数の多い順に返り、フィルタが効くことを確認"""
+        DocumentVector.objects.create(
+            source_type='daily_report',
+            source_id=2,
+            content='シフト調整とレジ締めについて',
+            metadata={'store_id': self.store.store_id, 'date': '2024-01-03'},
+            embedding=self.dummy_embedding
+        )
+        DocumentVector.objects.create(
+            source_type='daily_report',
+            source_id=3,
+            content='シフトの相談',
+            metadata={'store_id': self.store.store_id, 'date': '2024-01-04'},
+            embedding=self.dummy_embedding
+        )
+
+        results = VectorSearchService.keyword_search_documents(
+            query='シフト　レジ締め',
+            store_id=self.store.store_id,
+            source_types=['daily_report'],
+        )
+
+        self.assertEqual([r['source_id'] for r in results], [2, 3])
+        self.assertEqual([r['keyword_score'] for r in results], [2, 1])
+
+        results = VectorSearchService.keyword_search_documents(
+            query='シフト',
+            source_types=['daily_report'],
+            filters={'date_from': '2024-01-04'},
+        )
+        self.assertEqual([r['source_id'] for r in results], [3])
+
+        # 1文字の語のみの場合は検索しない
+        self.assertEqual(VectorSearchService.keyword_search_documents('の', source_types=['daily_report']), [])
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_query_embedding')
+    @patch('ai_features.services.core_services.VectorSearchService.search_documents')
+    def test_hybrid_search_documents_rank_fusion(self, mock_search_documents, mock_generate_query_embedding):
+        """キーワード検索とベクトル検索の結果がRRFで統合されることを確認"""
+        keyword_doc = DocumentVector.objects.create(
+            source_type='bbs_post',
+            source_id=2,
+            content='年末年始の営業時間のお知らせ',
+            metadata={'store_id': self.store.store_id, 'date': '2024-01-03'},
+            embedding=self.dummy_embedding
+        )
+        both_doc = DocumentVector.objects.create(
+            source_type='bbs_post',
+            source_id=3,
+            content='営業時間の変更について',
+            metadata={'store_id': self.store.store_id, 'date': '2024-01-02'},
+            embedding=self.dummy_embedding
+        )
+        vector_only = DocumentVector.objects.get(source_type='bbs_post', source_id=1)
+
+        def vector_result(doc, similarity):
+            return {
+                'vector_id': doc.vector_id,
+                'source_type': doc.source_type,
+                'source_id': doc.source_id,
+                'content': doc.content,
+                'metadata': doc.metadata,
+                'similarity': similarity,
+            }
+        mock_search_documents.return_value = [vector_result(both_doc, 0.9), vector_result(vector_only, 0.8)]
+        mock_generate_query_embedding.return_value = self.dummy_embedding
+
+        results = VectorSearchService.hybrid_search_documents(
+            query='営業時間',
+            source_types=['bbs_post'],
+            top_k=3
+        )
+
+        # 両方でヒットしたものが最上位、以降は各検索での順位順
+        self.assertEqual(
+            [r['source_id'] for r in results],
+            [both_doc.source_id, keyword_doc.source_id, vector_only.source_id]
+        )
+        self.assertEqual(sorted(results[0]['matched_by']), ['keyword', 'vector'])
+        self.assertEqual(results[0]['similarity'], 0.9)
+        self.assertEqual(results[1]['matched_by'], ['keyword'])
+        self.assertEqual(results[1]['similarity'], 0.0)
+        self.assertEqual(results[2]['matched_by'], ['vector'])
+        self.assertEqual(mock_search_documents.call_args.kwargs['top_k'], 12)
+        # 埋め込みは1回だけ生成し、ベクトル検索に渡す
+        mock_generate_query_embedding.assert_called_once_with('営業時間')
+        self.assertEqual(mock_search_documents.call_args.kwargs['query_embedding'], self.dummy_embedding)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_query_embedding')
+    def test_hybrid_search_overlaps_embedding_with_keyword_search(self, mock_generate_query_embedding):
+        """クエリの埋め込み生成中にキーワード検索が実行されることを確認"""
+        keyword_started = threading.Event()
+        overlapped = []
+
+        def generate(query):
+            # キーワード検索が始まるまで埋め込み生成を終えない（直列実行ならタイムアウトする）
+            overlapped.append(keyword_started.wait(timeout=5))
+            return None
+
+        mock_generate_query_embedding.side_effect = generate
+        keyword_search = VectorSearchService.keyword_search_documents
+
+        def keyword_search_documents(*args, **kwargs):
+            keyword_started.set()
+            return keyword_search(*args, **kwargs)
+
+        with patch.object(VectorSearchService, 'keyword_search_documents', side_effect=keyword_search_documents):
+            results = VectorSearchService.hybrid_search_documents('営業時間', source_types=['bbs_post'])
+
+        self.assertEqual(overlapped, [True])
+        self.assertEqual(results, [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'HNSWインデックスはPostgreSQLのみ')
+class VectorSearchHnswRecallTest(TestCase):
+    """HNSWインデックスで絞り込み検索した場合の再現率のテスト（PostgreSQLのみ）"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.query_embedding = rng.random(384)
+        self.other_store = Store.objects.create(store_name='他店舗', address='他店舗住所')
+        self.store = Store.objects.create(store_name='テスト店舗', address='テスト住所')
+
+        # 他店舗にクエリに近いドキュメントを多数、対象店舗にはクエリから遠いドキュメントを少数作成
+        vectors = [
+            DocumentVector(
+                source_type='daily_report', source_id=i, content=f'他店舗の日報{i}',
+                metadata={'store_id': self.other_store.store_id}, store_id=self.other_store.store_id,
+                embedding=(self.query_embedding + rng.normal(0, 0.01, 384)).tolist()
+            )
+            for i in range(300)
+        ]
+        vectors += [
+            DocumentVector(
+                source_type='daily_report', source_id=1000 + i, content=f'対象店舗の日報{i}',
+                metadata={'store_id': self.store.store_id}, store_id=self.store.store_id,
+                embedding=rng.random(384).tolist()
+            )
+            for i in range(5)
+        ]
+        DocumentVector.objects.bulk_create(vectors)
+
+        # 件数が少なくても順次スキャンにせず、HNSWインデックスを使用させる
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_store_filter_returns_documents_outside_ef_search_candidates(self):
+        """店舗の絞り込み対象がHNSWの探索候補に含まれない場合も結果を返すことを確認"""
+        results = VectorSearchService.search_documents(
+            'テスト', store_id=self.store.store_id, source_types=['daily_report'], top_k=5,
+            query_embedding=self.query_embedding.tolist()
+        )
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual({r['metadata']['store_id'] for r in results}, {self.store.store_id})
+        similarities = [r['similarity'] for r in results]
+        self.assertEqual(similarities, sorted(similarities, reverse=True))
+
+    def test_top_k_larger_than_ef_search(self):
+        """取得件数が ef_search より多い場合も取得件数分の結果を返すことを確認"""
+        with override_settings(AI_VECTOR_SEARCH_EF_SEARCH=40, AI_VECTOR_SEARCH_ITERATIVE_SCAN=''):
+            results = VectorSearchService.search_documents(
+                'テスト', source_types=['daily_report'], top_k=80,
+                query_embedding=self.query_embedding.tolist()
+            )
+
+        self.assertEqual(len(results), 80)
+
 
 class VectorizationServiceTest(TestCase):
     """VectorizationServiceのテスト"""
@@ -387,3 +808,391 @@ class VectorizationServiceTest(TestCase):
             source_type='daily_report',
             source_id=report.report_id
         ).count(), 0)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    def test_vectorize_unchanged_content_skips_embedding(self, mock_generate_embedding):
+        """コンテンツに変更がなければ埋め込みを再生成しないことを確認"""
+        mock_generate_embedding.return_value = np.random.rand(384).tolist()
+
+        report = DailyReport.objects.create(
+            store=self.store,
+            user=self.user,
+            date='2024-01-01',
+            genre='report',
+            location='hall',
+            title='テスト',
+            content='内容'
+        )
+        self.assertTrue(VectorizationService.vectorize_daily_report(report.report_id))
+        doc_vector = DocumentVector.objects.get(source_type='daily_report', source_id=report.report_id)
+        self.assertEqual(len(doc_vector.content_hash), 64)
+
+        # ベクトル化対象外のフィールドのみ変更
+        self.assertTrue(VectorizationService.vectorize_daily_report(report.report_id))
+        self.assertEqual(mock_generate_embedding.call_count, 1)
+
+        # コンテンツが変わった場合は再生成される
+        report.content = '更新された内容'
+        report.save()
+        self.assertTrue(VectorizationService.vectorize_daily_report(report.report_id))
+        self.assertEqual(mock_generate_embedding.call_count, 2)
+        doc_vector.refresh_from_db()
+        self.assertIn('更新された内容', doc_vector.content)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embeddings')
+    def test_bulk_vectorize_skips_unchanged(self, mock_generate_embeddings):
+        """一括ベクトル化でコンテンツに変更がないソースは埋め込みを再生成しないことを確認"""
+        mock_generate_embeddings.side_effect = lambda texts, **kwargs: [np.random.rand(384).tolist() for _ in texts]
+
+        post = BBSPost.objects.create(
+            store=self.store,
+            user=self.user,
+            title='投稿',
+            content='内容',
+            genre='information'
+        )
+
+        self.assertEqual(VectorizationService.bulk_vectorize('bbs_post'), (1, 0))
+        self.assertEqual(VectorizationService.bulk_vectorize('bbs_post'), (1, 0))
+        self.assertEqual(mock_generate_embeddings.call_args.args[0], [])
+
+        VectorizationService.bulk_vectorize('bbs_post', force=True)
+        self.assertEqual(len(mock_generate_embeddings.call_args.args[0]), 1)
+        self.assertEqual(DocumentVector.objects.filter(source_type='bbs_post', source_id=post.post_id).count(), 1)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embeddings')
+    def test_bulk_vectorize_creates_and_updates(self, mock_generate_embeddings):
+        """一括ベクトル化で作成・更新され、バッチ単位で埋め込みが生成されることを確認"""
+        mock_generate_embeddings.side_effect = lambda texts, **kwargs: [np.random.rand(384).tolist() for _ in texts]
+
+        reports = [
+            DailyReport.objects.create(
+                store=self.store,
+                user=self.user,
+                date='2024-01-01',
+                genre='claim',
+                location='hall',
+                title=f'日報{i}',
+                content='内容'
+            )
+            for i in range(3)
+        ]
+
+        # 既存のベクトルは更新されること
+        DocumentVector.objects.create(
+            source_type='daily_report',
+            source_id=reports[0].report_id,
+            content='古い内容',
+            metadata={},
+            embedding=np.random.rand(384).tolist()
+        )
+
+        progress = MagicMock()
+        success, fail = VectorizationService.bulk_vectorize('daily_report', batch_size=2, progress=progress)
+
+        self.assertEqual((success, fail), (3, 0))
+        self.assertEqual(mock_generate_embeddings.call_count, 2)
+        self.assertEqual([c.args[0] for c in progress.call_args_list], [2, 1])
+        self.assertEqual(DocumentVector.objects.filter(source_type='daily_report').count(), 3)
+
+        doc_vector = DocumentVector.objects.get(source_type='daily_report', source_id=reports[0].report_id)
+        self.assertIn('タイトル: 日報0', doc_vector.content)
+        self.assertEqual(doc_vector.metadata['store_id'], self.store.store_id)
+        self.assertEqual(doc_vector.store_id, self.store.store_id)
+        self.assertEqual(str(doc_vector.date), '2024-01-01')
+        self.assertTrue(doc_vector.metadata['has_claim'])
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embeddings')
+    def test_bulk_vectorize_embedding_failure(self, mock_generate_embeddings):
+        """埋め込み生成に失敗した要素が失敗件数に数えられることを確認"""
+        mock_generate_embeddings.side_effect = lambda texts, **kwargs: [None] + [np.random.rand(384).tolist() for _ in texts[1:]]
+
+        post = BBSPost.objects.create(
+            store=self.store,
+            user=self.user,
+            title='投稿',
+            content='内容',
+            genre='information'
+        )
+        comments = [
+            BBSComment.objects.create(post=post, user=self.user, content=f'コメント{i}')
+            for i in range(2)
+        ]
+
+        success, fail = VectorizationService.bulk_vectorize(
+            'bbs_comment', source_ids=[comment.comment_id for comment in comments]
+        )
+
+        self.assertEqual((success, fail), (1, 1))
+        self.assertFalse(DocumentVector.objects.filter(
+            source_type='bbs_comment', source_id=comments[0].comment_id
+        ).exists())
+        self.assertTrue(DocumentVector.objects.filter(
+            source_type='bbs_comment', source_id=comments[1].comment_id
+        ).exists())
+
+
+class VectorizationOutboxServiceTest(TestCase):
+    """VectorizationOutboxServiceのテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(
+            store_name='テスト店舗',
+            address='テスト住所'
+        )
+        self.user = User.objects.create_user(
+            user_id='testuser',
+            password='testpass123',
+            store=self.store
+        )
+        self.report = DailyReport.objects.create(
+            store=self.store,
+            user=self.user,
+            date='2024-01-01',
+            genre='report',
+            location='hall',
+            title='テスト',
+            content='内容'
+        )
+
+    def test_enqueue_skips_duplicate_pending_task(self):
+        """同じソースの待機中タスクは重複登録されないことを確認"""
+        VectorizationOutboxService.enqueue('daily_report', self.report.report_id)
+        VectorizationOutboxService.enqueue('daily_report', self.report.report_id)
+
+        self.assertEqual(VectorizationTask.objects.count(), 1)
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    def test_drain_vectorizes_and_deletes_task(self, mock_generate_embedding):
+        """処理に成功したタスクが削除され、ベクトルが作成されることを確認"""
+        mock_generate_embedding.return_value = np.random.rand(384).tolist()
+        VectorizationOutboxService.enqueue('daily_report', self.report.report_id)
+
+        self.assertEqual(VectorizationOutboxService.drain(), (1, 0))
+        self.assertFalse(VectorizationTask.objects.exists())
+        self.assertTrue(DocumentVector.objects.filter(
+            source_type='daily_report', source_id=self.report.report_id
+        ).exists())
+
+    @override_settings(VECTORIZATION_OUTBOX_MAX_ATTEMPTS=2, VECTORIZATION_OUTBOX_RETRY_DELAY=10)
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    def test_drain_retries_with_backoff(self, mock_generate_embedding):
+        """失敗したタスクがバックオフ後にリトライされ、上限で failed になることを確認"""
+        mock_generate_embedding.return_value = None
+        VectorizationOutboxService.enqueue('daily_report', self.report.report_id)
+
+        self.assertEqual(VectorizationOutboxService.drain(), (0, 1))
+        task = VectorizationTask.objects.get()
+        self.assertEqual(task.status, VectorizationTask.STATUS_PENDING)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.available_at, timezone.now() + timedelta(seconds=5))
+
+        # バックオフ中は取得されない
+        self.assertEqual(VectorizationOutboxService.drain(), (0, 0))
+
+        VectorizationTask.objects.update(available_at=timezone.now())
+        self.assertEqual(VectorizationOutboxService.drain(), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual(task.status, VectorizationTask.STATUS_FAILED)
+        self.assertEqual(task.attempts, 2)
+        self.assertEqual(VectorizationOutboxService.drain(), (0, 0))
+
+    def test_drain_drops_task_for_deleted_source(self):
+        """ソースが削除済みのタスクは処理不要として削除されることを確認"""
+        VectorizationOutboxService.enqueue('daily_report', self.report.report_id + 1000)
+
+        self.assertEqual(VectorizationOutboxService.drain(), (1, 0))
+        self.assertFalse(VectorizationTask.objects.exists())
+
+    @override_settings(VECTORIZATION_OUTBOX_LOCK_TIMEOUT=60)
+    def test_claim_reclaims_stale_processing_task(self):
+        """停止したワーカーが取得したままのタスクだけが再取得されることを確認"""
+        VectorizationTask.objects.create(
+            source_type='daily_report',
+            source_id=self.report.report_id,
+            status=VectorizationTask.STATUS_PROCESSING,
+            locked_at=timezone.now() - timedelta(seconds=30),
+        )
+        stale = VectorizationTask.objects.create(
+            source_type='daily_report',
+            source_id=self.report.report_id,
+            status=VectorizationTask.STATUS_PROCESSING,
+            locked_at=timezone.now() - timedelta(seconds=120),
+        )
+
+        claimed = VectorizationOutboxService.claim(10)
+
+        self.assertEqual([task.task_id for task in claimed], [stale.task_id])
+        self.assertEqual(VectorizationOutboxService.claim(10), [])
+
+    @patch('ai_features.services.core_services.EmbeddingService.generate_embedding')
+    def test_worker_command_once(self, mock_generate_embedding):
+        """ワーカーコマンドが --once で待機中のタスクを処理して終了することを確認"""
+        mock_generate_embedding.return_value = np.random.rand(384).tolist()
+        VectorizationOutboxService.enqueue('daily_report', self.report.report_id)
+
+        out = StringIO()
+        call_command('vectorization_worker', once=True, workers=1, stdout=out)
+
+        self.assertFalse(VectorizationTask.objects.exists())
+        self.assertIn('成功 1件', out.getvalue())
+
+    @patch('config.management.commands.vectorization_worker.close_old_connections')
+    @patch('config.management.commands.vectorization_worker.time.sleep')
+    @patch('ai_features.services.core_services.VectorizationOutboxService.drain')
+    def test_worker_command_survives_errors(self, mock_drain, mock_sleep, mock_close):
+        """処理中の例外（DB接続の切断など）でワーカーが停止せず、待機してから再開することを確認"""
+        from django.db import OperationalError
+
+        mock_drain.side_effect = [OperationalError('connection lost'), (1, 0), KeyboardInterrupt()]
+
+        out, err = StringIO(), StringIO()
+        call_command('vectorization_worker', workers=1, stdout=out, stderr=err)
+
+        self.assertEqual(mock_drain.call_count, 3)
+        self.assertEqual(mock_close.call_count, 3)
+        mock_sleep.assert_called_once_with(2.0)
+        self.assertIn('connection lost', err.getvalue())
+        self.assertIn('成功 1件', out.getvalue())
+
+
+@override_settings(
+    AI_CHAT_HISTORY_RECENT_EXCHANGES=2,
+    AI_CHAT_HISTORY_MAX_TOKENS=2000,
+    AI_CHAT_SUMMARY_MAX_TOKENS=600
+)
+class ChatHistoryServiceTest(TestCase):
+    """ChatHistoryService（要約＋直近のやり取り）のテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_name='テスト店舗', address='テスト住所')
+        self.user = User.objects.create_user(user_id='historyuser', password='testpass123', store=self.store)
+
+    def _save_turns(self, count, summarizer=None, start=1):
+        for i in range(start, start + count):
+            ChatHistoryService.save_turn(self.user, f'質問{i}', f'回答{i}')
+            ChatHistoryService.update_summary(self.user, summarizer)
+
+    def test_load_recent_exchanges_without_summary(self):
+        """要約がない場合は直近のやり取りだけを古い順に返すことを確認"""
+        self._save_turns(2)
+
+        history = ChatHistoryService.load_for_prompt(self.user)
+
+        self.assertEqual(
+            [(msg['role'], msg['content']) for msg in history],
+            [('user', '質問1'), ('assistant', '回答1'), ('user', '質問2'), ('assistant', '回答2')]
+        )
+        self.assertFalse(AIChatSummary.objects.filter(user=self.user).exclude(summary='').exists())
+
+    def test_older_turns_folded_into_summary(self):
+        """直近の範囲から外れたやり取りが要約に反映され、要約が先頭に入ることを確認"""
+        calls = []
+
+        def summarizer(summary, messages):
+            calls.append((summary, [msg['content'] for msg in messages]))
+            return f"要約{len(calls)}"
+
+        self._save_turns(4, summarizer=summarizer)
+
+        self.assertEqual(calls, [('', ['質問1', '回答1']), ('要約1', ['質問2', '回答2'])])
+        history = ChatHistoryService.load_for_prompt(self.user)
+        self.assertEqual(history[0], {'role': 'summary', 'content': '要約2'})
+        self.assertEqual([msg['content'] for msg in history[1:]], ['質問3', '回答3', '質問4', '回答4'])
+
+        state = AIChatSummary.objects.get(user=self.user)
+        last_summarized = AIChatHistory.objects.get(user=self.user, message='回答2')
+        self.assertEqual(state.summarized_until, last_summarized.chat_id)
+
+    @override_settings(AI_CHAT_HISTORY_MAX_TOKENS=100)
+    def test_recent_exchanges_bounded_by_token_ceiling(self):
+        """長い回答は切り詰め、直近のやり取りが上限トークン数に収まることを確認"""
+        ChatHistoryService.save_turn(self.user, '質問1', '表' * 500)
+        ChatHistoryService.save_turn(self.user, '質問2', '表' * 500)
+
+        history = ChatHistoryService.load_for_prompt(self.user)
+
+        # 回答は上限の半分に切り詰め、上限を超える古いやり取りは含めない
+        self.assertEqual([msg['content'] for msg in history][0], '質問2')
+        self.assertEqual(len(history), 2)
+        self.assertLessEqual(len(history[-1]['content']), 51)
+        total = sum(len(msg['content']) for msg in history)
+        self.assertLessEqual(total, 100)
+
+    @override_settings(AI_CHAT_SUMMARY_MAX_TOKENS=50)
+    def test_prompt_stays_bounded_for_long_conversation(self):
+        """会話が長くなっても要約と直近のやり取りが上限内に収まることを確認"""
+        self._save_turns(10, summarizer=lambda summary, messages: summary + '長い要約' * 20)
+
+        history = ChatHistoryService.load_for_prompt(self.user)
+
+        self.assertEqual(history[0]['role'], 'summary')
+        self.assertLessEqual(len(history[0]['content']), 51)
+        self.assertEqual(len(history), 5)
+
+    def test_summarizer_failure_uses_fallback(self):
+        """要約に失敗した場合は簡易要約を保存することを確認"""
+        def summarizer(summary, messages):
+            raise RuntimeError('LLM error')
+
+        self._save_turns(3, summarizer=summarizer)
+
+        summary = AIChatSummary.objects.get(user=self.user).summary
+        self.assertEqual(summary, '- ユーザー: 質問1\n- AI: 回答1')
+
+    def test_trim_keeps_max_chat_history(self):
+        """保持件数を超えた古い履歴が削除されることを確認"""
+        with patch.dict('os.environ', {'MAX_CHAT_HISTORY': '4'}):
+            self._save_turns(3)
+            # 要約を更新するまでは削除しない
+            ChatHistoryService.save_turn(self.user, '質問4', '回答4')
+            self.assertEqual(AIChatHistory.objects.filter(user=self.user).count(), 6)
+            ChatHistoryService.update_summary(self.user)
+
+        messages = list(AIChatHistory.objects.filter(user=self.user).order_by('created_at', 'chat_id')
+                        .values_list('message', flat=True))
+        self.assertEqual(messages, ['質問3', '回答3', '質問4', '回答4'])
+
+    def test_clear_removes_history_and_summary(self):
+        """履歴と要約が削除されることを確認"""
+        self._save_turns(3)
+
+        self.assertEqual(ChatHistoryService.clear(self.user), 6)
+        self.assertFalse(AIChatHistory.objects.filter(user=self.user).exists())
+        self.assertFalse(AIChatSummary.objects.filter(user=self.user).exists())
+
+    def test_schedule_summary_update_after_commit(self):
+        """要約の更新はコミット後に別スレッドで実行されることを確認"""
+        self._save_turns(2)
+        ChatHistoryService.save_turn(self.user, '質問3', '回答3')
+        summarizer = MagicMock(return_value='要約')
+
+        with patch('ai_features.services.chat_history.threading.Thread') as mock_thread, \
+                patch('django.db.close_old_connections') as mock_close:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                ChatHistoryService.schedule_summary_update(self.user, summarizer)
+            summarizer.assert_not_called()
+            mock_thread.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+            mock_thread.return_value.start.assert_called_once()
+            mock_thread.call_args[1]['target']()
+
+        summarizer.assert_called_once()
+        mock_close.assert_called_once()
+        self.assertEqual(AIChatSummary.objects.get(user=self.user).summary, '要約')
+
+    async def test_aupdate_summary(self):
+        """非同期の summarizer を await して要約を更新することを確認"""
+        from asgiref.sync import sync_to_async
+
+        for i in range(1, 4):
+            await sync_to_async(ChatHistoryService.save_turn)(self.user, f'質問{i}', f'回答{i}')
+
+        async def asummarizer(summary, messages):
+            return f"要約: {messages[0]['content']}"
+
+        self.assertTrue(await ChatHistoryService.aupdate_summary(self.user, asummarizer))
+        summary = await sync_to_async(AIChatSummary.objects.get)(user=self.user)
+        self.assertEqual(summary.summary, '要約: 質問1')
@@ -76,14 +76,18 @@ class ChatViewTest(TestCase):
         mock_chat_agent_class.return_value = mock_agent
 
         # リクエスト送信
-        response = self.client.post(
-            self.url,
-            data=json.dumps({'message': 'こんにちは'}),
-            content_type='application/json'
-        )
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(
+                self.url,
+                data=json.dumps({'message': 'こんにちは'}),
+                content_type='application/json'
+            )
 
         # 検証
         self.assertEqual(response.status_code, 200)
+        # 要約の更新は応答の後（コミット後に別スレッド）で行う
+        mock_agent.summarize_history.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
         data = json.loads(response.content)
         self.assertEqual(data['message'], 'AIの回答です')
 
@@ -9,53 +9,86 @@ from datetime import datetime, timedelta
 
 from langchain_core.tools import tool
 
+from ai_features.tools.formatting import format_tool_result
+
 logger = logging.getLogger(__name__)
 
+
+def _sum_rollup_counts(rollups, count_fields):
+    """店舗日次集計の件数カラムを合計し、件数の多い順に返す（0件は除外）
+
+    Args:
+        rollups: StoreDailyRollupのクエリセット
+        count_fields: {コード: カラム名} の辞書（GENRE_COUNT_FIELDS / LOCATION_COUNT_FIELDS）
+
+    Returns:
+        list: [(コード, 件数), ...]
+    """
+    from django.db.models import Sum
+
+    totals = rollups.aggregate(**{
+        f'{code}_total': Sum(field_name) for code, field_name in count_fields.items()
+    })
+    counts = [(code, totals[f'{code}_total'] or 0) for code in count_fields]
+    return sorted([item for item in counts if item[1] > 0], key=lambda item: -item[1])
+
+
+def _count_locations_for_genre(rollups, genre):
+    """店舗日次集計のジャンル×場所件数から、指定ジャンルの場所別件数を合計
+
+    Args:
+        rollups: StoreDailyRollupのクエリセット
+        genre: ジャンルコード
+
+    Returns:
+        list: [(場所コード, 件数), ...]（件数の多い順）
+    """
+    from analytics.models import StoreDailyRollup
+
+    genre_field = StoreDailyRollup.GENRE_COUNT_FIELDS[genre]
+    location_counts = {}
+    for matrix in rollups.filter(**{f'{genre_field}__gt': 0}).values_list('incident_matrix', flat=True):
+        for location, count in matrix.get(genre, {}).items():
+            location_counts[location] = location_counts.get(location, 0) + count
+    return sorted(location_counts.items(), key=lambda item: -item[1])
+
+
 @tool
 def get_claim_statistics(store_id: int, days: int = 30) -> str:
     """
     クレーム統計を取得します。指定期間のクレーム件数、内容の傾向を分析します。
     """
     try:
-        from reports.models import DailyReport
-        from django.db.models import Count, Q
-        from datetime import datetime, timedelta
-        import json
+        from analytics.models import StoreDailyRollup
+        from django.db.models import Sum
 
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
-        # 期間内全データ
-        queryset = DailyReport.objects.filter(
+        # 期間内の店舗日次集計
+        rollups = StoreDailyRollup.objects.filter(
             store_id=store_id,
             date__gte=start_date,
             date__lte=end_date
         )
 
-        total_reports = queryset.count()
-
         # 🎯 クレームは genre='claim'
-        #    内容（content）が空でないものに限定
-        claim_reports = queryset.filter(
-            genre='claim',
-            content__isnull=False
-        ).exclude(content='')
-
-        claim_count = claim_reports.count()
+        totals = rollups.aggregate(
+            report_total=Sum('report_count'),
+            claim_total=Sum('claim_count')
+        )
+        total_reports = totals['report_total'] or 0
+        claim_count = totals['claim_total'] or 0
         claim_rate = f"{(claim_count / total_reports * 100):.1f}%" if total_reports else "0%"
 
-        # 日別トレンド（最近7日）- DBで集計
+        # 日別トレンド（最近7日）
         recent_days = min(7, days)
         recent_start = end_date - timedelta(days=recent_days - 1)
 
-        daily_trend_qs = claim_reports.filter(
-            date__gte=recent_start
-        ).values('date').annotate(
-            count=Count('report_id')
-        ).order_by('-date')
-
         # 日付をキーにした辞書を作成
-        trend_dict = {item['date']: item['count'] for item in daily_trend_qs}
+        trend_dict = dict(
+            rollups.filter(date__gte=recent_start).values_list('date', 'claim_count')
+        )
 
         # 全日付を網羅（データがない日は0件）
         daily_trend = []
@@ -67,13 +100,9 @@ def get_claim_statistics(store_id: int, days: int = 30) -> str:
             })
 
         # カテゴリ別（location）
-        claim_by_genre = claim_reports.values('location').annotate(
-            count=Count('report_id')
-        ).order_by('-count')[:5]
-
         top_categories = [
-            {"category": item['location'], "count": item['count']}
-            for item in claim_by_genre
+            {"category": location, "count": count}
+            for location, count in _count_locations_for_genre(rollups, 'claim')[:5]
         ]
 
         result = {
@@ -89,7 +118,7 @@ def get_claim_statistics(store_id: int, days: int = 30) -> str:
             "top_categories": top_categories
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_claim_statistics: {e}", exc_info=True)
@@ -122,14 +151,15 @@ def get_sales_trend(store_id: int, days: int = 30) -> str:
         JSON string containing sales trend data with summary, daily breakdown, and weekly comparison
     """
     try:
-        from reports.models import StoreDailyPerformance
+        from analytics.models import StoreDailyRollup
         from django.db.models import Sum, Avg, Max, Min, Count
 
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
         # 期間内のパフォーマンスデータを取得
-        queryset = StoreDailyPerformance.objects.filter(
+        queryset = StoreDailyRollup.objects.filter(
+            has_performance=True,
             store_id=store_id,
             date__gte=start_date,
             date__lte=end_date
@@ -150,7 +180,7 @@ def get_sales_trend(store_id: int, days: int = 30) -> str:
             min_sales=Min('sales_amount'),
             total_customers=Sum('customer_count'),
             avg_customers=Avg('customer_count'),
-            data_count=Count('performance_id')
+            data_count=Count('rollup_id')
         )
 
         # 日別トレンド（最新7日分）- DBで一括取得
@@ -219,7 +249,7 @@ def get_sales_trend(store_id: int, days: int = 30) -> str:
             "week_comparison": week_comparison
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_sales_trend: {e}", exc_info=True)
@@ -249,7 +279,7 @@ def get_sales_by_date(store_id: int, date: str) -> str:
         JSON string containing sales and customer data for the specified date
     """
     try:
-        from reports.models import StoreDailyPerformance
+        from analytics.models import StoreDailyRollup
         from datetime import datetime
 
         # 日付をパース
@@ -262,7 +292,8 @@ def get_sales_by_date(store_id: int, date: str) -> str:
             }, ensure_ascii=False)
 
         # 指定日のデータを取得
-        performance = StoreDailyPerformance.objects.filter(
+        performance = StoreDailyRollup.objects.filter(
+            has_performance=True,
             store_id=store_id,
             date=target_date
         ).first()
@@ -291,7 +322,7 @@ def get_sales_by_date(store_id: int, date: str) -> str:
             }
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_sales_by_date: {e}", exc_info=True)
@@ -322,7 +353,7 @@ def get_sales_by_date_range(store_id: int, start_date: str, end_date: str) -> st
         JSON string containing aggregated summary and daily breakdown for the period
     """
     try:
-        from reports.models import StoreDailyPerformance
+        from analytics.models import StoreDailyRollup
         from django.db.models import Sum, Avg, Count
         from datetime import datetime
 
@@ -343,7 +374,8 @@ def get_sales_by_date_range(store_id: int, start_date: str, end_date: str) -> st
             }, ensure_ascii=False)
 
         # 期間内のデータを取得
-        queryset = StoreDailyPerformance.objects.filter(
+        queryset = StoreDailyRollup.objects.filter(
+            has_performance=True,
             store_id=store_id,
             date__gte=start,
             date__lte=end
@@ -364,7 +396,7 @@ def get_sales_by_date_range(store_id: int, start_date: str, end_date: str) -> st
             avg_sales=Avg('sales_amount'),
             total_customers=Sum('customer_count'),
             avg_customers=Avg('customer_count'),
-            data_count=Count('performance_id')
+            data_count=Count('rollup_id')
         )
 
         # 客単価計算
@@ -404,7 +436,7 @@ def get_sales_by_date_range(store_id: int, start_date: str, end_date: str) -> st
             "daily_breakdown": daily_data
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_sales_by_date_range: {e}", exc_info=True)
@@ -435,14 +467,15 @@ def get_cash_difference_analysis(store_id: int, days: int = 30) -> str:
         JSON string containing cash difference analysis with totals, frequency, and daily breakdown
     """
     try:
-        from reports.models import StoreDailyPerformance
+        from analytics.models import StoreDailyRollup
         from django.db.models import Sum, Avg, Max, Min, Count, Q
 
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
         # 期間内のパフォーマンスデータを取得
-        queryset = StoreDailyPerformance.objects.filter(
+        queryset = StoreDailyRollup.objects.filter(
+            has_performance=True,
             store_id=store_id,
             date__gte=start_date,
             date__lte=end_date
@@ -461,7 +494,7 @@ def get_cash_difference_analysis(store_id: int, days: int = 30) -> str:
             avg_difference=Avg('cash_difference'),
             max_difference=Max('cash_difference'),
             min_difference=Min('cash_difference'),
-            data_count=Count('performance_id')
+            data_count=Count('rollup_id')
         )
 
         # プラス/マイナスの内訳
@@ -470,13 +503,13 @@ def get_cash_difference_analysis(store_id: int, days: int = 30) -> str:
         zero_records = queryset.filter(cash_difference=0)
 
         plus_stats = plus_records.aggregate(
-            count=Count('performance_id'),
+            count=Count('rollup_id'),
             total=Sum('cash_difference'),
             avg=Avg('cash_difference')
         )
 
         minus_stats = minus_records.aggregate(
-            count=Count('performance_id'),
+            count=Count('rollup_id'),
             total=Sum('cash_difference'),
             avg=Avg('cash_difference')
         )
@@ -531,7 +564,7 @@ def get_cash_difference_analysis(store_id: int, days: int = 30) -> str:
             "recent_differences": daily_data
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_cash_difference_analysis: {e}", exc_info=True)
@@ -563,19 +596,20 @@ def get_report_statistics(store_id: int, days: int = 30) -> str:
     """
     try:
         from reports.models import DailyReport
-        from django.db.models import Count
+        from analytics.models import StoreDailyRollup
+        from django.db.models import Sum
 
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
-        # 期間内の日報を取得
-        queryset = DailyReport.objects.filter(
+        # 期間内の店舗日次集計を取得
+        rollups = StoreDailyRollup.objects.filter(
             store_id=store_id,
             date__gte=start_date,
             date__lte=end_date
         )
 
-        total_reports = queryset.count()
+        total_reports = rollups.aggregate(total=Sum('report_count'))['total'] or 0
 
         if total_reports == 0:
             return json.dumps({
@@ -584,49 +618,37 @@ def get_report_statistics(store_id: int, days: int = 30) -> str:
             }, ensure_ascii=False)
 
         # ジャンル別集計
-        genre_breakdown = queryset.values('genre').annotate(
-            count=Count('report_id')
-        ).order_by('-count')
-
         genre_data = []
-        for item in genre_breakdown:
-            genre_display = dict(DailyReport.GENRE_CHOICES).get(item['genre'], item['genre'])
-            percentage = (item['count'] / total_reports * 100) if total_reports > 0 else 0
+        for genre, count in _sum_rollup_counts(rollups, StoreDailyRollup.GENRE_COUNT_FIELDS):
+            genre_display = dict(DailyReport.GENRE_CHOICES).get(genre, genre)
+            percentage = (count / total_reports * 100) if total_reports > 0 else 0
             genre_data.append({
-                "genre": item['genre'],
+                "genre": genre,
                 "genre_display": genre_display,
-                "count": item['count'],
+                "count": count,
                 "percentage": f"{percentage:.1f}%"
             })
 
         # 場所別集計
-        location_breakdown = queryset.values('location').annotate(
-            count=Count('report_id')
-        ).order_by('-count')
-
         location_data = []
-        for item in location_breakdown:
-            location_display = dict(DailyReport.LOCATION_CHOICES).get(item['location'], item['location'])
-            percentage = (item['count'] / total_reports * 100) if total_reports > 0 else 0
+        for location, count in _sum_rollup_counts(rollups, StoreDailyRollup.LOCATION_COUNT_FIELDS):
+            location_display = dict(DailyReport.LOCATION_CHOICES).get(location, location)
+            percentage = (count / total_reports * 100) if total_reports > 0 else 0
             location_data.append({
-                "location": item['location'],
+                "location": location,
                 "location_display": location_display,
-                "count": item['count'],
+                "count": count,
                 "percentage": f"{percentage:.1f}%"
             })
 
-        # 日別投稿頻度（最近7日間）- DBで集計
+        # 日別投稿頻度（最近7日間）
         recent_days = min(7, days)
         recent_start = end_date - timedelta(days=recent_days - 1)
 
-        daily_submission_qs = queryset.filter(
-            date__gte=recent_start
-        ).values('date').annotate(
-            count=Count('report_id')
-        ).order_by('-date')
-
         # 日付をキーにした辞書を作成
-        submission_dict = {item['date']: item['count'] for item in daily_submission_qs}
+        submission_dict = dict(
+            rollups.filter(date__gte=recent_start).values_list('date', 'report_count')
+        )
 
         # 全日付を網羅（データがない日は0件）
         daily_submission = []
@@ -650,7 +672,7 @@ def get_report_statistics(store_id: int, days: int = 30) -> str:
             "daily_submission": daily_submission
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_report_statistics: {e}", exc_info=True)
@@ -729,7 +751,7 @@ def get_monthly_goal_status(store_id: int) -> str:
             "past_goals": past_goal_data[:5]  # 最大5件の履歴
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_monthly_goal_status: {e}", exc_info=True)
@@ -764,7 +786,8 @@ def gather_topic_related_data(topic: str, store_id: int, days: int = 30) -> str:
     try:
         from reports.models import DailyReport
         from bbs.models import BBSPost, BBSComment
-        from django.db.models import Q, Count
+        from django.db.models import Count
+        from common.services import KeywordSearchService
         from datetime import datetime, timedelta
 
         end_date = datetime.now().date()
@@ -779,12 +802,13 @@ def gather_topic_related_data(topic: str, store_id: int, days: int = 30) -> str:
         }
 
         # 1. 日報からの情報収集
-        daily_reports = DailyReport.objects.filter(
-            store_id=store_id,
-            date__gte=start_date,
-            date__lte=end_date
-        ).filter(
-            Q(title__icontains=topic) | Q(content__icontains=topic)
+        daily_reports = KeywordSearchService.filter(
+            DailyReport.objects.filter(
+                store_id=store_id,
+                date__gte=start_date,
+                date__lte=end_date
+            ),
+            [topic]
         ).order_by('-date')[:20]
 
         reports_data = []
@@ -794,6 +818,7 @@ def gather_topic_related_data(topic: str, store_id: int, days: int = 30) -> str:
                 "genre": dict(DailyReport.GENRE_CHOICES).get(report.genre, report.genre),
                 "location": dict(DailyReport.LOCATION_CHOICES).get(report.location, report.location),
                 "title": report.title,
+                "source_id": report.report_id,
                 "content": report.content[:300],
                 "author": report.user.user_id if report.user else "不明"
             })
@@ -806,12 +831,13 @@ def gather_topic_related_data(topic: str, store_id: int, days: int = 30) -> str:
         # 2. 掲示板からの情報収集 - prefetch_relatedでN+1クエリ解消
         from django.db.models import Prefetch
 
-        bbs_posts = BBSPost.objects.filter(
-            store_id=store_id,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).filter(
-            Q(title__icontains=topic) | Q(content__icontains=topic)
+        bbs_posts = KeywordSearchService.filter(
+            BBSPost.objects.filter(
+                store_id=store_id,
+                created_at__date__gte=start_date,
+                created_at__date__lte=end_date
+            ),
+            [topic]
         ).prefetch_related(
             Prefetch(
                 'comments',
@@ -835,6 +861,7 @@ def gather_topic_related_data(topic: str, store_id: int, days: int = 30) -> str:
 
             bbs_data.append({
                 "title": post.title,
+                "source_id": post.post_id,
                 "content": post.content[:300],
                 "author": post.user.user_id if post.user else "不明",
                 "created_at": post.created_at.strftime("%Y-%m-%d"),
@@ -847,35 +874,38 @@ def gather_topic_related_data(topic: str, store_id: int, days: int = 30) -> str:
             "items": bbs_data
         }
 
-        # 3. トピックに関連する統計（キーワードベース）
+        # 3. トピックに関連する統計（キーワードベース、店舗日次集計から取得）
+        from analytics.models import StoreDailyRollup
+
         topic_lower = topic.lower()
         statistics = {}
+        rollups = StoreDailyRollup.objects.filter(
+            store_id=store_id,
+            date__gte=start_date,
+            date__lte=end_date
+        )
 
         if any(keyword in topic_lower for keyword in ["クレーム", "苦情", "claim"]):
             # クレーム統計を追加
-            claim_reports = DailyReport.objects.filter(
-                store_id=store_id,
-                genre='claim',
-                date__gte=start_date,
-                date__lte=end_date
-            )
-            statistics["claim_count"] = claim_reports.count()
-            statistics["claim_by_location"] = list(claim_reports.values('location').annotate(count=Count('report_id')).order_by('-count')[:3])
+            from django.db.models import Sum
+
+            statistics["claim_count"] = rollups.aggregate(total=Sum('claim_count'))['total'] or 0
+            statistics["claim_by_location"] = [
+                {"location": location, "count": count}
+                for location, count in _count_locations_for_genre(rollups, 'claim')[:3]
+            ]
 
         if any(keyword in topic_lower for keyword in ["売上", "売り上げ", "sales", "revenue"]):
             # 売上統計を追加
             try:
-                from reports.models import StoreDailyPerformance
                 from django.db.models import Sum, Avg
 
-                sales_data = StoreDailyPerformance.objects.filter(
-                    store_id=store_id,
-                    date__gte=start_date,
-                    date__lte=end_date
+                sales_data = rollups.filter(
+                    has_performance=True
                 ).aggregate(
                     total=Sum('sales_amount'),
                     avg=Avg('sales_amount'),
-                    count=Count('performance_id')
+                    count=Count('rollup_id')
                 )
                 statistics["sales"] = {
                     "total": sales_data['total'] or 0,
@@ -887,17 +917,13 @@ def gather_topic_related_data(topic: str, store_id: int, days: int = 30) -> str:
 
         if any(keyword in topic_lower for keyword in ["事故", "accident", "トラブル"]):
             # 事故統計を追加
-            accident_reports = DailyReport.objects.filter(
-                store_id=store_id,
-                genre='accident',
-                date__gte=start_date,
-                date__lte=end_date
-            )
-            statistics["accident_count"] = accident_reports.count()
+            from django.db.models import Sum
+
+            statistics["accident_count"] = rollups.aggregate(total=Sum('accident_count'))['total'] or 0
 
         result["data_sources"]["related_statistics"] = statistics
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in gather_topic_related_data: {e}", exc_info=True)
@@ -931,7 +957,7 @@ def compare_periods(store_id: int, metric: str, period1_days: int = 7, period2_d
         JSON with side-by-side comparison and calculated change rates
     """
     try:
-        from reports.models import DailyReport, StoreDailyPerformance
+        from analytics.models import StoreDailyRollup
         from django.db.models import Sum, Avg, Count
 
         end_date = datetime.now().date()
@@ -962,24 +988,26 @@ def compare_periods(store_id: int, metric: str, period1_days: int = 7, period2_d
 
         if metric == "sales":
             # 売上比較
-            p1_data = StoreDailyPerformance.objects.filter(
+            p1_data = StoreDailyRollup.objects.filter(
+                has_performance=True,
                 store_id=store_id,
                 date__gte=period1_start,
                 date__lte=period1_end
             ).aggregate(
                 total=Sum('sales_amount'),
                 avg=Avg('sales_amount'),
-                count=Count('performance_id')
+                count=Count('rollup_id')
             )
 
-            p2_data = StoreDailyPerformance.objects.filter(
+            p2_data = StoreDailyRollup.objects.filter(
+                has_performance=True,
                 store_id=store_id,
                 date__gte=period2_start,
                 date__lte=period2_end
             ).aggregate(
                 total=Sum('sales_amount'),
                 avg=Avg('sales_amount'),
-                count=Count('performance_id')
+                count=Count('rollup_id')
             )
 
             p1_total = p1_data['total'] or 0
@@ -1007,19 +1035,17 @@ def compare_periods(store_id: int, metric: str, period1_days: int = 7, period2_d
 
         elif metric == "claims":
             # クレーム比較
-            p1_count = DailyReport.objects.filter(
+            p1_count = StoreDailyRollup.objects.filter(
                 store_id=store_id,
-                genre='claim',
                 date__gte=period1_start,
                 date__lte=period1_end
-            ).count()
+            ).aggregate(total=Sum('claim_count'))['total'] or 0
 
-            p2_count = DailyReport.objects.filter(
+            p2_count = StoreDailyRollup.objects.filter(
                 store_id=store_id,
-                genre='claim',
                 date__gte=period2_start,
                 date__lte=period2_end
-            ).count()
+            ).aggregate(total=Sum('claim_count'))['total'] or 0
 
             change = p1_count - p2_count
             change_rate = (change / p2_count * 100) if p2_count > 0 else 0
@@ -1036,19 +1062,17 @@ def compare_periods(store_id: int, metric: str, period1_days: int = 7, period2_d
 
         elif metric == "accidents":
             # 事故比較
-            p1_count = DailyReport.objects.filter(
+            p1_count = StoreDailyRollup.objects.filter(
                 store_id=store_id,
-                genre='accident',
                 date__gte=period1_start,
                 date__lte=period1_end
-            ).count()
+            ).aggregate(total=Sum('accident_count'))['total'] or 0
 
-            p2_count = DailyReport.objects.filter(
+            p2_count = StoreDailyRollup.objects.filter(
                 store_id=store_id,
-                genre='accident',
                 date__gte=period2_start,
                 date__lte=period2_end
-            ).count()
+            ).aggregate(total=Sum('accident_count'))['total'] or 0
 
             change = p1_count - p2_count
             change_rate = (change / p2_count * 100) if p2_count > 0 else 0
@@ -1065,17 +1089,17 @@ def compare_periods(store_id: int, metric: str, period1_days: int = 7, period2_d
 
         elif metric == "reports":
             # 日報全体の比較
-            p1_count = DailyReport.objects.filter(
+            p1_count = StoreDailyRollup.objects.filter(
                 store_id=store_id,
                 date__gte=period1_start,
                 date__lte=period1_end
-            ).count()
+            ).aggregate(total=Sum('report_count'))['total'] or 0
 
-            p2_count = DailyReport.objects.filter(
+            p2_count = StoreDailyRollup.objects.filter(
                 store_id=store_id,
                 date__gte=period2_start,
                 date__lte=period2_end
-            ).count()
+            ).aggregate(total=Sum('report_count'))['total'] or 0
 
             change = p1_count - p2_count
             change_rate = (change / p2_count * 100) if p2_count > 0 else 0
@@ -1092,24 +1116,26 @@ def compare_periods(store_id: int, metric: str, period1_days: int = 7, period2_d
 
         elif metric == "cash_difference":
             # 現金過不足比較
-            p1_data = StoreDailyPerformance.objects.filter(
+            p1_data = StoreDailyRollup.objects.filter(
+                has_performance=True,
                 store_id=store_id,
                 date__gte=period1_start,
                 date__lte=period1_end
             ).aggregate(
                 total=Sum('cash_difference'),
                 avg=Avg('cash_difference'),
-                count=Count('performance_id')
+                count=Count('rollup_id')
             )
 
-            p2_data = StoreDailyPerformance.objects.filter(
+            p2_data = StoreDailyRollup.objects.filter(
+                has_performance=True,
                 store_id=store_id,
                 date__gte=period2_start,
                 date__lte=period2_end
             ).aggregate(
                 total=Sum('cash_difference'),
                 avg=Avg('cash_difference'),
-                count=Count('performance_id')
+                count=Count('rollup_id')
             )
 
             p1_total = p1_data['total'] or 0
@@ -1137,7 +1163,7 @@ def compare_periods(store_id: int, metric: str, period1_days: int = 7, period2_d
                 "message": f"未対応のmetric: {metric}. 有効な値: sales, claims, accidents, reports, cash_difference"
             }, ensure_ascii=False)
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in compare_periods: {e}", exc_info=True)
@@ -1168,36 +1194,33 @@ def get_claim_statistics_all_stores(days: int = 30) -> str:
         全店舗のクレーム統計のJSON文字列
     """
     try:
-        from reports.models import DailyReport
-        from stores.models import Store
-        from django.db.models import Count, Q
+        from analytics.models import StoreDailyRollup
+        from django.db.models import Sum
 
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
-        # 全店舗のデータ
-        all_reports = DailyReport.objects.filter(
+        # 全店舗の店舗日次集計
+        rollups = StoreDailyRollup.objects.filter(
             date__gte=start_date,
             date__lte=end_date
         )
 
-        total_reports = all_reports.count()
-
         # クレーム
-        claim_reports = all_reports.filter(
-            genre='claim',
-            content__isnull=False
-        ).exclude(content='')
-
-        claim_count = claim_reports.count()
+        totals = rollups.aggregate(
+            report_total=Sum('report_count'),
+            claim_total=Sum('claim_count')
+        )
+        total_reports = totals['report_total'] or 0
+        claim_count = totals['claim_total'] or 0
         claim_rate = f"{(claim_count / total_reports * 100):.1f}%" if total_reports else "0%"
 
         # 店舗別クレーム数
-        claims_by_store = claim_reports.values(
+        claims_by_store = rollups.values(
             'store__store_name'
         ).annotate(
-            count=Count('report_id')
-        ).order_by('-count')[:10]
+            count=Sum('claim_count')
+        ).filter(count__gt=0).order_by('-count')[:10]
 
         store_breakdown = [
             {"store_name": item['store__store_name'], "count": item['count']}
@@ -1205,13 +1228,9 @@ def get_claim_statistics_all_stores(days: int = 30) -> str:
         ]
 
         # カテゴリ別（location）
-        claim_by_location = claim_reports.values('location').annotate(
-            count=Count('report_id')
-        ).order_by('-count')[:5]
-
         top_categories = [
-            {"category": item['location'], "count": item['count']}
-            for item in claim_by_location
+            {"category": location, "count": count}
+            for location, count in _count_locations_for_genre(rollups, 'claim')[:5]
         ]
 
         result = {
@@ -1227,7 +1246,7 @@ def get_claim_statistics_all_stores(days: int = 30) -> str:
             "top_categories": top_categories
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_claim_statistics_all_stores: {e}", exc_info=True)
@@ -1254,18 +1273,19 @@ def get_report_statistics_all_stores(days: int = 30) -> str:
     """
     try:
         from reports.models import DailyReport
-        from django.db.models import Count
+        from analytics.models import StoreDailyRollup
+        from django.db.models import Sum
 
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
-        # 全店舗の日報
-        queryset = DailyReport.objects.filter(
+        # 全店舗の店舗日次集計
+        rollups = StoreDailyRollup.objects.filter(
             date__gte=start_date,
             date__lte=end_date
         )
 
-        total_reports = queryset.count()
+        total_reports = rollups.aggregate(total=Sum('report_count'))['total'] or 0
 
         if total_reports == 0:
             return json.dumps({
@@ -1274,25 +1294,21 @@ def get_report_statistics_all_stores(days: int = 30) -> str:
             }, ensure_ascii=False)
 
         # ジャンル別集計
-        genre_breakdown = queryset.values('genre').annotate(
-            count=Count('report_id')
-        ).order_by('-count')
-
         genre_data = []
-        for item in genre_breakdown:
-            genre_display = dict(DailyReport.GENRE_CHOICES).get(item['genre'], item['genre'])
-            percentage = (item['count'] / total_reports * 100) if total_reports > 0 else 0
+        for genre, count in _sum_rollup_counts(rollups, StoreDailyRollup.GENRE_COUNT_FIELDS):
+            genre_display = dict(DailyReport.GENRE_CHOICES).get(genre, genre)
+            percentage = (count / total_reports * 100) if total_reports > 0 else 0
             genre_data.append({
-                "genre": item['genre'],
+                "genre": genre,
                 "genre_display": genre_display,
-                "count": item['count'],
+                "count": count,
                 "percentage": f"{percentage:.1f}%"
             })
 
         # 店舗別集計
-        store_breakdown = queryset.values('store__store_name').annotate(
-            count=Count('report_id')
-        ).order_by('-count')[:10]
+        store_breakdown = rollups.values('store__store_name').annotate(
+            count=Sum('report_count')
+        ).filter(count__gt=0).order_by('-count')[:10]
 
         store_data = [
             {"store_name": item['store__store_name'], "count": item['count']}
@@ -1311,7 +1327,7 @@ def get_report_statistics_all_stores(days: int = 30) -> str:
             "store_breakdown": store_data
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in get_report_statistics_all_stores: {e}", exc_info=True)
@@ -1341,7 +1357,7 @@ def gather_topic_related_data_all_stores(topic: str, days: int = 30) -> str:
     try:
         from reports.models import DailyReport
         from bbs.models import BBSPost, BBSComment
-        from django.db.models import Q, Count
+        from common.services import KeywordSearchService
 
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
@@ -1355,11 +1371,12 @@ def gather_topic_related_data_all_stores(topic: str, days: int = 30) -> str:
         }
 
         # 1. 日報からの情報収集（全店舗）
-        daily_reports = DailyReport.objects.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        ).filter(
-            Q(title__icontains=topic) | Q(content__icontains=topic)
+        daily_reports = KeywordSearchService.filter(
+            DailyReport.objects.filter(
+                date__gte=start_date,
+                date__lte=end_date
+            ),
+            [topic]
         ).order_by('-date')[:30]
 
         reports_data = []
@@ -1370,6 +1387,7 @@ def gather_topic_related_data_all_stores(topic: str, days: int = 30) -> str:
                 "genre": dict(DailyReport.GENRE_CHOICES).get(report.genre, report.genre),
                 "location": dict(DailyReport.LOCATION_CHOICES).get(report.location, report.location),
                 "title": report.title,
+                "source_id": report.report_id,
                 "content": report.content[:300],
                 "author": report.user.user_id if report.user else "不明"
             })
@@ -1382,11 +1400,12 @@ def gather_topic_related_data_all_stores(topic: str, days: int = 30) -> str:
         # 2. 掲示板からの情報収集（全店舗）
         from django.db.models import Prefetch
 
-        bbs_posts = BBSPost.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).filter(
-            Q(title__icontains=topic) | Q(content__icontains=topic)
+        bbs_posts = KeywordSearchService.filter(
+            BBSPost.objects.filter(
+                created_at__date__gte=start_date,
+                created_at__date__lte=end_date
+            ),
+            [topic]
         ).prefetch_related(
             Prefetch(
                 'comments',
@@ -1411,6 +1430,7 @@ def gather_topic_related_data_all_stores(topic: str, days: int = 30) -> str:
             bbs_data.append({
                 "store_name": post.store.store_name if post.store else "不明",
                 "title": post.title,
+                "source_id": post.post_id,
                 "content": post.content[:300],
                 "author": post.user.user_id if post.user else "不明",
                 "created_at": post.created_at.strftime("%Y-%m-%d"),
@@ -1428,21 +1448,25 @@ def gather_topic_related_data_all_stores(topic: str, days: int = 30) -> str:
         statistics = {}
 
         if any(keyword in topic_lower for keyword in ["クレーム", "苦情", "claim"]):
-            claim_reports = DailyReport.objects.filter(
-                genre='claim',
+            # 店舗日次集計から取得
+            from analytics.models import StoreDailyRollup
+            from django.db.models import Sum
+
+            claim_rollups = StoreDailyRollup.objects.filter(
+                claim_count__gt=0,
                 date__gte=start_date,
                 date__lte=end_date
             )
-            statistics["claim_count"] = claim_reports.count()
+            statistics["claim_count"] = claim_rollups.aggregate(total=Sum('claim_count'))['total'] or 0
             statistics["claim_by_store"] = list(
-                claim_reports.values('store__store_name')
-                .annotate(count=Count('report_id'))
+                claim_rollups.values('store__store_name')
+                .annotate(count=Sum('claim_count'))
                 .order_by('-count')[:5]
             )
 
         result["data_sources"]["related_statistics"] = statistics
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in gather_topic_related_data_all_stores: {e}", exc_info=True)
@@ -0,0 +1,178 @@
+"""
+ツール結果の整形（LLMに返すトークン数を抑える）
+
+インデントなしのJSONにし、日別の系列は列名と行の表形式にまとめてキーの繰り返しを省く。
+1回の応答（ターン）のツール結果の合計にトークン予算を設定した場合は、予算を超える結果の
+本文を短くし、それでも超える場合は末尾の項目を省略する。省略した本文は source_id を使って
+get_document_detail で取得し直せる。
+"""
+import copy
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# 表形式（columns / rows）にまとめる日別の系列のキー
+TABLE_KEYS = frozenset({
+    'daily_trend',
+    'daily_breakdown',
+    'daily_submission',
+    'recent_differences',
+})
+
+# 予算を超えた場合に短くする本文のキー
+TEXT_KEYS = frozenset({'content', 'best_answer'})
+
+# 本文を短くする段階（文字数）
+TRUNCATE_STEPS = (300, 150, 80)
+
+# 予算が残り少なくても1回のツール結果に割り当てる最小トークン数
+MIN_CALL_TOKENS = 300
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数を推定（ASCIIは4文字で1トークン、それ以外は1文字で1トークン）"""
+    ascii_count = sum(1 for char in text if char.isascii())
+    return ascii_count // 4 + (len(text) - ascii_count)
+
+
+class ToolOutputBudget:
+    """1回の応答（ターン）のツール結果のトークン予算（同じステップのツールは並列に消費する）"""
+
+    def __init__(self, total_tokens: int, max_call_tokens: Optional[int] = None):
+        """
+        Args:
+            total_tokens: ターン全体の予算
+            max_call_tokens: 1回のツール結果の上限（省略時は上限なし）
+        """
+        self.total_tokens = total_tokens
+        self.max_call_tokens = max_call_tokens
+        self.used_tokens = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> int:
+        """次のツール結果に割り当てるトークン数"""
+        with self._lock:
+            remaining = self.total_tokens - self.used_tokens
+        if self.max_call_tokens is not None:
+            remaining = min(remaining, self.max_call_tokens)
+        return max(remaining, MIN_CALL_TOKENS)
+
+    def consume(self, tokens: int) -> None:
+        """ツール結果のトークン数を使用済みにする"""
+        with self._lock:
+            self.used_tokens += tokens
+
+
+_current_budget: ContextVar[Optional[ToolOutputBudget]] = ContextVar('ai_tool_output_budget', default=None)
+
+
+@contextmanager
+def tool_output_budget(budget: Optional[ToolOutputBudget]):
+    """
+    ブロック内で実行するツールの結果にトークン予算を設定
+
+    Args:
+        budget: トークン予算（Noneの場合は予算なし）
+    """
+    token = _current_budget.set(budget)
+    try:
+        yield
+    finally:
+        _current_budget.reset(token)
+
+
+def format_tool_result(result: Dict) -> str:
+    """
+    ツール結果をLLMに返す文字列に整形
+
+    Args:
+        result: ツール結果の辞書
+
+    Returns:
+        インデントなしのJSON文字列（予算が設定されている場合は予算内に収める）
+    """
+    data = _to_tables(result)
+    text = _dumps(data)
+    budget = _current_budget.get()
+    if budget is None:
+        return text
+
+    limit = budget.available()
+    if estimate_tokens(text) > limit:
+        text = _fit(data, limit)
+    budget.consume(estimate_tokens(text))
+    return text
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def _to_tables(value: Any, key: Optional[str] = None) -> Any:
+    """日別の系列を {"columns": [...], "rows": [[...], ...]} にまとめる"""
+    if isinstance(value, dict):
+        return {k: _to_tables(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        if key in TABLE_KEYS and value and all(isinstance(row, dict) for row in value):
+            columns = list(value[0])
+            if all(list(row) == columns for row in value):
+                return {'columns': columns, 'rows': [[row[column] for column in columns] for row in value]}
+        return [_to_tables(item) for item in value]
+    return value
+
+
+def _fit(data: Dict, limit: int) -> str:
+    """本文を短くし、それでも超える場合は末尾の項目を省略して limit 以内に収める"""
+    data = copy.deepcopy(data)
+    for max_chars in TRUNCATE_STEPS:
+        _truncate_texts(data, max_chars)
+        text = _dumps(data)
+        if estimate_tokens(text) <= limit:
+            return text
+
+    while True:
+        target = _longest_list(data)
+        if target is None:
+            return text
+        parent, key = target
+        parent[key].pop()
+        parent[f'{key}_omitted'] = parent.get(f'{key}_omitted', 0) + 1
+        text = _dumps(data)
+        if estimate_tokens(text) <= limit:
+            return text
+
+
+def _truncate_texts(value: Any, max_chars: int) -> None:
+    if isinstance(value, dict):
+        for key, item in list(value.items()):
+            if key in TEXT_KEYS and isinstance(item, str) and len(item) > max_chars:
+                value[key] = item[:max_chars] + '…'
+                value['truncated'] = True
+            else:
+                _truncate_texts(item, max_chars)
+    elif isinstance(value, list):
+        for item in value:
+            _truncate_texts(item, max_chars)
+
+
+def _longest_list(data: Dict):
+    """末尾を省略できる項目（辞書）のリストのうち、JSONが最も長いもの（親の辞書, キー）"""
+    best = None
+
+    def visit(value):
+        nonlocal best
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if isinstance(item, list) and item and all(isinstance(row, dict) for row in item):
+                    size = len(_dumps(item))
+                    if best is None or size > best[0]:
+                        best = (size, value, key)
+                visit(item)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item)
+
+    visit(data)
+    return None if best is None else best[1:]
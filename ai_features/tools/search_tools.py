@@ -8,9 +8,35 @@ from typing import Optional
 
 from langchain_core.tools import tool
 
+from ai_features.tools.formatting import format_tool_result
+
 logger = logging.getLogger(__name__)
 
 
+def _format_thread_comments(comments, keyword: Optional[str] = None):
+    """
+    スレッドのコメントを整形（BBSService.load_threads / attach_comments で取得したもの）
+
+    Returns:
+        (コメントのリスト, ベストアンサーの本文またはNone)
+    """
+    comments_data = []
+    best_answer = None
+    for comment in comments:
+        comment_info = {
+            "author": comment.user.email if comment.user else "不明",
+            "content": comment.content,
+            "date": str(comment.created_at.date()),
+            "is_best_answer": comment.is_best_answer
+        }
+        if keyword is not None:
+            comment_info["contains_keyword"] = keyword.lower() in comment.content.lower()
+        comments_data.append(comment_info)
+        if comment.is_best_answer:
+            best_answer = comment.content
+    return comments_data, best_answer
+
+
 @tool
 def search_daily_reports(query: str = "", store_id: int = 0, days: int = 60) -> str:
     """
@@ -34,8 +60,8 @@ def search_daily_reports(query: str = "", store_id: int = 0, days: int = 60) ->
         # 日付フィルタ
         date_from = (date.today() - timedelta(days=days)).isoformat()
 
-        # ベクトル検索実行
-        search_results = VectorSearchService.search_documents(
+        # ハイブリッド検索実行（キーワード＋ベクトル）
+        search_results = VectorSearchService.hybrid_search_documents(
             query=query,
             store_id=store_id,
             source_types=['daily_report'],
@@ -51,8 +77,10 @@ def search_daily_reports(query: str = "", store_id: int = 0, days: int = 60) ->
                 "date": metadata.get('date', '不明'),
                 "type": "日報",
                 "store_name": metadata.get('store_name', '不明'),
+                "source_id": item.get('source_id'),
                 "content": item.get('content', ''),
                 "similarity": round(float(item.get('similarity', 0)), 3),
+                "matched_by": item.get('matched_by', []),
                 "has_claim": metadata.get('has_claim', False),
                 "has_praise": metadata.get('has_praise', False),
                 "has_accident": metadata.get('has_accident', False),
@@ -68,7 +96,7 @@ def search_daily_reports(query: str = "", store_id: int = 0, days: int = 60) ->
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_daily_reports: {e}", exc_info=True)
@@ -93,7 +121,7 @@ def search_bbs_posts(query: str = "", days: int = 30) -> str:
     """
     try:
         from ai_features.services.core_services import VectorSearchService, QueryClassifier
-        from bbs.models import BBSPost
+        from bbs.services import BBSService
         from datetime import date, timedelta
 
         # クエリの性質に応じてTop-K値を決定
@@ -102,8 +130,8 @@ def search_bbs_posts(query: str = "", days: int = 30) -> str:
         # 日付フィルタ
         date_from = (date.today() - timedelta(days=days)).isoformat()
 
-        # ベクトル検索実行（全店舗対象、store_id=None）
-        search_results = VectorSearchService.search_documents(
+        # ハイブリッド検索実行（キーワード＋ベクトル、全店舗対象、store_id=None）
+        search_results = VectorSearchService.hybrid_search_documents(
             query=query,
             store_id=None,  # 全店舗検索
             source_types=['bbs_post'],
@@ -111,31 +139,20 @@ def search_bbs_posts(query: str = "", days: int = 30) -> str:
             top_k=top_k
         )
 
+        # ヒットした投稿とコメントをまとめて取得
+        threads = BBSService.load_threads(item.get('source_id') for item in search_results)
+
         # 結果を整形（スレッド単位）
         formatted_results = []
         for item in search_results:
             metadata = item.get('metadata', {})
-            post_id = item.get('source_id')
+            post = threads.get(item.get('source_id'))
 
-            # 投稿のコメントをDBから取得
-            comments_data = []
-            best_answer = None
+            comments_data, best_answer = [], None
             store_name = metadata.get('store_name', '不明')
-            try:
-                post = BBSPost.objects.select_related('store').prefetch_related('comments__user').get(post_id=post_id)
+            if post is not None:
                 store_name = post.store.store_name if post.store else '不明'
-                for comment in post.comments.all().order_by('created_at'):
-                    comment_info = {
-                        "author": comment.user.email if comment.user else "不明",
-                        "content": comment.content,
-                        "date": str(comment.created_at.date()),
-                        "is_best_answer": comment.is_best_answer
-                    }
-                    comments_data.append(comment_info)
-                    if comment.is_best_answer:
-                        best_answer = comment.content
-            except BBSPost.DoesNotExist:
-                pass
+                comments_data, best_answer = _format_thread_comments(post.thread_comments)
 
             formatted_results.append({
                 "date": metadata.get('date', '不明'),
@@ -143,8 +160,10 @@ def search_bbs_posts(query: str = "", days: int = 30) -> str:
                 "title": metadata.get('title', '不明'),
                 "author": metadata.get('author_name', '不明'),
                 "category": metadata.get('category', '未分類'),
+                "source_id": item.get('source_id'),
                 "content": item.get('content', ''),
                 "similarity": round(float(item.get('similarity', 0)), 3),
+                "matched_by": item.get('matched_by', []),
                 "comment_count": len(comments_data),
                 "comments": comments_data,
                 "best_answer": best_answer,
@@ -161,7 +180,7 @@ def search_bbs_posts(query: str = "", days: int = 30) -> str:
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_bbs_posts: {e}", exc_info=True)
@@ -180,7 +199,7 @@ def search_bbs_by_keyword(keyword: str, days: int = 60) -> str:
 
     When to use this tool:
     - When looking for posts containing specific words (営業時間, シフト, 休み, etc.)
-    - When vector search (search_bbs_posts) returns no results but user insists data exists
+    - When the keyword must also be matched inside comments (search_bbs_posts already matches keywords in titles/contents)
     - When searching for announcements or notices (お知らせ, 連絡, 報告)
     - Keywords: ○○について, ○○の投稿, ○○が書いてある
 
@@ -193,7 +212,8 @@ def search_bbs_by_keyword(keyword: str, days: int = 60) -> str:
     """
     try:
         from bbs.models import BBSPost
-        from django.db.models import Q
+        from bbs.services import BBSService
+        from common.services import KeywordSearchService
         from datetime import date, timedelta
 
         end_date = date.today()
@@ -202,63 +222,43 @@ def search_bbs_by_keyword(keyword: str, days: int = 60) -> str:
         # デバッグログ
         logger.info(f"[search_bbs_by_keyword] keyword={keyword}, days={days}, start_date={start_date}, end_date={end_date}")
 
-        # まず全投稿数を確認
-        total_posts = BBSPost.objects.count()
-        logger.info(f"[search_bbs_by_keyword] Total posts in DB: {total_posts}")
-
-        # 日付範囲内の投稿数
-        date_filtered = BBSPost.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).count()
-        logger.info(f"[search_bbs_by_keyword] Posts in date range: {date_filtered}")
-
         # キーワードでDB直接検索（全店舗対象、タイトルまたは内容に含まれる）
-        posts = BBSPost.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).filter(
-            Q(title__icontains=keyword) | Q(content__icontains=keyword)
-        ).select_related('store').prefetch_related(
-            'comments__user', 'user'
-        ).order_by('-created_at')[:20]
+        posts = list(KeywordSearchService.filter(
+            BBSPost.objects.filter(
+                created_at__date__gte=start_date,
+                created_at__date__lte=end_date
+            ),
+            [keyword]
+        ).select_related('store', 'user').order_by('-created_at')[:20])
 
         logger.info(f"[search_bbs_by_keyword] Posts matching keyword: {len(posts)}")
 
         # コメント内にキーワードがある投稿も検索（全店舗）
         from bbs.models import BBSComment
-        comment_post_ids = BBSComment.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
-            content__icontains=keyword
+        comment_post_ids = KeywordSearchService.filter(
+            BBSComment.objects.filter(
+                created_at__date__gte=start_date,
+                created_at__date__lte=end_date
+            ),
+            [keyword],
+            fields=('content',)
         ).values_list('post_id', flat=True).distinct()
 
         # コメントでヒットした投稿も追加
-        comment_posts = BBSPost.objects.filter(
+        comment_posts = list(BBSPost.objects.filter(
             post_id__in=comment_post_ids
         ).exclude(
             post_id__in=[p.post_id for p in posts]
-        ).select_related('store').prefetch_related(
-            'comments__user', 'user'
-        ).order_by('-created_at')[:10]
+        ).select_related('store', 'user').order_by('-created_at')[:10])
+
+        # ヒットした投稿のコメントをまとめて取得
+        BBSService.attach_comments(posts + comment_posts)
 
         # 結果を整形
         formatted_results = []
 
         def format_post(post, match_type):
-            comments_data = []
-            best_answer = None
-            for comment in post.comments.all().order_by('created_at'):
-                comment_info = {
-                    "author": comment.user.email if comment.user else "不明",
-                    "content": comment.content,
-                    "date": str(comment.created_at.date()),
-                    "is_best_answer": comment.is_best_answer,
-                    "contains_keyword": keyword.lower() in comment.content.lower()
-                }
-                comments_data.append(comment_info)
-                if comment.is_best_answer:
-                    best_answer = comment.content
+            comments_data, best_answer = _format_thread_comments(post.thread_comments, keyword)
 
             return {
                 "date": str(post.created_at.date()),
@@ -266,6 +266,7 @@ def search_bbs_by_keyword(keyword: str, days: int = 60) -> str:
                 "title": post.title,
                 "author": post.user.email if post.user else "不明",
                 "genre": post.genre,
+                "source_id": post.post_id,
                 "content": post.content,
                 "match_type": match_type,
                 "comment_count": len(comments_data),
@@ -300,7 +301,7 @@ def search_bbs_by_keyword(keyword: str, days: int = 60) -> str:
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_bbs_by_keyword: {e}", exc_info=True)
@@ -325,14 +326,14 @@ def search_bbs_posts_my_store(query: str = "", store_id: int = 0, days: int = 30
     """
     try:
         from ai_features.services.core_services import VectorSearchService, QueryClassifier
-        from bbs.models import BBSPost
+        from bbs.services import BBSService
         from datetime import date, timedelta
 
         top_k = QueryClassifier.classify_and_get_top_k(query)
         date_from = (date.today() - timedelta(days=days)).isoformat()
 
-        # 自店舗のみベクトル検索
-        search_results = VectorSearchService.search_documents(
+        # 自店舗のみハイブリッド検索（キーワード＋ベクトル）
+        search_results = VectorSearchService.hybrid_search_documents(
             query=query,
             store_id=store_id,  # 自店舗のみ
             source_types=['bbs_post'],
@@ -340,35 +341,27 @@ def search_bbs_posts_my_store(query: str = "", store_id: int = 0, days: int = 30
             top_k=top_k
         )
 
+        # ヒットした投稿とコメントをまとめて取得
+        threads = BBSService.load_threads(item.get('source_id') for item in search_results)
+
         formatted_results = []
         for item in search_results:
             metadata = item.get('metadata', {})
-            post_id = item.get('source_id')
-
-            comments_data = []
-            best_answer = None
-            try:
-                post = BBSPost.objects.prefetch_related('comments__user').get(post_id=post_id)
-                for comment in post.comments.all().order_by('created_at'):
-                    comment_info = {
-                        "author": comment.user.email if comment.user else "不明",
-                        "content": comment.content,
-                        "date": str(comment.created_at.date()),
-                        "is_best_answer": comment.is_best_answer
-                    }
-                    comments_data.append(comment_info)
-                    if comment.is_best_answer:
-                        best_answer = comment.content
-            except BBSPost.DoesNotExist:
-                pass
+            post = threads.get(item.get('source_id'))
+
+            comments_data, best_answer = [], None
+            if post is not None:
+                comments_data, best_answer = _format_thread_comments(post.thread_comments)
 
             formatted_results.append({
                 "date": metadata.get('date', '不明'),
                 "title": metadata.get('title', '不明'),
                 "author": metadata.get('author_name', '不明'),
                 "category": metadata.get('category', '未分類'),
+                "source_id": item.get('source_id'),
                 "content": item.get('content', ''),
                 "similarity": round(float(item.get('similarity', 0)), 3),
+                "matched_by": item.get('matched_by', []),
                 "comment_count": len(comments_data),
                 "comments": comments_data,
                 "best_answer": best_answer,
@@ -385,7 +378,7 @@ def search_bbs_posts_my_store(query: str = "", store_id: int = 0, days: int = 30
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_bbs_posts_my_store: {e}", exc_info=True)
@@ -410,61 +403,54 @@ def search_bbs_by_keyword_my_store(keyword: str, store_id: int = 0, days: int =
     """
     try:
         from bbs.models import BBSPost, BBSComment
-        from django.db.models import Q
+        from bbs.services import BBSService
+        from common.services import KeywordSearchService
         from datetime import date, timedelta
 
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
 
         # 自店舗のみキーワード検索
-        posts = BBSPost.objects.filter(
-            store_id=store_id,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).filter(
-            Q(title__icontains=keyword) | Q(content__icontains=keyword)
-        ).prefetch_related(
-            'comments__user', 'user'
-        ).order_by('-created_at')[:20]
+        posts = list(KeywordSearchService.filter(
+            BBSPost.objects.filter(
+                store_id=store_id,
+                created_at__date__gte=start_date,
+                created_at__date__lte=end_date
+            ),
+            [keyword]
+        ).select_related('store', 'user').order_by('-created_at')[:20])
 
         # コメント内検索も自店舗のみ
-        comment_post_ids = BBSComment.objects.filter(
-            post__store_id=store_id,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
-            content__icontains=keyword
+        comment_post_ids = KeywordSearchService.filter(
+            BBSComment.objects.filter(
+                post__store_id=store_id,
+                created_at__date__gte=start_date,
+                created_at__date__lte=end_date
+            ),
+            [keyword],
+            fields=('content',)
         ).values_list('post_id', flat=True).distinct()
 
-        comment_posts = BBSPost.objects.filter(
+        comment_posts = list(BBSPost.objects.filter(
             post_id__in=comment_post_ids
         ).exclude(
             post_id__in=[p.post_id for p in posts]
-        ).prefetch_related(
-            'comments__user', 'user'
-        ).order_by('-created_at')[:10]
+        ).select_related('store', 'user').order_by('-created_at')[:10])
+
+        # ヒットした投稿のコメントをまとめて取得
+        BBSService.attach_comments(posts + comment_posts)
 
         formatted_results = []
 
         def format_post(post, match_type):
-            comments_data = []
-            best_answer = None
-            for comment in post.comments.all().order_by('created_at'):
-                comment_info = {
-                    "author": comment.user.email if comment.user else "不明",
-                    "content": comment.content,
-                    "date": str(comment.created_at.date()),
-                    "is_best_answer": comment.is_best_answer,
-                    "contains_keyword": keyword.lower() in comment.content.lower()
-                }
-                comments_data.append(comment_info)
-                if comment.is_best_answer:
-                    best_answer = comment.content
+            comments_data, best_answer = _format_thread_comments(post.thread_comments, keyword)
 
             return {
                 "date": str(post.created_at.date()),
                 "title": post.title,
                 "author": post.user.email if post.user else "不明",
                 "genre": post.genre,
+                "source_id": post.post_id,
                 "content": post.content,
                 "match_type": match_type,
                 "comment_count": len(comments_data),
@@ -498,7 +484,7 @@ def search_bbs_by_keyword_my_store(keyword: str, store_id: int = 0, days: int =
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_bbs_by_keyword_my_store: {e}", exc_info=True)
@@ -551,7 +537,7 @@ def search_manual(query: str = "", category: Optional[str] = None) -> str:
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_manual: {e}", exc_info=True)
@@ -585,7 +571,7 @@ def search_by_genre(query: str, store_id: int, genre: str, days: int = 60) -> st
     """
     try:
         from reports.models import DailyReport
-        from django.db import models
+        from common.services import KeywordSearchService
         from datetime import date, timedelta
 
         # ジャンルの妥当性チェック
@@ -609,9 +595,7 @@ def search_by_genre(query: str, store_id: int, genre: str, days: int = 60) -> st
 
         # クエリでさらに絞り込み（タイトルまたは内容に含まれる）
         if query:
-            reports = reports.filter(
-                models.Q(title__icontains=query) | models.Q(content__icontains=query)
-            )
+            reports = KeywordSearchService.filter(reports, [query])
 
         # 結果を整形
         formatted_results = []
@@ -621,6 +605,7 @@ def search_by_genre(query: str, store_id: int, genre: str, days: int = 60) -> st
                 "genre": dict(DailyReport.GENRE_CHOICES).get(report.genre, report.genre),
                 "location": dict(DailyReport.LOCATION_CHOICES).get(report.location, report.location),
                 "title": report.title,
+                "source_id": report.report_id,
                 "content": report.content[:200],  # 最大200文字
                 "author": report.user.user_id if report.user else "不明"
             })
@@ -635,7 +620,7 @@ def search_by_genre(query: str, store_id: int, genre: str, days: int = 60) -> st
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_by_genre: {e}", exc_info=True)
@@ -669,7 +654,7 @@ def search_by_location(query: str, store_id: int, location: str, days: int = 60)
     """
     try:
         from reports.models import DailyReport
-        from django.db import models
+        from common.services import KeywordSearchService
         from datetime import date, timedelta
 
         # 場所の妥当性チェック
@@ -693,9 +678,7 @@ def search_by_location(query: str, store_id: int, location: str, days: int = 60)
 
         # クエリでさらに絞り込み
         if query:
-            reports = reports.filter(
-                models.Q(title__icontains=query) | models.Q(content__icontains=query)
-            )
+            reports = KeywordSearchService.filter(reports, [query])
 
         # 結果を整形
         formatted_results = []
@@ -705,6 +688,7 @@ def search_by_location(query: str, store_id: int, location: str, days: int = 60)
                 "genre": dict(DailyReport.GENRE_CHOICES).get(report.genre, report.genre),
                 "location": dict(DailyReport.LOCATION_CHOICES).get(report.location, report.location),
                 "title": report.title,
+                "source_id": report.report_id,
                 "content": report.content[:200],
                 "author": report.user.user_id if report.user else "不明"
             })
@@ -719,7 +703,7 @@ def search_by_location(query: str, store_id: int, location: str, days: int = 60)
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_by_location: {e}", exc_info=True)
@@ -760,8 +744,8 @@ def search_daily_reports_all_stores(query: str = "", days: int = 60) -> str:
         # 日付フィルタ
         date_from = (date.today() - timedelta(days=days)).isoformat()
 
-        # ベクトル検索実行（全店舗）
-        search_results = VectorSearchService.search_documents(
+        # ハイブリッド検索実行（キーワード＋ベクトル、全店舗）
+        search_results = VectorSearchService.hybrid_search_documents(
             query=query,
             store_id=None,  # 全店舗
             source_types=['daily_report'],
@@ -777,8 +761,10 @@ def search_daily_reports_all_stores(query: str = "", days: int = 60) -> str:
                 "date": metadata.get('date', '不明'),
                 "type": "日報",
                 "store_name": metadata.get('store_name', '不明'),
+                "source_id": item.get('source_id'),
                 "content": item.get('content', ''),
                 "similarity": round(float(item.get('similarity', 0)), 3),
+                "matched_by": item.get('matched_by', []),
                 "has_claim": metadata.get('has_claim', False),
                 "has_praise": metadata.get('has_praise', False),
                 "has_accident": metadata.get('has_accident', False),
@@ -794,7 +780,7 @@ def search_daily_reports_all_stores(query: str = "", days: int = 60) -> str:
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_daily_reports_all_stores: {e}", exc_info=True)
@@ -824,7 +810,7 @@ def search_bbs_posts_all_stores(query: str = "", days: int = 30) -> str:
     """
     try:
         from ai_features.services.core_services import VectorSearchService, QueryClassifier
-        from bbs.models import BBSPost
+        from bbs.services import BBSService
         from datetime import date, timedelta
 
         # クエリの性質に応じてTop-K値を決定
@@ -833,8 +819,8 @@ def search_bbs_posts_all_stores(query: str = "", days: int = 30) -> str:
         # 日付フィルタ
         date_from = (date.today() - timedelta(days=days)).isoformat()
 
-        # ベクトル検索実行（全店舗、投稿のみ検索）
-        search_results = VectorSearchService.search_documents(
+        # ハイブリッド検索実行（キーワード＋ベクトル、全店舗、投稿のみ検索）
+        search_results = VectorSearchService.hybrid_search_documents(
             query=query,
             store_id=None,  # 全店舗
             source_types=['bbs_post'],
@@ -842,29 +828,18 @@ def search_bbs_posts_all_stores(query: str = "", days: int = 30) -> str:
             top_k=top_k * 2  # 全店舗なので件数を増やす
         )
 
+        # ヒットした投稿とコメントをまとめて取得
+        threads = BBSService.load_threads(item.get('source_id') for item in search_results)
+
         # 結果を整形（スレッド単位）
         formatted_results = []
         for item in search_results:
             metadata = item.get('metadata', {})
-            post_id = item.get('source_id')
-
-            # 投稿のコメントをDBから取得
-            comments_data = []
-            best_answer = None
-            try:
-                post = BBSPost.objects.prefetch_related('comments__user').get(post_id=post_id)
-                for comment in post.comments.all().order_by('created_at'):
-                    comment_info = {
-                        "author": comment.user.email if comment.user else "不明",
-                        "content": comment.content,
-                        "date": str(comment.created_at.date()),
-                        "is_best_answer": comment.is_best_answer
-                    }
-                    comments_data.append(comment_info)
-                    if comment.is_best_answer:
-                        best_answer = comment.content
-            except BBSPost.DoesNotExist:
-                pass
+            post = threads.get(item.get('source_id'))
+
+            comments_data, best_answer = [], None
+            if post is not None:
+                comments_data, best_answer = _format_thread_comments(post.thread_comments)
 
             formatted_results.append({
                 "date": metadata.get('date', '不明'),
@@ -872,8 +847,10 @@ def search_bbs_posts_all_stores(query: str = "", days: int = 30) -> str:
                 "title": metadata.get('title', '不明'),
                 "author": metadata.get('author_name', '不明'),
                 "category": metadata.get('category', '未分類'),
+                "source_id": item.get('source_id'),
                 "content": item.get('content', ''),
                 "similarity": round(float(item.get('similarity', 0)), 3),
+                "matched_by": item.get('matched_by', []),
                 "comment_count": len(comments_data),
                 "comments": comments_data,
                 "best_answer": best_answer,
@@ -890,7 +867,7 @@ def search_bbs_posts_all_stores(query: str = "", days: int = 30) -> str:
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_bbs_posts_all_stores: {e}", exc_info=True)
@@ -919,7 +896,7 @@ def search_by_genre_all_stores(query: str, genre: str, days: int = 60) -> str:
     """
     try:
         from reports.models import DailyReport
-        from django.db import models
+        from common.services import KeywordSearchService
         from datetime import date, timedelta
 
         # ジャンルの妥当性チェック
@@ -942,9 +919,7 @@ def search_by_genre_all_stores(query: str, genre: str, days: int = 60) -> str:
 
         # クエリでさらに絞り込み
         if query:
-            reports = reports.filter(
-                models.Q(title__icontains=query) | models.Q(content__icontains=query)
-            )
+            reports = KeywordSearchService.filter(reports, [query])
 
         # 結果を整形
         formatted_results = []
@@ -955,6 +930,7 @@ def search_by_genre_all_stores(query: str, genre: str, days: int = 60) -> str:
                 "genre": dict(DailyReport.GENRE_CHOICES).get(report.genre, report.genre),
                 "location": dict(DailyReport.LOCATION_CHOICES).get(report.location, report.location),
                 "title": report.title,
+                "source_id": report.report_id,
                 "content": report.content[:200],
                 "author": report.user.user_id if report.user else "不明"
             })
@@ -969,7 +945,7 @@ def search_by_genre_all_stores(query: str, genre: str, days: int = 60) -> str:
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_by_genre_all_stores: {e}", exc_info=True)
@@ -998,7 +974,7 @@ def search_by_location_all_stores(query: str, location: str, days: int = 60) ->
     """
     try:
         from reports.models import DailyReport
-        from django.db import models
+        from common.services import KeywordSearchService
         from datetime import date, timedelta
 
         # 場所の妥当性チェック
@@ -1021,9 +997,7 @@ def search_by_location_all_stores(query: str, location: str, days: int = 60) ->
 
         # クエリでさらに絞り込み
         if query:
-            reports = reports.filter(
-                models.Q(title__icontains=query) | models.Q(content__icontains=query)
-            )
+            reports = KeywordSearchService.filter(reports, [query])
 
         # 結果を整形
         formatted_results = []
@@ -1034,6 +1008,7 @@ def search_by_location_all_stores(query: str, location: str, days: int = 60) ->
                 "genre": dict(DailyReport.GENRE_CHOICES).get(report.genre, report.genre),
                 "location": dict(DailyReport.LOCATION_CHOICES).get(report.location, report.location),
                 "title": report.title,
+                "source_id": report.report_id,
                 "content": report.content[:200],
                 "author": report.user.user_id if report.user else "不明"
             })
@@ -1048,11 +1023,88 @@ def search_by_location_all_stores(query: str, location: str, days: int = 60) ->
             "total": len(formatted_results)
         }
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return format_tool_result(result)
 
     except Exception as e:
         logger.error(f"Error in search_by_location_all_stores: {e}", exc_info=True)
         return json.dumps({
             "status": "error",
             "message": f"全店舗場所検索エラー: {str(e)}"
-        }, ensure_ascii=False)
\ No newline at end of file
+        }, ensure_ascii=False)
+
+
+@tool
+def get_document_detail(source_type: str, source_id: int) -> str:
+    """
+    日報・掲示板投稿の全文を取得します。検索結果の本文が省略されている（"truncated": true）場合に、
+    その結果の source_id を指定して使います。
+
+    Args:
+        source_type: "daily_report"（日報）または "bbs_post"（掲示板投稿、コメントを含む）
+        source_id: 検索結果の source_id
+
+    Returns:
+        全文のJSON文字列
+    """
+    try:
+        if source_type == 'daily_report':
+            from reports.models import DailyReport
+
+            report = DailyReport.objects.select_related('store').filter(report_id=source_id).first()
+            if report is None:
+                return json.dumps({
+                    "status": "no_data",
+                    "message": f"日報（ID: {source_id}）が見つかりませんでした。"
+                }, ensure_ascii=False)
+
+            result = {
+                "status": "success",
+                "source_type": source_type,
+                "source_id": source_id,
+                "date": str(report.date),
+                "store_name": report.store.store_name if report.store else "不明",
+                "genre": report.get_genre_display(),
+                "location": report.get_location_display(),
+                "title": report.title,
+                "content": report.content
+            }
+
+        elif source_type == 'bbs_post':
+            from bbs.services import BBSService
+
+            post = BBSService.load_threads([source_id]).get(source_id)
+            if post is None:
+                return json.dumps({
+                    "status": "no_data",
+                    "message": f"掲示板投稿（ID: {source_id}）が見つかりませんでした。"
+                }, ensure_ascii=False)
+
+            comments_data, best_answer = _format_thread_comments(post.thread_comments)
+            result = {
+                "status": "success",
+                "source_type": source_type,
+                "source_id": source_id,
+                "date": str(post.created_at.date()),
+                "store_name": post.store.store_name if post.store else "不明",
+                "title": post.title,
+                "author": post.user.email if post.user else "不明",
+                "content": post.content,
+                "comment_count": len(comments_data),
+                "comments": comments_data,
+                "best_answer": best_answer
+            }
+
+        else:
+            return json.dumps({
+                "status": "error",
+                "message": f"source_type は daily_report または bbs_post を指定してください: {source_type}"
+            }, ensure_ascii=False)
+
+        return format_tool_result(result)
+
+    except Exception as e:
+        logger.error(f"Error in get_document_detail: {e}", exc_info=True)
+        return json.dumps({
+            "status": "error",
+            "message": f"取得エラー: {str(e)}"
+        }, ensure_ascii=False)
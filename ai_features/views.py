@@ -10,10 +10,10 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
-from django.db import transaction
 
 
 from ai_features.models import AIChatHistory
+from ai_features.services.chat_history import ChatHistoryService
 
 logger = logging.getLogger(__name__)
 
@@ -74,10 +74,10 @@ class ChatView(View):
                     status=400
                 )
 
-            # チャット履歴取得（オプション）
+            # チャット履歴取得（オプション、過去の会話の要約＋直近のやり取り）
             chat_history = None
             if data.get('include_history', False):
-                chat_history = self._get_chat_history(request.user)
+                chat_history = ChatHistoryService.load_for_prompt(request.user)
 
             # 環境変数からAI設定を取得
             openai_api_key = os.environ.get('OPENAI_API_KEY', '')
@@ -108,11 +108,13 @@ class ChatView(View):
             if(response['message'] == ""):
                response=response['message'] = "ERROR: invalid response"
 
-            self._save_chat_history(
+            ChatHistoryService.save_turn(
                 user=request.user,
                 message=message,
                 response=response['message']
             )
+            # 要約の更新（LLM呼び出し）は応答を返した後に別スレッドで行う
+            ChatHistoryService.schedule_summary_update(request.user, agent.summarize_history)
 
             return JsonResponse(response)
 
@@ -130,25 +132,8 @@ class ChatView(View):
 
     def get(self, request):
 
-        chat_history = self._get_chat_history(request.user, 20)
-        return JsonResponse(
-            {"history": chat_history},
-            status = 200
-        )
-
-    def _get_chat_history(self, user, limit: int = 10) -> list:
-        """
-        チャット履歴を取得
-
-        Args:
-            user: ユーザーオブジェクト
-            limit: 取得件数
-
-        Returns:
-            チャット履歴のリスト
-        """
-        history = AIChatHistory.objects.filter(user=user).order_by('-created_at')[:limit]
-        return [
+        history = AIChatHistory.objects.filter(user=request.user).order_by('-created_at')[:20]
+        chat_history = [
             {
                 "role": chat.role,
                 "content": chat.message,
@@ -156,42 +141,10 @@ class ChatView(View):
             }
             for chat in reversed(history)  # 古い順に並び替え
         ]
-
-    def _save_chat_history(self, user, message: str, response: str):
-        """
-        チャット履歴をDB保存（MAX_CHAT_HISTORY件数まで）
-
-        Args:
-            user: ユーザーオブジェクト
-            message: ユーザーのメッセージ
-            response: AIの応答
-        """
-
-        max_chat_history = int(os.environ.get('MAX_CHAT_HISTORY', '14'))
-
-        with transaction.atomic():
-            # ユーザー発言
-            AIChatHistory.objects.create(
-                user=user,
-                role='user',
-                message=message
-            )
-
-            # AI応答
-            AIChatHistory.objects.create(
-                user=user,
-                role='assistant',
-                message=response
-            )
-
-            # 件数超過分を削除（古い順）
-            qs = AIChatHistory.objects.filter(user=user).order_by('-created_at')
-
-            excess_count = qs.count() - max_chat_history
-            if excess_count > 0:
-                # スライスしたクエリセットは直接削除できないので、IDを取得してから削除
-                ids_to_delete = list(qs.reverse()[:excess_count].values_list('chat_id', flat=True))
-                AIChatHistory.objects.filter(chat_id__in=ids_to_delete).delete()
+        return JsonResponse(
+            {"history": chat_history},
+            status = 200
+        )
 
 
 @login_required
@@ -203,7 +156,7 @@ def clear_chat_history_view(request):
     DELETE /api/ai/chat/history/
     """
     try:
-        deleted_count = AIChatHistory.objects.filter(user=request.user).delete()[0]
+        deleted_count = ChatHistoryService.clear(request.user)
 
         return JsonResponse({
             "message": f"{deleted_count}件のチャット履歴を削除しました"
@@ -289,17 +242,10 @@ def chat_stream_view(request):
                     openai_api_key=openai_api_key
                 )
 
-                # チャット履歴取得（オプション）
+                # チャット履歴取得（オプション、過去の会話の要約＋直近のやり取り）
                 chat_history = None
                 if data.get('include_history', False):
-                    history = AIChatHistory.objects.filter(user=request.user).order_by('-created_at')[:10]
-                    chat_history = [
-                        {
-                            "role": chat.role,
-                            "content": chat.message,
-                        }
-                        for chat in reversed(history)
-                    ]
+                    chat_history = ChatHistoryService.load_for_prompt(request.user)
 
                 # ストリーミングチャット実行
 
@@ -311,8 +257,13 @@ def chat_stream_view(request):
                 for chunk in agent.chat_stream(
                     query=message,
                     user=request.user,
-                    chat_history=chat_history
+                    chat_history=chat_history,
+                    include_progress=True
                 ):
+                    # ツール実行の進捗イベントはそのまま送信
+                    if isinstance(chunk, dict):
+                        yield f"data: {json.dumps(chunk)}\n\n"
+                        continue
                     # チャンクを送信
                     yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
                     full_response += chunk
@@ -320,26 +271,13 @@ def chat_stream_view(request):
                 # 完了通知
                 yield f"data: {json.dumps({'type': 'done', 'content': ''})}\n\n"
 
-                # チャット履歴を保存
-                with transaction.atomic():
-                    AIChatHistory.objects.create(
-                        user=request.user,
-                        role='user',
-                        message=message
-                    )
-                    AIChatHistory.objects.create(
-                        user=request.user,
-                        role='assistant',
-                        message=full_response
-                    )
-
-                    # 件数超過分を削除
-                    max_chat_history = int(os.environ.get('MAX_CHAT_HISTORY', '14'))
-                    qs = AIChatHistory.objects.filter(user=request.user).order_by('-created_at')
-                    excess_count = qs.count() - max_chat_history
-                    if excess_count > 0:
-                        ids_to_delete = list(qs.reverse()[:excess_count].values_list('chat_id', flat=True))
-                        AIChatHistory.objects.filter(chat_id__in=ids_to_delete).delete()
+                # チャット履歴を保存（要約の更新は別スレッドで行う）
+                ChatHistoryService.save_turn(
+                    user=request.user,
+                    message=message,
+                    response=full_response
+                )
+                ChatHistoryService.schedule_summary_update(request.user, agent.summarize_history)
 
             except Exception as e:
                 logger.error(f"Error in streaming chat: {e}", exc_info=True)
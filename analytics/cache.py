@@ -0,0 +1,211 @@
+"""
+グラフデータAPIのレスポンスキャッシュ
+
+キャッシュキーには「店舗×月」単位のバケットのバージョンを含め、日報・実績の保存時に
+該当バケットのバージョンだけを更新することで、影響を受けるグラフのみを無効化する。
+バックエンドは Django のキャッシュフレームワークとプロセス内LRUを設定で切り替える。
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LocalLRUCacheBackend:
+    """プロセス内のLRUキャッシュ（エントリごとにTTLを持つ）"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set(self, key, value, timeout=None):
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """Djangoのキャッシュフレームワーク（Redis/Memcached等の共有キャッシュ）を使うバックエンド"""
+
+    def __init__(self, alias='default'):
+        self._cache = caches[alias]
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def get_many(self, keys):
+        return self._cache.get_many(keys)
+
+    def set(self, key, value, timeout=None):
+        self._cache.set(key, value, timeout)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class GraphDataCache:
+    """グラフデータのレスポンスキャッシュ"""
+
+    KEY_PREFIX = 'analytics:graph'
+
+    _backend = None
+    _backend_lock = threading.Lock()
+
+    @classmethod
+    def get_backend(cls):
+        """設定に応じたキャッシュバックエンドを取得（'none'の場合はNone）"""
+        backend_name = getattr(settings, 'ANALYTICS_GRAPH_CACHE_BACKEND', 'local')
+        if backend_name == 'none':
+            return None
+
+        if cls._backend is None:
+            with cls._backend_lock:
+                if cls._backend is None:
+                    if backend_name == 'django':
+                        cls._backend = DjangoCacheBackend(
+                            getattr(settings, 'ANALYTICS_GRAPH_CACHE_ALIAS', 'default')
+                        )
+                    else:
+                        cls._backend = LocalLRUCacheBackend(
+                            getattr(settings, 'ANALYTICS_GRAPH_CACHE_MAX_ENTRIES', 512)
+                        )
+        return cls._backend
+
+    @classmethod
+    def reset_backend(cls):
+        """バックエンドを破棄（設定変更時・テスト用）"""
+        with cls._backend_lock:
+            cls._backend = None
+
+    @classmethod
+    def get_or_compute(cls, params, start_date, end_date, store_id, compute):
+        """キャッシュからグラフデータを取得し、なければ計算して保存
+
+        Args:
+            params: キャッシュキーに含めるリクエストパラメータの辞書
+            start_date: 期間の開始日
+            end_date: 期間の終了日
+            store_id: 集計対象の店舗ID（全店舗モードの場合はNone）
+            compute: キャッシュミス時にデータを計算する関数
+
+        Returns:
+            計算済みのグラフデータ
+        """
+        backend = cls.get_backend()
+        if backend is None:
+            return compute()
+
+        today = datetime.now().date()
+        is_closed = end_date < today
+        versions = cls._get_versions(backend, store_id, start_date, end_date)
+        key = cls._make_key(params, versions, None if is_closed else today)
+
+        cached = backend.get(key)
+        if cached is not None:
+            return cached
+
+        value = compute()
+        if is_closed:
+            timeout = getattr(settings, 'ANALYTICS_GRAPH_CACHE_CLOSED_TTL', 86400)
+        else:
+            timeout = getattr(settings, 'ANALYTICS_GRAPH_CACHE_CURRENT_TTL', 60)
+        backend.set(key, value, timeout)
+        return value
+
+    @classmethod
+    def invalidate(cls, store_id, date):
+        """指定店舗・日付を含むバケット（自店舗バケットと全店舗バケット）を無効化
+
+        Args:
+            store_id: 店舗ID
+            date: 日付
+        """
+        backend = cls.get_backend()
+        if backend is None:
+            return
+        for scope in (cls._scope(store_id), cls._scope(None)):
+            backend.set(cls._version_key(scope, date.year, date.month), uuid.uuid4().hex, None)
+
+    @classmethod
+    def invalidate_all(cls):
+        """全エントリを無効化（集計の再構築時など）"""
+        backend = cls.get_backend()
+        if backend is None:
+            return
+        backend.set(f'{cls.KEY_PREFIX}:generation', uuid.uuid4().hex, None)
+
+    @classmethod
+    def _scope(cls, store_id):
+        return 'all' if store_id is None else f'store:{store_id}'
+
+    @classmethod
+    def _version_key(cls, scope, year, month):
+        return f'{cls.KEY_PREFIX}:version:{scope}:{year}-{month:02d}'
+
+    @classmethod
+    def _get_versions(cls, backend, store_id, start_date, end_date):
+        """期間に含まれる月バケットのバージョンを取得（未設定のものは新規発行）"""
+        scope = cls._scope(store_id)
+        keys = [f'{cls.KEY_PREFIX}:generation']
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            keys.append(cls._version_key(scope, year, month))
+            month += 1
+            if month > 12:
+                month = 1
+                year += 1
+
+        found = backend.get_many(keys)
+        versions = []
+        for key in keys:
+            version = found.get(key)
+            if version is None:
+                # 追い出された・未発行のバージョンは新しい値で発行し直し、古いエントリを参照しないようにする
+                version = uuid.uuid4().hex
+                backend.set(key, version, None)
+            versions.append(version)
+        return versions
+
+    @classmethod
+    def _make_key(cls, params, versions, today):
+        payload = json.dumps(
+            {'params': params, 'versions': versions, 'today': str(today) if today else None},
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return f'{cls.KEY_PREFIX}:data:{digest}'
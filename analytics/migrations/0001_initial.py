@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('stores', '0003_remove_store_sales_target'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreDailyRollup',
+            fields=[
+                ('rollup_id', models.AutoField(primary_key=True, serialize=False, verbose_name='集計ID')),
+                ('date', models.DateField(verbose_name='日付')),
+                ('has_performance', models.BooleanField(default=False, verbose_name='実績登録済みフラグ')),
+                ('sales_amount', models.IntegerField(blank=True, null=True, verbose_name='売上金額')),
+                ('customer_count', models.IntegerField(blank=True, null=True, verbose_name='客数')),
+                ('cash_difference', models.IntegerField(blank=True, null=True, verbose_name='違算金額')),
+                ('report_count', models.IntegerField(default=0, verbose_name='日報件数')),
+                ('claim_count', models.IntegerField(default=0, verbose_name='クレーム件数')),
+                ('praise_count', models.IntegerField(default=0, verbose_name='賞賛件数')),
+                ('accident_count', models.IntegerField(default=0, verbose_name='事故件数')),
+                ('report_genre_count', models.IntegerField(default=0, verbose_name='報告件数')),
+                ('other_genre_count', models.IntegerField(default=0, verbose_name='その他ジャンル件数')),
+                ('kitchen_count', models.IntegerField(default=0, verbose_name='キッチン件数')),
+                ('hall_count', models.IntegerField(default=0, verbose_name='ホール件数')),
+                ('cashier_count', models.IntegerField(default=0, verbose_name='レジ件数')),
+                ('toilet_count', models.IntegerField(default=0, verbose_name='トイレ件数')),
+                ('other_location_count', models.IntegerField(default=0, verbose_name='その他場所件数')),
+                ('incident_matrix', models.JSONField(default=dict, help_text='{genre: {location: count}} 形式', verbose_name='ジャンル×場所件数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='stores.store', verbose_name='店舗ID')),
+            ],
+            options={
+                'verbose_name': '店舗日次集計',
+                'verbose_name_plural': '店舗日次集計',
+                'db_table': 'store_daily_rollups',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'store'], name='rollup_date_store_idx')],
+                'unique_together': {('store', 'date')},
+            },
+        ),
+    ]
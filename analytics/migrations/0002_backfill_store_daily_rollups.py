@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+
+GENRE_COUNT_FIELDS = {
+    'claim': 'claim_count',
+    'praise': 'praise_count',
+    'accident': 'accident_count',
+    'report': 'report_genre_count',
+    'other': 'other_genre_count',
+}
+LOCATION_COUNT_FIELDS = {
+    'kitchen': 'kitchen_count',
+    'hall': 'hall_count',
+    'cashier': 'cashier_count',
+    'toilet': 'toilet_count',
+    'other': 'other_location_count',
+}
+
+
+def backfill_rollups(apps, schema_editor):
+    """既存の日報・店舗日次実績から集計レコードを作成"""
+    DailyReport = apps.get_model('reports', 'DailyReport')
+    StoreDailyPerformance = apps.get_model('reports', 'StoreDailyPerformance')
+    StoreDailyRollup = apps.get_model('analytics', 'StoreDailyRollup')
+
+    rollups = defaultdict(lambda: {'report_count': 0, 'incident_matrix': {}})
+
+    for row in DailyReport.objects.values('store_id', 'date', 'genre', 'location').annotate(count=Count('pk')):
+        fields = rollups[(row['store_id'], row['date'])]
+        fields['report_count'] += row['count']
+        for mapping, code in ((GENRE_COUNT_FIELDS, row['genre']), (LOCATION_COUNT_FIELDS, row['location'])):
+            if code in mapping:
+                fields[mapping[code]] = fields.get(mapping[code], 0) + row['count']
+        genre_cells = fields['incident_matrix'].setdefault(row['genre'], {})
+        genre_cells[row['location']] = genre_cells.get(row['location'], 0) + row['count']
+
+    for row in StoreDailyPerformance.objects.values(
+        'store_id', 'date', 'sales_amount', 'customer_count', 'cash_difference'
+    ):
+        fields = rollups[(row['store_id'], row['date'])]
+        fields['has_performance'] = True
+        fields['sales_amount'] = row['sales_amount']
+        fields['customer_count'] = row['customer_count']
+        fields['cash_difference'] = row['cash_difference']
+
+    StoreDailyRollup.objects.bulk_create(
+        [
+            StoreDailyRollup(store_id=store_id, date=date, **fields)
+            for (store_id, date), fields in rollups.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,2 +1,74 @@
-# このアプリではモデルを定義していません
-# データはreportsとbbsアプリのモデルから動的に集計されます
+from django.db import models
+
+
+class StoreDailyRollup(models.Model):
+    """店舗日次集計モデル
+
+    日報（DailyReport）と店舗日次実績（StoreDailyPerformance）を店舗×日付単位で
+    事前集計したテーブル。元データの保存・削除時にシグナルで更新され、
+    rebuild_daily_rollups コマンドで再構築できる。
+    """
+
+    # ジャンル/場所コード → 件数カラム名
+    GENRE_COUNT_FIELDS = {
+        'claim': 'claim_count',
+        'praise': 'praise_count',
+        'accident': 'accident_count',
+        'report': 'report_genre_count',
+        'other': 'other_genre_count',
+    }
+    LOCATION_COUNT_FIELDS = {
+        'kitchen': 'kitchen_count',
+        'hall': 'hall_count',
+        'cashier': 'cashier_count',
+        'toilet': 'toilet_count',
+        'other': 'other_location_count',
+    }
+
+    rollup_id = models.AutoField(primary_key=True, verbose_name='集計ID')
+    store = models.ForeignKey(
+        'stores.Store',
+        on_delete=models.CASCADE,
+        related_name='daily_rollups',
+        verbose_name='店舗ID'
+    )
+    date = models.DateField(verbose_name='日付')
+
+    # 店舗日次実績（実績未登録の日はNULL）
+    has_performance = models.BooleanField(default=False, verbose_name='実績登録済みフラグ')
+    sales_amount = models.IntegerField(null=True, blank=True, verbose_name='売上金額')
+    customer_count = models.IntegerField(null=True, blank=True, verbose_name='客数')
+    cash_difference = models.IntegerField(null=True, blank=True, verbose_name='違算金額')
+
+    # 日報件数
+    report_count = models.IntegerField(default=0, verbose_name='日報件数')
+    claim_count = models.IntegerField(default=0, verbose_name='クレーム件数')
+    praise_count = models.IntegerField(default=0, verbose_name='賞賛件数')
+    accident_count = models.IntegerField(default=0, verbose_name='事故件数')
+    report_genre_count = models.IntegerField(default=0, verbose_name='報告件数')
+    other_genre_count = models.IntegerField(default=0, verbose_name='その他ジャンル件数')
+    kitchen_count = models.IntegerField(default=0, verbose_name='キッチン件数')
+    hall_count = models.IntegerField(default=0, verbose_name='ホール件数')
+    cashier_count = models.IntegerField(default=0, verbose_name='レジ件数')
+    toilet_count = models.IntegerField(default=0, verbose_name='トイレ件数')
+    other_location_count = models.IntegerField(default=0, verbose_name='その他場所件数')
+    incident_matrix = models.JSONField(
+        default=dict,
+        verbose_name='ジャンル×場所件数',
+        help_text='{genre: {location: count}} 形式'
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    class Meta:
+        db_table = 'store_daily_rollups'
+        verbose_name = '店舗日次集計'
+        verbose_name_plural = '店舗日次集計'
+        ordering = ['-date']
+        unique_together = [['store', 'date']]  # 1店舗1日1レコード
+        indexes = [
+            models.Index(fields=['date', 'store'], name='rollup_date_store_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.store_id} - {self.date}"
@@ -1,8 +1,12 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 from reports.models import DailyReport, StoreDailyPerformance
 from stores.models import MonthlyGoal, Store
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Count, Q
+
+from analytics.models import StoreDailyRollup
 
 
 # 店舗ごとの折れ線表示に使うシンプルな色パレット
@@ -17,153 +21,178 @@ COLOR_PALETTE = [
     'rgb(220, 38, 38)',    # deep red
 ]
 
+# 場所別グラフの場所定義と色
+INCIDENT_LOCATIONS = [
+    ('kitchen', 'キッチン', 'rgb(239, 68, 68)'),      # red
+    ('hall', 'ホール', 'rgb(59, 130, 246)'),          # blue
+    ('cashier', 'レジ', 'rgb(34, 197, 94)'),          # green
+    ('toilet', 'トイレ', 'rgb(234, 179, 8)'),         # yellow
+    ('other', 'その他', 'rgb(156, 163, 175)'),        # gray
+]
 
-class AnalyticsService:
-    """分析データを集計するサービスクラス"""
+# ジャンル未指定時に集計するネガティブジャンル（クレームと事故）
+NEGATIVE_GENRES = ('claim', 'accident')
 
-    @staticmethod
-    def get_sales_data(store, start_date, end_date, base_store=None):
-        """売上データを取得
 
+class IncidentMatrix:
+    """日付×場所×店舗×ジャンルのインシデント件数マトリクス
+
+    店舗日次集計（StoreDailyRollup）のジャンル×場所件数から生成し（PeriodRollups.incident_matrix）、
+    日/週バケットへの集計、自店舗/他店舗の振り分け、ジャンルの絞り込みはPython側で行う。
+    """
+
+    def __init__(self, rows):
+        """
         Args:
-            store: 店舗オブジェクト
-            start_date: 開始日
-            end_date: 終了日
-            base_store: 比較用の自店舗（全店舗モード時に指定）
+            rows: (date, location, store_id, genre, count) のイテラブル
+        """
+        # 日付ごとにセルをまとめておき、バケット集計時は該当日のみ走査する
+        self._cells_by_date = defaultdict(list)
+        for date, location, store_id, genre, count in rows:
+            self._cells_by_date[date].append((location, store_id, genre, count))
+
+    def count(self, start_date, end_date, location='all', genre=None, store_id=None, exclude_store_id=None):
+        """指定条件に該当する件数を合計
+
+        Args:
+            start_date: バケットの開始日
+            end_date: バケットの終了日
+            location: 場所コード（'all'の場合は全場所）
+            genre: ジャンル（Noneの場合はネガティブジャンル）
+            store_id: 指定した店舗のみ集計
+            exclude_store_id: 指定した店舗を除外して集計
 
         Returns:
-            dict: {labels: [...], data: [...]} または {labels: [...], datasets: [...]}
+            int: 件数
         """
-        # 日付範囲内の全日付を生成
-        date_range = []
+        genres = (genre,) if genre else NEGATIVE_GENRES
+        total = 0
         current_date = start_date
         while current_date <= end_date:
-            date_range.append(current_date)
+            for cell_location, cell_store_id, cell_genre, cell_count in self._cells_by_date.get(current_date, ()):
+                if location != 'all' and cell_location != location:
+                    continue
+                if cell_genre not in genres:
+                    continue
+                if store_id is not None and cell_store_id != store_id:
+                    continue
+                if exclude_store_id is not None and cell_store_id == exclude_store_id:
+                    continue
+                total += cell_count
             current_date += timedelta(days=1)
+        return total
 
-        # 各日付の売上を集計
-        labels = []
-        data = []
-        today = datetime.now().date()
 
-        for date in date_range:
-            # 未来の日付はスキップ
-            if date > today:
-                continue
-            labels.append(date.strftime('%m/%d'))
+class PeriodRollups:
+    """期間・集計範囲ごとの店舗日次集計スナップショット
 
-        # storeが指定されている場合は従来通り単一ラインを返す
-        if store:
-            for date in date_range:
-                if date > today:
-                    continue
+    StoreDailyRollup を1回のクエリでまとめて取得し、売上・客数の時系列と
+    インシデント件数マトリクスの両方をここから生成する。
+    同じ期間・集計範囲の複数グラフで共有すれば、DBアクセスは1回で済む。
+    """
 
-                perf = StoreDailyPerformance.objects.filter(
-                    store=store,
-                    date=date
-                ).first()
-                data.append(perf.sales_amount if perf else 0)
+    def __init__(self, start_date, end_date, store=None, base_store=None):
+        """
+        Args:
+            start_date: 開始日
+            end_date: 終了日
+            store: 店舗オブジェクト（Noneの場合は本部を除く全店舗）
+            base_store: 比較用の自店舗（本部であっても集計対象に含める）
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.store = store
+        self.base_store = base_store
+        self._rows = None
+        self._stores = None
+
+    @property
+    def rows(self):
+        """期間内の集計行（初回アクセス時に1クエリで取得）"""
+        if self._rows is None:
+            today = datetime.now().date()
+            query = StoreDailyRollup.objects.filter(
+                date__gte=self.start_date,
+                date__lte=min(self.end_date, today),
+            )
+            if self.store:
+                query = query.filter(store=self.store)
+            elif self.base_store:
+                query = query.filter(~Q(store__store_name='本部') | Q(store=self.base_store))
+            else:
+                # 全店舗の際は本部を除外
+                query = query.exclude(store__store_name='本部')
 
-            return {
-                'labels': labels,
-                'data': data,
-            }
+            self._rows = list(query.values(
+                'store_id', 'date', 'has_performance', 'sales_amount', 'customer_count',
+                'report_count', 'incident_matrix',
+            ))
+        return self._rows
 
-        # store=None かつ base_store指定時は自店舗と他店舗平均の2本のラインを返す
-        datasets = []
-        # 本部は除外する
-        stores = Store.objects.exclude(store_name='本部').order_by('store_id')
+    @property
+    def stores(self):
+        """本部を除く店舗一覧（店舗ID順）"""
+        if self._stores is None:
+            self._stores = list(Store.objects.exclude(store_name='本部').order_by('store_id'))
+        return self._stores
 
-        if base_store:
-            # 他店舗（自店舗を除く）
-            other_stores = stores.exclude(pk=base_store.pk)
-            other_store_count = other_stores.count()
+    def performance_values(self, field, store_ids=None):
+        """実績の指定カラムを店舗・日付ごとに取得
 
-            # 自店舗データ
-            self_data = []
-            for date in date_range:
-                if date > today:
-                    continue
-                perf = StoreDailyPerformance.objects.filter(store=base_store, date=date).first()
-                self_data.append(perf.sales_amount if perf else 0)
+        Args:
+            field: 取得するカラム名（'sales_amount' または 'customer_count'）
+            store_ids: 対象店舗IDのリスト（Noneの場合は全店舗）
 
-            # 他店舗平均データ
-            other_average_data = []
-            for date in date_range:
-                if date > today:
-                    continue
-                # その日の他店舗の売上を集計
-                daily_sales = StoreDailyPerformance.objects.filter(
-                    store__in=other_stores,
-                    date=date
-                ).aggregate(total=Sum('sales_amount'))
-
-                # 平均を計算
-                if other_store_count > 0 and daily_sales['total'] is not None:
-                    other_average_data.append(round(daily_sales['total'] / other_store_count, 2))
-                else:
-                    other_average_data.append(0)
+        Returns:
+            dict: {store_id: {date: 値}}（実績がない日はキーなし）
+        """
+        values = {}
+        for row in self.rows:
+            if not row['has_performance']:
+                continue
+            if store_ids is not None and row['store_id'] not in store_ids:
+                continue
+            values.setdefault(row['store_id'], {})[row['date']] = row[field]
+        return values
 
-            # 自店舗の折れ線
-            datasets.append({
-                'label': '自店舗',
-                'data': self_data,
-                'borderColor': 'rgb(13, 148, 136)',  # teal-600
-                'backgroundColor': 'rgba(13, 148, 136, 0.1)',
-                'tension': 0.3,
-                'fill': False,
-                'borderWidth': 3,
-                'pointRadius': 4,
-            })
+    def incident_matrix(self):
+        """インシデント件数マトリクスを生成
 
-            # 他店舗平均の折れ線
-            datasets.append({
-                'label': '他店舗平均',
-                'data': other_average_data,
-                'borderColor': 'rgb(107, 114, 128)',  # gray-500
-                'backgroundColor': 'rgba(107, 114, 128, 0.1)',
-                'tension': 0.3,
-                'fill': False,
-                'borderWidth': 3,
-                'pointRadius': 4,
-                'borderDash': [5, 5],  # 破線スタイル
-            })
+        Returns:
+            IncidentMatrix: 件数マトリクス
+        """
+        return IncidentMatrix(
+            (row['date'], location, row['store_id'], genre, count)
+            for row in self.rows
+            if row['report_count'] > 0
+            for genre, location_counts in row['incident_matrix'].items()
+            for location, count in location_counts.items()
+        )
 
-            return {
-                'labels': labels,
-                'datasets': datasets,
-                'chart_kind': 'line',
-            }
 
-        # base_storeが指定されていない場合は全店舗の個別ライン（後方互換性のため残す）
-        for idx, s in enumerate(stores):
-            store_data = []
-            for date in date_range:
-                if date > today:
-                    continue
-                perf = StoreDailyPerformance.objects.filter(store=s, date=date).first()
-                store_data.append(perf.sales_amount if perf else 0)
+class AnalyticsService:
+    """分析データを集計するサービスクラス"""
 
-            base_color = COLOR_PALETTE[idx % len(COLOR_PALETTE)]
-            datasets.append({
-                'label': s.store_name,
-                'data': store_data,
-                'borderColor': base_color,
-                'backgroundColor': base_color,
-                'tension': 0.3,
-                'fill': False,
-                'borderWidth': 2,
-                'pointRadius': 3,
-            })
+    @staticmethod
+    def get_sales_data(store, start_date, end_date, base_store=None, rollups=None):
+        """売上データを取得
 
-        return {
-            'labels': labels,
-            'datasets': datasets,
-            'chart_kind': 'line',
-        }
+        Args:
+            store: 店舗オブジェクト
+            start_date: 開始日
+            end_date: 終了日
+            base_store: 比較用の自店舗（全店舗モード時に指定）
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
+
+        Returns:
+            dict: {labels: [...], data: [...]} または {labels: [...], datasets: [...]}
+        """
+        return AnalyticsService._get_performance_series(
+            'sales_amount', store, start_date, end_date, base_store=base_store, rollups=rollups
+        )
 
     @staticmethod
-    def get_customer_count_data(store, start_date, end_date, base_store=None):
+    def get_customer_count_data(store, start_date, end_date, base_store=None, rollups=None):
         """客数データを取得
 
         Args:
@@ -171,77 +200,90 @@ class AnalyticsService:
             start_date: 開始日
             end_date: 終了日
             base_store: 比較用の自店舗（全店舗モード時に指定）
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
 
         Returns:
             dict: {labels: [...], data: [...]} または {labels: [...], datasets: [...]}
         """
-        # 日付範囲内の全日付を生成
-        date_range = []
+        return AnalyticsService._get_performance_series(
+            'customer_count', store, start_date, end_date, base_store=base_store, rollups=rollups
+        )
+
+    @staticmethod
+    def _get_elapsed_dates(start_date, end_date):
+        """期間内の日付のうち今日までのものを返す（未来日は除外）
+
+        Args:
+            start_date: 開始日
+            end_date: 終了日
+
+        Returns:
+            list: 日付のリスト
+        """
+        today = datetime.now().date()
+        dates = []
         current_date = start_date
-        while current_date <= end_date:
-            date_range.append(current_date)
+        while current_date <= min(end_date, today):
+            dates.append(current_date)
             current_date += timedelta(days=1)
+        return dates
 
-        # 各日付の客数を集計
-        labels = []
-        data = []
-        today = datetime.now().date()
+    @staticmethod
+    def _get_performance_series(field, store, start_date, end_date, base_store=None, rollups=None):
+        """売上・客数の時系列データを生成（期間全体を1クエリで取得し、欠損日は0で補完）
 
-        for date in date_range:
-            # 未来の日付はスキップ
-            if date > today:
-                continue
-            labels.append(date.strftime('%m/%d'))
+        Args:
+            field: 集計するカラム名（'sales_amount' または 'customer_count'）
+            store: 店舗オブジェクト
+            start_date: 開始日
+            end_date: 終了日
+            base_store: 比較用の自店舗（全店舗モード時に指定）
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
+
+        Returns:
+            dict: {labels: [...], data: [...]} または {labels: [...], datasets: [...]}
+        """
+        if rollups is None:
+            rollups = PeriodRollups(start_date, end_date, store=store, base_store=base_store)
+        dates = AnalyticsService._get_elapsed_dates(start_date, end_date)
+        labels = [date.strftime('%m/%d') for date in dates]
 
         # storeが指定されている場合は従来通り単一ラインを返す
         if store:
-            for date in date_range:
-                if date > today:
-                    continue
-
-                perf = StoreDailyPerformance.objects.filter(
-                    store=store,
-                    date=date
-                ).first()
-                data.append(perf.customer_count if perf else 0)
+            values = rollups.performance_values(field, store_ids=[store.pk]).get(store.pk, {})
 
             return {
                 'labels': labels,
-                'data': data,
+                'data': [values.get(date, 0) for date in dates],
             }
 
         # store=None かつ base_store指定時は自店舗と他店舗平均の2本のラインを返す
         datasets = []
         # 本部は除外する
-        stores = Store.objects.exclude(store_name='本部').order_by('store_id')
+        stores = rollups.stores
 
         if base_store:
             # 他店舗（自店舗を除く）
-            other_stores = stores.exclude(pk=base_store.pk)
-            other_store_count = other_stores.count()
+            other_store_ids = [s.pk for s in stores if s.pk != base_store.pk]
+            other_store_count = len(other_store_ids)
+
+            values = rollups.performance_values(field, store_ids=[base_store.pk] + other_store_ids)
 
             # 自店舗データ
-            self_data = []
-            for date in date_range:
-                if date > today:
-                    continue
-                perf = StoreDailyPerformance.objects.filter(store=base_store, date=date).first()
-                self_data.append(perf.customer_count if perf else 0)
+            self_values = values.get(base_store.pk, {})
+            self_data = [self_values.get(date, 0) for date in dates]
 
             # 他店舗平均データ
             other_average_data = []
-            for date in date_range:
-                if date > today:
-                    continue
-                # その日の他店舗の客数を集計
-                daily_customers = StoreDailyPerformance.objects.filter(
-                    store__in=other_stores,
-                    date=date
-                ).aggregate(total=Sum('customer_count'))
-
-                # 平均を計算
-                if other_store_count > 0 and daily_customers['total'] is not None:
-                    other_average_data.append(round(daily_customers['total'] / other_store_count, 2))
+            for date in dates:
+                # その日の他店舗の実績を合計（実績が1件もない日は0）
+                daily_values = [
+                    values[store_id][date]
+                    for store_id in other_store_ids
+                    if date in values.get(store_id, {})
+                ]
+                if other_store_count > 0 and daily_values:
+                    other_average_data.append(round(sum(daily_values) / other_store_count, 2))
                 else:
                     other_average_data.append(0)
 
@@ -277,18 +319,14 @@ class AnalyticsService:
             }
 
         # base_storeが指定されていない場合は全店舗の個別ライン（後方互換性のため残す）
+        values = rollups.performance_values(field, store_ids=[s.pk for s in stores])
         for idx, s in enumerate(stores):
-            store_data = []
-            for date in date_range:
-                if date > today:
-                    continue
-                perf = StoreDailyPerformance.objects.filter(store=s, date=date).first()
-                store_data.append(perf.customer_count if perf else 0)
+            store_values = values.get(s.pk, {})
 
             base_color = COLOR_PALETTE[idx % len(COLOR_PALETTE)]
             datasets.append({
                 'label': s.store_name,
-                'data': store_data,
+                'data': [store_values.get(date, 0) for date in dates],
                 'borderColor': base_color,
                 'backgroundColor': base_color,
                 'tension': 0.3,
@@ -304,7 +342,7 @@ class AnalyticsService:
         }
 
     @staticmethod
-    def get_incident_by_location_data(store, start_date, end_date, genre=None, base_store=None, period='week'):
+    def get_incident_by_location_data(store, start_date, end_date, genre=None, base_store=None, period='week', rollups=None):
         """場所別インシデント数データを取得（積み上げ棒グラフ用 / 比較モード対応）
 
         Args:
@@ -314,6 +352,7 @@ class AnalyticsService:
             genre: 絞り込むジャンル（Noneの場合は全ジャンル）
             base_store: 比較用の自店舗（全店舗モードで自店舗 vs 他店平均を出す場合に指定）
             period: 期間タイプ（'week', 'month', または 'preview'）
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
 
         Returns:
             dict: {labels: [...], datasets: [...]}
@@ -321,149 +360,20 @@ class AnalyticsService:
         # 月選択時は週単位で集計
         if period == 'month':
             return AnalyticsService._get_incident_by_location_weekly(
-                store, start_date, end_date, genre, base_store
+                store, start_date, end_date, genre, base_store, rollups
             )
 
-        # 週選択時またはプレビュー時は日付範囲内の全日付を生成
-        date_range = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_range.append(current_date)
-            current_date += timedelta(days=1)
-
-        # 場所定義と色
-        locations = [
-            ('kitchen', 'キッチン', 'rgb(239, 68, 68)'),      # red
-            ('hall', 'ホール', 'rgb(59, 130, 246)'),          # blue
-            ('cashier', 'レジ', 'rgb(34, 197, 94)'),          # green
-            ('toilet', 'トイレ', 'rgb(234, 179, 8)'),         # yellow
-            ('other', 'その他', 'rgb(156, 163, 175)'),        # gray
+        # 週選択時またはプレビュー時は日単位のバケット
+        buckets = [
+            ('' if period == 'preview' else date.strftime('%m/%d'), date, date)
+            for date in AnalyticsService._get_elapsed_dates(start_date, end_date)
         ]
-
-        labels = []
-        datasets = []
-        today = datetime.now().date()
-
-        # ラベル（日付）を生成
-        for date in date_range:
-            if date > today:
-                continue
-            # プレビューモードの場合はラベルを空文字列に
-            if period == 'preview':
-                labels.append('')
-            else:
-                labels.append(date.strftime('%m/%d'))
-
-        # 比較モード：base_store が指定され、かつ store が None（全店舗モードのとき）
-        if base_store and store is None:
-            # 他店舗の数（本部と自店舗を除外）
-            other_store_qs = Store.objects.exclude(store_name='本部').exclude(pk=base_store.pk)
-            other_store_count = other_store_qs.count()
-
-            # 日付×場所ごとに自店舗と他店舗合計を取得
-            self_counts = {}
-            other_averages = {}
-            for date in date_range:
-                if date > today:
-                    continue
-                self_counts[date] = {}
-                other_averages[date] = {}
-                for location_code, location_label, color in locations:
-                    q_self = DailyReport.objects.filter(date=date, location=location_code, store=base_store)
-                    if genre:
-                        q_self = q_self.filter(genre=genre)
-                    else:
-                        # ネガティブジャンル：クレームと事故のみ
-                        q_self = q_self.filter(genre__in=['claim', 'accident'])
-                    self_counts[date][location_code] = q_self.count()
-
-                    q_other = DailyReport.objects.filter(date=date, location=location_code).exclude(store__store_name='本部').exclude(store=base_store)
-                    if genre:
-                        q_other = q_other.filter(genre=genre)
-                    else:
-                        # ネガティブジャンル：クレームと事故のみ
-                        q_other = q_other.filter(genre__in=['claim', 'accident'])
-                    other_total = q_other.count()
-
-                    # 他店舗平均を計算
-                    if other_store_count > 0:
-                        other_averages[date][location_code] = round(other_total / other_store_count, 2)
-                    else:
-                        other_averages[date][location_code] = 0.0
-
-            # 各場所ごとに差分（自店舗 - 他店舗平均）を計算
-            for location_code, location_label, color in locations:
-                diff_series = []
-                for date in date_range:
-                    if date > today:
-                        continue
-                    # 差分を計算（自店舗 - 他店舗平均）
-                    diff = self_counts[date][location_code] - other_averages[date][location_code]
-                    diff_series.append(round(diff, 2))
-
-                datasets.append({
-                    'label': location_label,
-                    'data': diff_series,
-                    'backgroundColor': color,
-                    'location_code': location_code,
-                    'location_label': location_label,
-                })
-
-            return {
-                'labels': labels,
-                'datasets': datasets,
-                'is_comparison': True,  # 比較モードであることを示すフラグ
-            }
-
-        # 従来モード：全日付・全場所のデータを先に取得
-        all_data = {}
-        for date in date_range:
-            if date > today:
-                continue
-            all_data[date] = {}
-            for location_code, location_label, color in locations:
-                query = DailyReport.objects.filter(
-                    date=date,
-                    location=location_code
-                )
-                if store:
-                    query = query.filter(store=store)
-                else:
-                    # 全店舗の際は本部を除外
-                    query = query.exclude(store__store_name='本部')
-                if genre:
-                    query = query.filter(genre=genre)
-                else:
-                    # ネガティブジャンル：クレームと事故のみ
-                    query = query.filter(genre__in=['claim', 'accident'])
-                all_data[date][location_code] = query.count()
-
-        # 各場所ごとのデータを集計（棒グラフ用）
-        for location_code, location_label, color in locations:
-            location_data = []
-            for date in date_range:
-                # 未来の日付はスキップ
-                if date > today:
-                    continue
-
-                # 事前に取得したデータを使用
-                count = all_data[date][location_code]
-                location_data.append(count)
-
-            datasets.append({
-                'label': location_label,
-                'data': location_data,
-                'backgroundColor': color,
-                'stack': 'bar',  # 棒グラフ用のスタック
-            })
-
-        return {
-            'labels': labels,
-            'datasets': datasets,
-        }
+        return AnalyticsService._build_incident_by_location(
+            store, start_date, end_date, buckets, genre, base_store, rollups
+        )
 
     @staticmethod
-    def _get_incident_by_location_weekly(store, start_date, end_date, genre=None, base_store=None):
+    def _get_incident_by_location_weekly(store, start_date, end_date, genre=None, base_store=None, rollups=None):
         """場所別インシデント数データを週単位で集計（月選択時用）
 
         Args:
@@ -472,90 +382,60 @@ class AnalyticsService:
             end_date: 終了日
             genre: 絞り込むジャンル（Noneの場合は全ジャンル）
             base_store: 比較用の自店舗（全店舗モードで自店舗 vs 他店平均を出す場合に指定）
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
 
         Returns:
             dict: {labels: [...], datasets: [...]}
         """
-        # 月を週に分割
-        weeks = AnalyticsService.split_month_into_weeks(start_date, end_date)
-
-        # 場所定義と色
-        locations = [
-            ('kitchen', 'キッチン', 'rgb(239, 68, 68)'),      # red
-            ('hall', 'ホール', 'rgb(59, 130, 246)'),          # blue
-            ('cashier', 'レジ', 'rgb(34, 197, 94)'),          # green
-            ('toilet', 'トイレ', 'rgb(234, 179, 8)'),         # yellow
-            ('other', 'その他', 'rgb(156, 163, 175)'),        # gray
-        ]
+        return AnalyticsService._build_incident_by_location(
+            store, start_date, end_date,
+            AnalyticsService._get_week_buckets(start_date, end_date),
+            genre, base_store, rollups
+        )
 
-        labels = []
-        datasets = []
-        today = datetime.now().date()
+    @staticmethod
+    def _build_incident_by_location(store, start_date, end_date, buckets, genre=None, base_store=None, rollups=None):
+        """場所別インシデント数をバケット（日または週）ごとに集計
 
-        # ラベル（週）を生成
-        for week_start, week_end, week_label in weeks:
-            # 未来の週はスキップ
-            if week_start > today:
-                continue
-            labels.append(week_label)
+        Args:
+            store: 店舗オブジェクト
+            start_date: 開始日
+            end_date: 終了日
+            buckets: [(label, bucket_start, bucket_end), ...]
+            genre: 絞り込むジャンル（Noneの場合はネガティブジャンル）
+            base_store: 比較用の自店舗（全店舗モードで自店舗 vs 他店平均を出す場合に指定）
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
+
+        Returns:
+            dict: {labels: [...], datasets: [...]}
+        """
+        if rollups is None:
+            rollups = PeriodRollups(start_date, end_date, store=store, base_store=base_store)
+        matrix = rollups.incident_matrix()
+        labels = [label for label, _, _ in buckets]
+        datasets = []
 
         # 比較モード：base_store が指定され、かつ store が None（全店舗モードのとき）
         if base_store and store is None:
             # 他店舗の数（本部と自店舗を除外）
-            other_store_qs = Store.objects.exclude(store_name='本部').exclude(pk=base_store.pk)
-            other_store_count = other_store_qs.count()
-
-            # 週×場所ごとに自店舗と他店舗合計を取得
-            self_counts = {}
-            other_averages = {}
-            for week_start, week_end, week_label in weeks:
-                # 未来の週はスキップ
-                if week_start > today:
-                    continue
-                self_counts[week_label] = {}
-                other_averages[week_label] = {}
-                for location_code, location_label, color in locations:
-                    # 週の範囲内でクエリ
-                    q_self = DailyReport.objects.filter(
-                        date__gte=week_start,
-                        date__lte=min(week_end, today),
-                        location=location_code,
-                        store=base_store
-                    )
-                    if genre:
-                        q_self = q_self.filter(genre=genre)
-                    else:
-                        # ネガティブジャンル：クレームと事故のみ
-                        q_self = q_self.filter(genre__in=['claim', 'accident'])
-                    self_counts[week_label][location_code] = q_self.count()
-
-                    q_other = DailyReport.objects.filter(
-                        date__gte=week_start,
-                        date__lte=min(week_end, today),
-                        location=location_code
-                    ).exclude(store__store_name='本部').exclude(store=base_store)
-                    if genre:
-                        q_other = q_other.filter(genre=genre)
-                    else:
-                        # ネガティブジャンル：クレームと事故のみ
-                        q_other = q_other.filter(genre__in=['claim', 'accident'])
-                    other_total = q_other.count()
+            other_store_count = AnalyticsService._count_other_stores(base_store, rollups)
 
+            # 各場所ごとに差分（自店舗 - 他店舗平均）を計算
+            for location_code, location_label, color in INCIDENT_LOCATIONS:
+                diff_series = []
+                for _, bucket_start, bucket_end in buckets:
+                    self_count = matrix.count(
+                        bucket_start, bucket_end, location_code, genre, store_id=base_store.pk
+                    )
+                    other_total = matrix.count(
+                        bucket_start, bucket_end, location_code, genre, exclude_store_id=base_store.pk
+                    )
                     # 他店舗平均を計算
                     if other_store_count > 0:
-                        other_averages[week_label][location_code] = round(other_total / other_store_count, 2)
+                        other_average = round(other_total / other_store_count, 2)
                     else:
-                        other_averages[week_label][location_code] = 0.0
-
-            # 各場所ごとに差分（自店舗 - 他店舗平均）を計算
-            for location_code, location_label, color in locations:
-                diff_series = []
-                for week_start, week_end, week_label in weeks:
-                    if week_start > today:
-                        continue
-                    # 差分を計算（自店舗 - 他店舗平均）
-                    diff = self_counts[week_label][location_code] - other_averages[week_label][location_code]
-                    diff_series.append(round(diff, 2))
+                        other_average = 0.0
+                    diff_series.append(round(self_count - other_average, 2))
 
                 datasets.append({
                     'label': location_label,
@@ -571,45 +451,14 @@ class AnalyticsService:
                 'is_comparison': True,  # 比較モードであることを示すフラグ
             }
 
-        # 従来モード：全週・全場所のデータを先に取得
-        all_data = {}
-        for week_start, week_end, week_label in weeks:
-            if week_start > today:
-                continue
-            all_data[week_label] = {}
-            for location_code, location_label, color in locations:
-                query = DailyReport.objects.filter(
-                    date__gte=week_start,
-                    date__lte=min(week_end, today),
-                    location=location_code
-                )
-                if store:
-                    query = query.filter(store=store)
-                else:
-                    # 全店舗の際は本部を除外
-                    query = query.exclude(store__store_name='本部')
-                if genre:
-                    query = query.filter(genre=genre)
-                else:
-                    # ネガティブジャンル：クレームと事故のみ
-                    query = query.filter(genre__in=['claim', 'accident'])
-                all_data[week_label][location_code] = query.count()
-
-        # 各場所ごとのデータを集計（棒グラフ用）
-        for location_code, location_label, color in locations:
-            location_data = []
-            for week_start, week_end, week_label in weeks:
-                # 未来の週はスキップ
-                if week_start > today:
-                    continue
-
-                # 事前に取得したデータを使用
-                count = all_data[week_label][location_code]
-                location_data.append(count)
-
+        # 従来モード：各場所ごとのデータを集計（棒グラフ用）
+        for location_code, location_label, color in INCIDENT_LOCATIONS:
             datasets.append({
                 'label': location_label,
-                'data': location_data,
+                'data': [
+                    matrix.count(bucket_start, bucket_end, location_code, genre)
+                    for _, bucket_start, bucket_end in buckets
+                ],
                 'backgroundColor': color,
                 'stack': 'bar',  # 棒グラフ用のスタック
             })
@@ -620,7 +469,7 @@ class AnalyticsService:
         }
 
     @staticmethod
-    def get_incident_trend_by_location(store, start_date, end_date, location, genre=None, period='week', base_store=None):
+    def get_incident_trend_by_location(store, start_date, end_date, location, genre=None, period='week', base_store=None, rollups=None):
         """特定場所のインシデント推移データを取得（折れ線グラフ用）
 
         Args:
@@ -631,96 +480,32 @@ class AnalyticsService:
             genre: 絞り込むジャンル（Noneの場合は全ジャンル）
             period: 期間タイプ（'week', 'month', または 'preview'）
             base_store: 比較用の自店舗（全店舗モード時に指定）
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
 
         Returns:
             dict: {labels: [...], data: [...]} または {labels: [...], datasets: [...]}
         """
-        today = datetime.now().date()
-
         # 比較モード：base_store が指定され、かつ store が None（全店舗モードのとき）
         if base_store and store is None:
             return AnalyticsService._get_incident_trend_comparison(
-                base_store, start_date, end_date, location, genre, period
+                base_store, start_date, end_date, location, genre, period, rollups
             )
 
-        # 月選択時は週単位で集計（プレビューは除く）
-        if period == 'month':
-            weeks = AnalyticsService.split_month_into_weeks(start_date, end_date)
-            labels = []
-            data = []
-
-            for week_start, week_end, week_label in weeks:
-                if week_start > today:
-                    continue
-                labels.append(week_label)
-
-                # 週の範囲内でクエリ
-                query = DailyReport.objects.filter(
-                    date__gte=week_start,
-                    date__lte=min(week_end, today)
-                )
-                # 場所フィルタ（'all'の場合は全場所）
-                if location != 'all':
-                    query = query.filter(location=location)
-                if store:
-                    query = query.filter(store=store)
-                else:
-                    query = query.exclude(store__store_name='本部')
-                if genre:
-                    query = query.filter(genre=genre)
-                else:
-                    # ネガティブジャンル：クレームと事故のみ
-                    query = query.filter(genre__in=['claim', 'accident'])
-
-                data.append(query.count())
-
-            return {
-                'labels': labels,
-                'data': data,
-            }
-
-        # 週選択時は日単位で集計
-        date_range = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_range.append(current_date)
-            current_date += timedelta(days=1)
-
-        labels = []
-        data = []
-
-        for date in date_range:
-            if date > today:
-                continue
-            # プレビューモードの場合はラベルを空文字列に
-            if period == 'preview':
-                labels.append('')
-            else:
-                labels.append(date.strftime('%m/%d'))
-
-            query = DailyReport.objects.filter(date=date)
-            # 場所フィルタ（'all'の場合は全場所）
-            if location != 'all':
-                query = query.filter(location=location)
-            if store:
-                query = query.filter(store=store)
-            else:
-                query = query.exclude(store__store_name='本部')
-            if genre:
-                query = query.filter(genre=genre)
-            else:
-                # ネガティブジャンル：クレームと事故のみ
-                query = query.filter(genre__in=['claim', 'accident'])
-
-            data.append(query.count())
+        if rollups is None:
+            rollups = PeriodRollups(start_date, end_date, store=store)
+        matrix = rollups.incident_matrix()
+        buckets = AnalyticsService._get_trend_buckets(start_date, end_date, period)
 
         return {
-            'labels': labels,
-            'data': data,
+            'labels': [label for label, _, _ in buckets],
+            'data': [
+                matrix.count(bucket_start, bucket_end, location, genre)
+                for _, bucket_start, bucket_end in buckets
+            ],
         }
 
     @staticmethod
-    def _get_incident_trend_comparison(base_store, start_date, end_date, location, genre, period):
+    def _get_incident_trend_comparison(base_store, start_date, end_date, location, genre, period, rollups=None):
         """場所別インシデント推移の比較モード（自店舗 vs 他店舗平均）
 
         Args:
@@ -730,104 +515,34 @@ class AnalyticsService:
             location: 場所コード
             genre: ジャンル
             period: 期間タイプ
+            rollups: 共有する PeriodRollups（Noneの場合はこの呼び出しで取得）
 
         Returns:
             dict: {labels: [...], datasets: [...]}
         """
-        today = datetime.now().date()
-        other_stores = Store.objects.exclude(store_name='本部').exclude(pk=base_store.pk)
-        other_store_count = other_stores.count()
-
-        datasets = []
+        if rollups is None:
+            rollups = PeriodRollups(start_date, end_date, base_store=base_store)
+        other_store_count = AnalyticsService._count_other_stores(base_store, rollups)
+        matrix = rollups.incident_matrix()
+        buckets = AnalyticsService._get_trend_buckets(start_date, end_date, period)
 
-        # 月選択時は週単位で集計
-        if period == 'month':
-            weeks = AnalyticsService.split_month_into_weeks(start_date, end_date)
-            labels = []
-            self_data = []
-            other_avg_data = []
-
-            for week_start, week_end, week_label in weeks:
-                if week_start > today:
-                    continue
-                labels.append(week_label)
-
-                # 自店舗のクエリ
-                q_self = DailyReport.objects.filter(
-                    date__gte=week_start,
-                    date__lte=min(week_end, today),
-                    store=base_store
-                )
-                if location != 'all':
-                    q_self = q_self.filter(location=location)
-                if genre:
-                    q_self = q_self.filter(genre=genre)
-                else:
-                    q_self = q_self.filter(genre__in=['claim', 'accident'])
-                self_data.append(q_self.count())
-
-                # 他店舗のクエリ
-                q_other = DailyReport.objects.filter(
-                    date__gte=week_start,
-                    date__lte=min(week_end, today)
-                ).exclude(store__store_name='本部').exclude(store=base_store)
-                if location != 'all':
-                    q_other = q_other.filter(location=location)
-                if genre:
-                    q_other = q_other.filter(genre=genre)
-                else:
-                    q_other = q_other.filter(genre__in=['claim', 'accident'])
-                other_total = q_other.count()
-
-                if other_store_count > 0:
-                    other_avg_data.append(round(other_total / other_store_count, 2))
-                else:
-                    other_avg_data.append(0)
-
-        else:
-            # 週選択時・プレビュー時は日単位で集計
-            date_range = []
-            current_date = start_date
-            while current_date <= end_date:
-                date_range.append(current_date)
-                current_date += timedelta(days=1)
-
-            labels = []
-            self_data = []
-            other_avg_data = []
-
-            for date in date_range:
-                if date > today:
-                    continue
-                if period == 'preview':
-                    labels.append('')
-                else:
-                    labels.append(date.strftime('%m/%d'))
-
-                # 自店舗のクエリ
-                q_self = DailyReport.objects.filter(date=date, store=base_store)
-                if location != 'all':
-                    q_self = q_self.filter(location=location)
-                if genre:
-                    q_self = q_self.filter(genre=genre)
-                else:
-                    q_self = q_self.filter(genre__in=['claim', 'accident'])
-                self_data.append(q_self.count())
-
-                # 他店舗のクエリ
-                q_other = DailyReport.objects.filter(date=date).exclude(store__store_name='本部').exclude(store=base_store)
-                if location != 'all':
-                    q_other = q_other.filter(location=location)
-                if genre:
-                    q_other = q_other.filter(genre=genre)
-                else:
-                    q_other = q_other.filter(genre__in=['claim', 'accident'])
-                other_total = q_other.count()
+        labels = []
+        self_data = []
+        other_avg_data = []
+        for label, bucket_start, bucket_end in buckets:
+            labels.append(label)
+            self_data.append(
+                matrix.count(bucket_start, bucket_end, location, genre, store_id=base_store.pk)
+            )
+            other_total = matrix.count(
+                bucket_start, bucket_end, location, genre, exclude_store_id=base_store.pk
+            )
+            if other_store_count > 0:
+                other_avg_data.append(round(other_total / other_store_count, 2))
+            else:
+                other_avg_data.append(0)
 
-                if other_store_count > 0:
-                    other_avg_data.append(round(other_total / other_store_count, 2))
-                else:
-                    other_avg_data.append(0)
+        datasets = []
 
         # 自店舗の折れ線
         datasets.append({
@@ -860,6 +575,57 @@ class AnalyticsService:
             'chart_kind': 'line',
         }
 
+    @staticmethod
+    def _get_week_buckets(start_date, end_date):
+        """月の期間を週バケットに分割（未来の週は除外）
+
+        Args:
+            start_date: 月の開始日
+            end_date: 月の終了日
+
+        Returns:
+            list: [(week_label, week_start, week_end), ...]
+        """
+        today = datetime.now().date()
+        return [
+            (week_label, week_start, week_end)
+            for week_start, week_end, week_label in AnalyticsService.split_month_into_weeks(start_date, end_date)
+            if week_start <= today
+        ]
+
+    @staticmethod
+    def _get_trend_buckets(start_date, end_date, period):
+        """推移グラフ用のバケットを生成（月選択時は週単位、それ以外は日単位）
+
+        Args:
+            start_date: 開始日
+            end_date: 終了日
+            period: 期間タイプ（'week', 'month', または 'preview'）
+
+        Returns:
+            list: [(label, bucket_start, bucket_end), ...]
+        """
+        if period == 'month':
+            return AnalyticsService._get_week_buckets(start_date, end_date)
+
+        return [
+            ('' if period == 'preview' else date.strftime('%m/%d'), date, date)
+            for date in AnalyticsService._get_elapsed_dates(start_date, end_date)
+        ]
+
+    @staticmethod
+    def _count_other_stores(base_store, rollups):
+        """比較対象となる他店舗の数（本部と自店舗を除外）を取得
+
+        Args:
+            base_store: 自店舗
+            rollups: 店舗一覧を共有する PeriodRollups
+
+        Returns:
+            int: 他店舗数
+        """
+        return sum(1 for s in rollups.stores if s.pk != base_store.pk)
+
     @staticmethod
     def get_week_range(base_date=None):
         """指定日を含む週の開始日と終了日を取得
@@ -993,7 +759,7 @@ class AnalyticsService:
         return start_date, end_date, period_label
 
     @staticmethod
-    def get_graph_data_by_type(graph_type, store, start_date, end_date, genre=None, base_store=None, period='week', location=None):
+    def get_graph_data_by_type(graph_type, store, start_date, end_date, genre=None, base_store=None, period='week', location=None, rollups=None):
         """グラフタイプに応じてデータを取得
 
         Args:
@@ -1005,6 +771,7 @@ class AnalyticsService:
             base_store: 比較モードの自店舗（optional）
             period: 期間タイプ（'week' または 'month'）
             location: 場所コード（incident_trend_by_locationの場合のみ使用）
+            rollups: 複数グラフで共有する PeriodRollups（Noneの場合はグラフごとに取得）
 
         Returns:
             dict: {title: str, chart_data: dict}
@@ -1013,13 +780,15 @@ class AnalyticsService:
             ValueError: 不正なグラフタイプの場合
         """
         if graph_type == 'sales':
-            chart_data = AnalyticsService.get_sales_data(store, start_date, end_date, base_store=base_store)
+            chart_data = AnalyticsService.get_sales_data(store, start_date, end_date, base_store=base_store, rollups=rollups)
             title = '売上推移'
         elif graph_type == 'customer_count':
-            chart_data = AnalyticsService.get_customer_count_data(store, start_date, end_date, base_store=base_store)
+            chart_data = AnalyticsService.get_customer_count_data(store, start_date, end_date, base_store=base_store, rollups=rollups)
             title = '客数推移'
         elif graph_type == 'incident_by_location':
-            chart_data = AnalyticsService.get_incident_by_location_data(store, start_date, end_date, genre, base_store, period)
+            chart_data = AnalyticsService.get_incident_by_location_data(
+                store, start_date, end_date, genre, base_store, period, rollups=rollups
+            )
             # ジャンル名のマッピング
             genre_labels = {
                 'claim': 'クレーム',
@@ -1033,7 +802,9 @@ class AnalyticsService:
         elif graph_type == 'incident_trend_by_location':
             if not location:
                 raise ValueError('場所が指定されていません')
-            chart_data = AnalyticsService.get_incident_trend_by_location(store, start_date, end_date, location, genre, period, base_store=base_store)
+            chart_data = AnalyticsService.get_incident_trend_by_location(
+                store, start_date, end_date, location, genre, period, base_store=base_store, rollups=rollups
+            )
             # 場所名のマッピング
             location_labels = {
                 'kitchen': 'キッチン',
@@ -1095,3 +866,125 @@ class AnalyticsService:
                 'achievement_rate': 0,
                 'achievement_text': '',
             }
+
+
+class DailyRollupService:
+    """店舗日次集計（StoreDailyRollup）を更新するサービスクラス"""
+
+    @staticmethod
+    def _build_rollup_fields(report_rows, performance=None):
+        """日報の集計行と実績から集計レコードのフィールド値を生成
+
+        Args:
+            report_rows: (genre, location, count) のイテラブル
+            performance: 実績の辞書（sales_amount, customer_count, cash_difference）またはNone
+
+        Returns:
+            dict: StoreDailyRollupのフィールド値
+        """
+        fields = {
+            'report_count': 0,
+            'incident_matrix': {},
+        }
+        for field_name in StoreDailyRollup.GENRE_COUNT_FIELDS.values():
+            fields[field_name] = 0
+        for field_name in StoreDailyRollup.LOCATION_COUNT_FIELDS.values():
+            fields[field_name] = 0
+
+        for genre, location, count in report_rows:
+            fields['report_count'] += count
+            if genre in StoreDailyRollup.GENRE_COUNT_FIELDS:
+                fields[StoreDailyRollup.GENRE_COUNT_FIELDS[genre]] += count
+            if location in StoreDailyRollup.LOCATION_COUNT_FIELDS:
+                fields[StoreDailyRollup.LOCATION_COUNT_FIELDS[location]] += count
+            genre_cells = fields['incident_matrix'].setdefault(genre, {})
+            genre_cells[location] = genre_cells.get(location, 0) + count
+
+        fields['has_performance'] = performance is not None
+        fields['sales_amount'] = performance['sales_amount'] if performance else None
+        fields['customer_count'] = performance['customer_count'] if performance else None
+        fields['cash_difference'] = performance['cash_difference'] if performance else None
+
+        return fields
+
+    @staticmethod
+    def refresh(store_id, date):
+        """指定店舗・日付の集計レコードを元データから再計算
+
+        Args:
+            store_id: 店舗ID
+            date: 日付
+
+        Returns:
+            StoreDailyRollup: 更新後の集計レコード（元データがない場合はNone）
+        """
+        report_rows = [
+            (row['genre'], row['location'], row['count'])
+            for row in DailyReport.objects.filter(store_id=store_id, date=date)
+            .values('genre', 'location').annotate(count=Count('pk'))
+        ]
+        performance = StoreDailyPerformance.objects.filter(
+            store_id=store_id, date=date
+        ).values('sales_amount', 'customer_count', 'cash_difference').first()
+
+        # 元データがなくなった日は集計レコードも削除
+        if not report_rows and performance is None:
+            StoreDailyRollup.objects.filter(store_id=store_id, date=date).delete()
+            return None
+
+        rollup, _ = StoreDailyRollup.objects.update_or_create(
+            store_id=store_id,
+            date=date,
+            defaults=DailyRollupService._build_rollup_fields(report_rows, performance),
+        )
+        return rollup
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(start_date=None, end_date=None, store_id=None):
+        """集計レコードを元データから一括で再構築
+
+        Args:
+            start_date: 開始日（Noneの場合は制限なし）
+            end_date: 終了日（Noneの場合は制限なし）
+            store_id: 店舗ID（Noneの場合は全店舗）
+
+        Returns:
+            int: 作成した集計レコード数
+        """
+        filters = {}
+        if start_date:
+            filters['date__gte'] = start_date
+        if end_date:
+            filters['date__lte'] = end_date
+        if store_id:
+            filters['store_id'] = store_id
+
+        report_rows = defaultdict(list)
+        for row in DailyReport.objects.filter(**filters).values(
+            'store_id', 'date', 'genre', 'location'
+        ).annotate(count=Count('pk')):
+            report_rows[(row['store_id'], row['date'])].append(
+                (row['genre'], row['location'], row['count'])
+            )
+
+        performances = {
+            (row['store_id'], row['date']): row
+            for row in StoreDailyPerformance.objects.filter(**filters).values(
+                'store_id', 'date', 'sales_amount', 'customer_count', 'cash_difference'
+            )
+        }
+
+        StoreDailyRollup.objects.filter(**filters).delete()
+
+        rollups = [
+            StoreDailyRollup(
+                store_id=key[0],
+                date=key[1],
+                **DailyRollupService._build_rollup_fields(report_rows.get(key, ()), performances.get(key)),
+            )
+            for key in set(report_rows) | set(performances)
+        ]
+        StoreDailyRollup.objects.bulk_create(rollups, batch_size=500)
+
+        return len(rollups)
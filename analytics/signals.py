@@ -0,0 +1,67 @@
+"""
+店舗日次集計（StoreDailyRollup）とグラフキャッシュの自動更新
+
+日報・店舗日次実績の保存/削除時に、影響を受ける店舗×日付の集計レコードを再計算し、
+該当する店舗・月のグラフキャッシュを無効化する。
+どちらもコミット後に行う（コミット前に無効化すると、並行するリクエストが更新前のデータを
+新しいバージョンでキャッシュしてしまうため）。
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from reports.models import DailyReport, StoreDailyPerformance
+from stores.models import Store
+
+from .cache import GraphDataCache
+from .services import DailyRollupService
+
+
+def _rollup_key(instance):
+    """集計キー（店舗ID, 日付）を取得（日付が文字列で代入されている場合もdateに変換）"""
+    return instance.store_id, instance._meta.get_field('date').to_python(instance.date)
+
+
+def _refresh_after_commit(*keys):
+    """コミット後に集計の再計算とグラフキャッシュの無効化を行う"""
+    def refresh():
+        for key in keys:
+            DailyRollupService.refresh(*key)
+            GraphDataCache.invalidate(*key)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(pre_save, sender=DailyReport)
+@receiver(pre_save, sender=StoreDailyPerformance)
+def remember_rollup_key(sender, instance, **kwargs):
+    """更新前の店舗・日付を保持（店舗や日付が変更された場合に旧集計も更新するため）"""
+    if instance._state.adding or instance.pk is None:
+        instance._rollup_previous_key = None
+        return
+    instance._rollup_previous_key = sender.objects.filter(pk=instance.pk).values_list(
+        'store_id', 'date'
+    ).first()
+
+
+@receiver(post_save, sender=DailyReport)
+@receiver(post_save, sender=StoreDailyPerformance)
+def refresh_rollup_on_save(sender, instance, **kwargs):
+    """保存後に該当する店舗×日付の集計を再計算"""
+    current_key = _rollup_key(instance)
+    previous_key = getattr(instance, '_rollup_previous_key', None)
+
+    if previous_key and tuple(previous_key) != current_key:
+        _refresh_after_commit(current_key, tuple(previous_key))
+    else:
+        _refresh_after_commit(current_key)
+
+
+@receiver(post_delete, sender=DailyReport)
+@receiver(post_delete, sender=StoreDailyPerformance)
+def refresh_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    """削除後に該当する店舗×日付の集計を再計算"""
+    # 店舗ごと削除される場合は集計レコードもCASCADEで削除されるため再計算しない
+    if isinstance(origin, Store) or getattr(origin, 'model', None) is Store:
+        return
+    _refresh_after_commit(_rollup_key(instance))
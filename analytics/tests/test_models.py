@@ -16,4 +16,116 @@ class AnalyticsModelDependencyTests(TestCase):
         self.assertTrue(hasattr(Store, 'objects'))
         self.assertTrue(hasattr(DailyReport, 'objects'))
         self.assertTrue(hasattr(StoreDailyPerformance, 'objects'))
-        self.assertTrue(hasattr(MonthlyGoal, 'objects'))
\ No newline at end of file
+        self.assertTrue(hasattr(MonthlyGoal, 'objects'))
+
+class StoreDailyRollupTests(TestCase):
+    """
+    店舗日次集計（StoreDailyRollup）の自動更新と再構築のテスト
+    """
+
+    def setUp(self):
+        from datetime import date
+        self.store = Store.objects.create(store_name='A店', address='東京都')
+        self.day = date(2025, 1, 10)
+
+    def _create_report(self, **kwargs):
+        params = {
+            'store': self.store, 'date': self.day, 'genre': 'claim',
+            'location': 'hall', 'title': 't', 'content': 'c',
+        }
+        params.update(kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return DailyReport.objects.create(**params)
+
+    def _rollup(self, day=None):
+        from analytics.models import StoreDailyRollup
+        return StoreDailyRollup.objects.filter(store=self.store, date=day or self.day).first()
+
+    def test_report_create_updates_rollup(self):
+        """日報作成時にジャンル・場所別件数が集計されること"""
+        self._create_report()
+        self._create_report(genre='praise', location='kitchen')
+
+        rollup = self._rollup()
+        self.assertEqual(rollup.report_count, 2)
+        self.assertEqual(rollup.claim_count, 1)
+        self.assertEqual(rollup.praise_count, 1)
+        self.assertEqual(rollup.hall_count, 1)
+        self.assertEqual(rollup.incident_matrix, {'claim': {'hall': 1}, 'praise': {'kitchen': 1}})
+        self.assertFalse(rollup.has_performance)
+
+    def test_performance_save_updates_rollup(self):
+        """実績の登録・更新が集計に反映されること"""
+        with self.captureOnCommitCallbacks(execute=True):
+            perf = StoreDailyPerformance.objects.create(
+                store=self.store, date=self.day, sales_amount=1000, customer_count=10
+            )
+        self.assertEqual(self._rollup().sales_amount, 1000)
+
+        perf.sales_amount = 2000
+        with self.captureOnCommitCallbacks(execute=True):
+            perf.save()
+        rollup = self._rollup()
+        self.assertTrue(rollup.has_performance)
+        self.assertEqual(rollup.sales_amount, 2000)
+
+    def test_report_with_string_date_updates_rollup(self):
+        """日付を文字列で指定して作成した場合も集計されること"""
+        self._create_report(date='2025-01-10')
+        self.assertEqual(self._rollup().claim_count, 1)
+
+    def test_report_date_change_refreshes_both_days(self):
+        """日報の日付変更時に変更前・変更後の両方の集計が更新されること"""
+        from datetime import timedelta
+        report = self._create_report()
+
+        report.date = self.day + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            report.save()
+
+        self.assertIsNone(self._rollup())
+        self.assertEqual(self._rollup(report.date).claim_count, 1)
+
+    def test_report_delete_updates_rollup(self):
+        """日報削除時に集計が更新されること"""
+        report = self._create_report()
+        self._create_report()
+        with self.captureOnCommitCallbacks(execute=True):
+            report.delete()
+        self.assertEqual(self._rollup().report_count, 1)
+
+    def test_rollup_refreshed_after_commit(self):
+        """集計の再計算はコミット後に行われること"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            DailyReport.objects.create(
+                store=self.store, date=self.day, genre='claim', location='hall', title='t', content='c'
+            )
+            self.assertIsNone(self._rollup())
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(self._rollup().claim_count, 1)
+
+    def test_store_delete_cascades_rollup(self):
+        """店舗削除時に集計レコードも削除されること"""
+        from analytics.models import StoreDailyRollup
+        self._create_report()
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreDailyPerformance.objects.create(
+                store=self.store, date=self.day, sales_amount=1000, customer_count=10
+            )
+            self.store.delete()
+        self.assertFalse(StoreDailyRollup.objects.exists())
+
+    def test_rebuild_command(self):
+        """シグナルを経由しない変更が再構築コマンドで反映されること"""
+        from django.core.management import call_command
+        from io import StringIO
+        self._create_report()
+        DailyReport.objects.filter(store=self.store).update(genre='accident')
+
+        call_command('rebuild_daily_rollups', stdout=StringIO())
+
+        rollup = self._rollup()
+        self.assertEqual(rollup.claim_count, 0)
+        self.assertEqual(rollup.accident_count, 1)
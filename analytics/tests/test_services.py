@@ -25,7 +25,8 @@ class AnalyticsServiceTest(TestCase):
         )
         
         self.today = datetime.now().date()
-        self.create_test_data()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_test_data()
 
     def create_test_data(self):
         # 過去7日間の売上データ
@@ -307,3 +308,147 @@ class AnalyticsServiceTest(TestCase):
             start.month > self.today.month or
             (start.month < self.today.month and start.year > self.today.year)
         )
+
+    def test_get_sales_data_comparison_with_other_store_average(self):
+        """全店舗モードで自店舗と他店舗平均が算出されるテスト"""
+        other_a = Store.objects.create(store_name='B店', address='東京都', store_id=2)
+        Store.objects.create(store_name='C店', address='東京都', store_id=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreDailyPerformance.objects.create(
+                store=other_a, date=self.today, sales_amount=90000, customer_count=30
+            )
+
+        result = AnalyticsService.get_sales_data(None, self.today - timedelta(days=1), self.today, base_store=self.store)
+
+        self.assertEqual(result['chart_kind'], 'line')
+        self_line, other_line = result['datasets']
+        self.assertEqual(self_line['data'], [150000, 160000])
+        # 実績のない日は0、ある日は他店舗数（2店舗）で割った平均
+        self.assertEqual(other_line['data'], [0, 45000.0])
+
+    def test_get_sales_data_all_stores_lines(self):
+        """base_store未指定の全店舗モードで店舗ごとのラインが返るテスト"""
+        Store.objects.create(store_name='本部', address='東京都', store_id=99)
+        other = Store.objects.create(store_name='B店', address='東京都', store_id=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreDailyPerformance.objects.create(
+                store=other, date=self.today, sales_amount=1000, customer_count=3
+            )
+
+        result = AnalyticsService.get_customer_count_data(None, self.today, self.today)
+
+        self.assertEqual([d['label'] for d in result['datasets']], ['A店', 'B店'])
+        self.assertEqual(result['datasets'][1]['data'], [3])
+
+    def test_get_sales_data_query_count_is_constant(self):
+        """期間の長さに関わらずクエリ数が一定であることのテスト"""
+        Store.objects.create(store_name='B店', address='東京都', store_id=2)
+        month_start = self.today - timedelta(days=30)
+
+        with self.assertNumQueries(1):
+            AnalyticsService.get_sales_data(self.store, month_start, self.today)
+        with self.assertNumQueries(2):
+            AnalyticsService.get_sales_data(None, month_start, self.today, base_store=self.store)
+        with self.assertNumQueries(2):
+            AnalyticsService.get_customer_count_data(None, month_start, self.today)
+
+    def test_get_incident_by_location_comparison_diff(self):
+        """比較モードで自店舗と他店舗平均の差分が返るテスト"""
+        other = Store.objects.create(store_name='B店', address='東京都', store_id=2)
+        hq = Store.objects.create(store_name='本部', address='東京都', store_id=99)
+        with self.captureOnCommitCallbacks(execute=True):
+            for target in (other, other, hq):
+                DailyReport.objects.create(
+                    store=target, user=self.staff, date=self.today,
+                    genre='accident', location='hall', title='t', content='c'
+                )
+
+        result = AnalyticsService.get_incident_by_location_data(
+            None, self.today, self.today, base_store=self.store
+        )
+
+        self.assertTrue(result['is_comparison'])
+        hall = next(d for d in result['datasets'] if d['location_code'] == 'hall')
+        # 自店舗: 今日のクレーム1件 - 他店舗平均: 2件 / 1店舗（本部は除外）
+        self.assertEqual(hall['data'], [-1])
+
+    def test_get_incident_by_location_weekly_buckets(self):
+        """月選択時は週単位で集計されるテスト"""
+        start, end = AnalyticsService.get_month_range(self.today)
+        result = AnalyticsService.get_incident_by_location_data(self.store, start, end, period='month')
+
+        weeks = [w for w in AnalyticsService.split_month_into_weeks(start, end) if w[0] <= self.today]
+        self.assertEqual(result['labels'], [label for _, _, label in weeks])
+        hall = next(d for d in result['datasets'] if d['label'] == 'ホール')
+        expected = DailyReport.objects.filter(
+            store=self.store, location='hall', date__gte=start, date__lte=self.today
+        ).count()
+        self.assertEqual(sum(hall['data']), expected)
+
+    def test_get_incident_trend_comparison(self):
+        """推移グラフの比較モードで他店舗平均が算出されるテスト"""
+        other = Store.objects.create(store_name='B店', address='東京都', store_id=2)
+        Store.objects.create(store_name='C店', address='東京都', store_id=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            DailyReport.objects.create(
+                store=other, user=self.staff, date=self.today,
+                genre='claim', location='kitchen', title='t', content='c'
+            )
+
+        result = AnalyticsService.get_incident_trend_by_location(
+            None, self.today, self.today, 'all', base_store=self.store
+        )
+
+        self_line, other_line = result['datasets']
+        self.assertEqual(self_line['data'], [1])
+        self.assertEqual(other_line['data'], [0.5])
+
+    def test_get_incident_trend_genre_filter(self):
+        """推移グラフのジャンル絞り込みテスト"""
+        with self.captureOnCommitCallbacks(execute=True):
+            DailyReport.objects.create(
+                store=self.store, user=self.staff, date=self.today,
+                genre='praise', location='hall', title='t', content='c'
+            )
+        result = AnalyticsService.get_incident_trend_by_location(
+            self.store, self.today, self.today, 'hall', genre='praise'
+        )
+        self.assertEqual(result['data'], [1])
+
+    def test_incident_charts_query_count_is_constant(self):
+        """インシデント系グラフのクエリ数が期間に依存しないテスト"""
+        start, end = AnalyticsService.get_month_range(self.today)
+
+        with self.assertNumQueries(1):
+            AnalyticsService.get_incident_by_location_data(self.store, start, end, period='month')
+        with self.assertNumQueries(2):
+            AnalyticsService.get_incident_by_location_data(None, start, end, base_store=self.store, period='week')
+        with self.assertNumQueries(1):
+            AnalyticsService.get_incident_trend_by_location(self.store, start, end, 'kitchen', period='month')
+        with self.assertNumQueries(2):
+            AnalyticsService.get_incident_trend_by_location(None, start, end, 'all', base_store=self.store)
+
+
+class LocalLRUCacheBackendTest(TestCase):
+    """プロセス内LRUキャッシュのテスト"""
+
+    def test_evicts_least_recently_used(self):
+        from analytics.cache import LocalLRUCacheBackend
+        backend = LocalLRUCacheBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('c'), 3)
+
+    def test_expired_entry_is_not_returned(self):
+        from unittest.mock import patch
+        from analytics.cache import LocalLRUCacheBackend
+        backend = LocalLRUCacheBackend()
+        with patch('analytics.cache.time.monotonic', return_value=100.0):
+            backend.set('a', 1, timeout=10)
+        with patch('analytics.cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(backend.get('a'))
@@ -102,3 +102,221 @@ class AnalyticsViewTests(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'analytics/calendar_detail.html')
+
+
+class GraphDataCacheTests(TestCase):
+    """グラフデータAPIのレスポンスキャッシュのテスト"""
+
+    def setUp(self):
+        from analytics.cache import GraphDataCache
+        GraphDataCache.reset_backend()
+
+        self.store = Store.objects.create(store_name='A店', address='東京都')
+        self.staff = User.objects.create_user(
+            user_id='staff001', password='password123', store=self.store
+        )
+        self.today = datetime.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreDailyPerformance.objects.create(
+                store=self.store, date=self.today, sales_amount=1000, customer_count=10
+            )
+        self.client.login(user_id='staff001', password='password123')
+        self.url = reverse('analytics:graph_data')
+        self.params = {'graph_type': 'sales', 'period': 'week', 'offset': 0}
+
+    def test_second_request_is_served_from_cache(self):
+        """同じ条件の2回目のリクエストは集計クエリを発行しないこと"""
+        from unittest.mock import patch
+        from analytics.services import AnalyticsService
+
+        first = self.client.get(self.url, self.params).json()
+        with patch.object(AnalyticsService, 'get_graph_data_by_type') as mock_get:
+            second = self.client.get(self.url, self.params).json()
+
+        mock_get.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_save_invalidates_affected_store(self):
+        """実績の更新で該当店舗のキャッシュが無効化されること"""
+        self.client.get(self.url, self.params)
+
+        perf = StoreDailyPerformance.objects.get(store=self.store, date=self.today)
+        perf.sales_amount = 5000
+        with self.captureOnCommitCallbacks(execute=True):
+            perf.save()
+
+        data = self.client.get(self.url, self.params).json()
+        self.assertEqual(data['data'][-1], 5000)
+
+    def test_invalidation_waits_for_commit(self):
+        """キャッシュの無効化はコミット後に行われること（コミット前のデータを新しいバージョンでキャッシュしない）"""
+        from unittest.mock import patch
+        from analytics.cache import GraphDataCache
+
+        self.client.get(self.url, self.params)
+
+        perf = StoreDailyPerformance.objects.get(store=self.store, date=self.today)
+        perf.sales_amount = 5000
+        with patch.object(GraphDataCache, 'invalidate', wraps=GraphDataCache.invalidate) as mock_invalidate:
+            with self.captureOnCommitCallbacks() as callbacks:
+                perf.save()
+            mock_invalidate.assert_not_called()
+
+            self.assertEqual(len(callbacks), 1)
+            callbacks[0]()
+            mock_invalidate.assert_called_once_with(self.store.store_id, self.today)
+
+        data = self.client.get(self.url, self.params).json()
+        self.assertEqual(data['data'][-1], 5000)
+
+    def test_other_store_save_keeps_own_cache(self):
+        """他店舗の更新では自店舗モードのキャッシュが維持されること"""
+        from unittest.mock import patch
+        from analytics.services import AnalyticsService
+
+        self.client.get(self.url, self.params)
+        other = Store.objects.create(store_name='B店', address='大阪府')
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreDailyPerformance.objects.create(
+                store=other, date=self.today, sales_amount=1, customer_count=1
+            )
+
+        with patch.object(AnalyticsService, 'get_graph_data_by_type') as mock_get:
+            self.client.get(self.url, self.params)
+        mock_get.assert_not_called()
+
+    def test_all_scope_is_invalidated_by_other_store(self):
+        """全店舗モードのキャッシュは他店舗の更新でも無効化されること"""
+        params = dict(self.params, scope='all')
+        self.client.get(self.url, params)
+        other = Store.objects.create(store_name='B店', address='大阪府')
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreDailyPerformance.objects.create(
+                store=other, date=self.today, sales_amount=3000, customer_count=1
+            )
+
+        data = self.client.get(self.url, params).json()
+        self.assertEqual(data['datasets'][1]['data'][-1], 3000.0)
+
+
+class GraphDataBatchTests(TestCase):
+    """グラフデータのバッチAPIのテスト"""
+
+    def setUp(self):
+        from analytics.cache import GraphDataCache
+        GraphDataCache.reset_backend()
+
+        self.store = Store.objects.create(store_name='A店', address='東京都')
+        self.staff = User.objects.create_user(
+            user_id='staff001', password='password123', store=self.store
+        )
+        self.today = datetime.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreDailyPerformance.objects.create(
+                store=self.store, date=self.today, sales_amount=1000, customer_count=10
+            )
+            DailyReport.objects.create(
+                store=self.store, user=self.staff, date=self.today,
+                genre='claim', location='hall', title='バッチテスト', content='詳細'
+            )
+        self.client.login(user_id='staff001', password='password123')
+        self.url = reverse('analytics:graph_data_batch')
+
+    def post(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def test_returns_all_graphs_in_order(self):
+        """指定した順に全グラフのデータを1つのレスポンスで返すこと"""
+        response = self.post({
+            'period': 'week',
+            'offset': 0,
+            'graphs': [
+                {'graph_type': 'sales'},
+                {'graph_type': 'customer_count'},
+                {'graph_type': 'incident_by_location', 'genre': 'claim'},
+                {'graph_type': 'incident_trend_by_location', 'genre': 'claim', 'location': 'hall'},
+            ],
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn('period_label', data)
+        graphs = data['graphs']
+        self.assertEqual(
+            [g['graph_type'] for g in graphs],
+            ['sales', 'customer_count', 'incident_by_location', 'incident_trend_by_location'],
+        )
+        self.assertEqual(graphs[0]['data'][-1], 1000)
+        self.assertEqual(graphs[1]['data'][-1], 10)
+        hall = next(d for d in graphs[2]['datasets'] if d['label'] == 'ホール')
+        self.assertEqual(hall['data'][-1], 1)
+        self.assertEqual(graphs[3]['data'][-1], 1)
+
+    def test_matches_single_graph_api(self):
+        """単体APIと同じ内容を返すこと"""
+        single = self.client.get(
+            reverse('analytics:graph_data'),
+            {'graph_type': 'incident_by_location', 'period': 'month', 'scope': 'all', 'genre': 'claim'},
+        ).json()
+        batch = self.post({
+            'period': 'month',
+            'scope': 'all',
+            'graphs': [{'graph_type': 'incident_by_location', 'genre': 'claim'}],
+        }).json()
+        self.assertEqual(dict(single, graph_type='incident_by_location'), batch['graphs'][0])
+
+    def test_shares_single_rollup_fetch(self):
+        """全グラフの集計を1回の集計行取得で行うこと"""
+        payload = {
+            'period': 'month',
+            'scope': 'all',
+            'graphs': [
+                {'graph_type': 'sales'},
+                {'graph_type': 'customer_count'},
+                {'graph_type': 'incident_by_location'},
+                {'graph_type': 'incident_trend_by_location', 'location': 'all'},
+            ],
+        }
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.post(payload)
+        rollup_queries = [q for q in ctx.captured_queries if 'store_daily_rollups' in q['sql']]
+        self.assertEqual(len(rollup_queries), 1)
+
+    def test_invalid_spec_reports_error_per_graph(self):
+        """不正なグラフ指定は該当グラフのみエラーとして返すこと"""
+        data = self.post({
+            'graphs': [
+                {'graph_type': 'unknown'},
+                {'graph_type': 'incident_trend_by_location'},
+                {'graph_type': 'sales'},
+            ],
+        }).json()
+        graphs = data['graphs']
+        self.assertIn('error', graphs[0])
+        self.assertIn('error', graphs[1])
+        self.assertNotIn('error', graphs[2])
+
+    def test_rejects_invalid_requests(self):
+        """不正なリクエストは400を返すこと"""
+        self.assertEqual(self.post({'graphs': []}).status_code, 400)
+        self.assertEqual(
+            self.post({'graphs': [{'graph_type': 'sales'}] * 9}).status_code, 400
+        )
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_rejects_non_string_spec_fields(self):
+        """グラフ指定・期間・スコープに文字列以外を指定した場合は400を返すこと"""
+        for spec in (
+            {'graph_type': 'incident_by_location', 'genre': ['claim']},
+            {'graph_type': 'incident_trend_by_location', 'location': {'a': 1}},
+            {'graph_type': ['sales']},
+        ):
+            response = self.post({'graphs': [spec]})
+            self.assertEqual(response.status_code, 400, spec)
+            self.assertIn('error', response.json())
+        self.assertEqual(self.post({'period': ['week'], 'graphs': [{'graph_type': 'sales'}]}).status_code, 400)
+        self.assertEqual(self.post({'scope': {'all': 1}, 'graphs': [{'graph_type': 'sales'}]}).status_code, 400)
@@ -11,5 +11,6 @@ urlpatterns = [
     path("calendar/detail/<int:report_id>/", views.calendar_detail, name="calendar_detail"),
     path('graph/own_store/', views.dashboard, name='dashboard'),
     path('api/graph-data/', views.get_graph_data, name='graph_data'),
+    path('api/graph-data/batch/', views.get_graph_data_batch, name='graph_data_batch'),
     path('api/monthly-goal/', views.get_monthly_goal, name='monthly_goal'),
 ]
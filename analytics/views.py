@@ -1,14 +1,18 @@
 from datetime import date
 import calendar as pycal
+import json
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Max
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 from django.http import JsonResponse
 from django.utils.dateparse import parse_date
 from django.urls import reverse
-from .services import AnalyticsService
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_POST
+from .cache import GraphDataCache
+from .models import StoreDailyRollup
+from .services import AnalyticsService, PeriodRollups
 
 from reports.models import DailyReport, StoreDailyPerformance
 
@@ -61,23 +65,21 @@ def calendar_view(request):
     cal = pycal.Calendar(firstweekday=6)
     weeks = cal.monthdatescalendar(year, month)
 
-    perf_qs = StoreDailyPerformance.objects.filter(date__range=(first, last))
+    # 店舗日次集計から売上とジャンル別件数をまとめて取得
+    rollup_qs = StoreDailyRollup.objects.filter(date__range=(first, last))
     if store is not None:
-        perf_qs = perf_qs.filter(store=store)
-    sales_map = {p.date: p.sales_amount for p in perf_qs}
-
-    rep_qs = DailyReport.objects.filter(date__range=(first, last))
-    if store is not None:
-        rep_qs = rep_qs.filter(store=store)
-
-    raw = rep_qs.values("date", "genre").annotate(cnt=Count("pk"))
+        rollup_qs = rollup_qs.filter(store=store)
 
+    sales_map = {}
     counts_map = {}
-    for r in raw:
-        d = r["date"]
-        g = _normalize_genre(r["genre"])
-        counts_map.setdefault(d, {}).setdefault(g, 0)
-        counts_map[d][g] += r["cnt"]
+    for rollup in rollup_qs:
+        d = rollup.date
+        if rollup.has_performance:
+            sales_map[d] = rollup.sales_amount
+        for genre, field_name in StoreDailyRollup.GENRE_COUNT_FIELDS.items():
+            g = _normalize_genre(genre)
+            counts_map.setdefault(d, {}).setdefault(g, 0)
+            counts_map[d][g] += getattr(rollup, field_name)
 
     def make_cell(d: date):
         c = counts_map.get(d, {})
@@ -180,6 +182,7 @@ def calendar_detail(request, report_id: int):
 
 
 @login_required
+@ensure_csrf_cookie  # バッチAPI（POST）用のCSRFトークンをCookieに設定
 def dashboard(request):
     """分析ダッシュボード画面"""
     return render(request, 'analytics/dashboard.html')
@@ -202,24 +205,154 @@ def get_graph_data(request):
         return JsonResponse({'error': '店舗が設定されていません'}, status=400)
 
     # スコープに応じて店舗を設定
-    if scope == 'all':
-        store = None  # 全店舗モード
-        base_store = user_store  # 比較用の自店舗
-    else:
-        store = user_store
-        base_store = None
+    store, base_store = _resolve_scope(user_store, scope)
 
     # 期間の日付範囲とラベルを計算
     start_date, end_date, period_label = AnalyticsService.calculate_period_dates(period, offset)
 
-    # グラフデータを取得
+    # グラフデータを取得（期間・スコープ・店舗単位でキャッシュ）
     try:
-        result = AnalyticsService.get_graph_data_by_type(
-            graph_type, store, start_date, end_date, genre, base_store=base_store, period=period, location=location
+        response_data = _get_cached_graph_response(
+            graph_type, user_store, scope, store, base_store, start_date, end_date, period_label,
+            period, genre, location
         )
     except ValueError as e:
         return JsonResponse({'error': str(e)}, status=400)
 
+    return JsonResponse(response_data)
+
+
+# バッチAPIで1リクエストに指定できるグラフ数の上限
+MAX_BATCH_GRAPHS = 8
+
+# バッチAPIのグラフ指定で受け付ける項目（いずれも文字列）
+BATCH_SPEC_FIELDS = ('graph_type', 'genre', 'location')
+
+
+@login_required
+@require_POST
+def get_graph_data_batch(request):
+    """複数グラフのデータを1リクエストでまとめて取得するAPI
+
+    期間・スコープは全グラフ共通とし、店舗日次集計の取得は1回だけ行って各グラフで共有する。
+    JSONデータ例: {
+        "period": "week", "offset": 0, "scope": "own",
+        "graphs": [{"graph_type": "incident_by_location", "genre": "claim"},
+                   {"graph_type": "incident_trend_by_location", "genre": "claim", "location": "hall"}]
+    }
+    """
+    try:
+        data = json.loads(request.body)
+        period = data.get('period', 'week')
+        offset = int(data.get('offset', 0))
+        scope = data.get('scope', 'own')
+        specs = data.get('graphs')
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': '不正なリクエストです'}, status=400)
+
+    if not isinstance(period, str) or not isinstance(scope, str):
+        return JsonResponse({'error': '不正なリクエストです'}, status=400)
+    if not isinstance(specs, list) or not specs:
+        return JsonResponse({'error': 'グラフが指定されていません'}, status=400)
+    if len(specs) > MAX_BATCH_GRAPHS:
+        return JsonResponse({'error': f'一度に取得できるグラフは{MAX_BATCH_GRAPHS}件までです'}, status=400)
+    # キャッシュキー等に使うため、グラフ指定の各項目は文字列のみ受け付ける
+    for spec in specs:
+        if isinstance(spec, dict) and any(
+            spec.get(field) is not None and not isinstance(spec.get(field), str)
+            for field in BATCH_SPEC_FIELDS
+        ):
+            return JsonResponse({'error': '不正なグラフ指定です'}, status=400)
+
+    # ユーザーの所属店舗を取得
+    user_store = request.user.store
+    if not user_store:
+        return JsonResponse({'error': '店舗が設定されていません'}, status=400)
+
+    store, base_store = _resolve_scope(user_store, scope)
+    start_date, end_date, period_label = AnalyticsService.calculate_period_dates(period, offset)
+
+    # 集計行は最初にキャッシュミスしたグラフの計算時に1回だけ取得される
+    rollups = PeriodRollups(start_date, end_date, store=store, base_store=base_store)
+
+    graphs = []
+    for spec in specs:
+        if not isinstance(spec, dict):
+            graphs.append({'graph_type': None, 'error': '不正なグラフ指定です'})
+            continue
+
+        graph_type = spec.get('graph_type')
+        try:
+            graph = _get_cached_graph_response(
+                graph_type, user_store, scope, store, base_store, start_date, end_date, period_label,
+                period, spec.get('genre'), spec.get('location'), rollups=rollups
+            )
+        except ValueError as e:
+            graphs.append({'graph_type': graph_type, 'error': str(e)})
+            continue
+        # キャッシュ上のオブジェクトは変更せずにコピーして返す
+        graphs.append(dict(graph, graph_type=graph_type))
+
+    return JsonResponse({
+        'period_label': period_label,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'graphs': graphs,
+    })
+
+
+def _resolve_scope(user_store, scope):
+    """スコープから集計対象の店舗と比較用の自店舗を決定
+
+    Returns:
+        tuple: (store, base_store)
+    """
+    if scope == 'all':
+        # 全店舗モード（自店舗は比較用）
+        return None, user_store
+    return user_store, None
+
+
+def _get_cached_graph_response(graph_type, user_store, scope, store, base_store, start_date, end_date, period_label,
+                               period='week', genre=None, location=None, rollups=None):
+    """グラフデータAPIのレスポンスをキャッシュ経由で取得
+
+    単体API・バッチAPIで同じキャッシュエントリを共有できるよう、パラメータを正規化してキーにする。
+
+    Raises:
+        ValueError: 不正なグラフタイプの場合
+    """
+    genre = genre or None
+    location = location or None
+    cache_params = {
+        'graph_type': graph_type,
+        'period': period,
+        'start_date': start_date,
+        'genre': genre,
+        'location': location,
+        'scope': scope,
+        'store_id': user_store.pk,
+    }
+    return GraphDataCache.get_or_compute(
+        cache_params, start_date, end_date, store.pk if store else None,
+        lambda: _build_graph_response(
+            graph_type, store, start_date, end_date, period_label,
+            genre=genre, base_store=base_store, period=period, location=location, rollups=rollups
+        )
+    )
+
+
+def _build_graph_response(graph_type, store, start_date, end_date, period_label, genre=None, base_store=None, period='week', location=None, rollups=None):
+    """グラフデータAPIのレスポンスを構築
+
+    Raises:
+        ValueError: 不正なグラフタイプの場合
+    """
+    result = AnalyticsService.get_graph_data_by_type(
+        graph_type, store, start_date, end_date, genre, base_store=base_store, period=period, location=location,
+        rollups=rollups
+    )
+
     # レスポンスの構築
     chart_data = result['chart_data']
     response_data = {
@@ -244,7 +377,7 @@ def get_graph_data(request):
     if 'is_comparison' in chart_data:
         response_data['is_comparison'] = chart_data['is_comparison']
 
-    return JsonResponse(response_data)
+    return response_data
 
 
 @login_required
@@ -14,15 +14,15 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'c3_app.settings')
 import django
 django.setup()
 
+from asgiref.sync import sync_to_async
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from django.contrib.sessions.models import Session
 from django.contrib.auth import get_user_model
-from django.db import transaction
 from datetime import datetime
 
-from ai_features.models import AIChatHistory
+from ai_features.services.chat_history import ChatHistoryService
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +43,7 @@ if allowed_origins and allowed_origins[0]:
 User = get_user_model()
 
 
-def get_user_from_session(request: Request):
+async def get_user_from_session(request: Request):
     """
     DjangoセッションCookieからユーザーを取得
     """
@@ -53,6 +53,14 @@ def get_user_from_session(request: Request):
     if not session_cookie:
         raise HTTPException(status_code=401, detail="認証されていません")
 
+    # ORMはイベントループ外（スレッド）で実行する
+    return await sync_to_async(_load_session_user)(session_cookie)
+
+
+def _load_session_user(session_cookie: str):
+    """
+    セッションキーからユーザーを取得（同期処理）
+    """
     try:
         # セッションを取得
         session = Session.objects.get(session_key=session_cookie)
@@ -76,6 +84,8 @@ def get_user_from_session(request: Request):
 
         return user
 
+    except HTTPException:
+        raise
     except Session.DoesNotExist:
         raise HTTPException(status_code=401, detail="無効なセッションです")
     except User.DoesNotExist:
@@ -85,6 +95,20 @@ def get_user_from_session(request: Request):
         raise HTTPException(status_code=500, detail="認証処理でエラーが発生しました")
 
 
+def _load_chat_history(user):
+    """
+    プロンプトに渡すチャット履歴（過去の会話の要約＋直近のやり取り）を取得（同期処理）
+    """
+    return ChatHistoryService.load_for_prompt(user)
+
+
+def _save_chat_history(user, message: str, response: str):
+    """
+    チャット履歴を保存（同期処理）
+    """
+    ChatHistoryService.save_turn(user, message, response)
+
+
 @app.get("/")
 async def root():
     """ヘルスチェック"""
@@ -136,25 +160,23 @@ async def chat_stream(
                 # チャット履歴取得（オプション）
                 chat_history = None
                 if body.get('include_history', False):
-                    history = AIChatHistory.objects.filter(user=user).order_by('-created_at')[:10]
-                    chat_history = [
-                        {
-                            "role": chat.role,
-                            "content": chat.message,
-                        }
-                        for chat in reversed(history)
-                    ]
+                    chat_history = await sync_to_async(_load_chat_history)(user)
 
                 # ステータス送信: 開始
                 yield f"data: {json.dumps({'type': 'start', 'content': 'チャットを開始します...'})}\n\n"
 
-                # エージェントからストリーミングで回答を取得
+                # エージェントからストリーミングで回答を取得（LLM呼び出しは非同期）
                 full_response = ""
-                for chunk in agent.chat_stream(
+                async for chunk in agent.achat_stream(
                     query=message,
                     user=user,
-                    chat_history=chat_history
+                    chat_history=chat_history,
+                    include_progress=True
                 ):
+                    # ツール実行の進捗イベントはそのまま送信
+                    if isinstance(chunk, dict):
+                        yield f"data: {json.dumps(chunk)}\n\n"
+                        continue
                     # チャンクを送信
                     yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
                     full_response += chunk
@@ -163,25 +185,13 @@ async def chat_stream(
                 yield f"data: {json.dumps({'type': 'done', 'content': ''})}\n\n"
 
                 # チャット履歴を保存
-                with transaction.atomic():
-                    AIChatHistory.objects.create(
-                        user=user,
-                        role='user',
-                        message=message
-                    )
-                    AIChatHistory.objects.create(
-                        user=user,
-                        role='assistant',
-                        message=full_response
-                    )
-
-                    # 件数超過分を削除
-                    max_chat_history = int(os.environ.get('MAX_CHAT_HISTORY', '14'))
-                    qs = AIChatHistory.objects.filter(user=user).order_by('-created_at')
-                    excess_count = qs.count() - max_chat_history
-                    if excess_count > 0:
-                        ids_to_delete = list(qs.reverse()[:excess_count].values_list('chat_id', flat=True))
-                        AIChatHistory.objects.filter(chat_id__in=ids_to_delete).delete()
+                await sync_to_async(_save_chat_history)(user, message, full_response)
+
+                # 要約を更新（LLM呼び出しは await し、同期処理のスレッドを占有しない）
+                try:
+                    await ChatHistoryService.aupdate_summary(user, agent.asummarize_history)
+                except Exception as e:
+                    logger.error(f"Failed to update chat summary: {e}", exc_info=True)
 
             except Exception as e:
                 logger.error(f"Error in streaming chat: {e}", exc_info=True)
@@ -198,8 +208,10 @@ async def chat_stream(
         return StreamingResponse(error_stream(), media_type='text/event-stream')
     except Exception as e:
         logger.error(f"Error in chat_stream endpoint: {e}", exc_info=True)
+        # except節を抜けると e は削除されるため、ストリーム生成前に文字列化しておく
+        error_message = f'エラーが発生しました: {str(e)}'
         async def error_stream():
-            yield f"data: {json.dumps({'type': 'error', 'content': f'エラーが発生しました: {str(e)}'})}\n\n"
+            yield f"data: {json.dumps({'type': 'error', 'content': error_message})}\n\n"
         return StreamingResponse(error_stream(), media_type='text/event-stream')
 
 
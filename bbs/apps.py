@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BbsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bbs'
+
+    def ready(self):
+        # リアクション数の自動更新シグナルを登録
+        from . import signals  # noqa: F401
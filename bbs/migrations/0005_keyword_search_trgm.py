@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:25
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from common.migration_operations import AddPostgresIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bbs', '0004_alter_bbscommentreaction_reaction_type_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddPostgresIndex(
+            model_name='bbscomment',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('content'), name='gin_trgm_ops'), name='bbs_comment_content_trgm_idx'),
+        ),
+        AddPostgresIndex(
+            model_name='bbspost',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='gin_trgm_ops'), name='bbs_post_title_trgm_idx'),
+        ),
+        AddPostgresIndex(
+            model_name='bbspost',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('content'), name='gin_trgm_ops'), name='bbs_post_content_trgm_idx'),
+        ),
+    ]
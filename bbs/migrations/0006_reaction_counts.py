@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:45
+
+import common.indexes
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from common.migration_operations import replace_index_state
+
+
+def backfill_reaction_counts(apps, schema_editor):
+    """既存のリアクションから投稿・コメントのリアクション数を集計"""
+    for model_name, reaction_model_name, fk_name in (
+        ('BBSPost', 'BBSReaction', 'post'),
+        ('BBSComment', 'BBSCommentReaction', 'comment'),
+    ):
+        model = apps.get_model('bbs', model_name)
+        reaction_model = apps.get_model('bbs', reaction_model_name)
+        counts = {}
+        for reaction_type in ('naruhodo', 'iine'):
+            reaction_count = reaction_model.objects.filter(
+                **{fk_name: OuterRef('pk')}, reaction_type=reaction_type
+            ).values(fk_name).annotate(count=Count('pk')).values('count')
+            counts[f'{reaction_type}_count'] = Coalesce(Subquery(reaction_count), 0)
+        model.objects.update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bbs', '0005_keyword_search_trgm'),
+    ]
+
+    operations = [
+        # SQLiteはフィールド追加時にテーブルを作り直し、状態にある全インデックスを作成し直すため、
+        # 先に pg_trgm の GIN インデックスを PostgreSQL専用インデックスとして扱う（DDLなし）
+        replace_index_state(
+            model_name='bbscomment',
+            index=common.indexes.PostgresGinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('content'), name='gin_trgm_ops'), name='bbs_comment_content_trgm_idx'),
+        ),
+        replace_index_state(
+            model_name='bbspost',
+            index=common.indexes.PostgresGinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='gin_trgm_ops'), name='bbs_post_title_trgm_idx'),
+        ),
+        replace_index_state(
+            model_name='bbspost',
+            index=common.indexes.PostgresGinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('content'), name='gin_trgm_ops'), name='bbs_post_content_trgm_idx'),
+        ),
+        migrations.AddField(
+            model_name='bbscomment',
+            name='iine_count',
+            field=models.IntegerField(db_default=0, default=0, verbose_name='いいね数'),
+        ),
+        migrations.AddField(
+            model_name='bbscomment',
+            name='naruhodo_count',
+            field=models.IntegerField(db_default=0, default=0, verbose_name='なるほど数'),
+        ),
+        migrations.AddField(
+            model_name='bbspost',
+            name='iine_count',
+            field=models.IntegerField(db_default=0, default=0, verbose_name='いいね数'),
+        ),
+        migrations.AddField(
+            model_name='bbspost',
+            name='naruhodo_count',
+            field=models.IntegerField(db_default=0, default=0, verbose_name='なるほど数'),
+        ),
+        migrations.RunPython(backfill_reaction_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bbs', '0006_reaction_counts'),
+        ('reports', '0002_keyword_search_trgm'),
+        ('stores', '0003_remove_store_sales_target'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bbspost',
+            index=models.Index(fields=['-created_at', '-post_id'], name='bbs_post_created_keyset_idx'),
+        ),
+    ]
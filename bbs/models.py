@@ -1,6 +1,17 @@
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
 
+from common.indexes import PostgresGinIndex
+
+
+# リアクション種別 → 投稿・コメントのリアクション数カラム名
+REACTION_COUNT_FIELDS = {
+    'naruhodo': 'naruhodo_count',
+    'iine': 'iine_count',
+}
+
 
 class BBSPost(models.Model):
     """掲示板投稿モデル"""
@@ -43,6 +54,9 @@ class BBSPost(models.Model):
     title = models.CharField(max_length=200, verbose_name='タイトル')
     content = models.TextField(verbose_name='本文')
     comment_count = models.IntegerField(default=0, verbose_name='コメント数')
+    # リアクション数（リアクションの追加・削除時にシグナルで更新、rebuild_reaction_counts で再集計）
+    naruhodo_count = models.IntegerField(default=0, db_default=0, verbose_name='なるほど数')
+    iine_count = models.IntegerField(default=0, db_default=0, verbose_name='いいね数')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='投稿日時')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
 
@@ -51,6 +65,13 @@ class BBSPost(models.Model):
         verbose_name = '掲示板投稿'
         verbose_name_plural = '掲示板投稿'
         ordering = ['-created_at']
+        indexes = [
+            # 一覧のキーセットページネーション用（新しい順）
+            models.Index(fields=['-created_at', '-post_id'], name='bbs_post_created_keyset_idx'),
+            # キーワード検索用（icontains は UPPER(col) LIKE になるため UPPER 式に pg_trgm を張る、PostgreSQLのみ）
+            PostgresGinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='bbs_post_title_trgm_idx'),
+            PostgresGinIndex(OpClass(Upper('content'), name='gin_trgm_ops'), name='bbs_post_content_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user}"
@@ -112,6 +133,9 @@ class BBSComment(models.Model):
     )
     content = models.TextField(verbose_name='本文')
     is_best_answer = models.BooleanField(default=False, verbose_name='ベストアンサーフラグ')
+    # リアクション数（リアクションの追加・削除時にシグナルで更新、rebuild_reaction_counts で再集計）
+    naruhodo_count = models.IntegerField(default=0, db_default=0, verbose_name='なるほど数')
+    iine_count = models.IntegerField(default=0, db_default=0, verbose_name='いいね数')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='投稿日時')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
 
@@ -120,6 +144,10 @@ class BBSComment(models.Model):
         verbose_name = '掲示板コメント'
         verbose_name_plural = '掲示板コメント'
         ordering = ['created_at']
+        indexes = [
+            # キーワード検索用（PostgreSQLのみ）
+            PostgresGinIndex(OpClass(Upper('content'), name='gin_trgm_ops'), name='bbs_comment_content_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user} on {self.post.title}"
@@ -3,9 +3,12 @@
 投稿・コメント作成時にベクトル化も実行
 """
 import logging
-from typing import Optional, Dict, Any
-from django.db import transaction
-from .models import BBSPost, BBSComment
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import REACTION_COUNT_FIELDS, BBSComment, BBSCommentReaction, BBSPost, BBSReaction
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,12 @@ logger = logging.getLogger(__name__)
 class BBSService:
     """掲示板サービス - 投稿・コメントの作成・更新・ベクトル化を管理"""
 
+    # リアクション対象種別 → (対象モデル, リアクションモデル, 外部キー名)
+    REACTION_TARGETS = {
+        'post': (BBSPost, BBSReaction, 'post'),
+        'comment': (BBSComment, BBSCommentReaction, 'comment'),
+    }
+
     @staticmethod
     @transaction.atomic
     def create_post(
@@ -48,6 +57,13 @@ class BBSService:
             **kwargs
         )
 
+        # アウトボックスに登録（同じトランザクションで保存し、ワーカーが非同期にベクトル化）
+        from ai_features.services.core_services import VectorizationOutboxService
+        if VectorizationOutboxService.is_enabled():
+            VectorizationOutboxService.enqueue('bbs_post', post.post_id)
+            logger.info(f"掲示板投稿作成＆ベクトル化登録: post_id={post.post_id}")
+            return post
+
         # ベクトル化を実行
         try:
             from ai_features.services.core_services import VectorizationService
@@ -84,6 +100,13 @@ class BBSService:
             setattr(post, field, value)
         post.save()
 
+        # アウトボックスに登録（同じトランザクションで保存し、ワーカーが非同期にベクトル化）
+        from ai_features.services.core_services import VectorizationOutboxService
+        if VectorizationOutboxService.is_enabled():
+            VectorizationOutboxService.enqueue('bbs_post', post.post_id)
+            logger.info(f"掲示板投稿更新＆ベクトル化登録: post_id={post.post_id}")
+            return post
+
         # ベクトルを再生成
         try:
             from ai_features.services.core_services import VectorizationService
@@ -131,8 +154,14 @@ class BBSService:
         )
 
         # 投稿のコメント数を更新
-        post.comment_count = post.comments.count()
-        post.save()
+        post.comment_count = BBSService.increment_comment_count(post.post_id)
+
+        # アウトボックスに登録（同じトランザクションで保存し、ワーカーが非同期にベクトル化）
+        from ai_features.services.core_services import VectorizationOutboxService
+        if VectorizationOutboxService.is_enabled():
+            VectorizationOutboxService.enqueue('bbs_comment', comment.comment_id)
+            logger.info(f"掲示板コメント作成＆ベクトル化登録: comment_id={comment.comment_id}")
+            return comment
 
         # ベクトル化を実行
         try:
@@ -170,6 +199,13 @@ class BBSService:
             setattr(comment, field, value)
         comment.save()
 
+        # アウトボックスに登録（同じトランザクションで保存し、ワーカーが非同期にベクトル化）
+        from ai_features.services.core_services import VectorizationOutboxService
+        if VectorizationOutboxService.is_enabled():
+            VectorizationOutboxService.enqueue('bbs_comment', comment.comment_id)
+            logger.info(f"掲示板コメント更新＆ベクトル化登録: comment_id={comment.comment_id}")
+            return comment
+
         # ベクトルを再生成
         try:
             from ai_features.services.core_services import VectorizationService
@@ -236,3 +272,199 @@ class BBSService:
         except Exception as e:
             logger.error(f"掲示板コメント再ベクトル化中にエラー: comment_id={comment_id}, error={e}", exc_info=True)
             return False
+
+    @staticmethod
+    def load_threads(post_ids: Iterable[int]) -> Dict[int, BBSPost]:
+        """
+        投稿（店舗・投稿者）とコメント（コメント者）をまとめて取得
+
+        投稿を in_bulk で1クエリ、コメントを1クエリで取得するため、件数によらずクエリ数は一定。
+
+        Args:
+            post_ids: 投稿IDのリスト（存在しないIDは結果に含まれない）
+
+        Returns:
+            投稿IDをキーとした投稿の辞書（各投稿の thread_comments に作成日時順のコメント）
+        """
+        posts = BBSPost.objects.select_related('store', 'user').in_bulk(set(post_ids))
+        BBSService.attach_comments(posts.values())
+        return posts
+
+    @staticmethod
+    def attach_comments(posts: Iterable[BBSPost]) -> List[BBSPost]:
+        """
+        投稿のコメント（コメント者）を1クエリで取得し、各投稿の thread_comments に設定
+
+        Args:
+            posts: 投稿のリスト
+
+        Returns:
+            コメントを設定した投稿のリスト
+        """
+        posts = list(posts)
+        comments_by_post = {post.post_id: [] for post in posts}
+        if comments_by_post:
+            comments = BBSComment.objects.filter(
+                post_id__in=comments_by_post
+            ).select_related('user').order_by('created_at', 'comment_id')
+            for comment in comments:
+                comments_by_post[comment.post_id].append(comment)
+        for post in posts:
+            post.thread_comments = comments_by_post[post.post_id]
+        return posts
+
+    @staticmethod
+    def attach_user_reactions(targets: Iterable, user) -> List:
+        """
+        ユーザーのリアクションを1クエリで取得し、各投稿・コメントの user_reactions に設定
+
+        Args:
+            targets: 投稿またはコメントのリスト（同じモデルのみ）
+            user: ログインユーザー
+
+        Returns:
+            user_reactions（リアクション種別の集合）を設定したリスト
+        """
+        targets = list(targets)
+        reactions_by_target = {target.pk: set() for target in targets}
+        if targets and user.is_authenticated:
+            if isinstance(targets[0], BBSPost):
+                rows = BBSReaction.objects.filter(post_id__in=reactions_by_target, user=user).values_list('post_id', 'reaction_type')
+            else:
+                rows = BBSCommentReaction.objects.filter(comment_id__in=reactions_by_target, user=user).values_list('comment_id', 'reaction_type')
+            for target_id, reaction_type in rows:
+                reactions_by_target[target_id].add(reaction_type)
+        for target in targets:
+            target.user_reactions = reactions_by_target[target.pk]
+        return targets
+
+    @staticmethod
+    def adjust_reaction_count(model, target_id: int, reaction_type: str, delta: int) -> None:
+        """
+        投稿・コメントのリアクション数を F() 式で増減
+
+        Args:
+            model: BBSPost または BBSComment
+            target_id: 投稿ID・コメントID
+            reaction_type: リアクション種別
+            delta: 増減数
+        """
+        field_name = REACTION_COUNT_FIELDS.get(reaction_type)
+        if field_name is None:
+            return
+        model.objects.filter(pk=target_id).update(**{field_name: F(field_name) + delta})
+
+    @staticmethod
+    def increment_comment_count(post_id: int) -> Optional[int]:
+        """
+        投稿のコメント数を F() 式で1増やす（COUNT(*) で数え直さない）
+
+        Args:
+            post_id: 投稿ID
+
+        Returns:
+            更新後のコメント数（投稿が存在しない場合はNone）
+        """
+        BBSPost.objects.filter(post_id=post_id).update(comment_count=F('comment_count') + 1)
+        return BBSPost.objects.filter(post_id=post_id).values_list('comment_count', flat=True).first()
+
+    @classmethod
+    def toggle_reaction(cls, target_type: str, target_id: int, user, reaction_type: str) -> Optional[Tuple[str, int]]:
+        """
+        投稿・コメントへのリアクションを切り替え、切り替え後のリアクション数を返す
+
+        PostgreSQLでは削除・競合を無視した作成・リアクション数の更新を1文で実行する。
+        同じリクエストが同時に届いても一意制約違反にならず、リアクション数もずれない。
+
+        Args:
+            target_type: 'post' または 'comment'
+            target_id: 投稿ID・コメントID
+            user: ログインユーザー
+            reaction_type: リアクション種別（REACTION_COUNT_FIELDS のキー）
+
+        Returns:
+            (action, count) action は 'added' または 'removed'（対象が存在しない場合はNone）
+        """
+        model, reaction_model, fk_name = cls.REACTION_TARGETS[target_type]
+        if connections[reaction_model.objects.db].vendor == 'postgresql':
+            return cls._toggle_reaction_postgres(model, reaction_model, fk_name, target_id, user, reaction_type)
+
+        count_field = REACTION_COUNT_FIELDS[reaction_type]
+        lookup = {f'{fk_name}_id': target_id, 'user': user, 'reaction_type': reaction_type}
+        with transaction.atomic():
+            if not model.objects.filter(pk=target_id).exists():
+                return None
+            # リアクション数はシグナルで増減する
+            deleted, _ = reaction_model.objects.filter(**lookup).delete()
+            if deleted:
+                action = 'removed'
+            else:
+                action = 'added'
+                try:
+                    with transaction.atomic():
+                        reaction_model.objects.create(**lookup)
+                except IntegrityError:
+                    # 同時リクエストで作成済み
+                    pass
+            count = model.objects.filter(pk=target_id).values_list(count_field, flat=True).get()
+        return action, count
+
+    @staticmethod
+    def _toggle_reaction_postgres(model, reaction_model, fk_name, target_id, user, reaction_type):
+        """削除・作成（ON CONFLICT DO NOTHING）・リアクション数の更新を1文で実行（シグナルは発行されない）"""
+        table = model._meta.db_table
+        pk_column = model._meta.pk.column
+        count_column = model._meta.get_field(REACTION_COUNT_FIELDS[reaction_type]).column
+        reaction_table = reaction_model._meta.db_table
+        fk_column = reaction_model._meta.get_field(fk_name).column
+        user_column = reaction_model._meta.get_field('user').column
+
+        sql = f"""
+            WITH deleted AS (
+                DELETE FROM {reaction_table}
+                WHERE {fk_column} = %(target_id)s AND {user_column} = %(user_id)s
+                  AND reaction_type = %(reaction_type)s
+                RETURNING 1
+            ), inserted AS (
+                INSERT INTO {reaction_table} ({fk_column}, {user_column}, reaction_type, created_at)
+                SELECT %(target_id)s, %(user_id)s, %(reaction_type)s, %(now)s
+                WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                  AND EXISTS (SELECT 1 FROM {table} WHERE {pk_column} = %(target_id)s)
+                ON CONFLICT ({fk_column}, {user_column}, reaction_type) DO NOTHING
+                RETURNING 1
+            )
+            UPDATE {table}
+            SET {count_column} = {count_column}
+                + (SELECT COUNT(*) FROM inserted) - (SELECT COUNT(*) FROM deleted)
+            WHERE {pk_column} = %(target_id)s
+            RETURNING {count_column}, (SELECT COUNT(*) FROM deleted)
+        """
+        params = {
+            'target_id': target_id,
+            'user_id': user.pk,
+            'reaction_type': reaction_type,
+            'now': timezone.now(),
+        }
+        with connections[reaction_model.objects.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        count, deleted = row
+        return ('removed' if deleted else 'added'), count
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_reaction_counts() -> None:
+        """投稿・コメントのリアクション数をリアクションテーブルから再集計"""
+        for model, reaction_model, fk_name in (
+            (BBSPost, BBSReaction, 'post'),
+            (BBSComment, BBSCommentReaction, 'comment'),
+        ):
+            counts = {}
+            for reaction_type, field_name in REACTION_COUNT_FIELDS.items():
+                reaction_count = reaction_model.objects.filter(
+                    **{fk_name: OuterRef('pk')}, reaction_type=reaction_type
+                ).values(fk_name).annotate(count=Count('pk')).values('count')
+                counts[field_name] = Coalesce(Subquery(reaction_count), 0)
+            model.objects.update(**counts)
@@ -0,0 +1,36 @@
+"""
+投稿・コメントのリアクション数（naruhodo_count / iine_count）の自動更新
+
+リアクションの作成・削除時に、対象の投稿・コメントの件数カラムを F() 式で増減する。
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BBSComment, BBSCommentReaction, BBSPost, BBSReaction
+from .services import BBSService
+
+
+@receiver(post_save, sender=BBSReaction)
+def increment_post_reaction_count(sender, instance, created, **kwargs):
+    """リアクション作成後に投稿のリアクション数を加算"""
+    if created:
+        BBSService.adjust_reaction_count(BBSPost, instance.post_id, instance.reaction_type, 1)
+
+
+@receiver(post_delete, sender=BBSReaction)
+def decrement_post_reaction_count(sender, instance, **kwargs):
+    """リアクション削除後に投稿のリアクション数を減算"""
+    BBSService.adjust_reaction_count(BBSPost, instance.post_id, instance.reaction_type, -1)
+
+
+@receiver(post_save, sender=BBSCommentReaction)
+def increment_comment_reaction_count(sender, instance, created, **kwargs):
+    """リアクション作成後にコメントのリアクション数を加算"""
+    if created:
+        BBSService.adjust_reaction_count(BBSComment, instance.comment_id, instance.reaction_type, 1)
+
+
+@receiver(post_delete, sender=BBSCommentReaction)
+def decrement_comment_reaction_count(sender, instance, **kwargs):
+    """リアクション削除後にコメントのリアクション数を減算"""
+    BBSService.adjust_reaction_count(BBSComment, instance.comment_id, instance.reaction_type, -1)
@@ -1,25 +1,41 @@
 from django import template
 
+from bbs.models import REACTION_COUNT_FIELDS
+
 register = template.Library()
 
-@register.simple_tag
-def is_reacted(post, user, reaction_type):
+
+def _has_reaction(target, user, reaction_type):
+    """ユーザーがリアクション済みか（BBSService.attach_user_reactions で取得済みの場合はクエリを発行しない）"""
     if not user.is_authenticated:
         return False
-    return post.reactions.filter(user=user, reaction_type=reaction_type).exists()
+    user_reactions = getattr(target, 'user_reactions', None)
+    if user_reactions is not None:
+        return reaction_type in user_reactions
+    return target.reactions.filter(user=user, reaction_type=reaction_type).exists()
+
+
+def _reaction_count(target, reaction_type):
+    """リアクション数（件数カラムを参照）"""
+    field_name = REACTION_COUNT_FIELDS.get(reaction_type)
+    if field_name is None:
+        return target.reactions.filter(reaction_type=reaction_type).count()
+    return getattr(target, field_name)
+
+
+@register.simple_tag
+def is_reacted(post, user, reaction_type):
+    return _has_reaction(post, user, reaction_type)
 
 @register.simple_tag
 def count_reactions(post, reaction_type):
-    return post.reactions.filter(reaction_type=reaction_type).count()
+    return _reaction_count(post, reaction_type)
 
 
 @register.simple_tag
 def is_comment_reacted(comment, user, reaction_type):
-
-    if not user.is_authenticated:
-        return False
-    return comment.reactions.filter(user=user, reaction_type=reaction_type).exists()
+    return _has_reaction(comment, user, reaction_type)
 
 @register.simple_tag
 def count_comment_reactions(comment, reaction_type):
-    return comment.reactions.filter(reaction_type=reaction_type).count()
\ No newline at end of file
+    return _reaction_count(comment, reaction_type)
@@ -1,12 +1,17 @@
-from django.test import TestCase
+from io import StringIO
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
 from unittest.mock import patch
 from bbs.services import BBSService
-from bbs.models import BBSPost, BBSComment
+from bbs.models import BBSPost, BBSComment, BBSReaction, BBSCommentReaction
 from stores.models import Store
+from ai_features.models import VectorizationTask
 
 User = get_user_model()
 
+@override_settings(AI_VECTORIZATION_MODE='sync')
 class BBSServiceTests(TestCase):
     def setUp(self):
         """テスト前の準備"""
@@ -368,4 +373,176 @@ class BBSServiceTests(TestCase):
 
         # コメントは更新されている
         comment.refresh_from_db()
-        self.assertEqual(comment.content, '更新されたコメント')
\ No newline at end of file
+        self.assertEqual(comment.content, '更新されたコメント')
+
+
+class BBSServiceOutboxTests(TestCase):
+    """アウトボックス経由のベクトル化登録のテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_name="テスト店舗", store_id=1)
+        self.user = User.objects.create_user(
+            password='password123',
+            user_id='user001',
+            store=self.store
+        )
+
+    @patch('ai_features.services.core_services.VectorizationService.vectorize_bbs_comment')
+    @patch('ai_features.services.core_services.VectorizationService.vectorize_bbs_post')
+    def test_create_post_and_comment_enqueue_vectorization(self, mock_vectorize_post, mock_vectorize_comment):
+        """投稿・コメント作成時はベクトル化を同期実行せず、アウトボックスに登録することを確認"""
+        post = BBSService.create_post(
+            store=self.store,
+            user=self.user,
+            title="投稿",
+            content="内容",
+            genre="information"
+        )
+        comment = BBSService.create_comment(post=post, user=self.user, content="コメント")
+
+        mock_vectorize_post.assert_not_called()
+        mock_vectorize_comment.assert_not_called()
+        self.assertEqual(
+            set(VectorizationTask.objects.values_list('source_type', 'source_id')),
+            {('bbs_post', post.post_id), ('bbs_comment', comment.comment_id)}
+        )
+
+
+class BBSThreadLoadTests(TestCase):
+    """スレッド（投稿＋コメント）の一括取得のテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_name="テスト店舗", store_id=1)
+        self.user = User.objects.create_user(
+            password='password123',
+            user_id='user001',
+            store=self.store
+        )
+        self.posts = []
+        for i in range(3):
+            post = BBSPost.objects.create(store=self.store, user=self.user, title=f"投稿{i}", content="内容")
+            for j in range(3):
+                BBSComment.objects.create(post=post, user=self.user, content=f"コメント{i}-{j}")
+            self.posts.append(post)
+
+    def test_load_threads_constant_queries(self):
+        """投稿数によらず2クエリで投稿・店舗・コメント・コメント者を取得することを確認"""
+        post_ids = [post.post_id for post in self.posts] + [99999]
+
+        with self.assertNumQueries(2):
+            threads = BBSService.load_threads(post_ids)
+            for post in threads.values():
+                self.assertEqual(post.store.store_name, self.store.store_name)
+                self.assertEqual(post.user.user_id, post.user_id)
+                for comment in post.thread_comments:
+                    self.assertEqual(comment.user.user_id, comment.user_id)
+
+        self.assertEqual(set(threads), {post.post_id for post in self.posts})
+        self.assertEqual(
+            [comment.content for comment in threads[self.posts[1].post_id].thread_comments],
+            ["コメント1-0", "コメント1-1", "コメント1-2"]
+        )
+
+    def test_attach_comments_empty(self):
+        """投稿がない場合はクエリを発行しないことを確認"""
+        with self.assertNumQueries(0):
+            self.assertEqual(BBSService.attach_comments([]), [])
+
+
+class BBSReactionCountTests(TestCase):
+    """リアクション数カラムとユーザーのリアクション一括取得のテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_name="テスト店舗", store_id=1)
+        self.user = User.objects.create_user(
+            password='password123',
+            user_id='user001',
+            store=self.store
+        )
+        self.other_user = User.objects.create_user(
+            password='password123',
+            user_id='user002',
+            store=self.store
+        )
+        self.post = BBSPost.objects.create(store=self.store, user=self.user, title="投稿", content="内容")
+        self.comment = BBSComment.objects.create(post=self.post, user=self.user, content="コメント")
+
+    def test_counts_follow_reactions(self):
+        """リアクションの作成・削除でリアクション数が増減することを確認"""
+        reaction = BBSReaction.objects.create(post=self.post, user=self.user, reaction_type='iine')
+        BBSReaction.objects.create(post=self.post, user=self.other_user, reaction_type='iine')
+        BBSReaction.objects.create(post=self.post, user=self.user, reaction_type='naruhodo')
+        BBSCommentReaction.objects.create(comment=self.comment, user=self.user, reaction_type='naruhodo')
+
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.post.iine_count, self.post.naruhodo_count), (2, 1))
+        self.assertEqual((self.comment.iine_count, self.comment.naruhodo_count), (0, 1))
+
+        reaction.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.iine_count, 1)
+
+    def test_attach_user_reactions(self):
+        """ログインユーザーのリアクションのみを1クエリで設定することを確認"""
+        other_post = BBSPost.objects.create(store=self.store, user=self.user, title="投稿2", content="内容")
+        BBSReaction.objects.create(post=self.post, user=self.user, reaction_type='iine')
+        BBSReaction.objects.create(post=self.post, user=self.user, reaction_type='naruhodo')
+        BBSReaction.objects.create(post=other_post, user=self.other_user, reaction_type='iine')
+
+        with self.assertNumQueries(1):
+            posts = BBSService.attach_user_reactions([self.post, other_post], self.user)
+
+        self.assertEqual(posts[0].user_reactions, {'iine', 'naruhodo'})
+        self.assertEqual(posts[1].user_reactions, set())
+
+    def test_attach_user_reactions_anonymous(self):
+        """未ログインの場合はクエリを発行しないことを確認"""
+        with self.assertNumQueries(0):
+            comments = BBSService.attach_user_reactions([self.comment], AnonymousUser())
+        self.assertEqual(comments[0].user_reactions, set())
+
+    def test_rebuild_reaction_counts(self):
+        """シグナルを経由しない変更後にコマンドで再集計できることを確認"""
+        BBSReaction.objects.create(post=self.post, user=self.user, reaction_type='iine')
+        BBSCommentReaction.objects.create(comment=self.comment, user=self.user, reaction_type='iine')
+        BBSPost.objects.update(iine_count=5, naruhodo_count=3)
+        BBSComment.objects.update(iine_count=0)
+
+        call_command('rebuild_reaction_counts', stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.post.iine_count, self.post.naruhodo_count), (1, 0))
+        self.assertEqual(self.comment.iine_count, 1)
+
+    def test_toggle_reaction(self):
+        """リアクションの切り替えで作成・削除と件数が連動することを確認"""
+        self.assertEqual(BBSService.toggle_reaction('post', self.post.post_id, self.user, 'iine'), ('added', 1))
+        self.assertEqual(BBSService.toggle_reaction('post', self.post.post_id, self.other_user, 'iine'), ('added', 2))
+        self.assertEqual(BBSService.toggle_reaction('post', self.post.post_id, self.user, 'iine'), ('removed', 1))
+        self.assertEqual(
+            BBSService.toggle_reaction('comment', self.comment.comment_id, self.user, 'naruhodo'),
+            ('added', 1)
+        )
+
+        self.assertEqual(
+            list(BBSReaction.objects.values_list('user_id', flat=True)),
+            [self.other_user.user_id]
+        )
+        self.assertTrue(BBSCommentReaction.objects.filter(comment=self.comment, user=self.user).exists())
+
+    def test_toggle_reaction_missing_target(self):
+        """存在しない対象の場合はNoneを返し、リアクションを作成しないことを確認"""
+        self.assertIsNone(BBSService.toggle_reaction('post', 99999, self.user, 'iine'))
+        self.assertFalse(BBSReaction.objects.exists())
+
+    def test_increment_comment_count(self):
+        """コメント数を数え直さずに1増やすことを確認"""
+        BBSPost.objects.filter(pk=self.post.pk).update(comment_count=5)
+
+        with self.assertNumQueries(2):
+            count = BBSService.increment_comment_count(self.post.post_id)
+
+        self.assertEqual(count, 6)
+        self.assertIsNone(BBSService.increment_comment_count(99999))
@@ -1,8 +1,10 @@
 import json
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from bbs.models import BBSPost, BBSComment, BBSReaction
+from bbs.models import BBSPost, BBSComment, BBSReaction, BBSCommentReaction
 from stores.models import Store
 
 User = get_user_model()
@@ -68,6 +70,27 @@ class BBSViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "美味しいラーメン")
 
+    def test_bbs_detail_queries_do_not_grow_with_comments(self):
+        """コメント・リアクションが増えても詳細画面のクエリ数が変わらないか"""
+        url = reverse('bbs:detail', args=[self.post1.post_id])
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(context)
+
+        comment = BBSComment.objects.create(post=self.post1, user=self.user, content="コメント")
+        BBSCommentReaction.objects.create(comment=comment, user=self.user, reaction_type='iine')
+        baseline = count_queries()
+
+        for i in range(5):
+            comment = BBSComment.objects.create(post=self.post1, user=self.user, content=f"コメント{i}")
+            BBSCommentReaction.objects.create(comment=comment, user=self.user, reaction_type='naruhodo')
+        BBSReaction.objects.create(post=self.post1, user=self.user, reaction_type='iine')
+
+        self.assertEqual(count_queries(), baseline)
+
     def test_bbs_register_post(self):
         """新規投稿機能のテスト"""
         data = {
@@ -99,6 +122,10 @@ class BBSViewTests(TestCase):
         # コメントが保存されたか確認
         self.assertTrue(BBSComment.objects.filter(content='テストコメントです').exists())
 
+        # コメント数が更新されたか確認
+        self.post1.refresh_from_db()
+        self.assertEqual(self.post1.comment_count, 1)
+
     def test_toggle_reaction_post(self):
         """リアクション（いいね）の切り替えテスト"""
         url = reverse('bbs:toggle_reaction')
@@ -130,4 +157,45 @@ class BBSViewTests(TestCase):
         json_resp = response.json()
         self.assertEqual(json_resp['status'], 'success')
         self.assertEqual(json_resp['action'], 'removed')
-        self.assertEqual(json_resp['count'], 0)
\ No newline at end of file
+        self.assertEqual(json_resp['count'], 0)
+
+    def test_toggle_reaction_not_found(self):
+        """存在しない対象へのリアクションは404を返すか"""
+        response = self.client.post(
+            reverse('bbs:toggle_reaction'),
+            data=json.dumps({'target_type': 'post', 'target_id': 99999, 'reaction_type': 'iine'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(BBSReaction.objects.exists())
+
+    def test_toggle_reaction_invalid_type(self):
+        """不正な対象種別・リアクション種別は400を返すか"""
+        url = reverse('bbs:toggle_reaction')
+        for data in (
+            {'target_type': 'report', 'target_id': self.post1.post_id, 'reaction_type': 'iine'},
+            {'target_type': 'post', 'target_id': self.post1.post_id, 'reaction_type': 'unknown'},
+        ):
+            response = self.client.post(url, data=json.dumps(data), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_bbs_list_load_more(self):
+        """「もっと見る」で次の投稿を重複なく取得できるか"""
+        for i in range(12):
+            BBSPost.objects.create(user=self.user, store=self.store, title=f"投稿{i}", content="内容")
+
+        response = self.client.get(reverse('bbs:list'))
+        self.assertEqual(len(response.context['posts']), 10)
+        self.assertEqual(response.context['total_count'], 14)
+
+        response_more = self.client.get(
+            reverse('bbs:list') + response.context['next_page_url'],
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response_more.status_code, 200)
+        self.assertTemplateUsed(response_more, 'bbs/components/post_items.html')
+        self.assertEqual(response_more['X-Next-Page'], '')
+
+        post_ids = [post.post_id for post in response.context['posts']]
+        post_ids += [post.post_id for post in response_more.context['posts']]
+        self.assertEqual(sorted(post_ids), sorted(BBSPost.objects.values_list('post_id', flat=True)))
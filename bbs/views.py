@@ -4,11 +4,17 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 import json
-from .models import BBSPost, BBSComment, BBSReaction, BBSCommentReaction
+from .models import REACTION_COUNT_FIELDS, BBSPost, BBSComment
 from .forms import BBSPostForm, BBSCommentForm
-from django.db.models import Q, Count, Exists, OuterRef
-from django.core.paginator import Paginator
+from django.db.models import F
 from stores.models import Store
+from common.pagination import KeysetPaginator
+from common.services import KeywordSearchService
+from .services import BBSService
+
+# 一覧の総件数を数える上限（超える場合は「1000+件」と表示し、全件のCOUNTを避ける）
+TOTAL_COUNT_LIMIT = 1000
+
 
 @login_required
 def bbs_register(request):
@@ -34,25 +40,9 @@ def bbs_list(request):
     """掲示板一覧ビュー"""
     NUM_BB_PER_PAGE = 10
 
-    # ✅ 修正1: total_reactions（いいね＋なるほどの合計）を計算に追加
+    # リアクション数は投稿の件数カラム（naruhodo_count / iine_count）を参照し、人気順の並び替え用に合計を計算
     posts = BBSPost.objects.select_related('user', 'store').annotate(
-        naruhodo_count=Count('reactions', filter=Q(reactions__reaction_type='naruhodo')),
-        iine_count=Count('reactions', filter=Q(reactions__reaction_type='iine')),
-        total_reactions=Count('reactions'),  # 並び替え用に全リアクション数をカウント
-        is_naruhodo=Exists(
-            BBSReaction.objects.filter(
-                post=OuterRef('pk'),
-                user=request.user,
-                reaction_type='naruhodo'
-            )
-        ),
-        is_iine=Exists(
-            BBSReaction.objects.filter(
-                post=OuterRef('pk'),
-                user=request.user,
-                reaction_type='iine'
-            )
-        ),
+        total_reactions=F('naruhodo_count') + F('iine_count'),
     )
 
     genre = request.GET.get('genre')
@@ -65,38 +55,53 @@ def bbs_list(request):
 
     query = request.GET.get('query')
     if query:
-        keywords = query.replace('　', ' ').split()
-        if keywords:
-            query_condition = Q()
-            for word in keywords:
-                query_condition |= Q(title__icontains=word) | Q(content__icontains=word)
-            posts = posts.filter(query_condition)
+        posts = KeywordSearchService.filter(posts, KeywordSearchService.split_keywords(query))
 
     # ✅ 修正2: 'popular' (人気順) のソートロジックを追加
+    # キーセットページネーションのため、末尾に主キーを加えて並び順を一意にする
     sort_option = request.GET.get('sort')
     if sort_option == 'oldest':
-        posts = posts.order_by('created_at')
+        ordering = ('created_at', 'post_id')
     elif sort_option == 'popular':
         # 合計リアクション数の降順、同数の場合は新しい順
-        posts = posts.order_by('-total_reactions', '-created_at')
+        ordering = ('-total_reactions', '-created_at', '-post_id')
     else:
-        posts = posts.order_by('-created_at')
-
-    paginator = Paginator(posts, NUM_BB_PER_PAGE)
+        ordering = ('-created_at', '-post_id')
 
-    page_number = request.GET.get("page")
-    posts_pagenated = paginator.get_page(page_number)
+    # OFFSET と COUNT(*) を使わず、前のページの最後の投稿（カーソル）より後を取得
+    paginator = KeysetPaginator(posts, ordering, NUM_BB_PER_PAGE)
+    posts_page = paginator.get_page(request.GET.get('cursor'))
+    # 表示するページの投稿について、ログインユーザーのリアクションを1クエリで取得
+    posts_page.object_list = BBSService.attach_user_reactions(posts_page.object_list, request.user)
 
-    # ページネーション用のクエリ文字列を構築（pageパラメータを除く）
+    # ページネーション用のクエリ文字列を構築（cursorパラメータを除く）
     query_params = request.GET.copy()
-    if 'page' in query_params:
-        del query_params['page']
+    for key in ('cursor', 'page'):
+        query_params.pop(key, None)
     query_string = query_params.urlencode()
+    next_page_url = None
+    if posts_page.has_next:
+        query_params['cursor'] = posts_page.next_cursor
+        next_page_url = f'?{query_params.urlencode()}'
+
+    # 「もっと見る」からの読み込みは投稿部分のみを返し、次ページのURLはヘッダーで渡す
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        response = render(request, 'bbs/components/post_items.html', {'posts': posts_page})
+        response['X-Next-Page'] = next_page_url or ''
+        return response
+
+    # 総件数は先頭ページでのみ、上限件数まで数える
+    total_count, total_count_capped = (None, False)
+    if not posts_page.has_previous:
+        total_count, total_count_capped = paginator.count(limit=TOTAL_COUNT_LIMIT)
 
     stores = Store.objects.all().order_by('store_name')
 
     context = {
-        'posts': posts_pagenated,
+        'posts': posts_page,
+        'next_page_url': next_page_url,
+        'total_count': total_count,
+        'total_count_capped': total_count_capped,
         'query': query,
         'sort': sort_option,
         'genre_choices': BBSPost.GENRE_CHOICES,
@@ -111,9 +116,13 @@ def bbs_list(request):
 @login_required
 def bbs_detail(request, bbs_id):
     """掲示板詳細ビュー（モックコメント付き）"""
-    post = get_object_or_404(BBSPost.objects.select_related('user', 'store').prefetch_related('reactions'), post_id=bbs_id)
+    post = get_object_or_404(BBSPost.objects.select_related('user', 'store'), post_id=bbs_id)
 
-    all_comments = BBSComment.objects.select_related('user').prefetch_related('reactions').filter(post=post)
+    all_comments = BBSComment.objects.select_related('user').filter(post=post)
+
+    # リアクション数は件数カラムを参照し、ログインユーザーのリアクションは投稿・コメントそれぞれ1クエリで取得
+    BBSService.attach_user_reactions([post], request.user)
+    all_comments = BBSService.attach_user_reactions(all_comments, request.user)
 
     # ベストアンサーを先頭に、その他を時系列順にソート
     comments = sorted(all_comments, key=lambda x: (not x.is_best_answer, x.created_at))
@@ -138,8 +147,7 @@ def bbs_comment(request, bbs_id):
             bbs_comment.post = bbs_post
             bbs_comment.save()
             # コメント数を更新
-            bbs_post.comment_count = bbs_post.comments.count()
-            bbs_post.save(update_fields=['comment_count'])
+            BBSService.increment_comment_count(bbs_post.post_id)
         else:
             pass
 
@@ -158,52 +166,17 @@ def toggle_reaction(request):
         target_id = data.get('target_id')
         reaction_type = data.get('reaction_type')
 
-        # 1. 対象のモデルとリアクションモデルを切り替える
-        if target_type == 'post':
-            ModelClass = BBSPost
-            ReactionClass = BBSReaction
-            id_field = 'post_id'
-            related_name = 'reactions'
-            lookup_kwargs = {'post_id': target_id} # 検索条件
-            reaction_lookup = {'post': None}       # リアクション作成時の紐付けキー
-        elif target_type == 'comment':
-            ModelClass = BBSComment
-            ReactionClass = BBSCommentReaction
-            id_field = 'comment_id'
-            related_name = 'reactions'
-            lookup_kwargs = {'comment_id': target_id}
-            reaction_lookup = {'comment': None}
-        else:
+        # 1. 対象種別・リアクション種別のバリデーション
+        if target_type not in BBSService.REACTION_TARGETS:
             return JsonResponse({'error': 'Invalid target type'}, status=400)
-
-        # 2. リアクション種別のバリデーション
-        valid_reactions = [choice[0] for choice in ReactionClass.REACTION_CHOICES]
-        if reaction_type not in valid_reactions:
+        if reaction_type not in REACTION_COUNT_FIELDS:
             return JsonResponse({'error': 'Invalid reaction type'}, status=400)
 
-        # 3. 対象オブジェクトの取得
-        target_obj = get_object_or_404(ModelClass, **lookup_kwargs)
-
-        # 4. リアクションの検索・作成・削除
-        # 検索条件の構築 (例: post=target_obj, user=user, reaction_type=...)
-        filter_kwargs = reaction_lookup.copy()
-        key_name = list(filter_kwargs.keys())[0] # 'post' または 'comment'
-        filter_kwargs[key_name] = target_obj
-        filter_kwargs['user'] = request.user
-        filter_kwargs['reaction_type'] = reaction_type
-
-        reaction = ReactionClass.objects.filter(**filter_kwargs).first()
-
-        if reaction:
-            reaction.delete()
-            action = 'removed'
-        else:
-            ReactionClass.objects.create(**filter_kwargs)
-            action = 'added'
-
-        # 5. 現在の件数を再取得
-        # target_obj.reactions.filter(...)
-        count = getattr(target_obj, related_name).filter(reaction_type=reaction_type).count()
+        # 2. リアクションの切り替えと切り替え後の件数の取得（PostgreSQLでは1文で実行）
+        result = BBSService.toggle_reaction(target_type, target_id, request.user, reaction_type)
+        if result is None:
+            return JsonResponse({'error': 'Not found'}, status=404)
+        action, count = result
 
         return JsonResponse({
             'status': 'success',
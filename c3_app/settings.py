@@ -230,3 +230,67 @@ else:
 # デフォルトは空文字列（同じサーバーを使用）
 # Renderでは別サービスのURLを設定（例: https://c3-app-stream.onrender.com）
 STREAM_API_URL = os.getenv('STREAM_API_URL', '')
+
+# 分析グラフAPIのレスポンスキャッシュ
+# 'local': プロセス内LRU / 'django': CACHESの共有キャッシュ（複数プロセス構成ではこちらを推奨） / 'none': 無効
+ANALYTICS_GRAPH_CACHE_BACKEND = os.getenv('ANALYTICS_GRAPH_CACHE_BACKEND', 'local')
+ANALYTICS_GRAPH_CACHE_ALIAS = os.getenv('ANALYTICS_GRAPH_CACHE_ALIAS', 'default')
+ANALYTICS_GRAPH_CACHE_MAX_ENTRIES = int(os.getenv('ANALYTICS_GRAPH_CACHE_MAX_ENTRIES', '512'))
+# 当期（今日を含む期間）は短く、締まった過去期間は長くキャッシュする（秒）
+ANALYTICS_GRAPH_CACHE_CURRENT_TTL = int(os.getenv('ANALYTICS_GRAPH_CACHE_CURRENT_TTL', '60'))
+ANALYTICS_GRAPH_CACHE_CLOSED_TTL = int(os.getenv('ANALYTICS_GRAPH_CACHE_CLOSED_TTL', '86400'))
+
+# AIチャットエージェント（ストリーミング時のReActループ）
+# 最大ステップ数、ツール実行のタイムアウト（秒）、同一ステップ内で並列実行するツール数の上限
+AI_AGENT_MAX_ITERATIONS = int(os.getenv('AI_AGENT_MAX_ITERATIONS', '5'))
+AI_AGENT_TOOL_TIMEOUT = float(os.getenv('AI_AGENT_TOOL_TIMEOUT', '30'))
+AI_AGENT_MAX_TOOL_WORKERS = int(os.getenv('AI_AGENT_MAX_TOOL_WORKERS', '8'))
+
+# ツール結果のトークン予算（1回の応答の合計、1回のツール結果の上限）
+# 超えた場合は本文を短くし、それでも超える場合は末尾の項目を省略する（0で予算なし）
+AI_TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv('AI_TOOL_OUTPUT_TOKEN_BUDGET', '12000'))
+AI_TOOL_OUTPUT_MAX_CALL_TOKENS = int(os.getenv('AI_TOOL_OUTPUT_MAX_CALL_TOKENS', '4000'))
+
+# プロンプトに渡すチャット履歴（過去の会話の要約＋直近のやり取り）
+# 直近のやり取りの件数（質問と回答で1件）、直近のやり取りのトークン上限、要約のトークン上限
+AI_CHAT_HISTORY_RECENT_EXCHANGES = int(os.getenv('AI_CHAT_HISTORY_RECENT_EXCHANGES', '2'))
+AI_CHAT_HISTORY_MAX_TOKENS = int(os.getenv('AI_CHAT_HISTORY_MAX_TOKENS', '2000'))
+AI_CHAT_SUMMARY_MAX_TOKENS = int(os.getenv('AI_CHAT_SUMMARY_MAX_TOKENS', '600'))
+
+# 埋め込み生成のバッチサイズ（一括ベクトル化時の1リクエストあたりのテキスト数、OpenAIの上限は2048）
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '100'))
+
+# 埋め込みキャッシュ（embedding_cache）の保持期間（最終使用からの日数、0で削除しない）
+EMBEDDING_CACHE_TTL_DAYS = int(os.getenv('EMBEDDING_CACHE_TTL_DAYS', '90'))
+
+# 日報・掲示板のベクトル化
+# 'outbox': 保存と同じトランザクションでアウトボックスに登録し、vectorization_worker が非同期に処理 / 'sync': 保存時に同期実行
+AI_VECTORIZATION_MODE = os.getenv('AI_VECTORIZATION_MODE', 'outbox')
+# リトライ上限、初回リトライまでの待ち時間（秒、以降は倍々）とその上限、処理中タスクを再取得するまでの時間（秒）
+VECTORIZATION_OUTBOX_MAX_ATTEMPTS = int(os.getenv('VECTORIZATION_OUTBOX_MAX_ATTEMPTS', '5'))
+VECTORIZATION_OUTBOX_RETRY_DELAY = float(os.getenv('VECTORIZATION_OUTBOX_RETRY_DELAY', '2'))
+VECTORIZATION_OUTBOX_MAX_RETRY_DELAY = float(os.getenv('VECTORIZATION_OUTBOX_MAX_RETRY_DELAY', '300'))
+VECTORIZATION_OUTBOX_LOCK_TIMEOUT = int(os.getenv('VECTORIZATION_OUTBOX_LOCK_TIMEOUT', '300'))
+
+# ベクトル検索（pgvector HNSWインデックス）
+# ef_search: 探索候補数（大きいほど再現率が上がり遅くなる、pgvectorのデフォルトは40。取得件数より小さい場合は取得件数を使用）
+# iterative_scan: 'relaxed_order' / 'strict_order' で絞り込み時に件数が不足した場合も探索を継続（pgvector 0.8以降、空の場合は無効）
+AI_VECTOR_SEARCH_EF_SEARCH = int(os.getenv('AI_VECTOR_SEARCH_EF_SEARCH', '40'))
+AI_VECTOR_SEARCH_ITERATIVE_SCAN = os.getenv('AI_VECTOR_SEARCH_ITERATIVE_SCAN', 'relaxed_order')
+
+# ハイブリッド検索（キーワード＋ベクトル、Reciprocal Rank Fusion）
+# RRFの定数k（大きいほど上位と下位の差が小さくなる）、各検索で取得する候補数（top_k の倍数）
+AI_HYBRID_SEARCH_RRF_K = int(os.getenv('AI_HYBRID_SEARCH_RRF_K', '60'))
+AI_HYBRID_SEARCH_CANDIDATE_FACTOR = int(os.getenv('AI_HYBRID_SEARCH_CANDIDATE_FACTOR', '4'))
+
+# キーワード検索（日報・掲示板）
+# PostgreSQLでは pg_trgm インデックスを使用。それ以外のDBでバイグラム転置インデックスで候補を絞り込むか
+KEYWORD_SEARCH_BIGRAM_INDEX = os.getenv('KEYWORD_SEARCH_BIGRAM_INDEX', 'True') == 'True'
+
+# 検索クエリの埋め込みキャッシュ
+# プロセス内LRUの最大件数（0で無効）、有効期間（秒）、共有キャッシュとして使うCACHESのエイリアス（空の場合はプロセス内のみ）
+AI_QUERY_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('AI_QUERY_EMBEDDING_CACHE_MAX_ENTRIES', '1024'))
+AI_QUERY_EMBEDDING_CACHE_TTL = int(os.getenv('AI_QUERY_EMBEDDING_CACHE_TTL', '3600'))
+AI_QUERY_EMBEDDING_CACHE_SHARED_ALIAS = os.getenv('AI_QUERY_EMBEDDING_CACHE_SHARED_ALIAS', '')
+# 同じクエリを生成中の他スレッドを待つ時間の上限（秒、超えた場合は自分で生成）
+AI_QUERY_EMBEDDING_CACHE_WAIT_TIMEOUT = float(os.getenv('AI_QUERY_EMBEDDING_CACHE_WAIT_TIMEOUT', '10'))
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'common'
+
+    def ready(self):
+        # キーワード検索用バイグラムの自動更新シグナルを登録
+        from . import signals  # noqa: F401
@@ -0,0 +1,34 @@
+"""
+PostgreSQL専用インデックス
+
+SQLiteではフィールド追加・変更時にテーブルを作り直し、モデルの状態にある全てのインデックスを作成し直す。
+pg_trgm の GIN インデックスや pgvector の HNSW インデックスは SQLite では作成できないため、
+PostgreSQL以外では何も実行しないSQLを返す（作成・削除自体は AddPostgresIndex / RemovePostgresIndex で行う）。
+"""
+from django.contrib.postgres.indexes import GinIndex
+from django.db.backends.ddl_references import Statement
+from pgvector.django import HnswIndex
+
+
+class PostgresOnlyIndexMixin:
+    """PostgreSQL以外ではDDLを発行しないインデックス"""
+
+    NOOP_SQL = 'SELECT 1'
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement(self.NOOP_SQL)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement(self.NOOP_SQL)
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+class PostgresGinIndex(PostgresOnlyIndexMixin, GinIndex):
+    """PostgreSQLでのみ作成する GIN インデックス（pg_trgm 等）"""
+
+
+class PostgresHnswIndex(PostgresOnlyIndexMixin, HnswIndex):
+    """PostgreSQLでのみ作成する HNSW インデックス（pgvector）"""
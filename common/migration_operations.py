@@ -0,0 +1,43 @@
+"""
+マイグレーション共通オペレーション
+
+PostgreSQL専用のインデックス（pgvector HNSW、pg_trgm GIN等）は SQLite では作成できないため、
+データベースがPostgreSQLの場合のみ作成する。モデルの状態（Meta.indexes）は常に更新する。
+"""
+from django.db import migrations
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """PostgreSQLでのみ作成するインデックス"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class RemovePostgresIndex(migrations.RemoveIndex):
+    """PostgreSQLでのみ削除するインデックス（AddPostgresIndex で作成したもの）"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def replace_index_state(model_name, index):
+    """
+    既存のインデックスを、モデルの状態上だけ同名の別クラスのインデックスに置き換える（DDLは発行しない）
+
+    作成済みのインデックスを common.indexes の PostgreSQL専用インデックスとして扱うために使用する。
+    """
+    return migrations.SeparateDatabaseAndState(state_operations=[
+        migrations.RemoveIndex(model_name=model_name, name=index.name),
+        migrations.AddIndex(model_name=model_name, index=index),
+    ])
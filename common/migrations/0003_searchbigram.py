@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:25
+
+from django.db import migrations, models
+
+
+INDEXED_FIELDS = {
+    ('reports', 'DailyReport'): ('title', 'content'),
+    ('bbs', 'BBSPost'): ('title', 'content'),
+    ('bbs', 'BBSComment'): ('content',),
+}
+
+
+def extract_bigrams(text):
+    text = text.lower()
+    return {
+        text[i:i + 2]
+        for i in range(len(text) - 1)
+        if not (text[i].isspace() or text[i + 1].isspace())
+    }
+
+
+def build_search_bigrams(apps, schema_editor):
+    """既存の日報・掲示板のバイグラムを登録（PostgreSQLは pg_trgm を使うため不要）"""
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    SearchBigram = apps.get_model('common', 'SearchBigram')
+    for (app_label, model_name), fields in INDEXED_FIELDS.items():
+        model = apps.get_model(app_label, model_name)
+        label = f'{app_label}.{model_name.lower()}'
+        entries = []
+        for object_id, *texts in model.objects.values_list('pk', *fields).iterator():
+            bigrams = extract_bigrams('\n'.join(text or '' for text in texts))
+            entries.extend(
+                SearchBigram(model_label=label, object_id=object_id, bigram=bigram)
+                for bigram in bigrams
+            )
+        SearchBigram.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_delete_pagevisit'),
+        ('reports', '0001_initial'),
+        ('bbs', '0004_alter_bbscommentreaction_reaction_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchBigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=50, verbose_name='モデル')),
+                ('object_id', models.IntegerField(verbose_name='オブジェクトID')),
+                ('bigram', models.CharField(max_length=2, verbose_name='バイグラム')),
+            ],
+            options={
+                'verbose_name': '検索バイグラム',
+                'verbose_name_plural': '検索バイグラム',
+                'db_table': 'search_bigrams',
+                'indexes': [models.Index(fields=['model_label', 'object_id'], name='search_bigram_object_idx')],
+                'unique_together': {('model_label', 'bigram', 'object_id')},
+            },
+        ),
+        migrations.RunPython(build_search_bigrams, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,27 @@
 from django.db import models
 
 
-# class PageVisit(models.Model):
-#     message = models.CharField(max_length=200)
-#     visited_at = models.DateTimeField(auto_now_add=True)
+class SearchBigram(models.Model):
+    """キーワード検索用のバイグラム転置インデックス
 
-#     class Meta:
-#         ordering = ['-visited_at']
+    PostgreSQL以外（開発・テスト用のSQLite）で pg_trgm の代わりに使用する。
+    日報・掲示板投稿・コメントの本文を2文字単位に分割して保持し、
+    キーワード検索の候補を絞り込む。保存・削除時にシグナルで更新され、
+    rebuild_search_index コマンドで再構築できる。
+    """
 
-#     def __str__(self):
-#         return f"{self.message} - {self.visited_at}"
+    model_label = models.CharField(max_length=50, verbose_name='モデル')
+    object_id = models.IntegerField(verbose_name='オブジェクトID')
+    bigram = models.CharField(max_length=2, verbose_name='バイグラム')
+
+    class Meta:
+        db_table = 'search_bigrams'
+        verbose_name = '検索バイグラム'
+        verbose_name_plural = '検索バイグラム'
+        unique_together = [['model_label', 'bigram', 'object_id']]
+        indexes = [
+            models.Index(fields=['model_label', 'object_id'], name='search_bigram_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}:{self.object_id} - {self.bigram}"
@@ -0,0 +1,154 @@
+"""
+キーセット（カーソル）ページネーション
+
+Paginator は COUNT(*) で総件数を数え、OFFSET で読み飛ばすため、後ろのページほど遅くなる。
+並び順のキー（例: (created_at, pk)）の値をカーソルとして渡し、その値より後のレコードを
+インデックスで直接取得するため、何ページ目でも1ページ目と同じコストで取得できる。
+"""
+import base64
+import datetime
+import decimal
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def _encode_value(value):
+    """カーソルに含める値をJSONに変換（日時はマイクロ秒まで保持する）"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class KeysetPage:
+    """キーセットページネーションの1ページ"""
+
+    def __init__(self, object_list: List, next_cursor: Optional[str], cursor: Optional[str]):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        """先頭ページ以外か（カーソル指定で取得したページ）"""
+        return self.cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class KeysetPaginator:
+    """キーセット（カーソル）ページネーター
+
+    ordering の最後のキーは一意（主キー等）である必要がある。
+    アノテーション（例: リアクション数の合計）もキーに使用できる。
+    values() のクエリセット（例: 日付の一覧）の場合は、各行の辞書からキーの値を取得する。
+    """
+
+    def __init__(self, queryset, ordering: Sequence[str], per_page: int):
+        """
+        Args:
+            queryset: 対象のクエリセット
+            ordering: 並び順（例: ('-created_at', '-pk')）
+            per_page: 1ページあたりの件数
+        """
+        self.queryset = queryset.order_by(*ordering)
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.per_page = per_page
+
+    def get_page(self, cursor: Optional[str] = None) -> KeysetPage:
+        """
+        カーソルの次のページを取得（カーソルが不正な場合は先頭ページ）
+
+        Args:
+            cursor: 前のページの next_cursor
+
+        Returns:
+            KeysetPage: 取得したページ
+        """
+        values = self.decode_cursor(cursor)
+        queryset = self.queryset
+        if values is None:
+            cursor = None
+        else:
+            queryset = queryset.filter(self._after(values))
+
+        # 1件多く取得して次のページの有無を判定する
+        object_list = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode_cursor(object_list[-1])
+        return KeysetPage(object_list, next_cursor, cursor)
+
+    def count(self, limit: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        総件数を取得（limit を指定した場合は limit 件で打ち切る）
+
+        Args:
+            limit: 数える上限
+
+        Returns:
+            (件数, 上限で打ち切ったか)
+        """
+        queryset = self.queryset.order_by()
+        if limit is None:
+            return queryset.count(), False
+        count = queryset[:limit + 1].count()
+        return min(count, limit), count > limit
+
+    def encode_cursor(self, obj) -> str:
+        """レコードのキーの値をカーソル文字列に変換"""
+        if isinstance(obj, dict):
+            values = [obj[name] for name, _ in self.keys]
+        else:
+            values = [getattr(obj, name) for name, _ in self.keys]
+        data = json.dumps(values, default=_encode_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor: Optional[str]) -> Optional[List[Any]]:
+        """カーソル文字列をキーの値に変換（不正な場合はNone）"""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.keys):
+                return None
+            return [self._to_python(name, value) for (name, _), value in zip(self.keys, values)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _to_python(self, name: str, value):
+        opts = self.queryset.model._meta
+        try:
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            # アノテーションはJSONの値をそのまま使う
+            return value
+        return field.to_python(value)
+
+    def _after(self, values: List[Any]) -> Q:
+        """並び順でカーソルより後のレコードの条件（(a, b) < (x, y) を展開した形）"""
+        condition = Q()
+        for i, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for (prev_name, _), prev_value in zip(self.keys[:i], values[:i]):
+                term &= Q(**{prev_name: prev_value})
+            condition |= term
+        return condition
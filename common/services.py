@@ -0,0 +1,187 @@
+"""
+共通のビジネスロジック
+日報・掲示板のキーワード検索（PostgreSQLは pg_trgm、それ以外はバイグラム転置インデックス）
+"""
+import logging
+from typing import Iterable, List, Optional, Sequence, Set
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Q
+
+from .models import SearchBigram
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordSearchService:
+    """キーワード検索サービス
+
+    PostgreSQLでは icontains（UPPER(col) LIKE '%...%'）を UPPER 式の pg_trgm GIN インデックスで処理する。
+    それ以外のデータベースでは SearchBigram で候補IDを絞り込んでから icontains で確認する。
+    """
+
+    # モデルラベル → インデックス対象フィールド
+    INDEXED_FIELDS = {
+        'reports.dailyreport': ('title', 'content'),
+        'bbs.bbspost': ('title', 'content'),
+        'bbs.bbscomment': ('content',),
+    }
+
+    # 再構築時の一括登録件数
+    BULK_BATCH_SIZE = 1000
+
+    @staticmethod
+    def split_keywords(query: Optional[str]) -> List[str]:
+        """検索文字列を空白（全角スペース含む）で分割
+
+        Args:
+            query: 検索文字列
+
+        Returns:
+            キーワードのリスト
+        """
+        if not query:
+            return []
+        return query.replace('　', ' ').split()
+
+    @staticmethod
+    def extract_bigrams(text: Optional[str]) -> Set[str]:
+        """テキストを小文字化して2文字単位に分割（空白を含むものは除外）
+
+        Args:
+            text: 対象テキスト
+
+        Returns:
+            バイグラムの集合
+        """
+        text = (text or '').lower()
+        return {
+            text[i:i + 2]
+            for i in range(len(text) - 1)
+            if not (text[i].isspace() or text[i + 1].isspace())
+        }
+
+    @staticmethod
+    def is_bigram_index_enabled(using: str = 'default') -> bool:
+        """バイグラム転置インデックスを使用するか（PostgreSQL以外かつ設定で有効な場合）"""
+        return (
+            connections[using].vendor != 'postgresql'
+            and getattr(settings, 'KEYWORD_SEARCH_BIGRAM_INDEX', True)
+        )
+
+    @classmethod
+    def filter(cls, queryset, keywords: Iterable[str], fields: Sequence[str] = ('title', 'content')):
+        """キーワードのいずれかを fields のいずれかに含むレコードに絞り込む
+
+        Args:
+            queryset: 検索対象のクエリセット（日報・掲示板投稿・コメント）
+            keywords: キーワードのリスト
+            fields: 検索対象のフィールド名
+
+        Returns:
+            QuerySet: 絞り込み後のクエリセット（キーワードが空の場合はそのまま）
+        """
+        keywords = [keyword for keyword in keywords if keyword]
+        if not keywords:
+            return queryset
+
+        label = queryset.model._meta.label_lower
+        use_index = (
+            set(fields) <= set(cls.INDEXED_FIELDS.get(label, ()))
+            and cls.is_bigram_index_enabled(queryset.db)
+        )
+
+        condition = Q()
+        for keyword in keywords:
+            keyword_condition = Q()
+            for field in fields:
+                keyword_condition |= Q(**{f'{field}__icontains': keyword})
+            if use_index:
+                candidate_ids = cls._candidate_ids(label, keyword)
+                if candidate_ids is not None:
+                    keyword_condition &= Q(pk__in=candidate_ids)
+            condition |= keyword_condition
+        return queryset.filter(condition)
+
+    @classmethod
+    def _candidate_ids(cls, label: str, keyword: str):
+        """キーワードの全バイグラムを含むオブジェクトIDのサブクエリ（1文字のキーワードはNone）"""
+        bigrams = cls.extract_bigrams(keyword)
+        if not bigrams:
+            return None
+        return (
+            SearchBigram.objects.filter(model_label=label, bigram__in=bigrams)
+            .values('object_id')
+            .annotate(matched=Count('bigram'))
+            .filter(matched=len(bigrams))
+            .values('object_id')
+        )
+
+    @classmethod
+    def _build_entries(cls, label: str, object_id: int, texts: Iterable[Optional[str]]) -> List[SearchBigram]:
+        bigrams = cls.extract_bigrams('\n'.join(text or '' for text in texts))
+        return [
+            SearchBigram(model_label=label, object_id=object_id, bigram=bigram)
+            for bigram in bigrams
+        ]
+
+    @classmethod
+    def index_object(cls, instance) -> None:
+        """オブジェクトのバイグラムを登録し直す
+
+        Args:
+            instance: 日報・掲示板投稿・コメントのインスタンス
+        """
+        label = instance._meta.label_lower
+        fields = cls.INDEXED_FIELDS.get(label)
+        if fields is None or not cls.is_bigram_index_enabled(instance._state.db or 'default'):
+            return
+
+        entries = cls._build_entries(label, instance.pk, (getattr(instance, field) for field in fields))
+        with transaction.atomic():
+            SearchBigram.objects.filter(model_label=label, object_id=instance.pk).delete()
+            SearchBigram.objects.bulk_create(entries)
+
+    @classmethod
+    def remove_object(cls, instance) -> None:
+        """オブジェクトのバイグラムを削除
+
+        Args:
+            instance: 日報・掲示板投稿・コメントのインスタンス
+        """
+        label = instance._meta.label_lower
+        if label not in cls.INDEXED_FIELDS or not cls.is_bigram_index_enabled(instance._state.db or 'default'):
+            return
+        SearchBigram.objects.filter(model_label=label, object_id=instance.pk).delete()
+
+    @classmethod
+    def rebuild(cls, labels: Optional[Iterable[str]] = None) -> int:
+        """バイグラム転置インデックスを元データから再構築
+
+        Args:
+            labels: 対象のモデルラベル（省略時は全対象モデル）
+
+        Returns:
+            int: 登録したオブジェクト数（PostgreSQLでは常に0）
+        """
+        if not cls.is_bigram_index_enabled():
+            return 0
+
+        count = 0
+        for label in labels or cls.INDEXED_FIELDS:
+            fields = cls.INDEXED_FIELDS[label]
+            model = apps.get_model(label)
+            with transaction.atomic():
+                SearchBigram.objects.filter(model_label=label).delete()
+                entries = []
+                for object_id, *texts in model.objects.values_list('pk', *fields).iterator():
+                    entries.extend(cls._build_entries(label, object_id, texts))
+                    count += 1
+                    if len(entries) >= cls.BULK_BATCH_SIZE:
+                        SearchBigram.objects.bulk_create(entries)
+                        entries = []
+                SearchBigram.objects.bulk_create(entries)
+            logger.info(f"Rebuilt search bigrams for {label}")
+        return count
@@ -0,0 +1,29 @@
+"""
+キーワード検索用バイグラム転置インデックス（SearchBigram）の自動更新
+
+日報・掲示板投稿・コメントの保存/削除時に、該当オブジェクトのバイグラムを登録し直す。
+PostgreSQLでは pg_trgm インデックスを使うため何もしない。
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bbs.models import BBSComment, BBSPost
+from reports.models import DailyReport
+
+from .services import KeywordSearchService
+
+
+@receiver(post_save, sender=DailyReport)
+@receiver(post_save, sender=BBSPost)
+@receiver(post_save, sender=BBSComment)
+def index_search_bigrams(sender, instance, **kwargs):
+    """保存後にバイグラムを登録し直す"""
+    KeywordSearchService.index_object(instance)
+
+
+@receiver(post_delete, sender=DailyReport)
+@receiver(post_delete, sender=BBSPost)
+@receiver(post_delete, sender=BBSComment)
+def remove_search_bigrams(sender, instance, **kwargs):
+    """削除後にバイグラムを削除"""
+    KeywordSearchService.remove_object(instance)
@@ -0,0 +1,126 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+
+from bbs.models import BBSPost
+from common.pagination import KeysetPaginator
+from reports.models import DailyReport
+from stores.models import Store
+
+User = get_user_model()
+
+
+class KeysetPaginatorTest(TestCase):
+    """キーセット（カーソル）ページネーションのテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_name="テスト店舗", store_id=1)
+        self.user = User.objects.create_user(
+            password='password123',
+            user_id='user001',
+            store=self.store
+        )
+        # 同じ日付・同じ作成日時の日報を含めて作成
+        for day in (10, 10, 10, 11, 12, 12, 13):
+            DailyReport.objects.create(
+                store=self.store,
+                user=self.user,
+                date=date(2026, 1, day),
+                genre='claim',
+                location='hall',
+                title=f'日報{day}',
+                content='内容'
+            )
+        DailyReport.objects.filter(date=date(2026, 1, 10)).update(
+            created_at=datetime(2026, 1, 10, 9, 0, 0, 123456, tzinfo=dt_timezone.utc)
+        )
+        self.ordering = ('-date', '-created_at', '-report_id')
+
+    def _collect(self, paginator):
+        """カーソルをたどって全ページを取得"""
+        pages = []
+        page = paginator.get_page()
+        pages.append(page)
+        while page.has_next:
+            page = paginator.get_page(page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_pages_cover_all_in_order(self):
+        """全ページをたどると重複・欠落なく並び順どおりに取得できる"""
+        queryset = DailyReport.objects.all()
+        pages = self._collect(KeysetPaginator(queryset, self.ordering, 3))
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous)
+        self.assertTrue(pages[1].has_previous)
+        self.assertEqual(
+            [report.report_id for page in pages for report in page],
+            list(queryset.order_by(*self.ordering).values_list('report_id', flat=True))
+        )
+
+    def test_ascending_order(self):
+        """昇順でも重複・欠落なく取得できる"""
+        ordering = ('date', 'created_at', 'report_id')
+        queryset = DailyReport.objects.all()
+        pages = self._collect(KeysetPaginator(queryset, ordering, 2))
+
+        self.assertEqual(
+            [report.report_id for page in pages for report in page],
+            list(queryset.order_by(*ordering).values_list('report_id', flat=True))
+        )
+
+    def test_page_queries_do_not_count(self):
+        """ページの取得は1クエリで、COUNT(*) を実行しない"""
+        paginator = KeysetPaginator(DailyReport.objects.all(), self.ordering, 3)
+        first_page = paginator.get_page()
+
+        with self.assertNumQueries(1) as context:
+            paginator.get_page(first_page.next_cursor)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'].upper())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """不正なカーソルは先頭ページとして扱う"""
+        paginator = KeysetPaginator(DailyReport.objects.all(), self.ordering, 3)
+        first_ids = [report.report_id for report in paginator.get_page()]
+
+        for cursor in ('invalid', 'W10', paginator.encode_cursor({'date': 1, 'created_at': 2, 'report_id': 3})[:-2]):
+            page = paginator.get_page(cursor)
+            self.assertEqual([report.report_id for report in page], first_ids)
+            self.assertFalse(page.has_previous)
+
+    def test_values_queryset(self):
+        """values() のクエリセット（日付の一覧）もページネーションできる"""
+        paginator = KeysetPaginator(DailyReport.objects.values('date').distinct(), ('-date',), 3)
+        pages = self._collect(paginator)
+
+        self.assertEqual(
+            [row['date'].day for page in pages for row in page],
+            [13, 12, 11, 10]
+        )
+
+    def test_annotation_key(self):
+        """アノテーションを並び順のキーに使用できる"""
+        for i, (iine, naruhodo) in enumerate(((3, 0), (1, 1), (0, 0), (2, 1))):
+            BBSPost.objects.create(
+                store=self.store, user=self.user, title=f'投稿{i}', content='内容',
+                iine_count=iine, naruhodo_count=naruhodo
+            )
+        queryset = BBSPost.objects.annotate(total_reactions=F('naruhodo_count') + F('iine_count'))
+        ordering = ('-total_reactions', '-created_at', '-post_id')
+        pages = self._collect(KeysetPaginator(queryset, ordering, 1))
+
+        self.assertEqual(
+            [post.title for page in pages for post in page],
+            ['投稿3', '投稿0', '投稿1', '投稿2']
+        )
+
+    def test_count_with_limit(self):
+        """総件数は上限件数で打ち切れる"""
+        paginator = KeysetPaginator(DailyReport.objects.all(), self.ordering, 3)
+
+        self.assertEqual(paginator.count(), (7, False))
+        self.assertEqual(paginator.count(limit=5), (5, True))
+        self.assertEqual(paginator.count(limit=7), (7, False))
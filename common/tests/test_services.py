@@ -0,0 +1,151 @@
+from io import StringIO
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from bbs.models import BBSComment, BBSPost
+from common.models import SearchBigram
+from common.services import KeywordSearchService
+from reports.models import DailyReport
+from stores.models import Store
+
+User = get_user_model()
+
+
+class KeywordSearchServiceTest(TestCase):
+    """キーワード検索サービスのテスト（SQLiteのバイグラム転置インデックス）"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_name="テスト店舗", store_id=1)
+        self.user = User.objects.create_user(
+            password='password123',
+            user_id='user001',
+            store=self.store
+        )
+
+    def _create_report(self, title, content):
+        return DailyReport.objects.create(
+            store=self.store,
+            user=self.user,
+            date=date(2026, 1, 10),
+            genre='claim',
+            location='hall',
+            title=title,
+            content=content
+        )
+
+    def _search_reports(self, keywords):
+        return set(
+            KeywordSearchService.filter(DailyReport.objects.all(), keywords)
+            .values_list('title', flat=True)
+        )
+
+    def test_split_keywords(self):
+        """全角スペースを含む検索文字列の分割"""
+        self.assertEqual(KeywordSearchService.split_keywords('提供　遅延 ホール'), ['提供', '遅延', 'ホール'])
+        self.assertEqual(KeywordSearchService.split_keywords(''), [])
+        self.assertEqual(KeywordSearchService.split_keywords(None), [])
+
+    def test_extract_bigrams(self):
+        """小文字化して2文字単位に分割し、空白をまたぐものは除外"""
+        self.assertEqual(KeywordSearchService.extract_bigrams('提供遅延'), {'提供', '供遅', '遅延'})
+        self.assertEqual(KeywordSearchService.extract_bigrams('AB c'), {'ab'})
+        self.assertEqual(KeywordSearchService.extract_bigrams('あ'), set())
+
+    def test_index_on_save(self):
+        """保存時にバイグラムが登録され、更新時に登録し直される"""
+        report = self._create_report('提供遅延', '混雑')
+        label = 'reports.dailyreport'
+
+        bigrams = set(SearchBigram.objects.filter(
+            model_label=label, object_id=report.pk
+        ).values_list('bigram', flat=True))
+        self.assertEqual(bigrams, {'提供', '供遅', '遅延', '混雑'})
+
+        report.content = '清掃'
+        report.save()
+        bigrams = set(SearchBigram.objects.filter(
+            model_label=label, object_id=report.pk
+        ).values_list('bigram', flat=True))
+        self.assertEqual(bigrams, {'提供', '供遅', '遅延', '清掃'})
+
+    def test_remove_on_delete(self):
+        """削除時にバイグラムが削除される（投稿削除でCASCADEされたコメントも含む）"""
+        post = BBSPost.objects.create(store=self.store, user=self.user, title='営業時間', content='年末年始')
+        BBSComment.objects.create(post=post, user=self.user, content='了解しました')
+
+        post.delete()
+
+        self.assertFalse(SearchBigram.objects.exists())
+
+    def test_filter_matches_title_and_content(self):
+        """タイトル・本文のいずれかにキーワードを含む日報を取得"""
+        self._create_report('提供遅延について', 'ランチの混雑で提供が遅れた')
+        self._create_report('お褒めの言葉', '接客が丁寧だと言われた')
+        self._create_report('清掃報告', 'トイレの清掃が遅延した')
+
+        self.assertEqual(self._search_reports(['遅延']), {'提供遅延について', '清掃報告'})
+        self.assertEqual(self._search_reports(['丁寧']), {'お褒めの言葉'})
+        self.assertEqual(self._search_reports(['存在しない']), set())
+
+    def test_filter_requires_contiguous_match(self):
+        """バイグラムが全て含まれていても連続していなければ一致しない"""
+        self._create_report('提供', '遅延と供遅')
+
+        self.assertEqual(self._search_reports(['提供遅延']), set())
+
+    def test_filter_keywords_or(self):
+        """複数キーワードはいずれかに一致すればよい"""
+        self._create_report('提供遅延', '')
+        self._create_report('接客', '丁寧')
+        self._create_report('清掃', '')
+
+        self.assertEqual(self._search_reports(['遅延', '丁寧']), {'提供遅延', '接客'})
+
+    def test_filter_single_character_and_case(self):
+        """1文字のキーワードと英字の大文字小文字を区別しない検索"""
+        self._create_report('POS不具合', 'レジが止まった')
+        self._create_report('接客', '丁寧')
+
+        self.assertEqual(self._search_reports(['止']), {'POS不具合'})
+        self.assertEqual(self._search_reports(['pos']), {'POS不具合'})
+
+    def test_filter_empty_keywords(self):
+        """キーワードが空の場合は絞り込まない"""
+        self._create_report('提供遅延', '')
+
+        queryset = DailyReport.objects.all()
+        self.assertIs(KeywordSearchService.filter(queryset, []), queryset)
+
+    def test_filter_comments(self):
+        """コメントは本文のみを検索"""
+        post = BBSPost.objects.create(store=self.store, user=self.user, title='営業時間', content='年末年始')
+        BBSComment.objects.create(post=post, user=self.user, content='了解しました')
+
+        comments = KeywordSearchService.filter(BBSComment.objects.all(), ['了解'], fields=('content',))
+        self.assertEqual(comments.count(), 1)
+
+    @override_settings(KEYWORD_SEARCH_BIGRAM_INDEX=False)
+    def test_filter_without_bigram_index(self):
+        """インデックス無効時（PostgreSQL相当）は icontains のみで検索"""
+        self._create_report('提供遅延', '')
+
+        queryset = KeywordSearchService.filter(DailyReport.objects.all(), ['遅延'])
+
+        self.assertNotIn('search_bigrams', str(queryset.query))
+        self.assertEqual(queryset.count(), 1)
+        self.assertFalse(SearchBigram.objects.exists())
+
+    def test_rebuild_search_index(self):
+        """シグナルを経由しない変更後にコマンドで再構築"""
+        report = self._create_report('提供遅延', '')
+        DailyReport.objects.filter(pk=report.pk).update(title='清掃報告')
+
+        self.assertEqual(self._search_reports(['清掃']), set())
+
+        call_command('rebuild_search_index', '--model', 'reports.dailyreport', stdout=StringIO())
+
+        self.assertEqual(self._search_reports(['清掃']), {'清掃報告'})
+        self.assertEqual(self._search_reports(['遅延']), set())
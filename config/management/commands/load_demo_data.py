@@ -9,6 +9,7 @@
     --dry-run: 実際には実行せず、SQLの内容を表示
 """
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import connection
 from pathlib import Path
@@ -59,6 +60,7 @@ class Command(BaseCommand):
                     bbs_posts,
                     daily_reports,
                     store_daily_performances,
+                    store_daily_rollups,
                     monthly_goals,
                     document_vectors,
                     knowledge_vectors
@@ -85,6 +87,11 @@ class Command(BaseCommand):
 
             self.stdout.write(self.style.SUCCESS('デモデータの読み込みが完了しました！'))
 
+            # SQL投入はシグナルを経由しないため店舗日次集計・検索インデックス・リアクション数を再構築
+            call_command('rebuild_daily_rollups', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('rebuild_reaction_counts', stdout=self.stdout)
+
             # 読み込み結果の確認
             self.stdout.write('\n=== 読み込み結果 ===')
             tables_to_check = [
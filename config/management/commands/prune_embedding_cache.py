@@ -0,0 +1,31 @@
+"""
+一定期間使われていない埋め込みキャッシュ（embedding_cache）を削除するコマンド
+
+vectorization_worker も1日1回削除するため、ワーカーを常時起動していない場合に cron 等から実行します。
+
+使用方法:
+    python manage.py prune_embedding_cache
+
+オプション:
+    --days: 最終使用からの日数（デフォルト: settings.EMBEDDING_CACHE_TTL_DAYS）
+"""
+
+from django.core.management.base import BaseCommand
+
+from ai_features.services.core_services import EmbeddingService
+
+
+class Command(BaseCommand):
+    help = '一定期間使われていない埋め込みキャッシュを削除します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='最終使用からの日数（0以下の場合は削除しない）',
+        )
+
+    def handle(self, *args, **options):
+        deleted = EmbeddingService.prune_embedding_cache(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'埋め込みキャッシュを削除しました: {deleted}件'))
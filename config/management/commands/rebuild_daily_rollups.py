@@ -0,0 +1,63 @@
+"""
+店舗日次集計（StoreDailyRollup）を再構築するコマンド
+
+SQLでの一括投入など、シグナルを経由せずに日報・店舗日次実績が変更された場合に実行します。
+
+使用方法:
+    python manage.py rebuild_daily_rollups
+
+オプション:
+    --store: 対象の店舗ID（省略時は全店舗）
+    --from: 開始日（YYYY-MM-DD、省略時は制限なし）
+    --to: 終了日（YYYY-MM-DD、省略時は制限なし）
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from analytics.cache import GraphDataCache
+from analytics.services import DailyRollupService
+
+
+class Command(BaseCommand):
+    help = '店舗日次集計を日報・店舗日次実績から再構築します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--store',
+            type=int,
+            help='対象の店舗ID（省略時は全店舗）',
+        )
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            help='開始日（YYYY-MM-DD）',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            help='終了日（YYYY-MM-DD）',
+        )
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['date_from'])
+        end_date = self._parse_date(options['date_to'])
+
+        self.stdout.write('店舗日次集計を再構築しています...')
+        count = DailyRollupService.rebuild(
+            start_date=start_date,
+            end_date=end_date,
+            store_id=options['store'],
+        )
+        # 再構築した集計を参照するよう、グラフキャッシュを全て無効化
+        GraphDataCache.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f'店舗日次集計を再構築しました: {count}件'))
+
+    def _parse_date(self, value):
+        """YYYY-MM-DD形式の日付をパース"""
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'日付形式が不正です: {value}（YYYY-MM-DD形式で指定してください）')
+        return parsed
@@ -0,0 +1,21 @@
+"""
+掲示板の投稿・コメントのリアクション数（naruhodo_count / iine_count）を再集計するコマンド
+
+SQLでの一括投入など、シグナルを経由せずにリアクションが変更された場合に実行します。
+
+使用方法:
+    python manage.py rebuild_reaction_counts
+"""
+
+from django.core.management.base import BaseCommand
+
+from bbs.services import BBSService
+
+
+class Command(BaseCommand):
+    help = '掲示板の投稿・コメントのリアクション数をリアクションテーブルから再集計します'
+
+    def handle(self, *args, **options):
+        self.stdout.write('リアクション数を再集計しています...')
+        BBSService.rebuild_reaction_counts()
+        self.stdout.write(self.style.SUCCESS('リアクション数を再集計しました'))
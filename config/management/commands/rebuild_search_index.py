@@ -0,0 +1,37 @@
+"""
+キーワード検索用のバイグラム転置インデックス（SearchBigram）を再構築するコマンド
+
+SQLでの一括投入など、シグナルを経由せずに日報・掲示板が変更された場合に実行します。
+PostgreSQLでは pg_trgm インデックスを使用するため何もしません。
+
+使用方法:
+    python manage.py rebuild_search_index
+
+オプション:
+    --model: 対象のモデル（reports.dailyreport / bbs.bbspost / bbs.bbscomment、複数指定可、省略時は全て）
+"""
+
+from django.core.management.base import BaseCommand
+
+from common.services import KeywordSearchService
+
+
+class Command(BaseCommand):
+    help = 'キーワード検索用のバイグラム転置インデックスを日報・掲示板から再構築します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            choices=list(KeywordSearchService.INDEXED_FIELDS),
+            help='対象のモデル（複数指定可、省略時は全て）',
+        )
+
+    def handle(self, *args, **options):
+        if not KeywordSearchService.is_bigram_index_enabled():
+            self.stdout.write('PostgreSQLでは pg_trgm インデックスを使用するため再構築は不要です')
+            return
+
+        self.stdout.write('検索インデックスを再構築しています...')
+        count = KeywordSearchService.rebuild(options['model'])
+        self.stdout.write(self.style.SUCCESS(f'検索インデックスを再構築しました: {count}件'))
@@ -216,15 +216,10 @@ class Command(BaseCommand):
             self.stdout.write('ベクトル化する日報がありません')
             return
 
-        success_count = 0
-        error_count = 0
-
-        for report in tqdm(reports, desc='日報をベクトル化中', unit='件'):
-            result = VectorizationService.vectorize_daily_report(report.report_id)
-            if result:
-                success_count += 1
-            else:
-                error_count += 1
+        with tqdm(total=total, desc='日報をベクトル化中', unit='件') as progress:
+            success_count, error_count = VectorizationService.bulk_vectorize(
+                'daily_report', progress=progress.update
+            )
 
         self.stdout.write(self.style.SUCCESS(
             f'\n日報のベクトル化完了: 成功 {success_count}件, 失敗 {error_count}件, 合計 {total}件'
@@ -335,15 +330,10 @@ class Command(BaseCommand):
         total_posts = all_posts.count()
 
         if total_posts > 0:
-            success_count = 0
-            error_count = 0
-
-            for post in tqdm(all_posts, desc='掲示板投稿をベクトル化中', unit='件'):
-                result = VectorizationService.vectorize_bbs_post(post.post_id)
-                if result:
-                    success_count += 1
-                else:
-                    error_count += 1
+            with tqdm(total=total_posts, desc='掲示板投稿をベクトル化中', unit='件') as progress:
+                success_count, error_count = VectorizationService.bulk_vectorize(
+                    'bbs_post', progress=progress.update
+                )
 
             self.stdout.write(self.style.SUCCESS(
                 f'\n掲示板投稿のベクトル化完了: 成功 {success_count}件, 失敗 {error_count}件, 合計 {total_posts}件'
@@ -358,15 +348,10 @@ class Command(BaseCommand):
         total_comments = all_comments.count()
 
         if total_comments > 0:
-            success_count = 0
-            error_count = 0
-
-            for comment in tqdm(all_comments, desc='掲示板コメントをベクトル化中', unit='件'):
-                result = VectorizationService.vectorize_bbs_comment(comment.comment_id)
-                if result:
-                    success_count += 1
-                else:
-                    error_count += 1
+            with tqdm(total=total_comments, desc='掲示板コメントをベクトル化中', unit='件') as progress:
+                success_count, error_count = VectorizationService.bulk_vectorize(
+                    'bbs_comment', progress=progress.update
+                )
 
             self.stdout.write(self.style.SUCCESS(
                 f'\n掲示板コメントのベクトル化完了: 成功 {success_count}件, 失敗 {error_count}件, 合計 {total_comments}件'
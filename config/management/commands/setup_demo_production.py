@@ -10,6 +10,7 @@
     --password: デモユーザーのパスワード（デフォルト: password123）
 """
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import connection
 from django.contrib.auth import get_user_model
@@ -76,6 +77,7 @@ class Command(BaseCommand):
                 report_images,
                 daily_reports,
                 store_daily_performances,
+                store_daily_rollups,
                 monthly_goals
             RESTART IDENTITY CASCADE;
 
@@ -114,6 +116,11 @@ class Command(BaseCommand):
                 cursor.execute(sql_content)
 
             self.stdout.write(self.style.SUCCESS('シードデータを投入しました'))
+
+            # SQL投入はシグナルを経由しないため店舗日次集計・検索インデックス・リアクション数を再構築
+            call_command('rebuild_daily_rollups', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('rebuild_reaction_counts', stdout=self.stdout)
             self._show_data_counts()
 
         except Exception as e:
@@ -126,54 +133,19 @@ class Command(BaseCommand):
         """全データをベクトル化"""
         self.stdout.write(self.style.WARNING('\n3. データをベクトル化中...\n'))
 
-        from reports.models import DailyReport
-        from bbs.models import BBSPost, BBSComment
         from ai_features.services.core_services import VectorizationService
 
-        # 日報のベクトル化
-        self.stdout.write('  日報をベクトル化中...')
-        reports = DailyReport.objects.all()
-        success, fail = 0, 0
-
-        for report in reports:
-            if VectorizationService.vectorize_daily_report(report.report_id):
-                success += 1
-            else:
-                fail += 1
-
-        self.stdout.write(
-            self.style.SUCCESS(f'    日報: 成功 {success}件, 失敗 {fail}件')
-        )
-
-        # BBS投稿のベクトル化
-        self.stdout.write('  掲示板投稿をベクトル化中...')
-        posts = BBSPost.objects.all()
-        success, fail = 0, 0
-
-        for post in posts:
-            if VectorizationService.vectorize_bbs_post(post.post_id):
-                success += 1
-            else:
-                fail += 1
-
-        self.stdout.write(
-            self.style.SUCCESS(f'    掲示板投稿: 成功 {success}件, 失敗 {fail}件')
-        )
-
-        # BBSコメントのベクトル化
-        self.stdout.write('  掲示板コメントをベクトル化中...')
-        comments = BBSComment.objects.all()
-        success, fail = 0, 0
-
-        for comment in comments:
-            if VectorizationService.vectorize_bbs_comment(comment.comment_id):
-                success += 1
-            else:
-                fail += 1
-
-        self.stdout.write(
-            self.style.SUCCESS(f'    掲示板コメント: 成功 {success}件, 失敗 {fail}件')
-        )
+        targets = [
+            ('daily_report', '日報'),
+            ('bbs_post', '掲示板投稿'),
+            ('bbs_comment', '掲示板コメント'),
+        ]
+        for source_type, label in targets:
+            self.stdout.write(f'  {label}をベクトル化中...')
+            success, fail = VectorizationService.bulk_vectorize(source_type)
+            self.stdout.write(
+                self.style.SUCCESS(f'    {label}: 成功 {success}件, 失敗 {fail}件')
+            )
 
     def _show_data_counts(self):
         """データ件数を表示"""
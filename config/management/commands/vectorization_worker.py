@@ -0,0 +1,115 @@
+"""
+ベクトル化のアウトボックス（vectorization_outbox）を処理するワーカーコマンド
+
+日報・掲示板の作成/更新時に登録されたタスクを取り出し、並列にベクトル化します。
+失敗したタスクは指数バックオフでリトライし、上限に達したものは failed として残ります。
+DB接続の切断などでタスクの取得自体が失敗した場合も停止せず、待機してから再開します。
+タスクがないときは、使われていない埋め込みキャッシュの削除も1日1回行います。
+外部のキューは不要で、SQLite/PostgreSQL のどちらでも動作します。
+
+使用方法:
+    python manage.py vectorization_worker
+
+オプション:
+    --once: 実行可能なタスクを処理したら終了（cron等から定期実行する場合）
+    --batch-size: 1回に取得するタスク数（デフォルト: 20）
+    --workers: 並列に処理するスレッド数（デフォルト: 4）
+    --interval: タスクがないときのポーリング間隔（秒、デフォルト: 1.0）
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ai_features.services.core_services import EmbeddingService, VectorizationOutboxService
+
+logger = logging.getLogger(__name__)
+
+# エラーが続いた場合の待機時間の上限（秒）
+MAX_ERROR_BACKOFF = 60
+
+# 埋め込みキャッシュを削除する間隔（秒）
+EMBEDDING_CACHE_PRUNE_INTERVAL = 24 * 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'ベクトル化のアウトボックスを処理します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='実行可能なタスクを処理したら終了',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='1回に取得するタスク数',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='並列に処理するスレッド数',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='タスクがないときのポーリング間隔（秒）',
+        )
+
+    def handle(self, *args, **options):
+        if not options['once']:
+            self.stdout.write('ベクトル化ワーカーを起動しました（Ctrl+Cで停止）')
+
+        total_success, total_fail = 0, 0
+        error_count = 0
+        last_pruned_at = None
+        try:
+            while True:
+                # 切断された接続・寿命を過ぎた接続を閉じる（長時間動作するため毎回確認）
+                close_old_connections()
+                try:
+                    success, fail = VectorizationOutboxService.drain(
+                        batch_size=options['batch_size'],
+                        max_workers=options['workers'],
+                    )
+                    if not (success or fail) and (
+                        last_pruned_at is None
+                        or time.monotonic() - last_pruned_at >= EMBEDDING_CACHE_PRUNE_INTERVAL
+                    ):
+                        pruned = EmbeddingService.prune_embedding_cache()
+                        last_pruned_at = time.monotonic()
+                        if pruned:
+                            self.stdout.write(f'埋め込みキャッシュを削除しました: {pruned}件')
+                except Exception as e:
+                    # DB接続の切断などで停止せず、バックオフしてから再開する
+                    error_count += 1
+                    delay = min(options['interval'] * (2 ** error_count), MAX_ERROR_BACKOFF)
+                    logger.error(f"Vectorization worker error (retry in {delay:.1f}s): {e}", exc_info=True)
+                    self.stderr.write(f'エラーが発生しました（{delay:.1f}秒後に再開）: {e}')
+                    if options['once']:
+                        break
+                    time.sleep(delay)
+                    continue
+
+                error_count = 0
+                total_success += success
+                total_fail += fail
+                if success or fail:
+                    self.stdout.write(f'ベクトル化: 成功 {success}件, 失敗 {fail}件')
+                    continue
+
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nベクトル化ワーカーを停止しました')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'処理したタスク: 成功 {total_success}件, 失敗 {total_fail}件')
+        )
@@ -0,0 +1,64 @@
+"""
+日報・掲示板投稿・掲示板コメントを一括でベクトル化するコマンド
+
+SQLでの一括投入など、シグナルやサービスを経由せずにデータが登録された場合に実行します。
+埋め込みはバッチ単位でまとめて生成し、DocumentVector に一括で書き込みます（既存行は更新）。
+コンテンツに変更がないデータは埋め込みを再生成しません。
+
+使用方法:
+    python manage.py vectorize_all
+
+オプション:
+    --type: 対象のソース種別（daily_report / bbs_post / bbs_comment、省略時は全種別）
+    --batch-size: 1バッチあたりの件数（省略時は settings.EMBEDDING_BATCH_SIZE）
+    --force: コンテンツに変更がないデータも埋め込みを再生成（埋め込みモデルの切り替え時など）
+"""
+
+from django.core.management.base import BaseCommand
+
+from ai_features.services.core_services import VectorizationService
+
+
+SOURCE_LABELS = {
+    'daily_report': '日報',
+    'bbs_post': '掲示板投稿',
+    'bbs_comment': '掲示板コメント',
+}
+
+
+class Command(BaseCommand):
+    help = '日報・掲示板投稿・掲示板コメントを一括でベクトル化します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            dest='source_types',
+            action='append',
+            choices=VectorizationService.SOURCE_TYPES,
+            help='対象のソース種別（複数指定可、省略時は全種別）',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='1バッチあたりの件数（省略時は settings.EMBEDDING_BATCH_SIZE）',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='コンテンツに変更がないデータも埋め込みを再生成',
+        )
+
+    def handle(self, *args, **options):
+        source_types = options['source_types'] or VectorizationService.SOURCE_TYPES
+
+        for source_type in source_types:
+            label = SOURCE_LABELS[source_type]
+            self.stdout.write(f'{label}をベクトル化中...')
+            success, fail = VectorizationService.bulk_vectorize(
+                source_type,
+                batch_size=options['batch_size'],
+                force=options['force'],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'{label}: 成功 {success}件, 失敗 {fail}件')
+            )
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_keyword_search_trgm'),
+        ('stores', '0003_remove_store_sales_target'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyreport',
+            index=models.Index(fields=['store', '-date', '-created_at', '-report_id'], name='daily_report_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+import common.indexes
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+from common.migration_operations import replace_index_state
+
+
+class Migration(migrations.Migration):
+    """pg_trgm の GIN インデックスを PostgreSQL専用インデックスとして扱う（モデルの状態のみ、DDLなし）"""
+
+    dependencies = [
+        ('reports', '0003_keyset_pagination_index'),
+    ]
+
+    operations = [
+        replace_index_state(
+            model_name='dailyreport',
+            index=common.indexes.PostgresGinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='gin_trgm_ops'), name='daily_report_title_trgm_idx'),
+        ),
+        replace_index_state(
+            model_name='dailyreport',
+            index=common.indexes.PostgresGinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('content'), name='gin_trgm_ops'), name='daily_report_content_trgm_idx'),
+        ),
+    ]
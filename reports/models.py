@@ -1,8 +1,12 @@
 import uuid
 import os
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
 
+from common.indexes import PostgresGinIndex
+
 
 def report_image_upload_path(instance, filename):
     """日報画像のアップロードパスを生成（ファイル名をUUIDに変換）"""
@@ -69,6 +73,13 @@ class DailyReport(models.Model):
         verbose_name = '日報'
         verbose_name_plural = '日報'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # 一覧のキーセットページネーション用（店舗ごとの日付・作成日時の新しい順）
+            models.Index(fields=['store', '-date', '-created_at', '-report_id'], name='daily_report_keyset_idx'),
+            # キーワード検索用（icontains は UPPER(col) LIKE になるため UPPER 式に pg_trgm を張る、PostgreSQLのみ）
+            PostgresGinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='daily_report_title_trgm_idx'),
+            PostgresGinIndex(OpClass(Upper('content'), name='gin_trgm_ops'), name='daily_report_content_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.title}"
@@ -56,6 +56,13 @@ class DailyReportService:
             **kwargs
         )
 
+        # アウトボックスに登録（同じトランザクションで保存し、ワーカーが非同期にベクトル化）
+        from ai_features.services.core_services import VectorizationOutboxService
+        if VectorizationOutboxService.is_enabled():
+            VectorizationOutboxService.enqueue('daily_report', report.report_id)
+            logger.info(f"日報作成＆ベクトル化登録: report_id={report.report_id}")
+            return report
+
         # ベクトル化を実行
         try:
             from ai_features.services.core_services import VectorizationService
@@ -93,6 +100,13 @@ class DailyReportService:
             setattr(report, field, value)
         report.save()
 
+        # アウトボックスに登録（同じトランザクションで保存し、ワーカーが非同期にベクトル化）
+        from ai_features.services.core_services import VectorizationOutboxService
+        if VectorizationOutboxService.is_enabled():
+            VectorizationOutboxService.enqueue('daily_report', report.report_id)
+            logger.info(f"日報更新＆ベクトル化登録: report_id={report.report_id}")
+            return report
+
         # ベクトルを再生成
         try:
             from ai_features.services.core_services import VectorizationService
@@ -1,13 +1,15 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from unittest.mock import patch, MagicMock
 from stores.models import Store
 from reports.models import DailyReport
 from reports.services import DailyReportService
+from ai_features.models import VectorizationTask
 
 User = get_user_model()
 
+@override_settings(AI_VECTORIZATION_MODE='sync')
 class DailyReportServiceTests(TestCase):
     def setUp(self):
         self.store = Store.objects.create(store_name="サービス店舗", store_id=10)
@@ -218,4 +220,53 @@ class DailyReportServiceTests(TestCase):
 
         result = DailyReportService.revectorize_report(report.report_id)
 
-        self.assertFalse(result)
\ No newline at end of file
+        self.assertFalse(result)
+
+
+class DailyReportServiceOutboxTests(TestCase):
+    """アウトボックス経由のベクトル化登録のテスト"""
+
+    def setUp(self):
+        self.store = Store.objects.create(store_name="サービス店舗", store_id=10)
+        self.user = User.objects.create_user(
+            user_id="service_user",
+            password="password",
+            store=self.store
+        )
+        self.today = timezone.now().date()
+
+    @patch('ai_features.services.core_services.VectorizationService.vectorize_daily_report')
+    def test_create_report_enqueues_vectorization(self, mock_vectorize):
+        """日報作成時はベクトル化を同期実行せず、アウトボックスに登録することを確認"""
+        report = DailyReportService.create_report(
+            store=self.store,
+            user=self.user,
+            date=self.today,
+            genre='praise',
+            location='hall',
+            title='アウトボックス',
+            content='内容'
+        )
+
+        mock_vectorize.assert_not_called()
+        task = VectorizationTask.objects.get()
+        self.assertEqual(task.source_type, 'daily_report')
+        self.assertEqual(task.source_id, report.report_id)
+        self.assertEqual(task.status, VectorizationTask.STATUS_PENDING)
+
+    @patch('ai_features.services.core_services.VectorizationService.vectorize_daily_report')
+    def test_update_report_does_not_duplicate_pending_task(self, mock_vectorize):
+        """未処理のタスクがある日報を更新してもタスクが重複しないことを確認"""
+        report = DailyReportService.create_report(
+            store=self.store,
+            user=self.user,
+            date=self.today,
+            genre='claim',
+            location='kitchen',
+            title='更新前',
+            content='更新前'
+        )
+        DailyReportService.update_report(report, {'title': '更新後'})
+
+        mock_vectorize.assert_not_called()
+        self.assertEqual(VectorizationTask.objects.filter(source_id=report.report_id).count(), 1)
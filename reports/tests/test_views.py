@@ -1,11 +1,13 @@
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from unittest.mock import patch
 from datetime import date
 from stores.models import Store
-from reports.models import DailyReport, ReportImage
+from reports.models import DailyReport, ReportImage, StoreDailyPerformance
 from bbs.models import BBSPost
 
 User = get_user_model()
@@ -224,3 +226,129 @@ class ReportViewTest(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context['report'].images.count(), 1)
+
+
+class ReportListViewTest(TestCase):
+    """日報一覧ビューのテスト"""
+
+    def setUp(self):
+        """テスト用データを作成（10日分、1日2件）"""
+        self.client = Client()
+        self.store = Store.objects.create(
+            store_name='テスト店舗',
+            address='テスト住所'
+        )
+        self.user = User.objects.create_user(
+            user_id='testuser',
+            password='testpass123',
+            store=self.store
+        )
+        for day in range(1, 11):
+            for i in range(2):
+                DailyReport.objects.create(
+                    store=self.store,
+                    user=self.user,
+                    date=date(2024, 1, day),
+                    genre='report',
+                    location='hall',
+                    title=f'日報{day}-{i}',
+                    content='日報の内容'
+                )
+        self.client.login(user_id='testuser', password='testpass123')
+        self.url = reverse('reports:list')
+
+    def test_first_page(self):
+        """先頭ページは7日分・10件を表示し、総件数と次のページのURLを渡すことを確認"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'reports/list.html')
+        self.assertEqual(
+            [day['date'].day for day in response.context['reports_by_date']],
+            [10, 9, 8, 7, 6, 5, 4]
+        )
+        self.assertEqual(len(response.context['reports']), 10)
+        self.assertEqual(response.context['total_days'], 10)
+        self.assertEqual(response.context['total_count'], 20)
+        self.assertIn('date_cursor=', response.context['next_date_page_url'])
+        self.assertIn('search_cursor=', response.context['next_search_page_url'])
+
+    def test_load_more_days(self):
+        """「もっと見る」では次の日付の一覧部分のみを返すことを確認"""
+        first = self.client.get(self.url, {'sort': 'oldest'})
+        response = self.client.get(
+            self.url + first.context['next_date_page_url'],
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'reports/components/day_items.html')
+        self.assertTemplateNotUsed(response, 'reports/list.html')
+        self.assertEqual([day['date'].day for day in response.context['reports_by_date']], [8, 9, 10])
+        self.assertEqual(response['X-Next-Page'], '')
+
+    def test_load_more_search(self):
+        """検索表示の「もっと見る」で残りの日報を重複なく取得できることを確認"""
+        first = self.client.get(self.url, {'genre': 'report'})
+        response = self.client.get(
+            self.url + first.context['next_search_page_url'],
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+        self.assertTemplateUsed(response, 'reports/components/report_items.html')
+        titles = [report.title for report in first.context['reports']]
+        titles += [report.title for report in response.context['reports']]
+        self.assertEqual(len(set(titles)), 20)
+        self.assertIn('genre=report', first.context['next_search_page_url'])
+        self.assertEqual(response['X-Next-Page'], '')
+
+    def test_day_view_performance(self):
+        """日別表示で日付ごとの日報と店舗実績をまとめることを確認"""
+        StoreDailyPerformance.objects.create(
+            store=self.store,
+            date=date(2024, 1, 9),
+            sales_amount=100000,
+            customer_count=50
+        )
+
+        response = self.client.get(self.url)
+
+        days = {day['date'].day: day for day in response.context['reports_by_date']}
+        self.assertEqual(days[9]['performance'].sales_amount, 100000)
+        self.assertIsNone(days[10]['performance'])
+        self.assertEqual(days[10]['count'], 2)
+        self.assertEqual(
+            [report.title for report in days[10]['reports']],
+            ['日報10-1', '日報10-0']
+        )
+
+    def test_day_view_queries_do_not_grow_with_history(self):
+        """過去の日報が増えても日別表示のクエリ数が変わらないことを確認"""
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertEqual(len(response.context['reports_by_date']), 7)
+
+            # 店舗実績は1クエリ、日報はページ内の日付のみを取得
+            sqls = [query['sql'] for query in context.captured_queries]
+            self.assertEqual(len([sql for sql in sqls if 'store_daily_performance' in sql]), 1)
+            report_sqls = [sql for sql in sqls if 'FROM "daily_reports"' in sql and 'DISTINCT' not in sql]
+            self.assertEqual(len(report_sqls), 1)
+            self.assertIn('"daily_reports"."date" IN', report_sqls[0])
+            return len(context)
+
+        baseline = count_queries()
+
+        for month in range(2, 6):
+            for day in range(1, 21):
+                DailyReport.objects.create(
+                    store=self.store,
+                    user=self.user,
+                    date=date(2023, month, day),
+                    genre='report',
+                    location='hall',
+                    title='過去の日報',
+                    content='日報の内容'
+                )
+
+        self.assertEqual(count_queries(), baseline)
@@ -2,16 +2,20 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q
 from itertools import groupby
 from operator import attrgetter
 import logging
 from .forms import DailyReportForm
 from .models import DailyReport, ReportImage, StoreDailyPerformance
 from bbs.models import BBSPost
+from common.pagination import KeysetPaginator
+from common.services import KeywordSearchService
 
 logger = logging.getLogger(__name__)
 
+# 一覧の総件数を数える上限（超える場合は「1000+件」と表示し、全件のCOUNTを避ける）
+TOTAL_COUNT_LIMIT = 1000
+
 
 @login_required
 def report_register(request):
@@ -82,10 +86,52 @@ def report_view(request, report_id):
     return render(request, 'reports/view.html', context)
 
 
+def _build_reports_by_date(reports, dates, store):
+    """日別表示用に、ページ内の日付の日報と店舗実績をまとめる
+
+    日報・店舗実績ともにページ内の日付だけを date__in でそれぞれ1クエリで取得するため、
+    過去の日報が多い店舗でもメモリ使用量と応答時間はページの大きさで頭打ちになる。
+
+    Args:
+        reports: 絞り込み・並び替え済みの日報クエリセット
+        dates: 表示する日付のリスト（表示順）
+        store: 店舗
+
+    Returns:
+        list: 日付ごとの {'date', 'reports', 'count', 'performance'}
+    """
+    if not dates:
+        return []
+
+    # 日報は日付順に並んでいるため、日付ごとにまとめる
+    reports_by_day = {
+        date: list(day_reports)
+        for date, day_reports in groupby(reports.filter(date__in=dates), key=attrgetter('date'))
+    }
+
+    # ページ内の日付の売上データをまとめて取得
+    performances = {
+        performance.date: performance
+        for performance in StoreDailyPerformance.objects.filter(store=store, date__in=dates)
+    }
+
+    reports_by_date = []
+    for date in dates:
+        day_reports = reports_by_day.get(date, [])
+        reports_by_date.append({
+            'date': date,
+            'reports': day_reports,
+            'count': len(day_reports),
+            'performance': performances.get(date)
+        })
+    return reports_by_date
+
+
 @login_required
 def report_list(request):
     """日報一覧ビュー"""
-    from django.core.paginator import Paginator
+    DAYS_PER_PAGE = 7
+    REPORTS_PER_PAGE = 10
 
     reports = DailyReport.objects.select_related('user', 'store').filter(store=request.user.store)
 
@@ -102,68 +148,72 @@ def report_list(request):
     # キーワード検索
     query = request.GET.get('query')
     if query:
-        keywords = query.replace('　', ' ').split()
-        if keywords:
-            query_condition = Q()
-            for word in keywords:
-                query_condition |= Q(title__icontains=word) | Q(content__icontains=word)
-            reports = reports.filter(query_condition)
-
-    # ソート
-    sort_option = request.GET.get('sort')
-    if sort_option == 'oldest':
-        reports = reports.order_by('date', 'created_at')
-    else:
-        reports = reports.order_by('-date', '-created_at')
+        reports = KeywordSearchService.filter(reports, KeywordSearchService.split_keywords(query))
 
-    # 日別表示用：ユニークな日付リストを取得
+    # ソート（キーセットページネーションのため、末尾に主キーを加えて並び順を一意にする）
+    sort_option = request.GET.get('sort')
     if sort_option == 'oldest':
-        unique_dates = list(reports.values_list('date', flat=True).distinct().order_by('date'))
+        date_ordering = ('date',)
+        report_ordering = ('date', 'created_at', 'report_id')
     else:
-        unique_dates = list(reports.values_list('date', flat=True).distinct().order_by('-date'))
-
-    # 日付リストをページネーション（1ページあたり7日分）
-    DAYS_PER_PAGE = 7
-    date_paginator = Paginator(unique_dates, DAYS_PER_PAGE)
-    page_number = request.GET.get('page', 1)
-    date_page = date_paginator.get_page(page_number)
-
-    # 現在のページの日付に対応する日報を取得
-    reports_by_date = []
-    for date in date_page:
-        day_reports = [r for r in reports if r.date == date]
+        date_ordering = ('-date',)
+        report_ordering = ('-date', '-created_at', '-report_id')
+    reports = reports.order_by(*report_ordering)
 
-        # その日の売上データを取得
-        performance = StoreDailyPerformance.objects.filter(
-            store=request.user.store,
-            date=date
-        ).first()
-
-        reports_by_date.append({
-            'date': date,
-            'reports': day_reports,
-            'count': len(day_reports),
-            'performance': performance
-        })
-
-    # 検索表示用のページネーション（1ページあたり10件）
-    REPORTS_PER_PAGE = 10
-    report_paginator = Paginator(reports, REPORTS_PER_PAGE)
-    search_page_number = request.GET.get('search_page', 1)
-    reports_paginated = report_paginator.get_page(search_page_number)
-
-    # ページネーション用のクエリ文字列を構築（pageパラメータを除く）
+    # ページネーション用のクエリ文字列を構築（カーソル・表示切り替えパラメータを除く）
     query_params = request.GET.copy()
-    if 'page' in query_params:
-        del query_params['page']
-    if 'search_page' in query_params:
-        del query_params['search_page']
+    for key in ('page', 'search_page', 'date_cursor', 'search_cursor', 'view'):
+        query_params.pop(key, None)
     query_string = query_params.urlencode()
 
+    def build_next_page_url(view, cursor_key, page):
+        if not page.has_next:
+            return None
+        params = query_params.copy()
+        params['view'] = view
+        params[cursor_key] = page.next_cursor
+        return f'?{params.urlencode()}'
+
+    # 日別表示用：日付の一覧をキーセットでページネーション（1ページあたり7日分）
+    date_paginator = KeysetPaginator(reports.values('date').distinct(), date_ordering, DAYS_PER_PAGE)
+    # 検索表示用：日報をキーセットでページネーション（1ページあたり10件）
+    report_paginator = KeysetPaginator(reports, report_ordering, REPORTS_PER_PAGE)
+
+    # 「もっと見る」からの読み込みは一覧部分のみを返し、次ページのURLはヘッダーで渡す
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        if request.GET.get('view') == 'search':
+            reports_page = report_paginator.get_page(request.GET.get('search_cursor'))
+            response = render(request, 'reports/components/report_items.html', {'reports': reports_page})
+            response['X-Next-Page'] = build_next_page_url('search', 'search_cursor', reports_page) or ''
+        else:
+            date_page = date_paginator.get_page(request.GET.get('date_cursor'))
+            reports_by_date = _build_reports_by_date(reports, [row['date'] for row in date_page], request.user.store)
+            response = render(request, 'reports/components/day_items.html', {'reports_by_date': reports_by_date})
+            response['X-Next-Page'] = build_next_page_url('daily', 'date_cursor', date_page) or ''
+        return response
+
+    date_page = date_paginator.get_page(request.GET.get('date_cursor'))
+    reports_by_date = _build_reports_by_date(reports, [row['date'] for row in date_page], request.user.store)
+    reports_page = report_paginator.get_page(request.GET.get('search_cursor'))
+
+    # 総件数は先頭ページでのみ、上限件数まで数える
+    total_days, total_days_capped = (None, False)
+    if not date_page.has_previous:
+        total_days, total_days_capped = date_paginator.count(limit=TOTAL_COUNT_LIMIT)
+    total_count, total_count_capped = (None, False)
+    if not reports_page.has_previous:
+        total_count, total_count_capped = report_paginator.count(limit=TOTAL_COUNT_LIMIT)
+
     context = {
-        'reports': reports_paginated,  # 検索表示用（ページネーション済み）
+        'reports': reports_page,  # 検索表示用（ページネーション済み）
+        'next_search_page_url': build_next_page_url('search', 'search_cursor', reports_page),
+        'total_count': total_count,
+        'total_count_capped': total_count_capped,
         'reports_by_date': reports_by_date,
         'date_page': date_page,  # 日別表示用ページネーション
+        'next_date_page_url': build_next_page_url('daily', 'date_cursor', date_page),
+        'total_days': total_days,
+        'total_days_capped': total_days_capped,
         'query': query,
         'sort': sort_option,
         'genre_choices': DailyReport.GENRE_CHOICES,